@@ -52,10 +52,23 @@ def create_app(config_name=None):
     if not os.path.exists(instance_path):
         os.makedirs(instance_path)
     
+    # Registro de eventos asíncrono (antes de que los módulos empiecen a registrar)
+    from app.bitacora import init_bitacora
+    init_bitacora(app)
+    
+    # Registrar la réplica de lectura (si existe) antes de inicializar SQLAlchemy
+    from app.replica import configurar_binds, init_replica
+    configurar_binds(app)
+    
     # Inicializar extensiones con la app
     db.init_app(app)
     login_manager.init_app(app)
     socketio.init_app(app, cors_allowed_origins="*")
+    init_replica(app)
+    
+    # Pool de hilos para el hash de contraseñas
+    from app.seguridad import configurar_pool
+    configurar_pool(app)
     
     # Configurar login manager
     login_manager.login_view = 'empleado.login'
@@ -64,29 +77,12 @@ def create_app(config_name=None):
     @login_manager.user_loader
     def load_user(user_id):
         """
-        Carga el usuario desde la base de datos para Flask-Login.
+        Carga el usuario para Flask-Login.
         Usa prefijos para distinguir entre UsuarioSistema (usr_) y Empleado (emp_).
+        La identidad se sirve desde una caché de corta duración (ver cache_identidad).
         """
-        from app.models import Empleado
-        
-        if not user_id:
-            return None
-        
-        # Parsear el prefijo para determinar el tipo de usuario
-        if user_id.startswith('usr_'):
-            # Es un UsuarioSistema (admin)
-            actual_id = int(user_id.replace('usr_', ''))
-            return UsuarioSistema.query.get(actual_id)
-        elif user_id.startswith('emp_'):
-            # Es un Empleado
-            actual_id = int(user_id.replace('emp_', ''))
-            return Empleado.query.get(actual_id)
-        else:
-            # Fallback para compatibilidad (intentar como Empleado)
-            try:
-                return Empleado.query.get(int(user_id))
-            except:
-                return None
+        from app.cache_identidad import cargar_identidad
+        return cargar_identidad(user_id)
     
     # Registrar blueprints (rutas)
     from app.routes.usuario_routes import usuario_bp
@@ -97,12 +93,31 @@ def create_app(config_name=None):
     app.register_blueprint(empleado_bp, url_prefix='/empleado')
     app.register_blueprint(admin_bp)
     
+    # Manejadores de conexión de Socket.IO (presencia de empleados)
+    from app import eventos_socket
+    
+    # Métricas de latencia, SQL y Socket.IO en /metrics
+    from app.metricas import init_metricas
+    init_metricas(app)
+    
+    # Trazas de latencia de los eventos Socket.IO (commit -> emit -> cliente)
+    from app.trazas_socket import init_trazas_socket
+    init_trazas_socket(app)
+    
+    # Registro de consultas SQL lentas con su plan de ejecución
+    from app.consultas_lentas import init_consultas_lentas
+    init_consultas_lentas(app)
+    
     # Auto-inicializar base de datos en producción si está vacía
     with app.app_context():
         try:
             # Crear todas las tablas si no existen
             db.create_all()
             
+            # create_all no agrega columnas ni índices nuevos a tablas ya existentes
+            from app.migraciones import actualizar_esquema
+            actualizar_esquema()
+            
             # Verificar si necesita inicialización
             from app.models import Empleado, TipoTramite
             
@@ -146,6 +161,34 @@ def create_app(config_name=None):
             app.logger.error(f'Error al inicializar base de datos: {e}')
             db.session.rollback()
     
+    # Precalentar la caché de cédulas
+    from app.cache_cedulas import init_cache_cedulas
+    init_cache_cedulas(app)
+    
+    # Programar el archivado de días cerrados
+    from app.archivo import init_archivo
+    init_archivo(app)
+    
+    # Programar la purga de claves de idempotencia vencidas
+    from app.idempotencia import init_idempotencia
+    init_idempotencia(app)
+    
+    # Programar el cierre de turnos no presentados
+    from app.no_presentados import init_no_presentados
+    init_no_presentados(app)
+    
+    # Programar el cierre de días anteriores
+    from app.cierre_dia import init_cierre_dia
+    init_cierre_dia(app)
+    
+    # Iniciar el envío de notificaciones por SMS, e-mail y WhatsApp
+    from app.mensajeria import init_mensajeria
+    init_mensajeria(app)
+    
+    # Convertir en turnos las citas cuya franja comenzó
+    from app.citas import init_citas
+    init_citas(app)
+    
     # Ruta principal
     @app.route('/')
     def index():
@@ -0,0 +1,204 @@
+"""
+Archivado de turnos y notificaciones de días cerrados
+
+Las tablas operativas 'turnos' y 'notificaciones' solo deben contener los
+días recientes. Este módulo mueve por lotes los turnos finalizados de días
+anteriores a ARCHIVO_DIAS_RETENCION hacia 'turnos_historico' y
+'notificaciones_historico', y ofrece funciones de consulta que leen de ambas
+tablas para las vistas históricas (historial y estadísticas).
+
+Además, las notificaciones de turnos ya cerrados se retiran de la tabla
+operativa (archivándolas o eliminándolas) pasadas NOTIFICACIONES_TTL_HORAS,
+sin esperar a que se archive el día completo.
+"""
+
+import logging
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, insert, select
+
+from app.migraciones import tablas_sin_autoincremento, verificar_esquema
+from app.models import db, Turno, TurnoHistorico, Notificacion, NotificacionHistorico
+
+logger = logging.getLogger(__name__)
+
+# Estados que ya no cambian y pueden salir de la tabla operativa
+ESTADOS_FINALES = ['atendido', 'cancelado', 'no_presentado']
+
+COLUMNAS_TURNO = [c.name for c in Turno.__table__.columns]
+COLUMNAS_NOTIFICACION = [c.name for c in Notificacion.__table__.columns]
+
+
+def fecha_corte(dias_retencion):
+    """Primer instante que se conserva en las tablas operativas"""
+    hoy = datetime.utcnow().date()
+    return datetime.combine(hoy - timedelta(days=dias_retencion), datetime.min.time())
+
+
+def archivar_dias_cerrados(dias_retencion=None, tamano_lote=None):
+    """
+    Mueve los turnos finalizados anteriores a la fecha de corte (y sus
+    notificaciones) a las tablas históricas, en lotes de `tamano_lote`.
+    Cada lote se confirma en su propia transacción.
+
+    No archiva nada mientras haya tablas sin migrar (ver migraciones) y se
+    detiene si algún id del lote ya existe en el histórico.
+
+    Args:
+        dias_retencion: Días completos que se conservan en las tablas operativas
+        tamano_lote: Cantidad de turnos movidos por transacción
+
+    Returns:
+        Total de turnos archivados
+    """
+    if dias_retencion is None:
+        dias_retencion = current_app.config['ARCHIVO_DIAS_RETENCION']
+    if tamano_lote is None:
+        tamano_lote = current_app.config['ARCHIVO_TAMANO_LOTE']
+
+    pendientes = tablas_sin_autoincremento()
+    if pendientes:
+        logger.error('Archivado desactivado: las tablas %s deben migrarse con migrar_db.py', ', '.join(pendientes))
+        return 0
+
+    corte = fecha_corte(dias_retencion)
+    total = 0
+
+    while True:
+        ids = db.session.execute(
+            select(Turno.id).where(
+                Turno.fecha_solicitud < corte,
+                Turno.estado.in_(ESTADOS_FINALES)
+            ).order_by(Turno.id).limit(tamano_lote)
+        ).scalars().all()
+
+        if not ids:
+            break
+
+        repetidos = db.session.execute(
+            select(TurnoHistorico.id).where(TurnoHistorico.id.in_(ids))
+        ).scalars().all()
+        if repetidos:
+            # El histórico ya tiene esos ids: no se mueve nada para no perder ni mezclar turnos
+            logger.error('Archivado detenido: los ids %s ya existen en turnos_historico', repetidos[:10])
+            break
+
+        db.session.execute(
+            insert(TurnoHistorico.__table__).from_select(
+                COLUMNAS_TURNO,
+                select(*[Turno.__table__.c[c] for c in COLUMNAS_TURNO]).where(Turno.id.in_(ids))
+            )
+        )
+        db.session.execute(
+            insert(NotificacionHistorico.__table__).from_select(
+                COLUMNAS_NOTIFICACION,
+                select(*[Notificacion.__table__.c[c] for c in COLUMNAS_NOTIFICACION]).where(Notificacion.turno_id.in_(ids))
+            )
+        )
+        db.session.execute(delete(Notificacion.__table__).where(Notificacion.turno_id.in_(ids)))
+        db.session.execute(delete(Turno.__table__).where(Turno.id.in_(ids)))
+        db.session.commit()
+
+        total += len(ids)
+        logger.info('Archivados %s turnos (acumulado: %s)', len(ids), total)
+
+    return total
+
+
+def barrer_notificaciones(ttl_horas=None, tamano_lote=None, archivar=None):
+    """
+    Retira de la tabla operativa, en lotes, las notificaciones de turnos
+    finalizados enviadas hace más de `ttl_horas`. Según `archivar` se copian a
+    'notificaciones_historico' o simplemente se eliminan.
+
+    Como el archivado, no corre mientras haya tablas sin migrar y se detiene
+    si algún id del lote ya existe en el histórico.
+
+    Returns:
+        Total de notificaciones retiradas
+    """
+    if ttl_horas is None:
+        ttl_horas = current_app.config['NOTIFICACIONES_TTL_HORAS']
+    if tamano_lote is None:
+        tamano_lote = current_app.config['ARCHIVO_TAMANO_LOTE']
+    if archivar is None:
+        archivar = current_app.config['NOTIFICACIONES_ARCHIVAR']
+
+    pendientes = tablas_sin_autoincremento()
+    if pendientes:
+        logger.error('Barrido de notificaciones desactivado: las tablas %s deben migrarse con migrar_db.py', ', '.join(pendientes))
+        return 0
+
+    limite = datetime.utcnow() - timedelta(hours=ttl_horas)
+    total = 0
+
+    while True:
+        ids = db.session.execute(
+            select(Notificacion.id)
+            .join(Turno, Turno.id == Notificacion.turno_id)
+            .where(Notificacion.fecha_envio < limite, Turno.estado.in_(ESTADOS_FINALES))
+            .order_by(Notificacion.id).limit(tamano_lote)
+        ).scalars().all()
+
+        if not ids:
+            break
+
+        if archivar:
+            repetidos = db.session.execute(
+                select(NotificacionHistorico.id).where(NotificacionHistorico.id.in_(ids))
+            ).scalars().all()
+            if repetidos:
+                logger.error('Barrido detenido: los ids %s ya existen en notificaciones_historico', repetidos[:10])
+                break
+            db.session.execute(
+                insert(NotificacionHistorico.__table__).from_select(
+                    COLUMNAS_NOTIFICACION,
+                    select(*[Notificacion.__table__.c[c] for c in COLUMNAS_NOTIFICACION]).where(Notificacion.id.in_(ids))
+                )
+            )
+        db.session.execute(delete(Notificacion.__table__).where(Notificacion.id.in_(ids)))
+        db.session.commit()
+
+        total += len(ids)
+
+    if total:
+        logger.info('Retiradas %s notificaciones de turnos cerrados', total)
+    return total
+
+
+def obtener_turno(turno_id):
+    """Busca un turno en la tabla operativa y, si no está, en el histórico"""
+    return db.session.get(Turno, turno_id) or db.session.get(TurnoHistorico, turno_id)
+
+
+def turnos_de_usuario(usuario_id):
+    """Todos los turnos de un usuario (operativos e históricos), más recientes primero"""
+    turnos = Turno.query.filter_by(usuario_id=usuario_id).all()
+    turnos += TurnoHistorico.query.filter_by(usuario_id=usuario_id).all()
+    turnos.sort(key=lambda t: t.fecha_solicitud, reverse=True)
+    return turnos
+
+
+def turnos_en_rango(fecha_inicio, fecha_fin):
+    """
+    Turnos solicitados entre dos fechas (inclusive) leyendo de ambas tablas.
+    Se filtra por rango de fecha y hora para aprovechar los índices.
+    """
+    desde = datetime.combine(fecha_inicio, datetime.min.time())
+    hasta = datetime.combine(fecha_fin + timedelta(days=1), datetime.min.time())
+
+    turnos = Turno.query.filter(Turno.fecha_solicitud >= desde, Turno.fecha_solicitud < hasta).all()
+    turnos += TurnoHistorico.query.filter(
+        TurnoHistorico.fecha_solicitud >= desde,
+        TurnoHistorico.fecha_solicitud < hasta
+    ).all()
+    return turnos
+
+
+def init_archivo(app):
+    """Programa el archivado periódico de días cerrados y la limpieza de notificaciones"""
+    from app.tareas import iniciar_tarea_periodica
+    verificar_esquema(app)
+    iniciar_tarea_periodica(app, 'archivo_turnos', app.config['ARCHIVO_INTERVALO_SEGUNDOS'], archivar_dias_cerrados)
+    iniciar_tarea_periodica(app, 'barrido_notificaciones', app.config['NOTIFICACIONES_INTERVALO_SEGUNDOS'], barrer_notificaciones)
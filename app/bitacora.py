@@ -0,0 +1,240 @@
+"""
+Registro de eventos estructurado y asíncrono
+
+Los print() de depuración escribían sincrónicamente en stdout en cada emisión
+de turno, carga del dashboard e inicio de sesión. Con un único worker de
+eventlet, una escritura lenta en el pipe de logs del proveedor detiene el
+bucle de eventos y con él todas las conexiones Socket.IO.
+
+Este módulo instala en el logger raíz un manejador que solo encola el
+registro: un hilo nativo (fuera del hub de eventlet) lo formatea como JSON y
+lo escribe. Además:
+- LOG_NIVEL fija el nivel general y LOG_NIVELES_MODULOS el de cada módulo
+  ("app.routes.empleado_routes=DEBUG,werkzeug=WARNING").
+- LOG_MUESTREO conserva 1 de cada N registros de los módulos indicados
+  ("app.routes.usuario_routes=10"); WARNING y superiores nunca se descartan.
+- Si la cola supera LOG_COLA_MAXIMA registros se descartan los nuevos en
+  lugar de bloquear la petición.
+
+Los módulos usan logging.getLogger(__name__) con argumentos diferidos
+(logger.debug('Turno %s', numero)): si el nivel está deshabilitado no se crea
+el registro ni se formatea nada. Los datos estructurados se pasan con
+extra={'datos': {...}} y deben ser valores simples (no objetos del ORM).
+"""
+
+import atexit
+import itertools
+import json
+import logging
+import sys
+from datetime import datetime, timezone
+
+from flask import has_request_context, request
+
+try:
+    # Hilo y cola nativos aunque eventlet haya parcheado threading
+    from eventlet import patcher
+    _threading = patcher.original('threading')
+    _queue = patcher.original('queue')
+except ImportError:
+    import queue as _queue
+    import threading as _threading
+
+# Registros que el hilo escritor agrupa en una sola escritura
+LOTE_ESCRITURA = 500
+
+
+def _pares(texto):
+    """'modulo=valor,otro=valor' -> {modulo: valor}"""
+    pares = {}
+    for parte in (texto or '').split(','):
+        if '=' in parte:
+            modulo, valor = parte.split('=', 1)
+            pares[modulo.strip()] = valor.strip()
+    return pares
+
+
+def _niveles(texto):
+    """'modulo=NIVEL,otro=NIVEL' -> {modulo: nivel}"""
+    return {modulo: nivel.upper() for modulo, nivel in _pares(texto).items()}
+
+
+def _tasas(texto):
+    """'modulo=N,otro=M' -> {modulo: N}"""
+    return {modulo: int(n) for modulo, n in _pares(texto).items()}
+
+
+class FormateadorJSON(logging.Formatter):
+    """Una línea JSON por registro"""
+
+    def format(self, record):
+        linea = {
+            'fecha': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'modulo': record.name,
+            'mensaje': record.getMessage(),
+        }
+        endpoint = getattr(record, 'endpoint', None)
+        if endpoint:
+            linea['endpoint'] = endpoint
+        datos = getattr(record, 'datos', None)
+        if datos:
+            linea['datos'] = datos
+        if record.exc_text:
+            linea['excepcion'] = record.exc_text
+        return json.dumps(linea, ensure_ascii=False, default=str)
+
+
+class FormateadorTexto(logging.Formatter):
+    """Formato legible para desarrollo"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s [%(name)s] %(message)s')
+
+    def format(self, record):
+        texto = super().format(record)
+        datos = getattr(record, 'datos', None)
+        if datos:
+            texto += ' ' + json.dumps(datos, ensure_ascii=False, default=str)
+        return texto
+
+
+class FiltroMuestreo(logging.Filter):
+    """Conserva 1 de cada N registros bajo WARNING de los módulos configurados"""
+
+    def __init__(self, tasas=None):
+        super().__init__()
+        self.configurar(tasas or {})
+
+    def configurar(self, tasas):
+        self.tasas = tasas
+        self._por_logger = {}   # nombre -> (tasa, contador)
+
+    def _tasa(self, nombre):
+        # Prefijo más largo configurado ('app.routes' aplica a 'app.routes.usuario_routes')
+        partes = nombre.split('.')
+        for i in range(len(partes), 0, -1):
+            tasa = self.tasas.get('.'.join(partes[:i]))
+            if tasa:
+                return tasa
+        return 1
+
+    def filter(self, record):
+        if not self.tasas or record.levelno >= logging.WARNING:
+            return True
+        muestreo = self._por_logger.get(record.name)
+        if muestreo is None:
+            muestreo = self._por_logger.setdefault(record.name, (self._tasa(record.name), itertools.count()))
+        tasa, contador = muestreo
+        return tasa <= 1 or next(contador) % tasa == 0
+
+
+class ManejadorCola(logging.Handler):
+    """
+    Encola los registros para el hilo escritor. En el hilo que registra solo
+    se interpola el mensaje (los argumentos pueden cambiar o ser objetos del
+    ORM) y se toma el endpoint de la petición actual.
+    """
+
+    def __init__(self, destino=None, maximo=10000):
+        super().__init__()
+        self.destino = destino or sys.stdout
+        self.maximo = maximo
+        self.cola = _queue.SimpleQueue()
+        self.encolados = 0
+        self.descartados = 0
+        self._hilo = None
+
+    def emit(self, record):
+        if self.cola.qsize() >= self.maximo:
+            self.descartados += 1
+            return
+        try:
+            record.msg = record.getMessage()
+            record.args = None
+            if record.exc_info:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+                record.exc_info = None
+            if has_request_context():
+                record.endpoint = request.endpoint
+            self.cola.put(record)
+            self.encolados += 1
+        except Exception:
+            self.handleError(record)
+
+    def iniciar(self):
+        if self._hilo is None:
+            self._hilo = _threading.Thread(target=self._escribir, name='bitacora', daemon=True)
+            self._hilo.start()
+
+    def detener(self, espera=2.0):
+        """Escribe lo pendiente y termina el hilo escritor"""
+        if self._hilo is not None:
+            self.cola.put(None)
+            self._hilo.join(espera)
+            self._hilo = None
+
+    def _escribir(self):
+        while True:
+            registros = [self.cola.get()]
+            while len(registros) < LOTE_ESCRITURA:
+                try:
+                    registros.append(self.cola.get_nowait())
+                except _queue.Empty:
+                    break
+
+            terminar = None in registros
+            lineas = []
+            for record in registros:
+                if record is None:
+                    continue
+                try:
+                    lineas.append(self.format(record))
+                except Exception:
+                    pass
+            if lineas:
+                try:
+                    self.destino.write('\n'.join(lineas) + '\n')
+                    self.destino.flush()
+                except Exception:
+                    pass
+            if terminar:
+                return
+
+    def estadisticas(self):
+        return {
+            'encolados': self.encolados,
+            'descartados': self.descartados,
+            'pendientes': self.cola.qsize()
+        }
+
+
+manejador = None
+
+
+def init_bitacora(app):
+    """Instala el manejador asíncrono en el logger raíz y aplica niveles y muestreo"""
+    global manejador
+    from flask.logging import default_handler
+
+    config = app.config
+    raiz = logging.getLogger()
+    if manejador is None:
+        manejador = ManejadorCola(maximo=config['LOG_COLA_MAXIMA'])
+        manejador.addFilter(FiltroMuestreo())
+        raiz.addHandler(manejador)
+        manejador.iniciar()
+        atexit.register(manejador.detener)
+
+    manejador.maximo = config['LOG_COLA_MAXIMA']
+    manejador.setFormatter(FormateadorTexto() if config['LOG_FORMATO'] == 'texto' else FormateadorJSON())
+    for filtro in manejador.filters:
+        if isinstance(filtro, FiltroMuestreo):
+            filtro.configurar(_tasas(config['LOG_MUESTREO']))
+
+    # El logger de Flask ('app', padre de los módulos) hereda el nivel general
+    app.logger.removeHandler(default_handler)
+    app.logger.setLevel(logging.NOTSET)
+    raiz.setLevel(config['LOG_NIVEL'].upper())
+    for modulo, nivel in _niveles(config['LOG_NIVELES_MODULOS']).items():
+        logging.getLogger(modulo).setLevel(nivel)
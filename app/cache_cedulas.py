@@ -0,0 +1,271 @@
+"""
+Caché de cédulas de usuarios (ciudadanos)
+
+Cada paso del formulario del kiosco busca al usuario por cédula. Este módulo
+combina dos estructuras en memoria:
+
+- Una caché LRU con los datos (to_dict) de las cédulas consultadas
+  recientemente, que evita repetir la consulta en los pasos siguientes.
+- Un filtro de Bloom con todas las cédulas registradas, que responde sin ir
+  a la base de datos cuando una cédula es "definitivamente nueva" (el caso
+  de todos los visitantes de primera vez). Puede dar falsos positivos, nunca
+  falsos negativos.
+
+Ambas se precalientan en segundo plano al iniciar la aplicación (solo en la
+instancia que ejecuta tareas programadas; sin filtro cada consulta va a la
+base de datos), se actualizan al registrar o modificar usuarios y se
+reconstruyen periódicamente. Cada CEDULAS_INCREMENTAL_SEGUNDOS se agregan al
+filtro las cédulas con id mayor al último leído, así las que registran otros
+procesos (importar_ciudadanos.py, generar_datos.py) no quedan descartadas
+hasta la siguiente reconstrucción. Los contadores de aciertos se exponen con
+estadisticas().
+"""
+
+import hashlib
+import logging
+import math
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import func, select
+
+from app import socketio
+from app.models import db, Usuario
+
+logger = logging.getLogger(__name__)
+
+# Cédulas agregadas al filtro entre cada cesión del bucle de eventos
+PAUSA_CADA = 5000
+
+
+class FiltroBloom:
+    """
+    Filtro de Bloom sobre cadenas con doble hashing (blake2b).
+
+    Args:
+        capacidad: Cantidad de elementos esperados
+        tasa_falsos_positivos: Probabilidad objetivo de falso positivo
+    """
+
+    def __init__(self, capacidad, tasa_falsos_positivos=0.01):
+        capacidad = max(1, capacidad)
+        self.capacidad = capacidad
+        self.num_bits = max(8, int(-capacidad * math.log(tasa_falsos_positivos) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacidad * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.elementos = 0
+
+    def _posiciones(self, valor):
+        digest = hashlib.blake2b(valor.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def agregar(self, valor):
+        for posicion in self._posiciones(valor):
+            self.bits[posicion >> 3] |= 1 << (posicion & 7)
+        self.elementos += 1
+
+    def __contains__(self, valor):
+        return all(self.bits[posicion >> 3] & (1 << (posicion & 7)) for posicion in self._posiciones(valor))
+
+
+class CacheCedulas:
+    """Caché LRU de usuarios por cédula más filtro de Bloom de cédulas registradas"""
+
+    def __init__(self, tamano_lru=5000, capacidad_minima_bloom=100000, tasa_falsos_positivos=0.01):
+        self.tamano_lru = tamano_lru
+        self.capacidad_minima_bloom = capacidad_minima_bloom
+        self.tasa_falsos_positivos = tasa_falsos_positivos
+        self._lru = OrderedDict()
+        self._bloom = None
+        self._max_id = 0  # Mayor id de usuario ya agregado al filtro
+        self._lock = threading.Lock()
+        self.contadores = {
+            'lru_aciertos': 0,
+            'lru_fallos': 0,
+            'bloom_consultas': 0,
+            'bloom_descartes': 0,
+            'bloom_falsos_positivos': 0
+        }
+
+    # ----- Precalentamiento -----
+
+    def precalentar(self):
+        """
+        Construye el filtro de Bloom con todas las cédulas (leídas en streaming)
+        y carga en la LRU los usuarios registrados más recientemente. Cede el
+        bucle de eventos cada PAUSA_CADA cédulas para no congelar Socket.IO.
+        """
+        total, max_id = db.session.execute(select(func.count(Usuario.id), func.max(Usuario.id))).one()
+        max_id = max_id or 0
+        bloom = FiltroBloom(max(total * 2, self.capacidad_minima_bloom), self.tasa_falsos_positivos)
+
+        cedulas = db.session.execute(
+            select(Usuario.cedula).where(Usuario.id <= max_id).execution_options(yield_per=10000)
+        ).scalars()
+        for leidas, cedula in enumerate(cedulas, 1):
+            bloom.agregar(cedula)
+            if leidas % PAUSA_CADA == 0:
+                socketio.sleep(0)
+
+        recientes = Usuario.query.order_by(Usuario.fecha_registro.desc()).limit(self.tamano_lru).all()
+
+        with self._lock:
+            self._bloom = bloom
+            self._max_id = max_id
+            self._lru.clear()
+            for usuario in reversed(recientes):
+                self._lru[usuario.cedula] = usuario.to_dict()
+
+        # Cédulas registradas mientras se construía el filtro
+        self.incorporar_nuevas()
+
+        logger.info('Caché de cédulas precalentada: %s cédulas en el filtro, %s en la LRU', total, len(recientes))
+
+    def incorporar_nuevas(self):
+        """
+        Agrega al filtro las cédulas con id mayor al último leído (registradas
+        por otros procesos). Es una consulta por la clave primaria.
+
+        Returns:
+            Cantidad de cédulas agregadas
+        """
+        with self._lock:
+            bloom, desde = self._bloom, self._max_id
+        if bloom is None:
+            return 0
+
+        filas = db.session.execute(
+            select(Usuario.id, Usuario.cedula).where(Usuario.id > desde).order_by(Usuario.id)
+        ).all()
+        for fila in filas:
+            bloom.agregar(fila.cedula)
+
+        with self._lock:
+            # Si entretanto se reconstruyó el filtro, el nuevo ya tiene su propio punto de partida
+            if filas and self._bloom is bloom:
+                self._max_id = max(self._max_id, filas[-1].id)
+        return len(filas)
+
+    # ----- Consultas -----
+
+    def puede_existir(self, cedula):
+        """
+        False solo si la cédula es definitivamente nueva (no está en el filtro).
+        Antes del precalentamiento siempre devuelve True. Una cédula registrada
+        por otro proceso se ve a más tardar en CEDULAS_INCREMENTAL_SEGUNDOS.
+        """
+        bloom = self._bloom
+        if bloom is None:
+            return True
+        self.contadores['bloom_consultas'] += 1
+        if cedula in bloom:
+            return True
+        self.contadores['bloom_descartes'] += 1
+        return False
+
+    def buscar(self, cedula):
+        """
+        Devuelve los datos (to_dict) del usuario con esa cédula, o None si no existe.
+        Consulta la base de datos solo si no está en la LRU y el filtro no la descarta.
+        """
+        with self._lock:
+            resumen = self._lru.get(cedula)
+            if resumen is not None:
+                self._lru.move_to_end(cedula)
+                self.contadores['lru_aciertos'] += 1
+                return resumen
+        self.contadores['lru_fallos'] += 1
+
+        if not self.puede_existir(cedula):
+            return None
+
+        usuario = Usuario.query.filter_by(cedula=cedula).first()
+        if usuario is None:
+            if self._bloom is not None:
+                self.contadores['bloom_falsos_positivos'] += 1
+            return None
+
+        return self.actualizar(usuario)
+
+    # ----- Actualizaciones -----
+
+    def actualizar(self, usuario):
+        """Registra o refresca un usuario en ambas estructuras (después del commit)"""
+        resumen = usuario.to_dict()
+        with self._lock:
+            self._lru[usuario.cedula] = resumen
+            self._lru.move_to_end(usuario.cedula)
+            while len(self._lru) > self.tamano_lru:
+                self._lru.popitem(last=False)
+            if self._bloom is not None:
+                self._bloom.agregar(usuario.cedula)
+        return resumen
+
+    def descartar(self, cedula):
+        """Elimina una cédula de la LRU (el filtro de Bloom no admite borrados)"""
+        with self._lock:
+            self._lru.pop(cedula, None)
+
+    def registrar_carga(self, nuevas, modificadas):
+        """
+        Refleja una carga masiva (después del commit): agrega las cédulas nuevas
+        al filtro y descarta de la LRU los datos de las modificadas.
+        """
+        with self._lock:
+            for cedula in modificadas:
+                self._lru.pop(cedula, None)
+            if self._bloom is not None:
+                for cedula in nuevas:
+                    self._bloom.agregar(cedula)
+
+    def bloom_saturado(self):
+        """True si el filtro superó su capacidad y conviene reconstruirlo (precalentar)"""
+        bloom = self._bloom
+        return bloom is not None and bloom.elementos > bloom.capacidad
+
+    # ----- Métricas -----
+
+    def estadisticas(self):
+        """Contadores y tasas de acierto de la caché"""
+        c = dict(self.contadores)
+        consultas_lru = c['lru_aciertos'] + c['lru_fallos']
+        c['lru_tasa_aciertos'] = round(c['lru_aciertos'] / consultas_lru, 4) if consultas_lru else 0
+        c['bloom_tasa_descartes'] = round(c['bloom_descartes'] / c['bloom_consultas'], 4) if c['bloom_consultas'] else 0
+        c['lru_tamano'] = len(self._lru)
+        c['bloom_inserciones'] = self._bloom.elementos if self._bloom is not None else 0
+        return c
+
+
+# Instancia única usada por las rutas
+cache_cedulas = CacheCedulas()
+
+
+def init_cache_cedulas(app):
+    """
+    Configura la caché y, si esta instancia ejecuta tareas programadas, la
+    precalienta en segundo plano y programa sus refrescos. En las demás
+    (scripts de consola, pruebas) el filtro no se construye.
+    """
+    cache_cedulas.tamano_lru = app.config['CEDULAS_LRU_TAMANO']
+    cache_cedulas.capacidad_minima_bloom = app.config['CEDULAS_BLOOM_CAPACIDAD']
+    cache_cedulas.tasa_falsos_positivos = app.config['CEDULAS_BLOOM_FALSOS_POSITIVOS']
+
+    from app.tareas import iniciar_tarea_periodica, tareas_habilitadas
+    if not tareas_habilitadas(app):
+        return
+
+    def _precalentar():
+        with app.app_context():
+            try:
+                cache_cedulas.precalentar()
+            except Exception as e:
+                db.session.rollback()
+                app.logger.error('Error al precalentar la caché de cédulas: %s', e)
+
+    socketio.start_background_task(_precalentar)
+    iniciar_tarea_periodica(app, 'cache_cedulas', app.config['CEDULAS_REFRESCO_SEGUNDOS'], cache_cedulas.precalentar)
+    iniciar_tarea_periodica(app, 'cache_cedulas_nuevas', app.config['CEDULAS_INCREMENTAL_SEGUNDOS'],
+                            cache_cedulas.incorporar_nuevas)
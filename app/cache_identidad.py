@@ -0,0 +1,126 @@
+"""
+Caché de identidad para el cargador de usuarios de Flask-Login
+
+Flask-Login llama a load_user en cada petición autenticada. En lugar de
+consultar UsuarioSistema/Empleado y luego cargar de forma perezosa el
+empleado vinculado y sus trámites asignados, la identidad se carga en una
+sola consulta (con joins) y se guarda desacoplada de la sesión durante
+IDENTIDAD_CACHE_TTL segundos. En cada petición la copia en caché se adjunta
+a la sesión con merge(load=False), que no ejecuta consultas.
+
+Las rutas de administración invalidan la entrada cuando editan o eliminan un
+usuario, un empleado o un trámite.
+"""
+
+import time
+
+from flask import current_app, g
+from flask_login import current_user
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload
+
+from app.models import db, UsuarioSistema, Empleado
+
+
+class IdentidadCacheada:
+    """
+    Datos de identidad de un usuario autenticado.
+
+    Atributos:
+        usuario: Instancia desacoplada (UsuarioSistema o Empleado) con sus relaciones cargadas
+        rol: 'superadmin', 'admin' o 'empleado'
+        activo: Estado de la cuenta
+        tramites_ids: IDs de los trámites asignados
+        expira: Instante (monotónico) en que la entrada deja de ser válida
+    """
+    __slots__ = ('usuario', 'rol', 'activo', 'tramites_ids', 'expira')
+
+    def __init__(self, usuario, ttl):
+        self.usuario = usuario
+        if isinstance(usuario, UsuarioSistema):
+            self.rol = 'superadmin' if usuario.es_superadmin else 'admin'
+        else:
+            self.rol = 'empleado'
+        self.activo = usuario.activo
+        self.tramites_ids = [t.id for t in usuario.tramites_asignados]
+        self.expira = time.monotonic() + ttl
+
+
+# user_id de Flask-Login ('usr_1', 'emp_3') -> IdentidadCacheada
+_cache = {}
+
+
+def _parsear_user_id(user_id):
+    """Convierte el ID con prefijo de Flask-Login en (modelo, id)"""
+    if user_id.startswith('usr_'):
+        return UsuarioSistema, int(user_id.replace('usr_', ''))
+    if user_id.startswith('emp_'):
+        return Empleado, int(user_id.replace('emp_', ''))
+    # Fallback para compatibilidad (intentar como Empleado)
+    return Empleado, int(user_id)
+
+
+def _consultar_identidad(modelo, actual_id):
+    """Carga el usuario con sus trámites en una sola consulta, desacoplado de la sesión"""
+    if modelo is UsuarioSistema:
+        opciones = joinedload(UsuarioSistema.empleado).joinedload(Empleado.tramites_asignados)
+    else:
+        opciones = joinedload(Empleado.tramites_asignados)
+
+    with Session(db.engine) as sesion:
+        return sesion.execute(
+            select(modelo).where(modelo.id == actual_id).options(opciones)
+        ).unique().scalar_one_or_none()
+
+
+def cargar_identidad(user_id):
+    """
+    Devuelve el usuario de la petición actual adjunto a la sesión.
+    Ejecuta como máximo una consulta; ninguna si la identidad está en caché.
+    """
+    if not user_id:
+        return None
+
+    try:
+        modelo, actual_id = _parsear_user_id(user_id)
+    except ValueError:
+        return None
+
+    identidad = _cache.get(user_id)
+    if identidad is None or identidad.expira < time.monotonic():
+        usuario = _consultar_identidad(modelo, actual_id)
+        if usuario is None:
+            _cache.pop(user_id, None)
+            return None
+        identidad = IdentidadCacheada(usuario, current_app.config['IDENTIDAD_CACHE_TTL'])
+        _cache[user_id] = identidad
+
+    g.identidad = identidad
+    return db.session.merge(identidad.usuario, load=False)
+
+
+def tramites_ids_actuales():
+    """IDs de los trámites asignados al usuario autenticado, sin consultar la base de datos"""
+    identidad = g.get('identidad')
+    if identidad is not None:
+        return identidad.tramites_ids
+    return [t.id for t in current_user.tramites_asignados]
+
+
+def invalidar_usuario(usuario_id):
+    """Descarta la identidad en caché de un UsuarioSistema"""
+    _cache.pop(f'usr_{usuario_id}', None)
+
+
+def invalidar_empleado(empleado_id):
+    """Descarta la identidad de un empleado y la de los usuarios vinculados a él"""
+    _cache.pop(f'emp_{empleado_id}', None)
+    _cache.pop(str(empleado_id), None)
+    for user_id, identidad in list(_cache.items()):
+        if isinstance(identidad.usuario, UsuarioSistema) and identidad.usuario.empleado_id == empleado_id:
+            _cache.pop(user_id, None)
+
+
+def invalidar_todo():
+    """Descarta todas las identidades (p. ej. al modificar un trámite)"""
+    _cache.clear()
@@ -0,0 +1,332 @@
+"""
+Sincronización declarativa del catálogo de trámites y sus asignaciones
+
+Un archivo JSON o YAML describe el estado deseado:
+
+    {
+      "tramites": [
+        {"nombre": "Impuesto Predial", "descripcion": "...", "tiempo_estimado": 15},
+        {"id": 4, "nombre": "Industria y Comercio (ICA)", "activo": true},
+        {"nombre": "Certificados", "activo": false}
+      ],
+      "asignaciones": {
+        "jperez": ["Impuesto Predial", "Certificados"],
+        "ventanilla3@alcaldia.gov.co": ["Industria y Comercio (ICA)"],
+        "12": []
+      }
+    }
+
+- Los trámites se identifican por nombre, o por id si se indica (para
+  renombrarlos). Solo se comparan los campos presentes en cada entrada.
+- Los trámites de la base que no aparecen en el catálogo no se modifican,
+  salvo con desactivar_ausentes (nunca se eliminan: conservan el historial).
+- Cada empleado de 'asignaciones' (usuario, email o id) queda con exactamente
+  esos trámites; una lista vacía significa que atiende todos (ver
+  app/enrutamiento.py). Los empleados que no aparecen no se modifican.
+
+calcular_cambios() compara el catálogo con la base en tres consultas y
+devuelve el plan; aplicar_cambios() lo ejecuta en una sola transacción
+(todo o nada). exportar_catalogo() genera el catálogo del estado actual.
+"""
+
+import json
+import os
+
+from sqlalchemy import and_, or_, select
+
+from app.models import db, Empleado, TipoTramite, empleado_tramites
+
+CAMPOS_TRAMITE = ('nombre', 'descripcion', 'tiempo_estimado', 'activo')
+
+
+def leer_catalogo(ruta):
+    """Lee un catálogo JSON o YAML (según la extensión; YAML requiere PyYAML)"""
+    with open(ruta, encoding='utf-8') as archivo:
+        if os.path.splitext(ruta)[1].lower() in ('.yml', '.yaml'):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError('Para leer catálogos YAML instale PyYAML (pip install pyyaml) o use JSON')
+            catalogo = yaml.safe_load(archivo)
+        else:
+            catalogo = json.load(archivo)
+    if not isinstance(catalogo, dict):
+        raise ValueError('El catálogo debe ser un objeto con las claves "tramites" y/o "asignaciones"')
+    return catalogo
+
+
+def _validar_tramite(entrada, posicion):
+    if not isinstance(entrada, dict):
+        raise ValueError(f'Trámite #{posicion}: debe ser un objeto')
+    desconocidos = set(entrada) - set(CAMPOS_TRAMITE) - {'id'}
+    if desconocidos:
+        raise ValueError(f'Trámite #{posicion}: campos desconocidos {", ".join(sorted(desconocidos))}')
+
+    nombre = str(entrada.get('nombre') or '').strip()
+    if not nombre:
+        raise ValueError(f'Trámite #{posicion}: el nombre es obligatorio')
+    if len(nombre) > 100:
+        raise ValueError(f'Trámite "{nombre[:40]}...": el nombre supera 100 caracteres')
+
+    datos = {'nombre': nombre}
+    if 'descripcion' in entrada:
+        datos['descripcion'] = str(entrada['descripcion'] or '').strip()
+    if 'tiempo_estimado' in entrada:
+        tiempo = entrada['tiempo_estimado']
+        if isinstance(tiempo, bool) or not isinstance(tiempo, int) or tiempo <= 0:
+            raise ValueError(f'Trámite "{nombre}": tiempo_estimado debe ser un entero positivo (minutos)')
+        datos['tiempo_estimado'] = tiempo
+    if 'activo' in entrada:
+        if not isinstance(entrada['activo'], bool):
+            raise ValueError(f'Trámite "{nombre}": activo debe ser true o false')
+        datos['activo'] = entrada['activo']
+    return datos
+
+
+def _valor_actual(tramite, campo):
+    valor = getattr(tramite, campo)
+    return (valor or '') if campo == 'descripcion' else valor
+
+
+class PlanSincronizacion:
+    """Cambios que llevan la base al estado del catálogo"""
+
+    def __init__(self):
+        self.crear = []          # [datos]
+        self.modificar = []      # [(TipoTramite, {campo: (antes, después)})]
+        self.desactivar = []     # [TipoTramite]
+        self.asignar = []        # [(Empleado, TipoTramite o None si se crea, nombre)]
+        self.quitar = []         # [(Empleado, TipoTramite)]
+
+    @property
+    def vacio(self):
+        return not (self.crear or self.modificar or self.desactivar or self.asignar or self.quitar)
+
+    def resumen(self):
+        return {
+            'tramites_creados': len(self.crear),
+            'tramites_modificados': len(self.modificar),
+            'tramites_desactivados': len(self.desactivar),
+            'asignaciones_agregadas': len(self.asignar),
+            'asignaciones_quitadas': len(self.quitar),
+        }
+
+    def lineas(self):
+        """Descripción legible del plan, una línea por cambio"""
+        lineas = [f'+ trámite "{datos["nombre"]}" '
+                  f'({", ".join(f"{c}={v!r}" for c, v in datos.items() if c != "nombre") or "valores por defecto"})'
+                  for datos in self.crear]
+        for tramite, cambios in self.modificar:
+            detalle = ', '.join(f'{campo}: {antes!r} -> {despues!r}' for campo, (antes, despues) in cambios.items())
+            lineas.append(f'~ trámite "{tramite.nombre}" (ID {tramite.id}): {detalle}')
+        lineas += [f'- trámite "{tramite.nombre}" (ID {tramite.id}): desactivado' for tramite in self.desactivar]
+        lineas += [f'+ {empleado.nombre} (ID {empleado.id}) atiende "{nombre}"' for empleado, _, nombre in self.asignar]
+        lineas += [f'- {empleado.nombre} (ID {empleado.id}) deja de atender "{tramite.nombre}"'
+                   for empleado, tramite in self.quitar]
+        return lineas
+
+
+def calcular_cambios(catalogo, desactivar_ausentes=False):
+    """
+    Compara el catálogo con la base de datos sin modificarla.
+
+    Returns:
+        PlanSincronizacion
+
+    Raises:
+        ValueError: Si el catálogo es inválido o referencia empleados o trámites inexistentes
+    """
+    entradas = catalogo.get('tramites') or []
+    asignaciones = catalogo.get('asignaciones') or {}
+    if not isinstance(entradas, list):
+        raise ValueError('"tramites" debe ser una lista')
+    if not isinstance(asignaciones, dict):
+        raise ValueError('"asignaciones" debe ser un objeto empleado -> lista de trámites')
+
+    tramites = db.session.execute(select(TipoTramite)).scalars().all()
+    por_id = {t.id: t for t in tramites}
+    por_nombre = {}
+    for tramite in tramites:
+        por_nombre.setdefault(tramite.nombre.strip().lower(), []).append(tramite)
+
+    plan = PlanSincronizacion()
+    nombres_catalogo = {}     # nombre en minúsculas -> nombre final
+    presentes = set()
+    for posicion, entrada in enumerate(entradas, 1):
+        datos = _validar_tramite(entrada, posicion)
+        clave = datos['nombre'].lower()
+        if clave in nombres_catalogo:
+            raise ValueError(f'Trámite "{datos["nombre"]}" repetido en el catálogo')
+        nombres_catalogo[clave] = datos['nombre']
+
+        if entrada.get('id') is not None:
+            tramite = por_id.get(entrada['id'])
+            if tramite is None:
+                raise ValueError(f'Trámite "{datos["nombre"]}": no existe el ID {entrada["id"]}')
+        else:
+            coincidencias = por_nombre.get(clave, [])
+            if len(coincidencias) > 1:
+                raise ValueError(f'Hay {len(coincidencias)} trámites llamados "{datos["nombre"]}" en la base: '
+                                 f'indique el id (IDs {", ".join(str(t.id) for t in coincidencias)})')
+            tramite = coincidencias[0] if coincidencias else None
+
+        if tramite is None:
+            plan.crear.append(datos)
+            continue
+        if tramite.id in presentes:
+            raise ValueError(f'El trámite ID {tramite.id} aparece más de una vez en el catálogo')
+        presentes.add(tramite.id)
+        cambios = {campo: (_valor_actual(tramite, campo), valor) for campo, valor in datos.items()
+                   if _valor_actual(tramite, campo) != valor}
+        if cambios:
+            plan.modificar.append((tramite, cambios))
+
+    if desactivar_ausentes:
+        plan.desactivar = [t for t in tramites if t.id not in presentes and t.activo]
+
+    _verificar_nombres_finales(plan, tramites)
+    if asignaciones:
+        _calcular_asignaciones(plan, asignaciones, tramites, nombres_catalogo)
+    return plan
+
+
+def _verificar_nombres_finales(plan, tramites):
+    """
+    Falla si un trámite creado o renombrado queda con el nombre de otro (sin
+    distinguir mayúsculas), esté o no en el catálogo. Los duplicados que ya
+    existen en la base y el plan no toca se toleran.
+    """
+    renombrados = {tramite.id: cambios['nombre'][1] for tramite, cambios in plan.modificar if 'nombre' in cambios}
+    finales = {}    # nombre final en minúsculas -> [(nombre, descripción, lo cambia el plan)]
+    for tramite in tramites:
+        nombre = renombrados.get(tramite.id, tramite.nombre).strip()
+        finales.setdefault(nombre.lower(), []).append((nombre, f'ID {tramite.id}', tramite.id in renombrados))
+    for datos in plan.crear:
+        finales.setdefault(datos['nombre'].lower(), []).append((datos['nombre'], 'nuevo', True))
+
+    for usos in finales.values():
+        cambiados = [nombre for nombre, _, cambia in usos if cambia]
+        if len(usos) > 1 and cambiados:
+            raise ValueError(f'Trámite "{cambiados[0]}": el nombre quedaría repetido '
+                             f'({", ".join(descripcion for _, descripcion, _ in usos)}); '
+                             f'renombre el otro trámite o indique su id')
+
+
+def _calcular_asignaciones(plan, asignaciones, tramites, nombres_catalogo):
+    empleados = db.session.execute(select(Empleado)).scalars().all()
+    por_referencia = {}
+    for empleado in empleados:
+        por_referencia[str(empleado.id)] = empleado
+        if empleado.usuario:
+            por_referencia[empleado.usuario.lower()] = empleado
+        if empleado.email:
+            por_referencia[empleado.email.lower()] = empleado
+
+    # Nombre final de cada trámite (el del catálogo si lo renombra) -> trámites existentes o [None] si es nuevo;
+    # más de uno solo si la base ya tenía nombres repetidos (ver _verificar_nombres_finales)
+    renombrados = {tramite.id: cambios['nombre'][1] for tramite, cambios in plan.modificar if 'nombre' in cambios}
+    destino = {}
+    for tramite in tramites:
+        destino.setdefault(renombrados.get(tramite.id, tramite.nombre).strip().lower(), []).append(tramite)
+    destino.update({datos['nombre'].lower(): [None] for datos in plan.crear})
+
+    por_id = {t.id: t for t in tramites}
+    actuales = {}
+    for empleado_id, tramite_id in db.session.execute(
+        select(empleado_tramites.c.empleado_id, empleado_tramites.c.tipo_tramite_id)
+    ):
+        actuales.setdefault(empleado_id, set()).add(tramite_id)
+
+    vistos = set()
+    for referencia, nombres in asignaciones.items():
+        empleado = por_referencia.get(str(referencia).strip().lower())
+        if empleado is None:
+            raise ValueError(f'Asignaciones: no existe el empleado "{referencia}" (usuario, email o ID)')
+        if empleado.id in vistos:
+            raise ValueError(f'Asignaciones: el empleado {empleado.nombre} (ID {empleado.id}) aparece más de una vez')
+        vistos.add(empleado.id)
+        if not isinstance(nombres, list):
+            raise ValueError(f'Asignaciones de "{referencia}": debe ser una lista de nombres de trámite')
+
+        deseados = set()
+        for nombre in nombres:
+            clave = str(nombre).strip().lower()
+            if clave not in destino:
+                raise ValueError(f'Asignaciones de "{referencia}": no existe el trámite "{nombre}"')
+            if len(destino[clave]) > 1:
+                raise ValueError(f'Asignaciones de "{referencia}": hay {len(destino[clave])} trámites llamados '
+                                 f'"{nombre}" en la base; renombre uno en el catálogo')
+            tramite = destino[clave][0]
+            if tramite is None:
+                plan.asignar.append((empleado, None, nombres_catalogo[clave]))
+            else:
+                deseados.add(tramite.id)
+
+        asignados = actuales.get(empleado.id, set())
+        plan.asignar += [(empleado, por_id[i], renombrados.get(i, por_id[i].nombre))
+                         for i in sorted(deseados - asignados)]
+        plan.quitar += [(empleado, por_id[i]) for i in sorted(asignados - deseados)]
+
+
+def aplicar_cambios(plan):
+    """
+    Ejecuta el plan en una sola transacción (todo o nada).
+
+    Returns:
+        Resumen de cambios aplicados
+    """
+    if plan.vacio:
+        return plan.resumen()
+    try:
+        nuevos = {}
+        for datos in plan.crear:
+            tramite = TipoTramite(**datos)
+            db.session.add(tramite)
+            nuevos[datos['nombre']] = tramite
+        for tramite, cambios in plan.modificar:
+            for campo, (_, valor) in cambios.items():
+                setattr(tramite, campo, valor)
+        for tramite in plan.desactivar:
+            tramite.activo = False
+        db.session.flush()
+
+        if plan.quitar:
+            db.session.execute(empleado_tramites.delete().where(or_(*(
+                and_(empleado_tramites.c.empleado_id == empleado.id,
+                     empleado_tramites.c.tipo_tramite_id == tramite.id)
+                for empleado, tramite in plan.quitar
+            ))))
+        if plan.asignar:
+            db.session.execute(empleado_tramites.insert(), [
+                {'empleado_id': empleado.id, 'tipo_tramite_id': (tramite or nuevos[nombre]).id}
+                for empleado, tramite, nombre in plan.asignar
+            ])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    from app.cache_identidad import invalidar_todo
+    invalidar_todo()
+    return plan.resumen()
+
+
+def exportar_catalogo():
+    """Catálogo con los trámites y las asignaciones actuales (punto de partida para editar)"""
+    tramites = db.session.execute(select(TipoTramite).order_by(TipoTramite.id)).scalars().all()
+    nombres = {t.id: t.nombre for t in tramites}
+    asignados = {}
+    for empleado_id, tramite_id in db.session.execute(
+        select(empleado_tramites.c.empleado_id, empleado_tramites.c.tipo_tramite_id)
+        .order_by(empleado_tramites.c.tipo_tramite_id)
+    ):
+        asignados.setdefault(empleado_id, []).append(nombres[tramite_id])
+    asignaciones = {
+        empleado.usuario or empleado.email or str(empleado.id): asignados.get(empleado.id, [])
+        for empleado in db.session.execute(select(Empleado).order_by(Empleado.id)).scalars()
+    }
+    return {
+        'tramites': [{'id': t.id, 'nombre': t.nombre, 'descripcion': t.descripcion or '',
+                      'tiempo_estimado': t.tiempo_estimado, 'activo': bool(t.activo)} for t in tramites],
+        'asignaciones': asignaciones,
+    }
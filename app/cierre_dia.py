@@ -0,0 +1,299 @@
+"""
+Cierre del día de atención
+
+Al terminar el día quedaban turnos en 'pendiente'/'en_atencion' que ninguna
+consulta de "hoy" vuelve a mirar, pero que siguen en la tabla operativa. El
+cierre de un día:
+
+1. Resuelve los turnos sobrantes según CIERRE_POLITICA: los que agotaron sus
+   llamados pasan a 'no_presentado'; el resto se cancela ('cancelar') o se
+   traslada como pendiente al día actual ('trasladar').
+2. Calcula el resumen diario por trámite y categoría (EstadisticaDiaria), con
+   un histograma de minutos de espera combinable entre días para estimar
+   percentiles sin volver a leer los turnos.
+3. Elimina las secuencias de numeración (SecuenciaTurno) del día. Los
+   números son únicos por día, así que cada día la numeración empieza de
+   nuevo; los turnos trasladados reciben un número del día actual.
+4. Ejecuta ANALYZE (y VACUUM si CIERRE_VACUUM) sobre las tablas operativas.
+5. Escribe un reporte JSON en CIERRE_DIRECTORIO_REPORTES.
+
+Una tarea periódica cierra los días anteriores que aún no tienen CierreDia;
+cerrar_dia.py permite ejecutarlo a demanda.
+"""
+
+import json
+import logging
+import os
+from bisect import bisect_left
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, func, select, union_all, update
+
+from app.models import (db, Turno, TurnoHistorico, SecuenciaTurno, CierreDia, EstadisticaDiaria)
+from app.no_presentados import LLAMADOS_MAXIMOS
+
+logger = logging.getLogger(__name__)
+
+POLITICAS = ['cancelar', 'trasladar']
+
+# Tablas que se analizan (y compactan) después del cierre
+TABLAS_OPERATIVAS = ['turnos', 'notificaciones', 'secuencias_turno', 'entregas_notificacion', 'claves_idempotencia',
+                     'citas', 'cupos_cita']
+
+# Límites superiores (minutos) de los cubos del histograma de espera; el último cubo es abierto
+LIMITES_ESPERA = [5, 10, 15, 20, 30, 45, 60, 90, 120, 180, 240]
+
+
+class HistogramaEspera:
+    """
+    Histograma de minutos de espera con cubos fijos. Dos histogramas se
+    combinan sumando sus conteos, por lo que los resúmenes diarios pueden
+    agregarse en semanas o meses y seguir estimando percentiles.
+    """
+
+    def __init__(self, conteos=None):
+        self.conteos = list(conteos) if conteos else [0] * (len(LIMITES_ESPERA) + 1)
+
+    @property
+    def total(self):
+        return sum(self.conteos)
+
+    def agregar(self, minutos):
+        self.conteos[bisect_left(LIMITES_ESPERA, max(0, minutos))] += 1
+
+    def combinar(self, otro):
+        self.conteos = [a + b for a, b in zip(self.conteos, otro.conteos)]
+        return self
+
+    def percentil(self, p):
+        """Percentil (0-100) estimado por interpolación lineal dentro del cubo"""
+        total = self.total
+        if not total:
+            return None
+        objetivo = p / 100 * total
+        acumulado = 0
+        for indice, conteo in enumerate(self.conteos):
+            if conteo and acumulado + conteo >= objetivo:
+                inferior = LIMITES_ESPERA[indice - 1] if indice > 0 else 0
+                if indice == len(LIMITES_ESPERA):
+                    return float(inferior)
+                superior = LIMITES_ESPERA[indice]
+                return round(inferior + (superior - inferior) * (objetivo - acumulado) / conteo, 2)
+            acumulado += conteo
+        return float(LIMITES_ESPERA[-1])
+
+    def a_json(self):
+        return json.dumps(self.conteos)
+
+    @classmethod
+    def desde_json(cls, texto):
+        return cls(json.loads(texto)) if texto else cls()
+
+
+def _rango(fecha):
+    desde = datetime.combine(fecha, datetime.min.time())
+    return desde, desde + timedelta(days=1)
+
+
+def _resolver_sobrantes(fecha, politica):
+    """Aplica la política a los turnos del día que siguen abiertos"""
+    desde, hasta = _rango(fecha)
+    del_dia = (Turno.fecha_solicitud >= desde, Turno.fecha_solicitud < hasta)
+
+    no_presentados = db.session.execute(
+        update(Turno)
+        .where(*del_dia, Turno.estado == 'pendiente', Turno.llamados_realizados >= LLAMADOS_MAXIMOS)
+        .values(estado='no_presentado')
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    abiertos = (*del_dia, Turno.estado.in_(['pendiente', 'en_atencion']))
+    cancelados = trasladados = 0
+
+    if politica == 'cancelar':
+        cancelados = db.session.execute(
+            update(Turno).where(*abiertos)
+            .values(estado='cancelado',
+                    observaciones=func.coalesce(Turno.observaciones + ' | ', '') + 'Cancelado en el cierre del día')
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    else:
+        # Los números son únicos por día: los trasladados reciben un número de hoy
+        hoy = datetime.utcnow().date()
+        filas = db.session.execute(
+            select(Turno.id, Turno.numero_turno, Turno.categoria_atencion).where(*abiertos).order_by(Turno.id)
+        ).all()
+        por_categoria = Counter(fila.categoria_atencion for fila in filas)
+        numeros = {categoria: iter(Turno.reservar_numeros(categoria, cantidad, hoy))
+                   for categoria, cantidad in por_categoria.items()}
+        for fila in filas:
+            db.session.execute(
+                update(Turno).where(Turno.id == fila.id)
+                .values(estado='pendiente', fecha_solicitud=datetime.combine(hoy, datetime.min.time()),
+                        numero_turno=next(numeros[fila.categoria_atencion]), fecha_numero=hoy,
+                        llamados_realizados=0, empleado_id=None,
+                        observaciones=func.coalesce(Turno.observaciones + ' | ', '')
+                        + f'Trasladado desde {fecha} (antes {fila.numero_turno})')
+                .execution_options(synchronize_session=False)
+            )
+        trasladados = len(filas)
+
+    return {'no_presentados': no_presentados, 'cancelados': cancelados, 'trasladados': trasladados}
+
+
+def _calcular_estadisticas(fecha):
+    """Reemplaza los resúmenes del día leyendo los turnos operativos y archivados"""
+    desde, hasta = _rango(fecha)
+    columnas = lambda modelo: select(
+        modelo.tipo_tramite_id, modelo.categoria_atencion, modelo.estado,
+        modelo.fecha_solicitud, modelo.fecha_atencion
+    ).where(modelo.fecha_solicitud >= desde, modelo.fecha_solicitud < hasta)
+
+    grupos = {}
+    for fila in db.session.execute(union_all(columnas(Turno), columnas(TurnoHistorico))):
+        clave = (fila.tipo_tramite_id, fila.categoria_atencion)
+        grupo = grupos.setdefault(clave, {'total': 0, 'atendido': 0, 'cancelado': 0, 'no_presentado': 0,
+                                          'esperas': [], 'histograma': HistogramaEspera()})
+        grupo['total'] += 1
+        if fila.estado in grupo:
+            grupo[fila.estado] += 1
+        if fila.estado == 'atendido' and fila.fecha_atencion:
+            minutos = (fila.fecha_atencion - fila.fecha_solicitud).total_seconds() / 60
+            grupo['esperas'].append(minutos)
+            grupo['histograma'].agregar(minutos)
+
+    db.session.execute(delete(EstadisticaDiaria).where(EstadisticaDiaria.fecha == fecha))
+    resumenes = []
+    for (tipo_tramite_id, categoria), grupo in sorted(grupos.items()):
+        esperas = grupo['esperas']
+        resumen = EstadisticaDiaria(
+            fecha=fecha,
+            tipo_tramite_id=tipo_tramite_id,
+            categoria_atencion=categoria,
+            total=grupo['total'],
+            atendidos=grupo['atendido'],
+            cancelados=grupo['cancelado'],
+            no_presentados=grupo['no_presentado'],
+            espera_promedio=round(sum(esperas) / len(esperas), 2) if esperas else None,
+            espera_p50=grupo['histograma'].percentil(50),
+            espera_p90=grupo['histograma'].percentil(90),
+            histograma_espera=grupo['histograma'].a_json()
+        )
+        db.session.add(resumen)
+        resumenes.append(resumen)
+    return resumenes
+
+
+def mantenimiento_tablas(vacuum=False):
+    """ANALYZE (y opcionalmente VACUUM) de las tablas operativas, fuera de transacción"""
+    motor = db.engine
+    with motor.connect().execution_options(isolation_level='AUTOCOMMIT') as conexion:
+        if motor.dialect.name == 'sqlite':
+            if vacuum:
+                conexion.exec_driver_sql('VACUUM')
+            for tabla in TABLAS_OPERATIVAS:
+                conexion.exec_driver_sql(f'ANALYZE {tabla}')
+        elif motor.dialect.name == 'postgresql':
+            comando = 'VACUUM ANALYZE' if vacuum else 'ANALYZE'
+            for tabla in TABLAS_OPERATIVAS:
+                conexion.exec_driver_sql(f'{comando} {tabla}')
+
+
+def _escribir_reporte(cierre, resumenes):
+    directorio = current_app.config['CIERRE_DIRECTORIO_REPORTES']
+    os.makedirs(directorio, exist_ok=True)
+    ruta = os.path.join(directorio, f'cierre_{cierre.fecha.isoformat()}.json')
+
+    total = HistogramaEspera()
+    for resumen in resumenes:
+        total.combinar(HistogramaEspera.desde_json(resumen.histograma_espera))
+
+    reporte = {
+        'fecha': cierre.fecha.isoformat(),
+        'fecha_cierre': cierre.fecha_cierre.strftime('%Y-%m-%d %H:%M:%S'),
+        'politica': cierre.politica,
+        'total_turnos': cierre.total_turnos,
+        'sobrantes': {
+            'cancelados': cierre.cancelados,
+            'no_presentados': cierre.no_presentados,
+            'trasladados': cierre.trasladados
+        },
+        'espera_minutos': {'p50': total.percentil(50), 'p90': total.percentil(90), 'atendidos': total.total},
+        'por_tramite_y_categoria': [r.to_dict() for r in resumenes]
+    }
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        json.dump(reporte, archivo, ensure_ascii=False, indent=2)
+    return ruta
+
+
+def cerrar_dia(fecha, politica=None, mantenimiento=True):
+    """
+    Cierra un día anterior al actual. Puede repetirse: los resúmenes y el
+    reporte se recalculan.
+
+    Args:
+        fecha: date del día a cerrar
+        politica: 'cancelar' o 'trasladar' (por defecto CIERRE_POLITICA)
+        mantenimiento: Ejecutar ANALYZE/VACUUM al terminar
+
+    Returns:
+        El CierreDia registrado
+    """
+    politica = politica or current_app.config['CIERRE_POLITICA']
+    if politica not in POLITICAS:
+        raise ValueError(f'Política de cierre no válida: {politica}')
+    if fecha >= datetime.utcnow().date():
+        raise ValueError('Solo se pueden cerrar días anteriores al actual')
+
+    sobrantes = _resolver_sobrantes(fecha, politica)
+    resumenes = _calcular_estadisticas(fecha)
+    db.session.execute(delete(SecuenciaTurno).where(SecuenciaTurno.fecha <= fecha))
+
+    cierre = db.session.get(CierreDia, fecha) or CierreDia(fecha=fecha)
+    cierre.fecha_cierre = datetime.utcnow()
+    cierre.politica = politica
+    cierre.total_turnos = sum(r.total for r in resumenes)
+    cierre.cancelados = sobrantes['cancelados']
+    cierre.no_presentados = sobrantes['no_presentados']
+    cierre.trasladados = sobrantes['trasladados']
+    db.session.add(cierre)
+    db.session.flush()
+
+    cierre.archivo_reporte = _escribir_reporte(cierre, resumenes)
+    db.session.commit()
+
+    logger.info('Día %s cerrado (%s): %s turnos, %s cancelados, %s no presentados, %s trasladados',
+                fecha, politica, cierre.total_turnos, cierre.cancelados, cierre.no_presentados, cierre.trasladados)
+
+    if mantenimiento:
+        mantenimiento_tablas(current_app.config['CIERRE_VACUUM'])
+    return cierre
+
+
+def dias_sin_cerrar():
+    """Días anteriores al actual con turnos en la tabla operativa y sin cierre"""
+    hoy = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    dias = db.session.execute(
+        select(func.date(Turno.fecha_solicitud)).where(Turno.fecha_solicitud < hoy).distinct()
+    ).scalars().all()
+    dias = sorted(d if isinstance(d, date) else date.fromisoformat(d) for d in dias)
+    cerrados = set(db.session.execute(select(CierreDia.fecha).where(CierreDia.fecha.in_(dias))).scalars())
+    return [d for d in dias if d not in cerrados]
+
+
+def cerrar_dias_pendientes():
+    """Cierra todos los días pendientes y ejecuta el mantenimiento una sola vez"""
+    dias = dias_sin_cerrar()
+    for fecha in dias:
+        cerrar_dia(fecha, mantenimiento=False)
+    if dias:
+        mantenimiento_tablas(current_app.config['CIERRE_VACUUM'])
+    return dias
+
+
+def init_cierre_dia(app):
+    """Programa la revisión periódica de días sin cerrar"""
+    from app.tareas import iniciar_tarea_periodica
+    iniciar_tarea_periodica(app, 'cierre_dia', app.config['CIERRE_INTERVALO_SEGUNDOS'], cerrar_dias_pendientes)
@@ -0,0 +1,300 @@
+"""
+Citas con franja horaria
+
+Toda la demanda llegaba sin cita y se concentraba en la mañana. Las citas
+reservan una franja de CITAS_MINUTOS_FRANJA minutos de un trámite y, a la
+hora de la franja, se convierten en turnos pendientes con fecha_solicitud
+igual al inicio de la franja, de modo que entran a la cola en vivo con su
+prioridad de categoría y por delante de quienes llegaron después.
+
+Capacidad:
+- Cada franja admite ventanillas * minutos_franja / tiempo_estimado *
+  CITAS_PROPORCION citas (al menos 1), donde ventanillas son los empleados
+  activos asignados al trámite. El resto de la capacidad queda para la
+  atención sin cita.
+- Las franjas de un día (CupoCita) y su resumen diario (CapacidadCitasDia) se
+  crean la primera vez que se consulta el día. El resumen es el índice de
+  capacidad: saber si un día tiene cupos es leer una fila.
+- La capacidad se fija al crear el día; los cambios de personal posteriores
+  no modifican días ya preparados.
+
+Los horarios usan el mismo reloj que fecha_solicitud (UTC).
+"""
+
+import logging
+import secrets
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import socketio
+from app.models import db, Turno, Empleado, empleado_tramites, CupoCita, CapacidadCitasDia, Cita
+
+logger = logging.getLogger(__name__)
+
+
+class CitaNoDisponible(Exception):
+    """La franja no existe, ya pasó o no tiene cupos"""
+
+
+# ===== CALENDARIO =====
+
+def _dias_habiles():
+    return {int(d) for d in current_app.config['CITAS_DIAS_SEMANA'].split(',') if d.strip()}
+
+
+def es_dia_habil(fecha):
+    return fecha.weekday() in _dias_habiles()
+
+
+def franjas_del_dia(fecha):
+    """Inicios de las franjas del día según el horario de atención"""
+    config = current_app.config
+    minutos = config['CITAS_MINUTOS_FRANJA']
+    inicio = datetime.combine(fecha, datetime.min.time()) + timedelta(hours=config['CITAS_HORA_INICIO'])
+    fin = datetime.combine(fecha, datetime.min.time()) + timedelta(hours=config['CITAS_HORA_FIN'])
+    franjas = []
+    while inicio + timedelta(minutes=minutos) <= fin:
+        franjas.append(inicio)
+        inicio += timedelta(minutes=minutos)
+    return franjas
+
+
+def capacidad_franja(tiempo_estimado, ventanillas):
+    """Citas por franja para un trámite con `ventanillas` empleados"""
+    config = current_app.config
+    capacidad = ventanillas * config['CITAS_MINUTOS_FRANJA'] / max(1, tiempo_estimado or 15) * config['CITAS_PROPORCION']
+    return max(1, int(capacidad)) if config['CITAS_PROPORCION'] > 0 else 0
+
+
+def _ventanillas(tipo_tramite_id):
+    return db.session.execute(
+        select(func.count())
+        .select_from(empleado_tramites)
+        .join(Empleado, Empleado.id == empleado_tramites.c.empleado_id)
+        .where(empleado_tramites.c.tipo_tramite_id == tipo_tramite_id, Empleado.activo == True)
+    ).scalar() or 1
+
+
+# ===== ÍNDICE DE CAPACIDAD =====
+
+def preparar_dias(tipo_tramite, fechas):
+    """
+    Crea las franjas y el resumen de los días hábiles que aún no los tienen.
+
+    Returns:
+        {fecha: CapacidadCitasDia} de los días hábiles pedidos
+    """
+    fechas = [f for f in fechas if es_dia_habil(f)]
+    if not fechas:
+        return {}
+    existentes = {d.fecha: d for d in CapacidadCitasDia.query.filter(
+        CapacidadCitasDia.tipo_tramite_id == tipo_tramite.id, CapacidadCitasDia.fecha.in_(fechas)
+    )}
+    faltantes = [f for f in fechas if f not in existentes]
+    if faltantes:
+        capacidad = capacidad_franja(tipo_tramite.tiempo_estimado, _ventanillas(tipo_tramite.id))
+        try:
+            with db.session.begin_nested():
+                for fecha in faltantes:
+                    franjas = franjas_del_dia(fecha)
+                    db.session.add_all(CupoCita(tipo_tramite_id=tipo_tramite.id, inicio=inicio, fecha=fecha,
+                                                capacidad=capacidad, reservadas=0) for inicio in franjas)
+                    existentes[fecha] = CapacidadCitasDia(tipo_tramite_id=tipo_tramite.id, fecha=fecha,
+                                                          capacidad=capacidad * len(franjas), reservadas=0)
+                    db.session.add(existentes[fecha])
+        except IntegrityError:
+            # Otra petición preparó los mismos días en paralelo
+            return preparar_dias(tipo_tramite, fechas)
+    return existentes
+
+
+def dias_disponibles(tipo_tramite, desde=None, dias=None):
+    """
+    Días con cupos libres desde `desde` (por defecto hoy) durante `dias` días,
+    sin pasar del período de reserva (hoy + CITAS_DIAS_ANTICIPACION).
+
+    Returns:
+        Lista de dicts {fecha, capacidad, libres}
+    """
+    hoy = datetime.utcnow().date()
+    anticipacion = current_app.config['CITAS_DIAS_ANTICIPACION']
+    limite = hoy + timedelta(days=anticipacion)
+    desde = min(max(desde or hoy, hoy), limite)
+    dias = min(dias or anticipacion, anticipacion, (limite - desde).days + 1)
+    resumenes = preparar_dias(tipo_tramite, [desde + timedelta(days=i) for i in range(dias)])
+    db.session.commit()
+
+    disponibles = []
+    for fecha in sorted(resumenes):
+        libres = resumenes[fecha].capacidad - resumenes[fecha].reservadas
+        if libres > 0:
+            disponibles.append({'fecha': fecha.isoformat(), 'capacidad': resumenes[fecha].capacidad, 'libres': libres})
+    if disponibles and disponibles[0]['fecha'] == hoy.isoformat():
+        # Las franjas ya iniciadas de hoy no se pueden reservar
+        if not franjas_disponibles(tipo_tramite, hoy):
+            disponibles.pop(0)
+    return disponibles
+
+
+def franjas_disponibles(tipo_tramite, fecha):
+    """Franjas futuras del día con cupos libres"""
+    preparar_dias(tipo_tramite, [fecha])
+    db.session.commit()
+    ahora = datetime.utcnow()
+    return [cupo.to_dict() for cupo in CupoCita.query.filter(
+        CupoCita.tipo_tramite_id == tipo_tramite.id,
+        CupoCita.fecha == fecha,
+        CupoCita.inicio > ahora,
+        CupoCita.reservadas < CupoCita.capacidad
+    ).order_by(CupoCita.inicio)]
+
+
+def _mover_cupo(tipo_tramite_id, inicio, delta):
+    """Suma `delta` a las reservas de la franja y del día; False si la franja no tiene cupo"""
+    condicion = [CupoCita.tipo_tramite_id == tipo_tramite_id, CupoCita.inicio == inicio]
+    if delta > 0:
+        condicion.append(CupoCita.reservadas + delta <= CupoCita.capacidad)
+    movidas = db.session.execute(
+        update(CupoCita).where(*condicion).values(reservadas=CupoCita.reservadas + delta)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not movidas:
+        return False
+    db.session.execute(
+        update(CapacidadCitasDia)
+        .where(CapacidadCitasDia.tipo_tramite_id == tipo_tramite_id, CapacidadCitasDia.fecha == inicio.date())
+        .values(reservadas=CapacidadCitasDia.reservadas + delta)
+        .execution_options(synchronize_session=False)
+    )
+    return True
+
+
+# ===== RESERVAS =====
+
+def reservar_cita(usuario, tipo_tramite, inicio, categoria=None):
+    """
+    Reserva una cita en la franja que empieza en `inicio` (sin confirmar).
+
+    Raises:
+        CitaNoDisponible: Si la franja no existe, ya empezó, está fuera del
+            período de reserva, no tiene cupos o el usuario ya tiene una cita
+            para el trámite ese día
+    """
+    ahora = datetime.utcnow()
+    if inicio <= ahora:
+        raise CitaNoDisponible('La franja ya comenzó')
+    if inicio.date() > ahora.date() + timedelta(days=current_app.config['CITAS_DIAS_ANTICIPACION']):
+        raise CitaNoDisponible('La fecha está fuera del período de reserva')
+    if not es_dia_habil(inicio.date()) or inicio not in franjas_del_dia(inicio.date()):
+        raise CitaNoDisponible('La franja no corresponde al horario de atención')
+
+    dia = datetime.combine(inicio.date(), datetime.min.time())
+    repetida = Cita.query.filter(
+        Cita.usuario_id == usuario.id,
+        Cita.tipo_tramite_id == tipo_tramite.id,
+        Cita.estado == 'reservada',
+        Cita.inicio >= dia, Cita.inicio < dia + timedelta(days=1)
+    ).first()
+    if repetida:
+        raise CitaNoDisponible(f'Ya tiene una cita para este trámite ese día ({repetida.codigo})')
+
+    preparar_dias(tipo_tramite, [inicio.date()])
+    if not _mover_cupo(tipo_tramite.id, inicio, 1):
+        raise CitaNoDisponible('La franja no tiene cupos disponibles')
+
+    cita = Cita(
+        codigo=secrets.token_hex(4).upper(),
+        usuario_id=usuario.id,
+        tipo_tramite_id=tipo_tramite.id,
+        categoria_atencion=categoria or usuario.categoria or 'ninguna',
+        inicio=inicio,
+        estado='reservada'
+    )
+    db.session.add(cita)
+    return cita
+
+
+def cancelar_cita(cita):
+    """Cancela una cita reservada y libera su cupo (sin confirmar)"""
+    if cita.estado != 'reservada':
+        raise CitaNoDisponible('Solo se pueden cancelar citas reservadas')
+    cita.estado = 'cancelada'
+    _mover_cupo(cita.tipo_tramite_id, cita.inicio, -1)
+
+
+# ===== ACTIVACIÓN =====
+
+def activar_citas(ahora=None, tamano_lote=None):
+    """
+    Convierte en turnos pendientes las citas cuya franja ya comenzó hoy y
+    marca como vencidas las de días anteriores que nunca se activaron.
+    Los turnos se anuncian con un único evento 'turnos_lote'.
+
+    Returns:
+        Lista de dicts de los turnos creados
+    """
+    ahora = ahora or datetime.utcnow()
+    tamano_lote = tamano_lote or current_app.config['ARCHIVO_TAMANO_LOTE']
+    hoy = datetime.combine(ahora.date(), datetime.min.time())
+
+    vencidas = db.session.execute(
+        update(Cita).where(Cita.estado == 'reservada', Cita.inicio < hoy).values(estado='vencida')
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    turnos_dict = []
+    while True:
+        citas = Cita.query.filter(Cita.estado == 'reservada', Cita.inicio <= ahora) \
+            .order_by(Cita.inicio).limit(tamano_lote).all()
+        if not citas:
+            break
+
+        por_categoria = {}
+        for cita in citas:
+            por_categoria[cita.categoria_atencion] = por_categoria.get(cita.categoria_atencion, 0) + 1
+        numeros = {categoria: iter(Turno.reservar_numeros(categoria, cantidad, ahora.date()))
+                   for categoria, cantidad in por_categoria.items()}
+
+        turnos = []
+        for cita in citas:
+            turno = Turno(
+                numero_turno=next(numeros[cita.categoria_atencion]),
+                fecha_numero=ahora.date(),
+                usuario_id=cita.usuario_id,
+                tipo_tramite_id=cita.tipo_tramite_id,
+                categoria_atencion=cita.categoria_atencion,
+                estado='pendiente',
+                fecha_solicitud=cita.inicio,
+                llamados_realizados=0,
+                observaciones=f'Cita {cita.codigo}'
+            )
+            turnos.append((cita, turno))
+        db.session.add_all(turno for _, turno in turnos)
+        db.session.flush()
+
+        for cita, turno in turnos:
+            cita.estado = 'activada'
+            cita.turno_id = turno.id
+        turnos_dict.extend(turno.to_dict() for _, turno in turnos)
+        db.session.commit()
+
+    db.session.commit()
+    if vencidas:
+        logger.info('%s citas vencidas sin activar', vencidas)
+
+    if turnos_dict:
+        logger.info('Activadas %s citas', len(turnos_dict))
+        socketio.emit('turnos_lote', {'turnos': turnos_dict}, namespace='/')
+        from app.enrutamiento import proponer_turnos
+        proponer_turnos(turnos_dict)
+
+    return turnos_dict
+
+
+def init_citas(app):
+    """Programa la activación periódica de citas"""
+    from app.tareas import iniciar_tarea_periodica
+    iniciar_tarea_periodica(app, 'citas', app.config['CITAS_INTERVALO_SEGUNDOS'], activar_citas)
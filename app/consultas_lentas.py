@@ -0,0 +1,236 @@
+"""
+Registro de consultas lentas
+
+Cuando el dashboard de administración o las estadísticas se vuelven lentos no
+hay forma de saber qué sentencia es la responsable. Este módulo recibe la
+duración de cada sentencia SQL (ver tiempo_sql, incluidas las que fallan) y,
+si supera CONSULTAS_LENTAS_UMBRAL_MS, guarda la sentencia, el endpoint y las
+líneas de la aplicación que la originaron. Los parámetros pueden contener
+datos personales y hashes de contraseñas: solo se guardan con
+CONSULTAS_LENTAS_PARAMETROS y nunca los de sentencias sobre TABLAS_SENSIBLES.
+
+El trabajo pesado ocurre fuera del camino de la petición: una tarea periódica
+(o la página de administración al abrirse) procesa las consultas registradas,
+obtiene su plan con EXPLAIN QUERY PLAN (SQLite) o EXPLAIN (PostgreSQL; EXPLAIN
+ANALYZE para SELECT si CONSULTAS_LENTAS_EXPLAIN_ANALYZE) una vez por sentencia
+distinta, las escribe en un log rotativo en formato JSON y las agrupa para el
+ranking por tiempo total de /admin/consultas-lentas.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import traceback
+from collections import deque
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+from flask import current_app, has_request_context, request
+
+from app.models import db
+from app.tiempo_sql import observar_consultas
+
+logger = logging.getLogger(__name__)
+
+# Logger propio del archivo rotativo (no se propaga al log de la aplicación)
+log_consultas = logging.getLogger('consultas_lentas')
+log_consultas.propagate = False
+
+DIRECTORIO_APP = os.path.dirname(os.path.abspath(__file__))
+LARGO_MAXIMO_PARAMETROS = 500
+
+# Tablas con datos personales o credenciales cuyos parámetros no se guardan
+TABLAS_SENSIBLES = ('usuarios', 'usuarios_sistema', 'empleados')
+_TABLA_SENSIBLE = re.compile(r'\b(?:%s)\b' % '|'.join(TABLAS_SENSIBLES), re.IGNORECASE)
+PARAMETROS_OCULTOS = '[ocultos]'
+
+# Listas de marcadores de IN (...) de largo variable: "(?, ?, ?)" o "(%(p_1)s, %(p_2)s)"
+_LISTA_MARCADORES = re.compile(r'\(\s*(?:\?|%\([^)]+\)s|%s)(?:\s*,\s*(?:\?|%\([^)]+\)s|%s))+\s*\)')
+_ESPACIOS = re.compile(r'\s+')
+
+
+def huella(sentencia):
+    """Sentencia normalizada: espacios colapsados y listas IN de cualquier largo unificadas"""
+    return _LISTA_MARCADORES.sub('(...)', _ESPACIOS.sub(' ', sentencia).strip())
+
+
+def _origen():
+    """Últimas líneas de la aplicación (fuera de este módulo) en la pila actual"""
+    lineas = []
+    for marco in traceback.extract_stack():
+        archivo = os.path.abspath(marco.filename)
+        if archivo.startswith(DIRECTORIO_APP) and archivo != os.path.abspath(__file__):
+            lineas.append(f'{os.path.relpath(archivo, os.path.dirname(DIRECTORIO_APP))}:{marco.lineno} {marco.name}')
+    return lineas[-3:]
+
+
+class RegistroConsultasLentas:
+    """Consultas lentas pendientes de procesar y su agregado por sentencia"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.umbral = 0.2
+        self.incluir_parametros = False
+        self.pendientes = deque(maxlen=1000)
+        self.sentencias = {}
+
+    def registrar(self, sentencia, parametros, segundos):
+        # En executemany se conserva solo el primer juego de parámetros
+        if isinstance(parametros, list):
+            parametros = parametros[0] if parametros else ()
+        if not self.incluir_parametros:
+            visibles = None
+        elif _TABLA_SENSIBLE.search(sentencia):
+            visibles = PARAMETROS_OCULTOS
+        else:
+            visibles = repr(parametros)[:LARGO_MAXIMO_PARAMETROS]
+        self.pendientes.append({
+            'fecha': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+            'duracion_ms': round(segundos * 1000, 2),
+            'sentencia': sentencia,
+            '_parametros': parametros,
+            'parametros': visibles,
+            'endpoint': request.endpoint if has_request_context() else None,
+            'origen': _origen()
+        })
+
+    def ranking(self):
+        """Sentencias ordenadas por tiempo total"""
+        with self._lock:
+            return sorted((dict(s) for s in self.sentencias.values()), key=lambda s: -s['total_ms'])
+
+    def reiniciar(self):
+        with self._lock:
+            self.sentencias.clear()
+            self.pendientes.clear()
+
+
+registro = RegistroConsultasLentas()
+
+
+# ===== GANCHOS SQL =====
+
+def _observar_consulta(conn, statement, parameters, duracion):
+    if duracion >= registro.umbral and not conn.info.get('lentas_explicando'):
+        registro.registrar(statement, parameters, duracion)
+
+
+# ===== PLANES =====
+
+def _primera_palabra(sentencia):
+    partes = sentencia.split(None, 1)
+    return partes[0].upper() if partes else ''
+
+
+def _es_lectura(sentencia):
+    return _primera_palabra(sentencia) in ('SELECT', 'WITH')
+
+
+def explicar(sentencia, parametros):
+    """
+    Plan de ejecución de la sentencia como lista de líneas.
+    EXPLAIN ANALYZE vuelve a ejecutar la consulta, por eso solo se usa con
+    SELECT en PostgreSQL y dentro de un SAVEPOINT que se revierte.
+    """
+    if _primera_palabra(sentencia) not in ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE'):
+        return []
+    dialecto = db.engine.dialect.name
+    if dialecto == 'sqlite':
+        prefijo = 'EXPLAIN QUERY PLAN '
+    elif dialecto == 'postgresql':
+        analizar = current_app.config['CONSULTAS_LENTAS_EXPLAIN_ANALYZE'] and _es_lectura(sentencia)
+        prefijo = 'EXPLAIN (ANALYZE, BUFFERS) ' if analizar else 'EXPLAIN '
+    else:
+        return []
+
+    # Las sentencias del propio EXPLAIN (y su SAVEPOINT) no se registran
+    conexion = db.session.connection()
+    conexion.info['lentas_explicando'] = True
+    try:
+        punto = db.session.begin_nested()
+        try:
+            filas = conexion.exec_driver_sql(prefijo + sentencia, parametros or ()).all()
+        finally:
+            punto.rollback()
+    finally:
+        conexion.info['lentas_explicando'] = False
+
+    if dialecto == 'sqlite':
+        # (id, padre, no usado, detalle)
+        return [fila[-1] for fila in filas]
+    return [fila[0] for fila in filas]
+
+
+def procesar_pendientes():
+    """
+    Agrega las consultas registradas por sentencia, obtiene el plan de las
+    sentencias nuevas y las escribe en el log rotativo.
+
+    Returns:
+        Cantidad de consultas procesadas
+    """
+    procesadas = 0
+    # Solo las registradas hasta ahora: procesar también ejecuta consultas
+    for _ in range(len(registro.pendientes)):
+        try:
+            consulta = registro.pendientes.popleft()
+        except IndexError:
+            break
+        procesadas += 1
+        clave = huella(consulta['sentencia'])
+        parametros = consulta.pop('_parametros')
+
+        with registro._lock:
+            agregado = registro.sentencias.get(clave)
+        if agregado is None:
+            try:
+                plan = explicar(consulta['sentencia'], parametros)
+            except Exception as e:
+                # Sin los parámetros que SQLAlchemy agrega al mensaje del error
+                plan = [f'No se pudo obtener el plan: {getattr(e, "orig", None) or e}']
+            agregado = {'sentencia': clave, 'ejecuciones': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'plan': plan}
+
+        with registro._lock:
+            agregado = registro.sentencias.setdefault(clave, agregado)
+            agregado['ejecuciones'] += 1
+            agregado['total_ms'] = round(agregado['total_ms'] + consulta['duracion_ms'], 2)
+            agregado['max_ms'] = max(agregado['max_ms'], consulta['duracion_ms'])
+            agregado['promedio_ms'] = round(agregado['total_ms'] / agregado['ejecuciones'], 2)
+            agregado['ultima_fecha'] = consulta['fecha']
+            agregado['ultimo_endpoint'] = consulta['endpoint']
+            agregado['origen'] = consulta['origen']
+            agregado['parametros'] = consulta['parametros']
+
+        log_consultas.warning(json.dumps(dict(consulta, plan=agregado['plan']), ensure_ascii=False, default=str))
+
+    if procesadas:
+        logger.info('Procesadas %s consultas lentas', procesadas)
+    return procesadas
+
+
+def init_consultas_lentas(app):
+    """Registra los ganchos SQL, el log rotativo y la tarea de procesamiento"""
+    umbral = app.config['CONSULTAS_LENTAS_UMBRAL_MS']
+    if umbral <= 0:
+        return
+
+    registro.umbral = umbral / 1000
+    registro.incluir_parametros = app.config['CONSULTAS_LENTAS_PARAMETROS']
+
+    archivo = app.config['CONSULTAS_LENTAS_ARCHIVO']
+    if not log_consultas.handlers:
+        os.makedirs(os.path.dirname(archivo), exist_ok=True)
+        manejador = RotatingFileHandler(archivo, maxBytes=app.config['CONSULTAS_LENTAS_ARCHIVO_MAX_BYTES'],
+                                        backupCount=app.config['CONSULTAS_LENTAS_ARCHIVO_RESPALDOS'],
+                                        encoding='utf-8')
+        manejador.setFormatter(logging.Formatter('%(message)s'))
+        log_consultas.addHandler(manejador)
+        log_consultas.setLevel(logging.WARNING)
+
+    observar_consultas(_observar_consulta)
+
+    from app.tareas import iniciar_tarea_periodica
+    iniciar_tarea_periodica(app, 'consultas_lentas', app.config['CONSULTAS_LENTAS_INTERVALO_SEGUNDOS'],
+                            procesar_pendientes)
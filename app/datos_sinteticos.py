@@ -0,0 +1,455 @@
+"""
+Datos sintéticos para benchmarks y pruebas de capacidad
+
+Genera usuarios, turnos y notificaciones realistas con una semilla fija (la
+misma semilla y los mismos parámetros producen las mismas filas, con las
+fechas relativas al momento de la carga):
+
+- Usuarios: nombres y apellidos frecuentes, edad, y cédulas con el formato de
+  su época (8 dígitos para quienes se cedularon antes de 2003, 10 dígitos
+  desde 1.000.000.000 para los más jóvenes). La categoría se deriva de la
+  edad (adulto mayor desde los 60), con una fracción de discapacidad y de
+  embarazadas entre las mujeres de 18 a 42 años.
+- Llegadas: el total de turnos se reparte entre los días según el día de la
+  semana (sábados y domingos cerrado) y el fin de mes, y dentro de cada
+  jornada según la curva por hora elegida (CURVAS_LLEGADA).
+- Atención: cada jornada se simula con N ventanillas que atienden por orden
+  de llegada; el tiempo de servicio es lognormal alrededor del
+  tiempo_estimado del trámite. De ahí salen la hora de llamado
+  (fecha_atencion), el empleado, el estado y los llamados realizados. En la
+  jornada en curso los turnos aún no llamados quedan pendientes.
+- Notificaciones: una por cada llamado, como las crea llamar_turno.
+
+Las filas se generan como tuplas en streaming (memoria acotada: una jornada y
+un lote) con IDs explícitos a partir del máximo existente y se cargan por
+lotes con el mecanismo más rápido de cada motor:
+
+- PostgreSQL: COPY ... FROM STDIN en formato CSV
+- SQLite: executemany del driver
+- Otros: INSERT de Core con múltiples parámetros
+"""
+
+import csv
+import heapq
+import io
+import itertools
+import math
+import random
+from array import array
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import func, insert, select
+
+from app.models import db, Empleado, Notificacion, TipoTramite, Turno, Usuario
+
+# Multiplicadores de llegadas por hora de la jornada
+CURVAS_LLEGADA = {
+    'constante': (1, 1, 1, 1, 1, 1, 1, 1),
+    'normal': (0.6, 1.4, 1.6, 1.2, 0.8, 0.9, 0.9, 0.6),
+    'vencimiento': (1.2, 2.4, 2.6, 2.0, 1.6, 1.8, 2.2, 2.6),
+}
+# Multiplicador por día de la semana (lunes a domingo) y para los últimos días del mes
+FACTOR_DIA_SEMANA = (1.25, 1.05, 1.0, 1.0, 1.1, 0.0, 0.0)
+FACTOR_FIN_DE_MES = 1.5
+DIA_FIN_DE_MES = 26
+
+HORA_APERTURA = 8
+HORAS_JORNADA = 8
+# Utilización objetivo al calcular las ventanillas automáticamente
+UTILIZACION_VENTANILLAS = 0.85
+# Dispersión (sigma del logaritmo) del tiempo de servicio alrededor del tiempo_estimado
+DISPERSION_SERVICIO = 0.5
+# Minutos entre llamados consecutivos de un mismo turno
+MINUTOS_ENTRE_LLAMADOS = 2
+FRACCION_CANCELADOS = 0.03
+FRACCION_NO_PRESENTADOS = 0.06
+
+# Rangos de cédulas: (primera, separación entre posiciones consecutivas)
+CEDULAS_ANTIGUAS = (10000000, 19)        # 8 dígitos, cedulados antes de 2003
+CEDULAS_NUEVAS = (1000000000, 47)        # 10 dígitos
+EDAD_CEDULA_NUEVA = 41
+# Edades de quienes hacen trámites: (desde, hasta) y peso
+EDADES = {(18, 29): 0.24, (30, 44): 0.32, (45, 59): 0.30, (60, 74): 0.10, (75, 95): 0.04}
+
+NOMBRES_MUJER = ('María', 'Luz', 'Ana', 'Carmen', 'Sandra', 'Gloria', 'Martha', 'Diana', 'Claudia', 'Paola',
+                 'Natalia', 'Laura', 'Valentina', 'Daniela', 'Camila', 'Andrea', 'Ángela', 'Rosa', 'Blanca', 'Yolanda')
+NOMBRES_HOMBRE = ('José', 'Luis', 'Carlos', 'Juan', 'Jorge', 'Andrés', 'Jaime', 'Diego', 'Óscar', 'Fernando',
+                  'Santiago', 'Sebastián', 'Miguel', 'Alejandro', 'Julián', 'Édgar', 'Héctor', 'Pedro', 'Manuel', 'Javier')
+APELLIDOS = ('Rodríguez', 'Gómez', 'González', 'Martínez', 'García', 'López', 'Hernández', 'Sánchez', 'Ramírez',
+             'Pérez', 'Díaz', 'Muñoz', 'Rojas', 'Moreno', 'Jiménez', 'Vargas', 'Castro', 'Gutiérrez', 'Ospina',
+             'Cardona', 'Restrepo', 'Álvarez', 'Torres', 'Suárez', 'Mejía', 'Castaño', 'Quintero', 'Giraldo')
+
+CATEGORIAS = ('ninguna', 'adulto_mayor', 'discapacidad', 'embarazada')
+
+COLUMNAS = {
+    'usuarios': ('id', 'cedula', 'nombre', 'telefono', 'email', 'categoria', 'fecha_registro'),
+    'turnos': ('id', 'numero_turno', 'usuario_id', 'tipo_tramite_id', 'categoria_atencion', 'estado',
+               'fecha_solicitud', 'fecha_atencion', 'empleado_id', 'observaciones', 'llamados_realizados',
+               'fecha_numero'),
+    'notificaciones': ('id', 'turno_id', 'mensaje', 'leida', 'fecha_envio'),
+}
+# Orden de carga (las claves foráneas apuntan a tablas anteriores)
+ORDEN_TABLAS = ('usuarios', 'turnos', 'notificaciones')
+TAMANO_LOTE = 50000
+
+
+def _maximo_id(modelo):
+    return db.session.execute(select(func.max(modelo.id))).scalar() or 0
+
+
+def ultimos_numeros():
+    """Último número de turno existente por prefijo (el más largo y luego el mayor)"""
+    ultimos = {}
+    for prefijo in set(Turno.PREFIJOS.values()):
+        del_prefijo = Turno.numero_turno.startswith(prefijo)
+        largo = db.session.execute(select(func.max(func.length(Turno.numero_turno))).where(del_prefijo)).scalar()
+        if largo:
+            numero = db.session.execute(select(func.max(Turno.numero_turno)).where(
+                del_prefijo, func.length(Turno.numero_turno) == largo)).scalar()
+            ultimos[prefijo] = int(numero[1:]) if numero[1:].isdigit() else 0
+    return ultimos
+
+
+def pesos_dias(dias, hasta):
+    """(fecha, peso de llegadas) de cada uno de los `dias` días que terminan en `hasta`"""
+    fechas = [hasta - timedelta(days=d) for d in range(dias - 1, -1, -1)]
+    pesos = [FACTOR_DIA_SEMANA[f.weekday()] * (FACTOR_FIN_DE_MES if f.day >= DIA_FIN_DE_MES else 1) for f in fechas]
+    if not any(pesos):
+        pesos = [1.0] * len(fechas)
+    return list(zip(fechas, pesos))
+
+
+def fraccion_transcurrida(ahora):
+    """Fracción de la jornada de hoy ya transcurrida (0 antes de la apertura)"""
+    apertura = datetime.combine(ahora.date(), time(HORA_APERTURA))
+    return min(1.0, max(0.0, (ahora - apertura).total_seconds() / (HORAS_JORNADA * 3600)))
+
+
+def repartir(total, pesos):
+    """Reparte `total` proporcionalmente a los pesos en enteros que suman exactamente `total`"""
+    suma = sum(pesos)
+    if not suma:
+        return [0] * len(pesos)
+    repartidos = []
+    acumulado = 0.0
+    for peso in pesos:
+        anterior = round(acumulado)
+        acumulado += total * peso / suma
+        repartidos.append(round(acumulado) - anterior)
+    return repartidos
+
+
+class GeneradorDatos:
+    """
+    Generador determinista de filas (tuplas en el orden de COLUMNAS).
+
+    Args:
+        tramites: Diccionario {tipo_tramite_id: minutos estimados}
+        empleados_ids: IDs de los empleados que atienden (vacío: sin empleado)
+        semilla: Semilla del generador aleatorio
+        curva: Nombre de la curva de llegadas por hora (CURVAS_LLEGADA)
+        ultimos_numeros: Último número de turno existente por prefijo (ver ultimos_numeros())
+    """
+
+    def __init__(self, tramites, empleados_ids=(), semilla=42, curva='normal', ultimos_numeros=None):
+        self.rng = random.Random(semilla)
+        self.tramites = tramites
+        self.tramites_ids = list(tramites)
+        self.empleados_ids = list(empleados_ids)
+        self.curva = CURVAS_LLEGADA[curva]
+        ultimos_numeros = ultimos_numeros or {}
+        self._numeros = {prefijo: itertools.count(ultimos_numeros.get(prefijo, 0) + 1)
+                         for prefijo in set(Turno.PREFIJOS.values())}
+        self._edades = list(EDADES)
+        self._pesos_edades = list(itertools.accumulate(EDADES.values()))
+        # Solicitantes posibles: ID y código de categoría (9 bytes por usuario)
+        self.usuarios_ids = array('q')
+        self.usuarios_categorias = bytearray()
+
+    # ===== USUARIOS =====
+
+    def usuarios(self, cantidad, primer_id, desde=0):
+        """
+        Filas de `usuarios` con IDs desde `primer_id`. `desde` es la posición
+        del primer usuario generado (los usuarios ya cargados): cada posición
+        tiene su propia franja de cédulas, así que las cédulas no se repiten
+        entre cargas sucesivas.
+        """
+        rng = self.rng
+        registro = datetime.utcnow()
+        for i in range(cantidad):
+            desde_edad, hasta_edad = rng.choices(self._edades, cum_weights=self._pesos_edades)[0]
+            edad = rng.randint(desde_edad, hasta_edad)
+            mujer = rng.random() < 0.52
+
+            if edad >= 60:
+                categoria = 'adulto_mayor'
+            elif rng.random() < 0.05:
+                categoria = 'discapacidad'
+            elif mujer and edad <= 42 and rng.random() < 0.12:
+                categoria = 'embarazada'
+            else:
+                categoria = 'ninguna'
+
+            primera, separacion = CEDULAS_NUEVAS if edad < EDAD_CEDULA_NUEVA else CEDULAS_ANTIGUAS
+            cedula = str(primera + (desde + i) * separacion + rng.randrange(separacion))
+            nombre = f'{rng.choice(NOMBRES_MUJER if mujer else NOMBRES_HOMBRE)} {rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}'
+
+            usuario_id = primer_id + i
+            self.usuarios_ids.append(usuario_id)
+            self.usuarios_categorias.append(CATEGORIAS.index(categoria))
+            yield (
+                usuario_id,
+                cedula,
+                nombre,
+                f'3{rng.randrange(10 ** 9):09d}' if rng.random() < 0.85 else None,
+                f'{nombre.split()[0].lower()}.{cedula}@correo.co' if rng.random() < 0.4 else None,
+                categoria,
+                registro
+            )
+
+    def usar_usuarios_existentes(self, filas):
+        """Agrega usuarios ya cargados (iterable de (id, categoria)) como solicitantes posibles"""
+        for usuario_id, categoria in filas:
+            self.usuarios_ids.append(usuario_id)
+            self.usuarios_categorias.append(CATEGORIAS.index(categoria) if categoria in CATEGORIAS else 0)
+
+    # ===== TURNOS =====
+
+    def ventanillas_para(self, turnos_por_dia):
+        """Ventanillas necesarias para atender la carga con UTILIZACION_VENTANILLAS"""
+        servicio = sum(self.tramites.values()) / len(self.tramites)
+        return max(1, math.ceil(turnos_por_dia * servicio / (HORAS_JORNADA * 60 * UTILIZACION_VENTANILLAS)))
+
+    def jornada(self, dia, cantidad, ventanillas, primer_turno_id, primera_notificacion_id, ahora=None):
+        """
+        Turnos y notificaciones de una jornada.
+
+        Args:
+            dia: Fecha de la jornada
+            cantidad: Turnos solicitados en el día
+            ventanillas: Ventanillas que atienden por orden de llegada
+            primer_turno_id: ID del primer turno
+            primera_notificacion_id: ID de la primera notificación
+            ahora: Hora actual si es la jornada en curso (las llegadas se
+                   reparten en lo transcurrido y lo no llamado queda pendiente)
+
+        Returns:
+            (filas de turnos, filas de notificaciones)
+        """
+        rng = self.rng
+        inicio = datetime.combine(dia, time(HORA_APERTURA))
+        duracion = HORAS_JORNADA * 3600
+        if ahora is not None:
+            if ahora <= inicio:
+                # Antes de la apertura: lo que va del día
+                inicio = datetime.combine(dia, time())
+            duracion = min(duracion, max(1, (ahora - inicio).total_seconds()))
+
+        horas = len(self.curva)
+        llegadas = sorted(
+            inicio + timedelta(seconds=(hora + rng.random()) * duracion / horas)
+            for hora in rng.choices(range(horas), self.curva, k=cantidad)
+        )
+
+        libres = [(inicio, ventanilla) for ventanilla in range(ventanillas)]
+        turnos = []
+        notificaciones = []
+        notificacion_id = primera_notificacion_id
+        for i, llegada in enumerate(llegadas):
+            turno_id = primer_turno_id + i
+            indice = rng.randrange(len(self.usuarios_ids))
+            categoria = CATEGORIAS[self.usuarios_categorias[indice]]
+            prefijo = Turno.PREFIJOS[categoria]
+            numero = f'{prefijo}{next(self._numeros[prefijo]):03d}'
+            tramite = rng.choice(self.tramites_ids)
+
+            azar = rng.random()
+            if azar < FRACCION_CANCELADOS:
+                estado = 'cancelado'
+            elif azar < FRACCION_CANCELADOS + FRACCION_NO_PRESENTADOS:
+                estado = 'no_presentado'
+            else:
+                estado = 'atendido'
+
+            # La ventanilla que se libera primero llama al turno
+            libre, ventanilla = heapq.heappop(libres)
+            llamado = max(llegada, libre)
+            if estado == 'cancelado':
+                llamados = 0
+                fin = libre
+            elif estado == 'no_presentado':
+                llamados = 3
+                fin = llamado + timedelta(minutes=MINUTOS_ENTRE_LLAMADOS * llamados)
+            else:
+                llamados = 2 if rng.random() < 0.1 else 1
+                servicio = rng.lognormvariate(math.log(self.tramites[tramite]), DISPERSION_SERVICIO)
+                fin = llamado + timedelta(minutes=MINUTOS_ENTRE_LLAMADOS * (llamados - 1) + servicio)
+            heapq.heappush(libres, (fin, ventanilla))
+
+            if ahora is not None and llamado > ahora:
+                estado, llamados = 'pendiente', 0
+            elif ahora is not None and estado == 'atendido' and fin > ahora:
+                estado = 'en_atencion'
+
+            atendido = estado in ('atendido', 'en_atencion')
+            empleado_id = None
+            if self.empleados_ids and llamados:
+                empleado_id = self.empleados_ids[ventanilla % len(self.empleados_ids)]
+            turnos.append((
+                turno_id, numero, self.usuarios_ids[indice], tramite, categoria, estado,
+                llegada, llamado if atendido else None, empleado_id, None, llamados, dia
+            ))
+
+            for n in range(1, llamados + 1):
+                notificaciones.append((
+                    notificacion_id,
+                    turno_id,
+                    f'🔔 LLAMADO #{n}: Su turno {numero} está siendo llamado. Por favor diríjase a la ventanilla de atención.',
+                    ahora is None,
+                    llamado + timedelta(minutes=MINUTOS_ENTRE_LLAMADOS * (n - 1))
+                ))
+                notificacion_id += 1
+
+        return turnos, notificaciones
+
+
+class CargadorMasivo:
+    """
+    Acumula filas por tabla y las inserta en lotes, con un commit por lote.
+    Al vaciar respeta ORDEN_TABLAS para que las claves foráneas siempre
+    apunten a filas ya insertadas.
+
+    Args:
+        tamano_lote: Filas acumuladas (entre todas las tablas) que disparan una inserción
+        progreso: Función opcional llamada con las filas insertadas por tabla tras cada lote
+    """
+
+    def __init__(self, tamano_lote=TAMANO_LOTE, progreso=None):
+        self.tamano_lote = tamano_lote
+        self.progreso = progreso
+        self.motor = db.engine
+        self.pendientes = {tabla: [] for tabla in ORDEN_TABLAS}
+        self.insertados = {tabla: 0 for tabla in ORDEN_TABLAS}
+        self._acumuladas = 0
+
+    def agregar(self, tabla, filas):
+        self.pendientes[tabla].extend(filas)
+        self._acumuladas = sum(len(p) for p in self.pendientes.values())
+        if self._acumuladas >= self.tamano_lote:
+            self.vaciar()
+
+    def vaciar(self):
+        with self.motor.begin() as conexion:
+            for tabla in ORDEN_TABLAS:
+                if self.pendientes[tabla]:
+                    self._insertar(conexion, tabla, self.pendientes[tabla])
+                    self.insertados[tabla] += len(self.pendientes[tabla])
+                    self.pendientes[tabla] = []
+        self._acumuladas = 0
+        if self.progreso:
+            self.progreso(dict(self.insertados))
+
+    def _insertar(self, conexion, tabla, filas):
+        columnas = COLUMNAS[tabla]
+        dialecto = self.motor.dialect.name
+        if dialecto == 'postgresql':
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(filas)   # None -> campo vacío sin comillas -> NULL
+            buffer.seek(0)
+            conexion.connection.cursor().copy_expert(
+                f'COPY {tabla} ({", ".join(columnas)}) FROM STDIN WITH (FORMAT csv)', buffer)
+        elif dialecto == 'sqlite':
+            # Mismo formato de fecha que guardan los tipos DateTime y Date de SQLAlchemy en SQLite
+            filas = [tuple(v.isoformat(' ', 'microseconds') if isinstance(v, datetime)
+                           else v.isoformat() if isinstance(v, date) else v for v in fila)
+                     for fila in filas]
+            conexion.connection.cursor().executemany(
+                f'INSERT INTO {tabla} ({", ".join(columnas)}) VALUES ({", ".join("?" * len(columnas))})', filas)
+        else:
+            conexion.execute(insert(db.metadata.tables[tabla]), [dict(zip(columnas, fila)) for fila in filas])
+
+    def terminar(self):
+        """Inserta lo pendiente y, en PostgreSQL, avanza las secuencias de IDs"""
+        if self._acumuladas:
+            self.vaciar()
+        if self.motor.dialect.name == 'postgresql':
+            with self.motor.begin() as conexion:
+                for tabla in ORDEN_TABLAS:
+                    conexion.exec_driver_sql(
+                        f"SELECT setval(pg_get_serial_sequence('{tabla}', 'id'), "
+                        f"(SELECT COALESCE(MAX(id), 1) FROM {tabla}))")
+        return dict(self.insertados)
+
+
+def poblar(usuarios, turnos, dias, curva='normal', ventanillas=0, turnos_hoy=None, empleados_ids=None,
+           notificaciones=True, semilla=42, tamano_lote=TAMANO_LOTE, progreso=None):
+    """
+    Genera y carga `usuarios` usuarios y `turnos` turnos repartidos en los
+    `dias` días que terminan hoy (la jornada de hoy queda en curso y recibe
+    solo la parte transcurrida de su cuota). Si
+    `usuarios` es 0 los turnos se asignan a los usuarios existentes. Debe
+    ejecutarse dentro de un contexto de aplicación.
+
+    Args:
+        curva: Curva de llegadas por hora (CURVAS_LLEGADA)
+        ventanillas: Ventanillas por jornada (0: según la carga promedio)
+        turnos_hoy: Turnos de hoy; si se indica, el resto se reparte en los días anteriores
+        empleados_ids: Empleados que atienden (None: todos los activos)
+        notificaciones: Generar una notificación por llamado
+        progreso: Función llamada con las filas insertadas por tabla tras cada lote
+
+    Returns:
+        Diccionario con las filas insertadas por tabla
+    """
+    tramites = {t.id: t.tiempo_estimado or 15
+                for t in TipoTramite.query.filter_by(activo=True).order_by(TipoTramite.id)}
+    if not tramites:
+        raise ValueError('No hay trámites activos')
+    if empleados_ids is None:
+        empleados_ids = db.session.execute(
+            select(Empleado.id).where(Empleado.activo.is_(True)).order_by(Empleado.id)).scalars().all()
+
+    generador = GeneradorDatos(tramites, empleados_ids, semilla, curva, ultimos_numeros())
+    cargador = CargadorMasivo(tamano_lote, progreso)
+    turno_id = _maximo_id(Turno) + 1
+    notificacion_id = _maximo_id(Notificacion) + 1
+
+    if usuarios:
+        existentes = db.session.execute(select(func.count(Usuario.id))).scalar_one()
+        filas = generador.usuarios(usuarios, _maximo_id(Usuario) + 1, desde=existentes)
+        for lote in iter(lambda: list(itertools.islice(filas, tamano_lote)), []):
+            cargador.agregar('usuarios', lote)
+    else:
+        generador.usar_usuarios_existentes(
+            db.session.execute(select(Usuario.id, Usuario.categoria).execution_options(yield_per=tamano_lote)))
+    db.session.remove()
+
+    if turnos and not generador.usuarios_ids:
+        raise ValueError('No hay usuarios a los que asignar los turnos')
+
+    ahora = datetime.utcnow()
+    calendario = pesos_dias(max(1, dias), ahora.date())
+    if turnos_hoy is not None:
+        cantidades = repartir(max(0, turnos - turnos_hoy), [peso for _, peso in calendario[:-1]]) + [turnos_hoy]
+    else:
+        # Hoy solo llega la parte ya transcurrida de su cuota (los días
+        # anteriores no dependen de la hora de la carga)
+        cantidades = repartir(turnos, [peso for _, peso in calendario])
+        cantidades[-1] = round(cantidades[-1] * fraccion_transcurrida(ahora))
+
+    abiertos = [c for c in cantidades if c]
+    ventanillas = ventanillas or generador.ventanillas_para(sum(abiertos) / max(1, len(abiertos)))
+
+    for (dia, _), cantidad in zip(calendario, cantidades):
+        if not cantidad:
+            continue
+        filas_turnos, filas_notificaciones = generador.jornada(
+            dia, cantidad, ventanillas, turno_id, notificacion_id, ahora=ahora if dia == ahora.date() else None)
+        turno_id += len(filas_turnos)
+        notificacion_id += len(filas_notificaciones)
+        cargador.agregar('turnos', filas_turnos)
+        if notificaciones:
+            cargador.agregar('notificaciones', filas_notificaciones)
+
+    return cargador.terminar()
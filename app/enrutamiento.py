@@ -0,0 +1,205 @@
+"""
+Enrutamiento de turnos a empleados
+
+Reemplaza la selección manual en el dashboard por un motor que conoce:
+- Qué empleados están conectados (presencia por Socket.IO, ver eventos_socket)
+- Los trámites asignados a cada uno
+- Su carga actual (turnos en atención) y los turnos que ya atendió hoy
+
+Con esa información:
+- siguiente_turno() entrega al empleado que queda libre el mejor turno de sus
+  trámites: primero por prioridad de categoría, luego del trámite con más
+  presión (pendientes por empleado conectado que lo atiende) y por último el
+  más antiguo.
+- proponer_turnos() envía cada turno nuevo al empleado libre y elegible con
+  menos turnos atendidos hoy (evento 'turno_propuesto' en su sala).
+
+Las funciones ordenar_candidatos, calcular_presion y elegir_empleado no usan
+la base de datos; benchmark_enrutamiento.py las usa para simular la política.
+"""
+
+import logging
+import threading
+from collections import Counter, namedtuple
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import case, func, select, update
+
+from app import socketio
+from app.models import db, Turno, Empleado, UsuarioSistema
+
+logger = logging.getLogger(__name__)
+
+# Orden de prioridad de las categorías (igual que en el dashboard)
+PRIORIDAD_CATEGORIA = {
+    'adulto_mayor': 1,
+    'discapacidad': 2,
+    'embarazada': 3,
+    'ninguna': 4
+}
+
+Candidato = namedtuple('Candidato', 'id tipo_tramite_id categoria_atencion fecha_solicitud')
+
+
+# ===== PRESENCIA =====
+
+class RegistroPresencia:
+    """Conexiones Socket.IO de empleados: sid -> (empleado_id, trámites asignados)"""
+
+    def __init__(self):
+        self._conexiones = {}
+        self._lock = threading.Lock()
+
+    def conectar(self, sid, empleado_id, tramites_ids):
+        with self._lock:
+            self._conexiones[sid] = (empleado_id, frozenset(tramites_ids))
+
+    def desconectar(self, sid):
+        with self._lock:
+            self._conexiones.pop(sid, None)
+
+    def en_linea(self):
+        """empleado_id -> trámites asignados (vacío = atiende todos)"""
+        with self._lock:
+            return {empleado_id: tramites for empleado_id, tramites in self._conexiones.values()}
+
+
+presencia = RegistroPresencia()
+
+
+def empleado_id_de(usuario):
+    """ID del empleado que corresponde al usuario autenticado (Empleado o UsuarioSistema vinculado)"""
+    if isinstance(usuario, Empleado):
+        return usuario.id
+    if isinstance(usuario, UsuarioSistema):
+        return usuario.empleado_id
+    return None
+
+
+# ===== POLÍTICA (sin base de datos) =====
+
+def atiende(tramites, tipo_tramite_id):
+    """Un empleado sin trámites asignados atiende todos (igual que el dashboard)"""
+    return not tramites or tipo_tramite_id in tramites
+
+
+def calcular_presion(pendientes_por_tramite, en_linea):
+    """
+    Presión de cada trámite: pendientes por empleado conectado que lo atiende.
+    Un trámite sin empleados conectados tiene la presión de su cola completa.
+    """
+    presion = {}
+    for tipo_tramite_id, pendientes in pendientes_por_tramite.items():
+        empleados = sum(1 for tramites in en_linea.values() if atiende(tramites, tipo_tramite_id))
+        presion[tipo_tramite_id] = pendientes / max(1, empleados)
+    return presion
+
+
+def ordenar_candidatos(candidatos, presion):
+    """Prioridad de categoría, luego trámite con más presión, luego el más antiguo"""
+    return sorted(candidatos, key=lambda c: (
+        PRIORIDAD_CATEGORIA.get(c.categoria_atencion, 5),
+        -presion.get(c.tipo_tramite_id, 0),
+        c.fecha_solicitud
+    ))
+
+
+def elegir_empleado(elegibles, cargas, atendidos):
+    """Empleado libre con menos turnos atendidos hoy, o None si todos están ocupados"""
+    libres = [e for e in elegibles if not cargas.get(e)]
+    if not libres:
+        return None
+    return min(libres, key=lambda e: (atendidos.get(e, 0), e))
+
+
+# ===== CONSULTAS =====
+
+def _inicio_hoy():
+    return datetime.combine(datetime.utcnow().date(), datetime.min.time())
+
+
+def cargas_empleados(empleados_ids):
+    """(turnos en atención, turnos atendidos hoy) por empleado, en una consulta"""
+    if not empleados_ids:
+        return {}, {}
+    filas = db.session.execute(
+        select(
+            Turno.empleado_id,
+            func.sum(case((Turno.estado == 'en_atencion', 1), else_=0)),
+            func.sum(case((Turno.estado == 'atendido', 1), else_=0))
+        )
+        .where(Turno.empleado_id.in_(empleados_ids), Turno.fecha_solicitud >= _inicio_hoy())
+        .group_by(Turno.empleado_id)
+    ).all()
+    return {f[0]: f[1] or 0 for f in filas}, {f[0]: f[2] or 0 for f in filas}
+
+
+def _pendientes_hoy():
+    return [Candidato(*fila) for fila in db.session.execute(
+        select(Turno.id, Turno.tipo_tramite_id, Turno.categoria_atencion, Turno.fecha_solicitud)
+        .where(Turno.estado == 'pendiente', Turno.fecha_solicitud >= _inicio_hoy())
+    )]
+
+
+# ===== OPERACIONES =====
+
+def siguiente_turno(empleado_id, tramites_ids):
+    """
+    Asigna al empleado el mejor turno pendiente de sus trámites y lo pasa a
+    'en_atencion'. Si otro empleado toma el mismo turno en paralelo se pasa
+    al siguiente candidato.
+
+    Returns:
+        El Turno asignado, o None si no hay turnos pendientes
+    """
+    pendientes = _pendientes_hoy()
+    en_linea = presencia.en_linea()
+    en_linea.setdefault(empleado_id, frozenset(tramites_ids))
+
+    presion = calcular_presion(Counter(c.tipo_tramite_id for c in pendientes), en_linea)
+    propios = [c for c in pendientes if atiende(tramites_ids, c.tipo_tramite_id)]
+
+    for candidato in ordenar_candidatos(propios, presion):
+        tomado = db.session.execute(
+            update(Turno)
+            .where(Turno.id == candidato.id, Turno.estado == 'pendiente')
+            .values(estado='en_atencion', empleado_id=empleado_id)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if tomado:
+            db.session.commit()
+            turno = db.session.get(Turno, candidato.id)
+            db.session.refresh(turno)
+            return turno
+
+    db.session.rollback()
+    return None
+
+
+def proponer_turnos(turnos_dict):
+    """
+    Propone cada turno nuevo al empleado conectado, libre y elegible con menos
+    turnos atendidos hoy. Los turnos sin empleado libre quedan en la cola para
+    siguiente_turno().
+    """
+    if not current_app.config['ENRUTAMIENTO_PROPONER']:
+        return {}
+
+    en_linea = presencia.en_linea()
+    if not en_linea:
+        return {}
+
+    cargas, atendidos = cargas_empleados(list(en_linea))
+    propuestas = {}
+    for turno in sorted(turnos_dict, key=lambda t: PRIORIDAD_CATEGORIA.get(t['categoria_atencion'], 5)):
+        elegibles = [e for e, tramites in en_linea.items() if atiende(tramites, turno['tipo_tramite_id'])]
+        empleado_id = elegir_empleado(elegibles, cargas, atendidos)
+        if empleado_id is None:
+            continue
+        # Un empleado recibe una sola propuesta mientras esté libre
+        cargas[empleado_id] = cargas.get(empleado_id, 0) + 1
+        propuestas[turno['id']] = empleado_id
+        socketio.emit('turno_propuesto', {'turno': turno}, to=f'empleado_{empleado_id}', namespace='/')
+
+    return propuestas
@@ -0,0 +1,56 @@
+"""
+Manejadores de conexión de Socket.IO
+
+Registra la presencia de los empleados autenticados para el motor de
+enrutamiento y los une a su sala personal (empleado_<id>), donde reciben los
+turnos propuestos. Las conexiones de los ciudadanos no se registran en la
+presencia, pero todas se cuentan en las métricas de conexiones activas.
+
+También atiende la sincronización de reloj y los acuses de recepción con los
+que los clientes informan la latencia de los eventos (ver trazas_socket).
+"""
+
+from flask import request
+from flask_login import current_user
+from flask_socketio import join_room
+
+from app import socketio
+from app.cache_identidad import tramites_ids_actuales
+from app.enrutamiento import empleado_id_de, presencia
+from app.metricas import registro
+from app import trazas_socket
+
+
+@socketio.on('connect')
+def conectar(auth=None):
+    """Registra al empleado conectado"""
+    registro.conexion(1)
+    if not current_user.is_authenticated:
+        return
+
+    empleado_id = empleado_id_de(current_user._get_current_object())
+    if empleado_id is None:
+        return
+
+    join_room(f'empleado_{empleado_id}')
+    presencia.conectar(request.sid, empleado_id, tramites_ids_actuales())
+
+
+@socketio.on('disconnect')
+def desconectar():
+    """Elimina la conexión del registro de presencia"""
+    registro.conexion(-1)
+    presencia.desconectar(request.sid)
+
+
+@socketio.on('sincronizar_reloj')
+def sincronizar_reloj(datos=None):
+    """Hora del servidor para que el cliente calcule el desfase de su reloj"""
+    return trazas_socket.hora_servidor()
+
+
+@socketio.on('acuse_evento')
+def acuse_evento(datos):
+    """Acuse de recepción de un evento con las horas (ya corregidas) del cliente"""
+    if isinstance(datos, dict):
+        trazas_socket.registro.acuse(datos.get('id'), datos.get('recibido'), datos.get('mostrado'))
@@ -0,0 +1,120 @@
+"""
+Idempotencia en la emisión de turnos
+
+Los kioscos envían un encabezado Idempotency-Key (un UUID por solicitud de
+turno) y lo repiten en cada reintento. La primera petición guarda la clave
+junto con el turno emitido, en la misma transacción. Los reintentos con la
+misma clave reciben el turno original en lugar de crear un duplicado y
+consumir otro número de la secuencia.
+
+Las claves vencen a las IDEMPOTENCIA_TTL_HORAS y se purgan periódicamente.
+"""
+
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta
+
+from flask import current_app, request
+from sqlalchemy import delete, select
+
+from app.models import db, ClaveIdempotencia
+
+logger = logging.getLogger(__name__)
+
+ENCABEZADO = 'Idempotency-Key'
+LONGITUD_MAXIMA = 64
+
+
+class ClaveInvalida(Exception):
+    """El encabezado Idempotency-Key no tiene un formato válido"""
+
+
+class ClaveReutilizada(Exception):
+    """La clave ya se usó con un cuerpo de petición distinto"""
+
+
+def clave_de_peticion():
+    """
+    Obtiene la clave de idempotencia de la petición actual.
+
+    Returns:
+        La clave, o None si la petición no la envía
+    """
+    clave = request.headers.get(ENCABEZADO, '').strip()
+    if not clave:
+        return None
+    if len(clave) > LONGITUD_MAXIMA:
+        raise ClaveInvalida(f'{ENCABEZADO} no puede superar {LONGITUD_MAXIMA} caracteres')
+    return clave
+
+
+def huella_de(data):
+    """SHA-256 del cuerpo JSON normalizado"""
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def _vencimiento():
+    return datetime.utcnow() - timedelta(hours=current_app.config['IDEMPOTENCIA_TTL_HORAS'])
+
+
+def turno_id_previo(clave, huella):
+    """
+    Busca un turno ya emitido con esta clave.
+
+    Returns:
+        ID del turno original, o None si la clave no existe o venció
+
+    Raises:
+        ClaveReutilizada: si la clave se usó con otro cuerpo de petición
+    """
+    registro = db.session.get(ClaveIdempotencia, clave)
+    if registro is None:
+        return None
+
+    if registro.fecha_creacion < _vencimiento():
+        # Clave vencida: se libera para que pueda registrarse de nuevo
+        db.session.delete(registro)
+        db.session.flush()
+        return None
+
+    if registro.huella != huella:
+        raise ClaveReutilizada(f'{ENCABEZADO} ya fue usada con datos distintos')
+
+    return registro.turno_id
+
+
+def registrar_clave(clave, huella, turno):
+    """
+    Asocia la clave al turno dentro de la transacción actual (antes del commit).
+    Si otro reintento registra la misma clave en paralelo, el commit falla con
+    IntegrityError y el llamador debe repetir la búsqueda.
+    """
+    db.session.flush()
+    db.session.add(ClaveIdempotencia(clave=clave, huella=huella, turno_id=turno.id))
+
+
+def purgar_claves_vencidas(tamano_lote=1000):
+    """Elimina por lotes las claves vencidas"""
+    total = 0
+    while True:
+        claves = db.session.execute(
+            select(ClaveIdempotencia.clave)
+            .where(ClaveIdempotencia.fecha_creacion < _vencimiento())
+            .limit(tamano_lote)
+        ).scalars().all()
+        if not claves:
+            break
+        db.session.execute(delete(ClaveIdempotencia).where(ClaveIdempotencia.clave.in_(claves)))
+        db.session.commit()
+        total += len(claves)
+
+    if total:
+        logger.info('Purgadas %s claves de idempotencia vencidas', total)
+    return total
+
+
+def init_idempotencia(app):
+    """Programa la purga periódica de claves vencidas"""
+    from app.tareas import iniciar_tarea_periodica
+    iniciar_tarea_periodica(app, 'purga_idempotencia', app.config['IDEMPOTENCIA_PURGA_SEGUNDOS'], purgar_claves_vencidas)
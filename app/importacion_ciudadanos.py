@@ -0,0 +1,457 @@
+"""
+Importación masiva de ciudadanos (tabla usuarios) desde archivos CSV
+
+Los municipios entregan padrones existentes (Sisbén, programas de Adulto
+Mayor, etc.) que hoy solo pueden registrarse uno a uno desde el kiosco. Este
+módulo los carga en streaming:
+
+- Lee el CSV fila por fila (separador ',' ';' o tabulador, detectado en el
+  encabezado) y reconoce columnas con nombres habituales: cedula/documento/
+  identificacion, nombres + apellidos (o primer_nombre ... segundo_apellido),
+  telefono/celular, email/correo y categoria/programa.
+- Valida y normaliza cada fila con las mismas reglas del kiosco (cédula de 7
+  a 12 dígitos, teléfono de 7 a 15, email) y traduce las categorías
+  ("Adulto Mayor", "gestante", "PcD", ...) a las del sistema.
+- Inserta o actualiza por lotes con INSERT ... ON CONFLICT (cedula) en
+  PostgreSQL y SQLite, con un commit por lote: la memoria depende del tamaño
+  del lote, no del archivo. Un teléfono o email vacío no borra el registrado.
+- Escribe las filas rechazadas (línea, motivo y columnas originales) en un
+  CSV a medida que aparecen.
+
+Desde /admin/importar-ciudadanos el archivo se sube por partes menores que
+MAX_CONTENT_LENGTH y se procesa en segundo plano (ver Importaciones); desde
+la consola se usa importar_ciudadanos.py.
+"""
+
+import codecs
+import csv
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from sqlalchemy import func, select
+
+from app.models import db, Usuario
+
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE = 5000
+MUESTRAS_RECHAZOS = 20
+
+# Encabezados reconocidos (normalizados: minúsculas, sin tildes, '_' como separador)
+COLUMNAS = {
+    'cedula': ('cedula', 'documento', 'numero_documento', 'num_documento', 'nro_documento',
+               'no_documento', 'identificacion', 'numero_identificacion', 'cc'),
+    'telefono': ('telefono', 'celular', 'movil', 'telefono_celular', 'numero_telefono'),
+    'email': ('email', 'correo', 'correo_electronico', 'e_mail'),
+    'categoria': ('categoria', 'programa', 'poblacion', 'grupo_poblacional', 'condicion'),
+}
+# Columnas que se unen, en este orden, para formar el nombre completo
+PARTES_NOMBRE = ('nombre', 'nombres', 'nombre_completo', 'primer_nombre', 'segundo_nombre',
+                 'apellidos', 'apellido', 'primer_apellido', 'segundo_apellido')
+
+CATEGORIAS = ('ninguna', 'adulto_mayor', 'discapacidad', 'embarazada')
+SINONIMOS_CATEGORIA = {
+    '': 'ninguna', 'ninguno': 'ninguna', 'general': 'ninguna', 'no': 'ninguna', 'na': 'ninguna', 'n_a': 'ninguna',
+    'adulto_mayor': 'adulto_mayor', 'adultos_mayores': 'adulto_mayor', 'tercera_edad': 'adulto_mayor',
+    'colombia_mayor': 'adulto_mayor', 'mayor': 'adulto_mayor',
+    'discapacitado': 'discapacidad', 'discapacitada': 'discapacidad', 'pcd': 'discapacidad',
+    'persona_con_discapacidad': 'discapacidad', 'con_discapacidad': 'discapacidad',
+    'gestante': 'embarazada', 'madre_gestante': 'embarazada', 'embarazo': 'embarazada',
+}
+
+_NO_ALFANUMERICO = re.compile(r'[^a-z0-9]+')
+_SEPARADORES_CEDULA = re.compile(r'[\s.,\-]')
+_DECIMAL_CERO = re.compile(r'^(\d+)\.0+$')   # Números exportados desde Excel como decimales
+_SEPARADORES_TELEFONO = re.compile(r'[\s()\-+.]')
+_CEDULA = re.compile(r'^\d{7,12}$')
+_TELEFONO = re.compile(r'^\d{7,15}$')
+_EMAIL = re.compile(r'^[^\s@]+@[^\s@]+\.[^\s@]+$')
+_ESPACIOS = re.compile(r'\s+')
+
+
+def normalizar_clave(texto):
+    """'Número de Documento' -> 'numero_de_documento'"""
+    texto = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode('ascii')
+    return _NO_ALFANUMERICO.sub('_', texto.lower()).strip('_')
+
+
+def normalizar_categoria(valor):
+    """Categoría del sistema para el texto del padrón, o None si no se reconoce"""
+    clave = normalizar_clave(valor).replace('_de_', '_')
+    if clave in CATEGORIAS:
+        return clave
+    return SINONIMOS_CATEGORIA.get(clave)
+
+
+def detectar_codificacion(ruta, muestra=1024 * 1024):
+    """utf-8-sig si el inicio del archivo es UTF-8 válido; si no, cp1252 (exportaciones de Excel)"""
+    with open(ruta, 'rb') as archivo:
+        datos = archivo.read(muestra)
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(datos, final=len(datos) < muestra)
+    except UnicodeDecodeError:
+        return 'cp1252'
+    return 'utf-8-sig'
+
+
+class Encabezado:
+    """Posición de cada campo en las filas del archivo"""
+
+    def __init__(self, columnas):
+        self.columnas = columnas
+        claves = [normalizar_clave(c).replace('_de_', '_') for c in columnas]
+        self.indices = {}
+        for campo, alias in COLUMNAS.items():
+            for nombre in alias:
+                if nombre in claves:
+                    self.indices[campo] = claves.index(nombre)
+                    break
+        self.nombre = [claves.index(parte) for parte in PARTES_NOMBRE if parte in claves]
+
+        if 'cedula' not in self.indices:
+            raise ValueError(f'El archivo no tiene columna de cédula (se reconoce: {", ".join(COLUMNAS["cedula"])})')
+        if not self.nombre:
+            raise ValueError(f'El archivo no tiene columna de nombre (se reconoce: {", ".join(PARTES_NOMBRE)})')
+
+    @property
+    def con_categoria(self):
+        return 'categoria' in self.indices
+
+    def _valor(self, fila, campo):
+        indice = self.indices.get(campo)
+        return fila[indice].strip() if indice is not None and indice < len(fila) else ''
+
+    def validar(self, fila):
+        """
+        Normaliza una fila del archivo.
+
+        Returns:
+            (datos, None) si es válida o (None, motivo) si se rechaza
+        """
+        if len(fila) > len(self.columnas):
+            return None, f'La fila tiene {len(fila)} columnas y el encabezado {len(self.columnas)}'
+
+        cedula = self._valor(fila, 'cedula')
+        cedula = _SEPARADORES_CEDULA.sub('', _DECIMAL_CERO.sub(r'\1', cedula))
+        if not cedula:
+            return None, 'Cédula vacía'
+        if not _CEDULA.match(cedula):
+            return None, f'Cédula inválida: {cedula[:20]}'
+
+        nombre = _ESPACIOS.sub(' ', ' '.join(fila[i] for i in self.nombre if i < len(fila))).strip()
+        if not nombre:
+            return None, 'Nombre vacío'
+        if len(nombre) > 100:
+            return None, 'Nombre de más de 100 caracteres'
+
+        telefono = _SEPARADORES_TELEFONO.sub('', _DECIMAL_CERO.sub(r'\1', self._valor(fila, 'telefono')))
+        if telefono and not _TELEFONO.match(telefono):
+            return None, f'Teléfono inválido: {telefono[:20]}'
+
+        email = self._valor(fila, 'email').lower()
+        if email and (len(email) > 100 or not _EMAIL.match(email)):
+            return None, f'Email inválido: {email[:40]}'
+
+        texto_categoria = self._valor(fila, 'categoria')
+        categoria = normalizar_categoria(texto_categoria)
+        if categoria is None:
+            return None, f'Categoría desconocida: {texto_categoria[:40]}'
+
+        return {
+            'cedula': cedula,
+            'nombre': nombre,
+            'telefono': telefono or None,
+            'email': email or None,
+            'categoria': categoria,
+        }, None
+
+
+class ResultadoImportacion:
+    """Contadores de una importación y primeras filas rechazadas"""
+
+    def __init__(self):
+        self.filas = 0
+        self.nuevos = 0
+        self.actualizados = 0
+        self.omitidos = 0         # Ya registrados (modo solo_nuevos)
+        self.duplicados = 0       # Cédula repetida en el archivo: gana la última fila
+        self.rechazados = 0
+        self.muestras = []        # [(línea, motivo)]
+        self.inicio = time.perf_counter()
+        self.duracion = 0.0
+
+    def rechazar(self, linea, motivo):
+        self.rechazados += 1
+        if len(self.muestras) < MUESTRAS_RECHAZOS:
+            self.muestras.append((linea, motivo))
+
+    def to_dict(self):
+        return {
+            'filas': self.filas,
+            'nuevos': self.nuevos,
+            'actualizados': self.actualizados,
+            'omitidos': self.omitidos,
+            'duplicados': self.duplicados,
+            'rechazados': self.rechazados,
+            'muestras': [{'linea': linea, 'motivo': motivo} for linea, motivo in self.muestras],
+            'duracion': round(self.duracion, 1),
+            'filas_por_segundo': round(self.filas / self.duracion) if self.duracion else 0,
+        }
+
+
+def _sentencia_upsert(solo_nuevos, con_categoria):
+    """INSERT ... ON CONFLICT (cedula) del dialecto de la base configurada"""
+    dialecto = db.engine.dialect.name
+    if dialecto == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialecto == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise ValueError(f'La importación requiere PostgreSQL o SQLite (base actual: {dialecto})')
+
+    tabla = Usuario.__table__
+    sentencia = insert(tabla)
+    if solo_nuevos:
+        return sentencia.on_conflict_do_nothing(index_elements=[tabla.c.cedula])
+
+    actualizar = {
+        'nombre': sentencia.excluded.nombre,
+        'telefono': func.coalesce(sentencia.excluded.telefono, tabla.c.telefono),
+        'email': func.coalesce(sentencia.excluded.email, tabla.c.email),
+    }
+    if con_categoria:
+        actualizar['categoria'] = sentencia.excluded.categoria
+    return sentencia.on_conflict_do_update(index_elements=[tabla.c.cedula], set_=actualizar)
+
+
+def _cedulas_existentes(cedulas, bloque=1000):
+    existentes = set()
+    for i in range(0, len(cedulas), bloque):
+        existentes.update(db.session.execute(
+            select(Usuario.cedula).where(Usuario.cedula.in_(cedulas[i:i + bloque]))
+        ).scalars())
+    return existentes
+
+
+def _guardar_lote(sentencia, lote, resultado, solo_nuevos):
+    from app.cache_cedulas import cache_cedulas
+
+    existentes = _cedulas_existentes(list(lote))
+    ahora = datetime.utcnow()
+    filas = []
+    for datos in lote.values():
+        datos['fecha_registro'] = ahora
+        filas.append(datos)
+    db.session.execute(sentencia, filas)
+    db.session.commit()
+
+    nuevas = [cedula for cedula in lote if cedula not in existentes]
+    resultado.nuevos += len(nuevas)
+    if solo_nuevos:
+        resultado.omitidos += len(existentes)
+        existentes = ()
+    else:
+        resultado.actualizados += len(existentes)
+    cache_cedulas.registrar_carga(nuevas, existentes)
+    lote.clear()
+
+
+def importar_ciudadanos(texto, rechazos=None, tamano_lote=TAMANO_LOTE, solo_nuevos=False, progreso=None):
+    """
+    Importa un CSV de ciudadanos en lotes.
+
+    Args:
+        texto: Archivo abierto en modo texto (newline='')
+        rechazos: Archivo de texto donde escribir el CSV de filas rechazadas (opcional)
+        tamano_lote: Filas válidas por INSERT y commit
+        solo_nuevos: No modificar los ciudadanos ya registrados
+        progreso: Función llamada con el ResultadoImportacion después de cada lote
+
+    Returns:
+        ResultadoImportacion
+
+    Raises:
+        ValueError: Si el archivo no tiene encabezado reconocible o la base no lo soporta
+    """
+    if tamano_lote < 1:
+        raise ValueError('El tamaño de lote debe ser positivo')
+
+    primera_linea = texto.readline()
+    if not primera_linea.strip():
+        raise ValueError('El archivo está vacío')
+    delimitador = max(',;\t', key=primera_linea.count)
+    encabezado = Encabezado(next(csv.reader([primera_linea], delimiter=delimitador)))
+    sentencia = _sentencia_upsert(solo_nuevos, encabezado.con_categoria)
+
+    escritor = None
+    if rechazos is not None:
+        escritor = csv.writer(rechazos)
+        escritor.writerow(['linea', 'motivo'] + encabezado.columnas)
+
+    resultado = ResultadoImportacion()
+    lote = {}
+    lector = csv.reader(texto, delimiter=delimitador)
+    for fila in lector:
+        if not any(valor.strip() for valor in fila):
+            continue
+        resultado.filas += 1
+        datos, motivo = encabezado.validar(fila)
+        if motivo:
+            linea = lector.line_num + 1
+            resultado.rechazar(linea, motivo)
+            if escritor:
+                escritor.writerow([linea, motivo] + fila)
+            continue
+
+        if datos['cedula'] in lote:
+            resultado.duplicados += 1
+        lote[datos['cedula']] = datos
+        if len(lote) >= tamano_lote:
+            _guardar_lote(sentencia, lote, resultado, solo_nuevos)
+            resultado.duracion = time.perf_counter() - resultado.inicio
+            if progreso:
+                progreso(resultado)
+
+    if lote:
+        _guardar_lote(sentencia, lote, resultado, solo_nuevos)
+    resultado.duracion = time.perf_counter() - resultado.inicio
+
+    from app.cache_cedulas import cache_cedulas
+    if cache_cedulas.bloom_saturado():
+        cache_cedulas.precalentar()
+
+    logger.info('Importación de ciudadanos: %s filas, %s nuevos, %s actualizados, %s omitidos, %s rechazados en %.1f s',
+                resultado.filas, resultado.nuevos, resultado.actualizados, resultado.omitidos,
+                resultado.rechazados, resultado.duracion)
+    if progreso:
+        progreso(resultado)
+    return resultado
+
+
+# ===== SUBIDA POR PARTES (ADMINISTRACIÓN) =====
+
+class Importaciones:
+    """
+    Archivos subidos por partes desde /admin/importar-ciudadanos y su
+    procesamiento en segundo plano (una importación a la vez). El estado es
+    por proceso; el archivo subido se borra al terminar y se conserva solo el
+    CSV de rechazos.
+    """
+
+    def __init__(self, maximo=20):
+        self._lock = threading.Lock()
+        self.maximo = maximo
+        self.importaciones = OrderedDict()
+        self.en_proceso = None
+
+    def listar(self):
+        return list(reversed(self.importaciones.values()))
+
+    def obtener(self, identificador):
+        return self.importaciones.get(identificador)
+
+    def crear(self, directorio, nombre, tamano, tamano_maximo):
+        """Registra una subida de `tamano` bytes y devuelve su estado"""
+        if tamano <= 0:
+            raise ValueError('El archivo está vacío')
+        if tamano > tamano_maximo:
+            raise ValueError(f'El archivo supera el máximo de {tamano_maximo // (1024 * 1024)} MB')
+
+        os.makedirs(directorio, exist_ok=True)
+        identificador = uuid.uuid4().hex[:12]
+        importacion = {
+            'id': identificador,
+            'nombre': os.path.basename(nombre or 'ciudadanos.csv')[:100],
+            'tamano': tamano,
+            'recibidos': 0,
+            'estado': 'subiendo',
+            'mensaje': None,
+            'resultado': None,
+            'fecha': datetime.now().strftime('%Y-%m-%d %H:%M'),
+            'archivo': os.path.join(directorio, f'{identificador}.csv'),
+            'rechazos': os.path.join(directorio, f'{identificador}_rechazos.csv'),
+        }
+        with self._lock:
+            self.importaciones[identificador] = importacion
+            # Se descartan las más antiguas, nunca la que se está procesando
+            antiguas = [i for i, datos in self.importaciones.items()
+                        if i != self.en_proceso and datos['estado'] != 'procesando']
+            for antigua in antiguas[:max(0, len(self.importaciones) - self.maximo)]:
+                datos = self.importaciones.pop(antigua)
+                for ruta in (datos['archivo'], datos['rechazos']):
+                    if os.path.exists(ruta):
+                        os.remove(ruta)
+        return importacion
+
+    def agregar_parte(self, identificador, inicio, datos):
+        """
+        Agrega al archivo la parte que empieza en el byte `inicio`. Reenviar una
+        parte ya recibida no tiene efecto.
+        """
+        importacion = self.importaciones.get(identificador)
+        if importacion is None or importacion['estado'] != 'subiendo':
+            raise ValueError('La importación no está recibiendo partes')
+        if inicio + len(datos) <= importacion['recibidos']:
+            return importacion
+        if inicio != importacion['recibidos']:
+            raise ValueError(f'Se esperaba la parte que empieza en el byte {importacion["recibidos"]}')
+        if inicio + len(datos) > importacion['tamano']:
+            raise ValueError('La parte excede el tamaño declarado del archivo')
+
+        with open(importacion['archivo'], 'ab') as archivo:
+            archivo.write(datos)
+        importacion['recibidos'] += len(datos)
+        return importacion
+
+    def procesar(self, app, identificador, solo_nuevos=False):
+        """Inicia la importación del archivo completo en una tarea de segundo plano"""
+        from app import socketio
+
+        importacion = self.importaciones.get(identificador)
+        if importacion is None or importacion['estado'] != 'subiendo':
+            raise ValueError('La importación no está pendiente')
+        if importacion['recibidos'] != importacion['tamano']:
+            raise ValueError(f'Faltan {importacion["tamano"] - importacion["recibidos"]} bytes por subir')
+        with self._lock:
+            if self.en_proceso is not None:
+                raise ValueError('Ya hay una importación en proceso')
+            self.en_proceso = identificador
+            importacion['estado'] = 'procesando'
+        socketio.start_background_task(self._ejecutar, app, importacion, solo_nuevos)
+        return importacion
+
+    def _ejecutar(self, app, importacion, solo_nuevos):
+        from app import socketio
+
+        def progreso(resultado):
+            importacion['resultado'] = resultado.to_dict()
+            socketio.sleep(0)   # Cede el bucle de eventos entre lotes
+
+        with app.app_context():
+            try:
+                codificacion = detectar_codificacion(importacion['archivo'])
+                with open(importacion['archivo'], encoding=codificacion, errors='replace', newline='') as texto, \
+                        open(importacion['rechazos'], 'w', encoding='utf-8-sig', newline='') as rechazos:
+                    importar_ciudadanos(texto, rechazos, app.config['IMPORTACION_TAMANO_LOTE'],
+                                        solo_nuevos, progreso)
+                importacion['estado'] = 'terminada'
+            except Exception as e:
+                db.session.rollback()
+                logger.exception('Error en la importación de ciudadanos %s', importacion['id'])
+                importacion['estado'] = 'error'
+                importacion['mensaje'] = str(e)
+            finally:
+                db.session.remove()
+                if os.path.exists(importacion['archivo']):
+                    os.remove(importacion['archivo'])
+                self.en_proceso = None
+
+
+importaciones = Importaciones()
@@ -0,0 +1,411 @@
+"""
+Envío de notificaciones por canales externos (SMS, e-mail y WhatsApp)
+
+Al llamar un turno, la ruta solo registra una EntregaNotificacion por canal
+(en la misma transacción que la Notificacion) y la pone en cola. Un grupo de
+workers en segundo plano toma los mensajes de cada canal en lotes, respeta un
+límite de envíos por segundo por canal (cubeta de tokens) y entrega el lote
+al transporte configurado. Los fallos se reintentan con espera exponencial y
+el resultado queda en la entrega (acuse de recibo).
+
+Transportes disponibles (MENSAJERIA_TRANSPORTE o MENSAJERIA_TRANSPORTE_<CANAL>):
+- archivo: escribe los mensajes en instance/mensajes/<canal>.jsonl (desarrollo)
+- memoria: guarda los mensajes en una lista (pruebas)
+Fuera de desarrollo y pruebas archivo y memoria no se admiten (no envían
+nada y marcarían los mensajes como entregados), y un canal sin transporte
+configurado queda deshabilitado.
+- smtp: envía e-mails con la configuración MAIL_*
+- webhook: POST JSON a MENSAJERIA_WEBHOOK_URL (pasarela de SMS/WhatsApp)
+
+Las llamadas al proveedor se ejecutan en hilos nativos (ver
+app.seguridad.ejecutar_fuera_del_bucle), nunca en el hilo de la petición.
+"""
+
+import json
+import logging
+import os
+import queue
+import smtplib
+import threading
+import time
+import urllib.request
+from datetime import datetime
+from email.message import EmailMessage
+
+from sqlalchemy import select, update
+
+from app import socketio
+from app.models import db, EntregaNotificacion
+from app.seguridad import ejecutar_fuera_del_bucle
+
+logger = logging.getLogger(__name__)
+
+CANALES = ['sms', 'email', 'whatsapp']
+
+# Campo del usuario usado como destino de cada canal
+CAMPO_DESTINO = {
+    'sms': 'telefono',
+    'email': 'email',
+    'whatsapp': 'telefono'
+}
+
+
+# ===== TRANSPORTES =====
+
+class Transporte:
+    """
+    Interfaz de los transportes. enviar_lote recibe una lista de dicts
+    (id, destino, mensaje) y devuelve, para cada uno, (exito, referencia o error).
+    """
+    nombre = 'base'
+
+    def __init__(self, canal, config):
+        self.canal = canal
+        self.config = config
+
+    def enviar_lote(self, mensajes):
+        raise NotImplementedError
+
+
+class TransporteArchivo(Transporte):
+    """Agrega los mensajes a instance/mensajes/<canal>.jsonl"""
+    nombre = 'archivo'
+
+    def enviar_lote(self, mensajes):
+        directorio = self.config['MENSAJERIA_DIRECTORIO']
+        os.makedirs(directorio, exist_ok=True)
+        ahora = datetime.utcnow().isoformat()
+        with open(os.path.join(directorio, f'{self.canal}.jsonl'), 'a', encoding='utf-8') as archivo:
+            for m in mensajes:
+                archivo.write(json.dumps({'fecha': ahora, 'canal': self.canal, **m}, ensure_ascii=False) + '\n')
+        return [(True, f'archivo-{m["id"]}') for m in mensajes]
+
+
+class TransporteMemoria(Transporte):
+    """Guarda los mensajes en TransporteMemoria.enviados (compartido entre canales)"""
+    nombre = 'memoria'
+    enviados = []
+
+    def enviar_lote(self, mensajes):
+        TransporteMemoria.enviados.extend({'canal': self.canal, **m} for m in mensajes)
+        return [(True, f'memoria-{m["id"]}') for m in mensajes]
+
+
+class TransporteSMTP(Transporte):
+    """Envía e-mails reutilizando una conexión SMTP por lote"""
+    nombre = 'smtp'
+
+    def enviar_lote(self, mensajes):
+        c = self.config
+        resultados = []
+        with smtplib.SMTP(c['MAIL_SERVER'], c['MAIL_PORT'], timeout=15) as servidor:
+            if c['MAIL_USE_TLS']:
+                servidor.starttls()
+            if c['MAIL_USERNAME']:
+                servidor.login(c['MAIL_USERNAME'], c['MAIL_PASSWORD'])
+            for m in mensajes:
+                correo = EmailMessage()
+                correo['From'] = c['MAIL_DEFAULT_SENDER'] or c['MAIL_USERNAME']
+                correo['To'] = m['destino']
+                correo['Subject'] = 'Llamado de turno'
+                correo.set_content(m['mensaje'])
+                try:
+                    servidor.send_message(correo)
+                    resultados.append((True, correo.get('Message-ID')))
+                except smtplib.SMTPException as e:
+                    resultados.append((False, str(e)))
+        return resultados
+
+
+class TransporteWebhook(Transporte):
+    """
+    Envía el lote a una pasarela HTTP. Se espera una respuesta 2xx con
+    {"referencias": [...]} en el mismo orden (opcional: sin la clave todo el
+    lote se da por entregado).
+    """
+    nombre = 'webhook'
+
+    def enviar_lote(self, mensajes):
+        cuerpo = json.dumps({'canal': self.canal, 'mensajes': mensajes}).encode('utf-8')
+        peticion = urllib.request.Request(
+            self.config['MENSAJERIA_WEBHOOK_URL'],
+            data=cuerpo,
+            headers={
+                'Content-Type': 'application/json',
+                'Authorization': f'Bearer {self.config["MENSAJERIA_WEBHOOK_TOKEN"] or ""}'
+            },
+            method='POST'
+        )
+        with urllib.request.urlopen(peticion, timeout=15) as respuesta:
+            datos = json.loads(respuesta.read() or b'{}')
+        referencias = datos.get('referencias')
+        if referencias is None:
+            return [(True, None)] * len(mensajes)
+        # Los mensajes sin referencia cuentan como no entregados (ver Mensajeria._enviar)
+        return [(True, referencia) for referencia in referencias[:len(mensajes)]]
+
+
+TRANSPORTES = {t.nombre: t for t in (TransporteArchivo, TransporteMemoria, TransporteSMTP, TransporteWebhook)}
+# Transportes que no entregan el mensaje a nadie
+TRANSPORTES_LOCALES = (TransporteArchivo.nombre, TransporteMemoria.nombre)
+
+
+# ===== LÍMITE DE ENVÍOS =====
+
+class CubetaTokens:
+    """
+    Cubeta de tokens: permite ráfagas de hasta `capacidad` envíos y un
+    promedio de `tasa` envíos por segundo.
+    """
+
+    def __init__(self, tasa, capacidad=None):
+        self.tasa = tasa
+        self.capacidad = capacidad or max(1, tasa)
+        self.tokens = self.capacidad
+        self.ultima = time.monotonic()
+        self._lock = threading.Lock()
+
+    def tomar(self, maximo):
+        """Toma hasta `maximo` tokens y devuelve cuántos obtuvo"""
+        with self._lock:
+            ahora = time.monotonic()
+            self.tokens = min(self.capacidad, self.tokens + (ahora - self.ultima) * self.tasa)
+            self.ultima = ahora
+            obtenidos = min(maximo, int(self.tokens))
+            self.tokens -= obtenidos
+            return obtenidos
+
+    def devolver(self, cantidad):
+        """Devuelve tokens tomados que no se usaron"""
+        with self._lock:
+            self.tokens = min(self.capacidad, self.tokens + cantidad)
+
+
+# ===== DESPACHADOR =====
+
+class Mensajeria:
+    """Colas por canal, workers, límites de envío y reintentos"""
+
+    def __init__(self):
+        self.app = None
+        self.colas = {canal: queue.Queue() for canal in CANALES}
+        self.cubetas = {}
+        self.transportes = {}
+        self.canales = []
+        self.workers = []
+
+    def configurar(self, app):
+        self.app = app
+        c = app.config
+        limites = c['MENSAJERIA_LIMITES']
+        self.canales = []
+        self.transportes = {}
+        for canal in c['MENSAJERIA_CANALES']:
+            if canal not in CANALES:
+                continue
+            nombre = c.get(f'MENSAJERIA_TRANSPORTE_{canal.upper()}') or c.get('MENSAJERIA_TRANSPORTE')
+            if not nombre:
+                logger.warning('Canal %s sin transporte configurado: no se enviarán mensajes por él', canal)
+                continue
+            if nombre not in TRANSPORTES:
+                raise ValueError(f'Transporte de mensajería desconocido para {canal}: {nombre}')
+            if nombre in TRANSPORTES_LOCALES and not (app.debug or app.testing):
+                raise ValueError(f'El transporte "{nombre}" del canal {canal} solo se admite en desarrollo y '
+                                 f'pruebas: configure smtp o webhook, o quite el canal de MENSAJERIA_CANALES')
+            self.canales.append(canal)
+            self.transportes[canal] = TRANSPORTES[nombre](canal, c)
+            self.cubetas[canal] = CubetaTokens(limites.get(canal, 5))
+
+    # ----- Encolado (desde las rutas) -----
+
+    def preparar(self, turno, notificacion):
+        """
+        Crea (sin confirmar) una entrega por cada canal habilitado para el que
+        el usuario tenga destino. Llamar antes del commit de la notificación y
+        pasar el resultado a encolar() después del commit.
+
+        Returns:
+            Lista de mensajes listos para encolar
+        """
+        entregas = []
+        usuario = turno.usuario
+        for canal in self.canales:
+            destino = (getattr(usuario, CAMPO_DESTINO[canal], None) or '').strip() if usuario else ''
+            if not destino:
+                continue
+            entrega = EntregaNotificacion(
+                notificacion_id=notificacion.id,
+                turno_id=turno.id,
+                canal=canal,
+                destino=destino,
+                mensaje=notificacion.mensaje,
+                intentos=0
+            )
+            db.session.add(entrega)
+            entregas.append(entrega)
+
+        if entregas:
+            db.session.flush()
+        return [self._mensaje(entrega) for entrega in entregas]
+
+    @staticmethod
+    def _mensaje(entrega):
+        return {
+            'id': entrega.id,
+            'canal': entrega.canal,
+            'destino': entrega.destino,
+            'mensaje': entrega.mensaje,
+            'intentos': entrega.intentos or 0
+        }
+
+    def encolar(self, mensajes):
+        """Pone en cola mensajes de entregas ya confirmadas (después del commit)"""
+        for mensaje in mensajes:
+            self.colas[mensaje['canal']].put(mensaje)
+
+    def recuperar_pendientes(self):
+        """Vuelve a encolar las entregas pendientes (p. ej. tras un reinicio)"""
+        pendientes = db.session.execute(
+            select(EntregaNotificacion).where(
+                EntregaNotificacion.estado == 'pendiente',
+                EntregaNotificacion.canal.in_(self.canales)
+            )
+        ).scalars().all()
+        self.encolar([self._mensaje(entrega) for entrega in pendientes])
+        return len(pendientes)
+
+    # ----- Envío (workers) -----
+
+    def _tomar_lote(self, canal):
+        """Saca de la cola del canal tantos mensajes como permitan el lote y el límite"""
+        cola = self.colas[canal]
+        if cola.empty():
+            return []
+        permitidos = self.cubetas[canal].tomar(self.app.config['MENSAJERIA_LOTE'])
+        lote = []
+        while len(lote) < permitidos:
+            try:
+                lote.append(cola.get_nowait())
+            except queue.Empty:
+                break
+        self.cubetas[canal].devolver(permitidos - len(lote))
+        return lote
+
+    def _enviar(self, canal, lote):
+        """Entrega un lote al transporte y registra los acuses"""
+        salientes = [{'id': m['id'], 'destino': m['destino'], 'mensaje': m['mensaje']} for m in lote]
+        try:
+            resultados = ejecutar_fuera_del_bucle(self.transportes[canal].enviar_lote, salientes)
+        except Exception as e:
+            resultados = [(False, f'{type(e).__name__}: {e}')] * len(lote)
+
+        # Un resultado por mensaje: los que falten se tratan como fallos (se reintentan)
+        resultados = list(resultados)
+        if len(resultados) != len(lote):
+            logger.warning('El transporte de %s devolvió %s resultados para %s mensajes',
+                           canal, len(resultados), len(lote))
+            faltantes = len(lote) - len(resultados)
+            resultados = resultados[:len(lote)] + [(False, 'El transporte no devolvió resultado')] * faltantes
+
+        ahora = datetime.utcnow()
+        cambios = []
+        for mensaje, (exito, detalle) in zip(lote, resultados):
+            mensaje['intentos'] += 1
+            if exito:
+                cambios.append({'id': mensaje['id'], 'estado': 'enviado', 'intentos': mensaje['intentos'],
+                                'referencia_proveedor': detalle, 'fecha_envio': ahora})
+            elif mensaje['intentos'] < self.app.config['MENSAJERIA_REINTENTOS']:
+                cambios.append({'id': mensaje['id'], 'intentos': mensaje['intentos'], 'ultimo_error': detalle})
+                self._reintentar(canal, mensaje)
+            else:
+                cambios.append({'id': mensaje['id'], 'estado': 'fallido', 'intentos': mensaje['intentos'],
+                                'ultimo_error': detalle})
+                logger.warning('Entrega %s por %s fallida definitivamente: %s', mensaje['id'], canal, detalle)
+
+        db.session.execute(update(EntregaNotificacion), cambios)
+        db.session.commit()
+
+    def _reintentar(self, canal, mensaje):
+        """Vuelve a encolar el mensaje después de una espera exponencial"""
+        espera = self.app.config['MENSAJERIA_BACKOFF_SEGUNDOS'] * 2 ** (mensaje['intentos'] - 1)
+
+        def _diferido():
+            socketio.sleep(espera)
+            self.colas[canal].put(mensaje)
+
+        if self.workers:
+            socketio.start_background_task(_diferido)
+        else:
+            self.colas[canal].put(mensaje)
+
+    def procesar(self):
+        """
+        Procesa un lote de cada canal.
+
+        Returns:
+            Cantidad de mensajes procesados
+        """
+        procesados = 0
+        for canal in self.canales:
+            lote = self._tomar_lote(canal)
+            if lote:
+                with self.app.app_context():
+                    try:
+                        self._enviar(canal, lote)
+                    except Exception:
+                        db.session.rollback()
+                        logger.exception('Error al registrar los acuses de %s', canal)
+                procesados += len(lote)
+        return procesados
+
+    def procesar_pendientes(self, max_vueltas=100):
+        """Procesa las colas hasta vaciarlas (uso sin workers: consola y pruebas)"""
+        total = 0
+        for _ in range(max_vueltas):
+            procesados = self.procesar()
+            total += procesados
+            if not procesados and all(self.colas[canal].empty() for canal in self.canales):
+                break
+            if not procesados:
+                time.sleep(0.05)
+        return total
+
+    def _worker(self):
+        while True:
+            if not self.procesar():
+                socketio.sleep(self.app.config['MENSAJERIA_ESPERA_SEGUNDOS'])
+
+    def iniciar_workers(self, cantidad):
+        for _ in range(cantidad):
+            self.workers.append(socketio.start_background_task(self._worker))
+        logger.info('Mensajería iniciada: %s workers, canales %s', cantidad, ', '.join(self.canales))
+
+    def estadisticas(self):
+        """Mensajes en cola por canal"""
+        return {canal: self.colas[canal].qsize() for canal in self.canales}
+
+
+# Instancia única usada por las rutas
+mensajeria = Mensajeria()
+
+
+def init_mensajeria(app):
+    """Configura los transportes, recupera las entregas pendientes e inicia los workers"""
+    mensajeria.configurar(app)
+    if not mensajeria.canales:
+        return
+
+    from app.tareas import tareas_habilitadas
+    if not tareas_habilitadas(app):
+        return
+
+    with app.app_context():
+        try:
+            recuperadas = mensajeria.recuperar_pendientes()
+            if recuperadas:
+                logger.info('Recuperadas %s entregas pendientes', recuperadas)
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f'Error al recuperar entregas pendientes: {e}')
+
+    mensajeria.iniciar_workers(app.config['MENSAJERIA_WORKERS'])
@@ -0,0 +1,263 @@
+"""
+Métricas de la aplicación en formato Prometheus
+
+Registra, por endpoint, la latencia de cada petición (histograma), la cantidad
+y el tiempo de las consultas SQL que ejecutó (ver tiempo_sql), los eventos Socket.IO emitidos con el tamaño de su carga y las
+conexiones Socket.IO activas. /metrics expone estos valores junto con los
+contadores de la caché de cédulas, las colas de mensajería, la presencia de
+empleados, la cola del registro de eventos y la latencia de entrega de los
+eventos Socket.IO (ver trazas_socket).
+
+El costo por petición es una lectura de reloj al inicio y al final, un
+contador por consulta SQL y una actualización del registro bajo un lock.
+La petición se registra al cerrarse su contexto (teardown_request), así
+también cuentan las que terminan en una excepción no manejada (código 500).
+Con METRICAS_HABILITADAS=false no se registra ningún gancho.
+
+/metrics exige "Authorization: Bearer <METRICAS_TOKEN>" si hay token; sin
+token solo responde a un superadmin con sesión iniciada o, en desarrollo y
+pruebas, a peticiones desde la propia máquina.
+"""
+
+import json
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+
+from flask import Response, current_app, g, has_request_context, request
+from flask_login import current_user
+
+from app import socketio
+from app.tiempo_sql import observar_consultas
+
+DIRECCIONES_LOCALES = ('127.0.0.1', '::1')
+
+# Límites superiores de los histogramas (segundos y consultas por petición)
+LIMITES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LIMITES_CONSULTAS = (1, 2, 5, 10, 20, 50, 100)
+
+PREFIJO = 'turnos'
+
+
+class Histograma:
+    """Histograma acumulable con límites fijos (formato Prometheus)"""
+
+    def __init__(self, limites):
+        self.limites = limites
+        self.conteos = [0] * (len(limites) + 1)
+        self.suma = 0.0
+
+    def observar(self, valor):
+        self.conteos[bisect_left(self.limites, valor)] += 1
+        self.suma += valor
+
+    def lineas(self, nombre, etiquetas):
+        acumulado = 0
+        for limite, conteo in zip(self.limites, self.conteos):
+            acumulado += conteo
+            yield f'{nombre}_bucket{{{etiquetas},le="{limite}"}} {acumulado}'
+        acumulado += self.conteos[-1]
+        yield f'{nombre}_bucket{{{etiquetas},le="+Inf"}} {acumulado}'
+        yield f'{nombre}_sum{{{etiquetas}}} {self.suma:.6f}'
+        yield f'{nombre}_count{{{etiquetas}}} {acumulado}'
+
+
+def _etiqueta(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"')
+
+
+class RegistroMetricas:
+    """Contadores e histogramas del proceso, protegidos por un lock"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.latencia = {}       # (endpoint, método) -> Histograma
+            self.respuestas = Counter()  # (endpoint, método, código)
+            self.consultas = {}      # endpoint -> Histograma de consultas por petición
+            self.tiempo_sql = Counter()  # endpoint -> segundos
+            self.emits = Counter()   # evento -> emisiones
+            self.bytes_emits = Counter()  # evento -> bytes de carga
+            self.conexiones = 0
+
+    def observar_peticion(self, endpoint, metodo, codigo, segundos, consultas, tiempo_sql):
+        with self._lock:
+            clave = (endpoint, metodo)
+            histograma = self.latencia.get(clave)
+            if histograma is None:
+                histograma = self.latencia[clave] = Histograma(LIMITES_LATENCIA)
+            histograma.observar(segundos)
+            self.respuestas[(endpoint, metodo, codigo)] += 1
+
+            histograma = self.consultas.get(endpoint)
+            if histograma is None:
+                histograma = self.consultas[endpoint] = Histograma(LIMITES_CONSULTAS)
+            histograma.observar(consultas)
+            self.tiempo_sql[endpoint] += tiempo_sql
+
+    def observar_emit(self, evento, tamano):
+        with self._lock:
+            self.emits[evento] += 1
+            self.bytes_emits[evento] += tamano
+
+    def conexion(self, delta):
+        with self._lock:
+            self.conexiones = max(0, self.conexiones + delta)
+
+    def exportar(self):
+        """Texto en formato de exposición de Prometheus"""
+        with self._lock:
+            lineas = [
+                f'# HELP {PREFIJO}_http_duracion_segundos Latencia de las peticiones HTTP',
+                f'# TYPE {PREFIJO}_http_duracion_segundos histogram',
+            ]
+            for (endpoint, metodo), histograma in sorted(self.latencia.items()):
+                lineas.extend(histograma.lineas(f'{PREFIJO}_http_duracion_segundos',
+                                                f'endpoint="{_etiqueta(endpoint)}",metodo="{metodo}"'))
+
+            lineas += [f'# HELP {PREFIJO}_http_peticiones_total Peticiones HTTP por código de respuesta',
+                       f'# TYPE {PREFIJO}_http_peticiones_total counter']
+            lineas += [f'{PREFIJO}_http_peticiones_total{{endpoint="{_etiqueta(e)}",metodo="{m}",codigo="{c}"}} {n}'
+                       for (e, m, c), n in sorted(self.respuestas.items())]
+
+            lineas += [f'# HELP {PREFIJO}_sql_consultas_por_peticion Consultas SQL ejecutadas en cada petición',
+                       f'# TYPE {PREFIJO}_sql_consultas_por_peticion histogram']
+            for endpoint, histograma in sorted(self.consultas.items()):
+                lineas.extend(histograma.lineas(f'{PREFIJO}_sql_consultas_por_peticion',
+                                                f'endpoint="{_etiqueta(endpoint)}"'))
+
+            lineas += [f'# HELP {PREFIJO}_sql_duracion_segundos_total Tiempo en consultas SQL por endpoint',
+                       f'# TYPE {PREFIJO}_sql_duracion_segundos_total counter']
+            lineas += [f'{PREFIJO}_sql_duracion_segundos_total{{endpoint="{_etiqueta(e)}"}} {s:.6f}'
+                       for e, s in sorted(self.tiempo_sql.items())]
+
+            lineas += [f'# HELP {PREFIJO}_socket_emits_total Eventos Socket.IO emitidos',
+                       f'# TYPE {PREFIJO}_socket_emits_total counter']
+            lineas += [f'{PREFIJO}_socket_emits_total{{evento="{_etiqueta(e)}"}} {n}'
+                       for e, n in sorted(self.emits.items())]
+            lineas += [f'# HELP {PREFIJO}_socket_emit_bytes_total Bytes de carga JSON emitidos por evento',
+                       f'# TYPE {PREFIJO}_socket_emit_bytes_total counter']
+            lineas += [f'{PREFIJO}_socket_emit_bytes_total{{evento="{_etiqueta(e)}"}} {n}'
+                       for e, n in sorted(self.bytes_emits.items())]
+
+            lineas += [f'# HELP {PREFIJO}_socket_conexiones_activas Conexiones Socket.IO abiertas',
+                       f'# TYPE {PREFIJO}_socket_conexiones_activas gauge',
+                       f'{PREFIJO}_socket_conexiones_activas {self.conexiones}']
+
+        lineas.extend(_metricas_de_componentes())
+        return '\n'.join(lineas) + '\n'
+
+
+registro = RegistroMetricas()
+
+
+def _metricas_de_componentes():
+    """Valores actuales de la caché de cédulas, la mensajería y la presencia"""
+    from app import bitacora, trazas_socket
+    from app.cache_cedulas import cache_cedulas
+    from app.enrutamiento import presencia
+    from app.mensajeria import mensajeria
+
+    lineas = [f'# HELP {PREFIJO}_cache_cedulas Contadores de la caché de cédulas',
+              f'# TYPE {PREFIJO}_cache_cedulas gauge']
+    lineas += [f'{PREFIJO}_cache_cedulas{{valor="{nombre}"}} {valor}'
+               for nombre, valor in sorted(cache_cedulas.estadisticas().items())]
+
+    lineas += [f'# HELP {PREFIJO}_mensajeria_cola Mensajes en cola por canal',
+               f'# TYPE {PREFIJO}_mensajeria_cola gauge']
+    lineas += [f'{PREFIJO}_mensajeria_cola{{canal="{canal}"}} {n}'
+               for canal, n in sorted(mensajeria.estadisticas().items())]
+
+    lineas += [f'# HELP {PREFIJO}_empleados_en_linea Empleados conectados al dashboard',
+               f'# TYPE {PREFIJO}_empleados_en_linea gauge',
+               f'{PREFIJO}_empleados_en_linea {len(presencia.en_linea())}']
+
+    lineas.extend(trazas_socket.registro.exportar())
+
+    if bitacora.manejador is not None:
+        lineas += [f'# HELP {PREFIJO}_logs Registros de log encolados, descartados y pendientes de escribir',
+                   f'# TYPE {PREFIJO}_logs gauge']
+        lineas += [f'{PREFIJO}_logs{{valor="{nombre}"}} {valor}'
+                   for nombre, valor in sorted(bitacora.manejador.estadisticas().items())]
+    return lineas
+
+
+# ===== GANCHOS =====
+
+def _observar_consulta(conn, statement, parameters, duracion):
+    medicion = g.get('metricas') if has_request_context() else None
+    if medicion is not None:
+        medicion[1] += 1
+        medicion[2] += duracion
+
+
+def _inicio_peticion():
+    # [inicio, consultas SQL, segundos en SQL, código] en un solo atributo para tocar g una vez
+    g.metricas = [time.perf_counter(), 0, 0.0, None]
+
+
+def _respuesta_peticion(respuesta):
+    medicion = g.get('metricas')
+    if medicion is not None:
+        medicion[3] = respuesta.status_code
+    return respuesta
+
+
+def _fin_peticion(excepcion=None):
+    # Sin código de respuesta la petición terminó en una excepción no manejada
+    medicion = g.pop('metricas', None)
+    if medicion is not None:
+        peticion = request._get_current_object()
+        registro.observar_peticion(
+            peticion.endpoint or 'sin_ruta', peticion.method, medicion[3] or 500,
+            time.perf_counter() - medicion[0], medicion[1], medicion[2]
+        )
+
+
+def _medir_emit(emit_original):
+    def emit(evento, *args, **kwargs):
+        try:
+            tamano = len(json.dumps(args[0], default=str)) if args else 0
+        except (TypeError, ValueError):
+            tamano = 0
+        registro.observar_emit(evento, tamano)
+        return emit_original(evento, *args, **kwargs)
+    emit.medido = True
+    return emit
+
+
+def _autorizado():
+    token = current_app.config['METRICAS_TOKEN']
+    if token:
+        return request.headers.get('Authorization') == f'Bearer {token}'
+    if getattr(current_user, 'es_superadmin', False):
+        return True
+    # Detrás de un proxy todas las peticiones llegan desde la propia máquina
+    return (current_app.debug or current_app.testing) and request.remote_addr in DIRECCIONES_LOCALES
+
+
+def exportar_metricas():
+    """Endpoint /metrics (Bearer METRICAS_TOKEN; sin token, solo superadmin o local en desarrollo)"""
+    if not _autorizado():
+        return Response('No autorizado\n', status=401, mimetype='text/plain')
+    return Response(registro.exportar(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+def init_metricas(app):
+    """Registra los ganchos de petición, SQL y Socket.IO y el endpoint /metrics"""
+    if not app.config['METRICAS_HABILITADAS']:
+        return
+
+    app.before_request(_inicio_peticion)
+    app.after_request(_respuesta_peticion)
+    app.teardown_request(_fin_peticion)
+    app.add_url_rule('/metrics', 'metricas', exportar_metricas)
+
+    observar_consultas(_observar_consulta)
+
+    if not getattr(socketio.emit, 'medido', False):
+        socketio.emit = _medir_emit(socketio.emit)
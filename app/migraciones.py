@@ -0,0 +1,192 @@
+"""
+Migraciones del esquema de bases existentes
+
+db.create_all() solo crea las tablas que faltan, no modifica las existentes.
+
+actualizar_esquema() corre al iniciar la aplicación y aplica los cambios
+baratos que ALTER TABLE permite en SQLite y PostgreSQL: columnas nuevas (con
+su valor inicial) e índices nuevos o que dejaron de ser únicos.
+
+Además, una base SQLite creada antes de que
+una tabla declarara sqlite_autoincrement conserva la definición anterior, y
+SQLite reutiliza max(id)+1 cuando la tabla operativa se vacía. Como el id se
+conserva al archivar, el id reutilizado choca con el de la tabla histórica.
+
+SQLite no permite agregar AUTOINCREMENT con ALTER TABLE, así que la tabla se
+reconstruye siguiendo el procedimiento recomendado por SQLite: crear la tabla
+nueva, copiar las filas, eliminar la anterior, renombrar la nueva y recrear
+sus índices, todo en una transacción. La secuencia queda en el mayor id de la
+tabla operativa o de la histórica, así los ids nuevos nunca repiten uno ya
+archivado.
+
+PostgreSQL no reutiliza los valores de sus secuencias y no requiere cambios.
+"""
+
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateTable
+
+from app.models import db, Notificacion, NotificacionHistorico, Turno, TurnoHistorico
+
+logger = logging.getLogger(__name__)
+
+# Columnas agregadas a tablas existentes: (modelo, columna, valor inicial en SQL)
+COLUMNAS_NUEVAS = [
+    # Los números de turno pasaron a ser únicos por día
+    (Turno, 'fecha_numero', 'date(fecha_solicitud)'),
+    (TurnoHistorico, 'fecha_numero', 'date(fecha_solicitud)'),
+]
+
+# Modelos cuyos índices se crean si faltan (o se recrean si cambió su unicidad)
+MODELOS_CON_INDICES = [Turno, Notificacion]
+
+# Tablas operativas cuyo id se conserva en una tabla histórica
+TABLAS_AUTOINCREMENTO = {
+    Turno.__table__: TurnoHistorico.__table__,
+    Notificacion.__table__: NotificacionHistorico.__table__,
+}
+
+
+def _es_sqlite(conexion):
+    return conexion.dialect.name == 'sqlite'
+
+
+def _sin_autoincremento(conexion, tabla):
+    sql = conexion.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :nombre"),
+        {'nombre': tabla.name}
+    ).scalar()
+    return sql is not None and 'AUTOINCREMENT' not in sql.upper()
+
+
+def _agregar_columnas(conexion):
+    inspector = inspect(conexion)
+    for modelo, nombre, inicial in COLUMNAS_NUEVAS:
+        tabla = modelo.__table__
+        if nombre in {c['name'] for c in inspector.get_columns(tabla.name)}:
+            continue
+        tipo = tabla.c[nombre].type.compile(dialect=conexion.dialect)
+        conexion.execute(text(f'ALTER TABLE {tabla.name} ADD COLUMN {nombre} {tipo}'))
+        conexion.execute(text(f'UPDATE {tabla.name} SET {nombre} = {inicial}'))
+        logger.info('Columna %s.%s agregada', tabla.name, nombre)
+
+
+def _actualizar_indices(conexion):
+    inspector = inspect(conexion)
+    for modelo in MODELOS_CON_INDICES:
+        existentes = {i['name']: bool(i['unique']) for i in inspector.get_indexes(modelo.__tablename__)}
+        for indice in modelo.__table__.indexes:
+            if indice.name in existentes and existentes[indice.name] != bool(indice.unique):
+                conexion.execute(text(f'DROP INDEX {indice.name}'))
+                del existentes[indice.name]
+            if indice.name not in existentes:
+                indice.create(conexion)
+                logger.info('Índice %s creado', indice.name)
+
+
+def actualizar_esquema(engine=None):
+    """Agrega las columnas e índices que faltan en las tablas existentes"""
+    if engine is None:
+        engine = db.engine
+    with engine.begin() as conexion:
+        _agregar_columnas(conexion)
+        _actualizar_indices(conexion)
+
+
+def tablas_sin_autoincremento(conexion=None):
+    """
+    Nombres de las tablas de TABLAS_AUTOINCREMENTO que en la base actual
+    todavía tienen la definición sin AUTOINCREMENT (solo SQLite)
+    """
+    if conexion is None:
+        conexion = db.session.connection()
+    if not _es_sqlite(conexion):
+        return []
+    return [tabla.name for tabla in TABLAS_AUTOINCREMENTO if _sin_autoincremento(conexion, tabla)]
+
+
+def _reconstruir(conexion, tabla):
+    """Reconstruye `tabla` con la definición actual del modelo (con AUTOINCREMENT)"""
+    temporal = f'{tabla.name}_migracion'
+    ddl = str(CreateTable(tabla).compile(dialect=conexion.dialect))
+    ddl = ddl.replace(f'CREATE TABLE {tabla.name} ', f'CREATE TABLE "{temporal}" ', 1)
+    columnas = ', '.join(f'"{c.name}"' for c in tabla.columns)
+
+    conexion.execute(text(f'DROP TABLE IF EXISTS "{temporal}"'))
+    conexion.execute(text(ddl))
+    conexion.execute(text(f'INSERT INTO "{temporal}" ({columnas}) SELECT {columnas} FROM "{tabla.name}"'))
+    conexion.execute(text(f'DROP TABLE "{tabla.name}"'))
+    conexion.execute(text(f'ALTER TABLE "{temporal}" RENAME TO "{tabla.name}"'))
+    for indice in tabla.indexes:
+        indice.create(conexion)
+
+
+def _ajustar_secuencia(conexion, tabla, historica):
+    """Lleva sqlite_sequence al mayor id de la tabla operativa o de la histórica"""
+    mayor = conexion.execute(text(
+        f'SELECT max(coalesce((SELECT max(id) FROM "{tabla.name}"), 0), '
+        f'coalesce((SELECT max(id) FROM "{historica.name}"), 0))'
+    )).scalar()
+    actual = conexion.execute(
+        text('SELECT seq FROM sqlite_sequence WHERE name = :nombre'), {'nombre': tabla.name}
+    ).scalar()
+    if actual is None:
+        conexion.execute(
+            text('INSERT INTO sqlite_sequence (name, seq) VALUES (:nombre, :seq)'),
+            {'nombre': tabla.name, 'seq': mayor}
+        )
+    elif actual < mayor:
+        conexion.execute(
+            text('UPDATE sqlite_sequence SET seq = :seq WHERE name = :nombre'),
+            {'nombre': tabla.name, 'seq': mayor}
+        )
+
+
+def migrar_autoincremento(engine=None):
+    """
+    Reconstruye con AUTOINCREMENT las tablas que aún no lo tienen y ajusta su
+    secuencia. Toma el bloqueo de escritura de la base durante toda la
+    migración (BEGIN IMMEDIATE), así dos procesos no migran a la vez.
+
+    Returns:
+        Lista de tablas reconstruidas
+    """
+    if engine is None:
+        engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return []
+
+    reconstruidas = []
+    with engine.connect() as conexion:
+        conexion.exec_driver_sql('BEGIN IMMEDIATE')
+        try:
+            for tabla, historica in TABLAS_AUTOINCREMENTO.items():
+                if _sin_autoincremento(conexion, tabla):
+                    _reconstruir(conexion, tabla)
+                    reconstruidas.append(tabla.name)
+                    logger.info('Tabla %s reconstruida con AUTOINCREMENT', tabla.name)
+                _ajustar_secuencia(conexion, tabla, historica)
+            conexion.commit()
+        except Exception:
+            conexion.rollback()
+            raise
+    return reconstruidas
+
+
+def verificar_esquema(app):
+    """Avisa al iniciar si quedan tablas sin migrar (el archivado y el barrido se niegan a correr)"""
+    with app.app_context():
+        try:
+            pendientes = tablas_sin_autoincremento(db.session.connection())
+        except Exception as e:
+            app.logger.error('No se pudo verificar el esquema de la base de datos: %s', e)
+            return
+        finally:
+            db.session.remove()
+    if pendientes:
+        app.logger.error(
+            'Las tablas %s no tienen AUTOINCREMENT y reutilizarían ids ya archivados; '
+            'el archivado y el barrido de notificaciones quedan desactivados hasta ejecutar: python migrar_db.py',
+            ', '.join(pendientes)
+        )
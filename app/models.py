@@ -7,11 +7,14 @@ de la base de datos para el sistema de gestión de turnos.
 
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from app.replica import SesionEnrutada
+from app.seguridad import generar_hash, verificar_password
 
-# Inicializar SQLAlchemy
-db = SQLAlchemy()
+# Inicializar SQLAlchemy (la sesión enruta las lecturas de reportes a la réplica)
+db = SQLAlchemy(session_options={'class_': SesionEnrutada})
 
 
 class UsuarioSistema(UserMixin, db.Model):
@@ -44,11 +47,14 @@ class UsuarioSistema(UserMixin, db.Model):
     
     def set_password(self, password):
         """Encripta y almacena la contraseña"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = generar_hash(password)
     
     def check_password(self, password):
-        """Verifica si la contraseña proporcionada es correcta"""
-        return check_password_hash(self.password_hash, password)
+        """
+        Verifica si la contraseña proporcionada es correcta (sin bloquear el
+        bucle de eventos). Si el hash usa parámetros antiguos lo actualiza.
+        """
+        return verificar_password(self, password)
     
     def get_id(self):
         """Retorna un ID único con prefijo para Flask-Login"""
@@ -162,11 +168,14 @@ class Empleado(UserMixin, db.Model):
     
     def set_password(self, password):
         """Encripta y almacena la contraseña del empleado"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = generar_hash(password)
     
     def check_password(self, password):
-        """Verifica si la contraseña proporcionada es correcta"""
-        return check_password_hash(self.password_hash, password)
+        """
+        Verifica si la contraseña proporcionada es correcta (sin bloquear el
+        bucle de eventos). Si el hash usa parámetros antiguos lo actualiza.
+        """
+        return verificar_password(self, password)
     
     def get_id(self):
         """Retorna un ID único con prefijo para Flask-Login"""
@@ -241,24 +250,34 @@ class Turno(db.Model):
     
     Atributos:
         id: Identificador único del turno
-        numero_turno: Número de turno asignado (formato: A001, B001, etc.)
+        numero_turno: Número de turno asignado (formato: A001, B001, etc.), único por día
+        fecha_numero: Día en que se emitió el número
         usuario_id: ID del usuario que solicita el turno
         tipo_tramite_id: ID del tipo de trámite
         categoria_atencion: Categoría de atención prioritaria
-        estado: Estado del turno (pendiente, en_atencion, atendido, cancelado)
+        estado: Estado del turno (pendiente, en_atencion, atendido, cancelado, no_presentado)
         fecha_solicitud: Fecha y hora de solicitud del turno
         fecha_atencion: Fecha y hora de atención
         empleado_id: ID del empleado que atiende
         observaciones: Notas o comentarios adicionales
     """
     __tablename__ = 'turnos'
+    __table_args__ = (
+        # La numeración empieza de nuevo cada día (ver SecuenciaTurno)
+        db.Index('ux_turnos_numero_fecha', 'numero_turno', 'fecha_numero', unique=True),
+        # Sin AUTOINCREMENT SQLite reutiliza max(id)+1 tras borrar filas, y el id
+        # se conserva al archivar en turnos_historico (ver TurnoHistorico). Las bases
+        # creadas antes se migran con migrar_db.py (ver app/migraciones.py)
+        {'sqlite_autoincrement': True},
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    numero_turno = db.Column(db.String(10), unique=True, nullable=False, index=True)
+    numero_turno = db.Column(db.String(10), nullable=False, index=True)
+    fecha_numero = db.Column(db.Date, default=lambda: datetime.utcnow().date())  # Día de la secuencia que emitió el número
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
     tipo_tramite_id = db.Column(db.Integer, db.ForeignKey('tipos_tramite.id'), nullable=False)
     categoria_atencion = db.Column(db.String(20), nullable=False)  # Prioridad basada en categoría del usuario
-    estado = db.Column(db.String(20), default='pendiente')  # pendiente, en_atencion, atendido, cancelado
+    estado = db.Column(db.String(20), default='pendiente')  # pendiente, en_atencion, atendido, cancelado, no_presentado
     fecha_solicitud = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     fecha_atencion = db.Column(db.DateTime)
     empleado_id = db.Column(db.Integer, db.ForeignKey('empleados.id'))
@@ -285,57 +304,123 @@ class Turno(db.Model):
             'llamados_realizados': self.llamados_realizados
         }
     
+    # Prefijos según categoría para priorización
+    PREFIJOS = {
+        'adulto_mayor': 'A',
+        'discapacidad': 'D',
+        'embarazada': 'E',
+        'ninguna': 'N'
+    }
+    
     @staticmethod
-    def generar_numero_turno(categoria):
+    def generar_numero_turno(categoria, fecha=None):
         """
-        Genera un número de turno único basado en la categoría.
+        Genera un número de turno único en el día basado en la categoría.
         
         Args:
             categoria: Categoría del usuario (adulto_mayor, discapacidad, embarazada, ninguna)
+            fecha: Día de la secuencia (por defecto hoy); el turno debe guardarlo en fecha_numero
         
         Returns:
             String con el número de turno generado (ej: A001, B015)
         """
-        # Prefijos según categoría para priorización
-        prefijos = {
-            'adulto_mayor': 'A',
-            'discapacidad': 'D',
-            'embarazada': 'E',
-            'ninguna': 'N'
-        }
+        return Turno.reservar_numeros(categoria, 1, fecha)[0]
+    
+    @staticmethod
+    def reservar_numeros(categoria, cantidad, fecha=None):
+        """
+        Reserva `cantidad` números de turno consecutivos para la categoría en
+        la transacción actual (ver SecuenciaTurno).
         
-        prefijo = prefijos.get(categoria, 'N')
+        Returns:
+            Lista de números de turno (ej: ['N004', 'N005', ...])
+        """
+        prefijo = Turno.PREFIJOS.get(categoria, 'N')
+        return SecuenciaTurno.reservar(prefijo, cantidad, fecha)
+
+
+class SecuenciaTurno(db.Model):
+    """
+    Contador diario de números de turno por prefijo.
+    
+    numero_turno es único por día (junto con fecha_numero), así que cada día
+    la secuencia empieza de nuevo desde el mayor número ya emitido ese día
+    (normalmente ninguno). Las secuencias de días cerrados se eliminan en el
+    cierre del día.
+    
+    Reservar N números es un único UPDATE ultimo = ultimo + N, que bloquea la
+    fila hasta el commit: las emisiones concurrentes se serializan en la base
+    de datos en lugar de competir por el mismo número.
+    
+    Atributos:
+        prefijo: Prefijo de la categoría (A, D, E, N)
+        fecha: Día de la secuencia
+        ultimo: Último número reservado
+    """
+    __tablename__ = 'secuencias_turno'
+    
+    prefijo = db.Column(db.String(1), primary_key=True)
+    fecha = db.Column(db.Date, primary_key=True)
+    ultimo = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<SecuenciaTurno {self.prefijo} {self.fecha}: {self.ultimo}>'
+    
+    @staticmethod
+    def _asegurar(prefijo, fecha):
+        """Crea la secuencia del día partiendo del mayor número del prefijo emitido ese día"""
+        if db.session.get(SecuenciaTurno, (prefijo, fecha)) is not None:
+            return
         
-        # Intentar generar un número único hasta 100 intentos
-        hoy = datetime.utcnow().date()
-        max_intentos = 100
+        ultimo = db.session.execute(
+            select(db.func.max(db.cast(db.func.substr(Turno.numero_turno, 2), db.Integer)))
+            .where(Turno.numero_turno.like(f'{prefijo}%'), Turno.fecha_numero == fecha)
+        ).scalar() or 0
         
-        for intento in range(max_intentos):
-            # Obtener el último turno de hoy con este prefijo (con bloqueo)
-            ultimo_turno = Turno.query.filter(
-                Turno.numero_turno.startswith(prefijo),
-                db.func.date(Turno.fecha_solicitud) == hoy
-            ).order_by(Turno.id.desc()).first()
-            
-            if ultimo_turno:
-                # Extraer el número y sumar 1
-                numero = int(ultimo_turno.numero_turno[1:]) + 1
-            else:
-                numero = 1
-            
-            numero_turno = f'{prefijo}{numero:03d}'  # Formato: A001, A002, etc.
-            
-            # Verificar que no exista ya este número
-            existe = Turno.query.filter_by(numero_turno=numero_turno).first()
-            if not existe:
-                return numero_turno
+        try:
+            with db.session.begin_nested():
+                db.session.add(SecuenciaTurno(prefijo=prefijo, fecha=fecha, ultimo=ultimo))
+        except IntegrityError:
+            # Otra petición la creó en paralelo
+            pass
+    
+    @staticmethod
+    def reservar(prefijo, cantidad, fecha=None):
+        """
+        Reserva `cantidad` números del día para el prefijo. Como la secuencia
+        parte del mayor número emitido en el día no debería haber choques; si
+        algún número ya existe ese día (p. ej. un turno insertado por fuera de
+        la secuencia) se omite y se reservan los que falten en una sola
+        actualización más.
+        
+        Args:
+            prefijo: Prefijo de la categoría
+            cantidad: Números a reservar
+            fecha: Día de la secuencia (por defecto hoy)
+        
+        Returns:
+            Lista de números de turno formateados
+        """
+        fecha = fecha or datetime.utcnow().date()
+        SecuenciaTurno._asegurar(prefijo, fecha)
+        condicion = (SecuenciaTurno.prefijo == prefijo) & (SecuenciaTurno.fecha == fecha)
+        
+        numeros = []
+        while len(numeros) < cantidad:
+            faltan = cantidad - len(numeros)
+            db.session.execute(
+                update(SecuenciaTurno).where(condicion).values(ultimo=SecuenciaTurno.ultimo + faltan)
+                .execution_options(synchronize_session=False)
+            )
+            ultimo = db.session.execute(select(SecuenciaTurno.ultimo).where(condicion)).scalar_one()
             
-            # Si existe, incrementar y continuar
-            numero += 1
+            candidatos = [f'{prefijo}{numero:03d}' for numero in range(ultimo - faltan + 1, ultimo + 1)]
+            ocupados = set(db.session.execute(
+                select(Turno.numero_turno).where(Turno.numero_turno.in_(candidatos), Turno.fecha_numero == fecha)
+            ).scalars())
+            numeros.extend(c for c in candidatos if c not in ocupados)
         
-        # Si después de 100 intentos no se encontró número, usar timestamp
-        import time
-        return f'{prefijo}{int(time.time()) % 1000:03d}'
+        return numeros
 
 
 class Notificacion(db.Model):
@@ -350,6 +435,13 @@ class Notificacion(db.Model):
         fecha_envio: Fecha y hora de envío
     """
     __tablename__ = 'notificaciones'
+    __table_args__ = (
+        # Consulta de notificaciones no leídas de un turno (verificar_notificaciones)
+        db.Index('ix_notificaciones_turno_leida', 'turno_id', 'leida'),
+        # Sin AUTOINCREMENT los ids se reutilizarían al vaciarse la tabla: chocarían
+        # en notificaciones_historico y romperían 'hasta_id' al marcar leídas
+        {'sqlite_autoincrement': True},
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     turno_id = db.Column(db.Integer, db.ForeignKey('turnos.id'), nullable=False)
@@ -373,3 +465,345 @@ class Notificacion(db.Model):
             'leida': self.leida,
             'fecha_envio': self.fecha_envio.strftime('%Y-%m-%d %H:%M:%S')
         }
+
+
+class TurnoHistorico(db.Model):
+    """
+    Turnos de días cerrados movidos fuera de la tabla operativa 'turnos'.
+    Tiene las mismas columnas que Turno (conservando el mismo id) para que
+    las vistas históricas puedan leer de ambas tablas de forma transparente.
+    El número de turno no es único aquí porque los números se repiten entre días.
+    """
+    __tablename__ = 'turnos_historico'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    numero_turno = db.Column(db.String(10), nullable=False, index=True)
+    fecha_numero = db.Column(db.Date)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False, index=True)
+    tipo_tramite_id = db.Column(db.Integer, db.ForeignKey('tipos_tramite.id'), nullable=False)
+    categoria_atencion = db.Column(db.String(20), nullable=False)
+    estado = db.Column(db.String(20))
+    fecha_solicitud = db.Column(db.DateTime, index=True)
+    fecha_atencion = db.Column(db.DateTime)
+    empleado_id = db.Column(db.Integer, db.ForeignKey('empleados.id'))
+    observaciones = db.Column(db.Text)
+    llamados_realizados = db.Column(db.Integer, default=0)
+    fecha_archivado = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Relaciones de solo lectura (mismos nombres que en Turno)
+    usuario = db.relationship('Usuario')
+    tipo_tramite = db.relationship('TipoTramite')
+    empleado_atencion = db.relationship('Empleado')
+    
+    # Misma representación JSON que un turno operativo
+    to_dict = Turno.to_dict
+    
+    def __repr__(self):
+        return f'<TurnoHistorico {self.numero_turno} - Estado: {self.estado}>'
+
+
+class NotificacionHistorico(db.Model):
+    """
+    Notificaciones de turnos archivados (mismas columnas que Notificacion).
+    """
+    __tablename__ = 'notificaciones_historico'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    turno_id = db.Column(db.Integer, nullable=False, index=True)
+    mensaje = db.Column(db.Text, nullable=False)
+    leida = db.Column(db.Boolean, default=False)
+    fecha_envio = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<NotificacionHistorico Turno:{self.turno_id}>'
+
+
+class ClaveIdempotencia(db.Model):
+    """
+    Claves Idempotency-Key enviadas por los kioscos al emitir turnos.
+    Permiten devolver el turno original cuando el kiosco reintenta una
+    petición cuya respuesta se perdió, en lugar de crear un duplicado.
+    
+    Atributos:
+        clave: Valor del encabezado Idempotency-Key
+        huella: SHA-256 del cuerpo de la petición original
+        turno_id: ID del turno emitido (puede estar archivado)
+        fecha_creacion: Fecha de uso de la clave (para su vencimiento)
+    """
+    __tablename__ = 'claves_idempotencia'
+    
+    clave = db.Column(db.String(64), primary_key=True)
+    huella = db.Column(db.String(64), nullable=False)
+    turno_id = db.Column(db.Integer, nullable=False)
+    fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f'<ClaveIdempotencia {self.clave} - Turno:{self.turno_id}>'
+
+
+class EntregaNotificacion(db.Model):
+    """
+    Entrega de una notificación por un canal externo (SMS, e-mail, WhatsApp).
+    Funciona como acuse de recibo: registra el estado, los intentos y la
+    referencia devuelta por el proveedor.
+    
+    Atributos:
+        id: Identificador único de la entrega
+        notificacion_id: ID de la notificación de origen (puede estar archivada)
+        turno_id: ID del turno notificado
+        canal: sms, email o whatsapp
+        destino: Teléfono o e-mail del usuario
+        mensaje: Texto enviado
+        estado: pendiente, enviado o fallido
+        intentos: Cantidad de intentos de envío realizados
+        referencia_proveedor: Identificador devuelto por el proveedor
+        ultimo_error: Último error del transporte
+        fecha_creacion: Fecha en que se encoló
+        fecha_envio: Fecha de entrega al proveedor
+    """
+    __tablename__ = 'entregas_notificacion'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    notificacion_id = db.Column(db.Integer, index=True)
+    turno_id = db.Column(db.Integer, nullable=False, index=True)
+    canal = db.Column(db.String(10), nullable=False)
+    destino = db.Column(db.String(120), nullable=False)
+    mensaje = db.Column(db.Text, nullable=False)
+    estado = db.Column(db.String(10), default='pendiente', index=True)  # pendiente, enviado, fallido
+    intentos = db.Column(db.Integer, default=0)
+    referencia_proveedor = db.Column(db.String(100))
+    ultimo_error = db.Column(db.Text)
+    fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow)
+    fecha_envio = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<EntregaNotificacion {self.canal}:{self.destino} - {self.estado}>'
+    
+    def to_dict(self):
+        """Convierte el objeto a diccionario"""
+        return {
+            'id': self.id,
+            'notificacion_id': self.notificacion_id,
+            'turno_id': self.turno_id,
+            'canal': self.canal,
+            'destino': self.destino,
+            'estado': self.estado,
+            'intentos': self.intentos,
+            'referencia_proveedor': self.referencia_proveedor,
+            'ultimo_error': self.ultimo_error,
+            'fecha_creacion': self.fecha_creacion.strftime('%Y-%m-%d %H:%M:%S') if self.fecha_creacion else None,
+            'fecha_envio': self.fecha_envio.strftime('%Y-%m-%d %H:%M:%S') if self.fecha_envio else None
+        }
+
+
+class CierreDia(db.Model):
+    """
+    Registro del cierre de un día de atención (ver app/cierre_dia.py).
+    
+    Atributos:
+        fecha: Día cerrado
+        fecha_cierre: Momento en que se ejecutó el cierre
+        politica: Tratamiento de los turnos sobrantes (cancelar o trasladar)
+        total_turnos: Turnos del día después del cierre
+        cancelados: Turnos sobrantes cancelados
+        no_presentados: Turnos sobrantes con sus tres llamados realizados
+        trasladados: Turnos sobrantes trasladados al día siguiente
+        archivo_reporte: Ruta del reporte generado
+    """
+    __tablename__ = 'cierres_dia'
+    
+    fecha = db.Column(db.Date, primary_key=True)
+    fecha_cierre = db.Column(db.DateTime, default=datetime.utcnow)
+    politica = db.Column(db.String(10), nullable=False)
+    total_turnos = db.Column(db.Integer, default=0)
+    cancelados = db.Column(db.Integer, default=0)
+    no_presentados = db.Column(db.Integer, default=0)
+    trasladados = db.Column(db.Integer, default=0)
+    archivo_reporte = db.Column(db.String(255))
+    
+    def __repr__(self):
+        return f'<CierreDia {self.fecha}>'
+
+
+class EstadisticaDiaria(db.Model):
+    """
+    Resumen diario por trámite y categoría, calculado al cerrar el día.
+    
+    Atributos:
+        fecha: Día resumido
+        tipo_tramite_id: ID del tipo de trámite
+        categoria_atencion: Categoría de atención
+        total: Turnos emitidos
+        atendidos, cancelados, no_presentados: Turnos por estado final
+        espera_promedio: Minutos promedio entre solicitud y atención
+        espera_p50, espera_p90: Percentiles de espera estimados con el histograma
+        histograma_espera: Histograma de minutos de espera (JSON, combinable entre días)
+    """
+    __tablename__ = 'estadisticas_diarias'
+    __table_args__ = (
+        db.UniqueConstraint('fecha', 'tipo_tramite_id', 'categoria_atencion', name='uq_estadistica_diaria'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    fecha = db.Column(db.Date, nullable=False, index=True)
+    tipo_tramite_id = db.Column(db.Integer, nullable=False)
+    categoria_atencion = db.Column(db.String(20), nullable=False)
+    total = db.Column(db.Integer, default=0)
+    atendidos = db.Column(db.Integer, default=0)
+    cancelados = db.Column(db.Integer, default=0)
+    no_presentados = db.Column(db.Integer, default=0)
+    espera_promedio = db.Column(db.Float)
+    espera_p50 = db.Column(db.Float)
+    espera_p90 = db.Column(db.Float)
+    histograma_espera = db.Column(db.Text)
+    
+    def __repr__(self):
+        return f'<EstadisticaDiaria {self.fecha} {self.tipo_tramite_id}/{self.categoria_atencion}>'
+    
+    def to_dict(self):
+        """Convierte el objeto a diccionario"""
+        return {
+            'fecha': self.fecha.strftime('%Y-%m-%d'),
+            'tipo_tramite_id': self.tipo_tramite_id,
+            'categoria_atencion': self.categoria_atencion,
+            'total': self.total,
+            'atendidos': self.atendidos,
+            'cancelados': self.cancelados,
+            'no_presentados': self.no_presentados,
+            'espera_promedio': self.espera_promedio,
+            'espera_p50': self.espera_p50,
+            'espera_p90': self.espera_p90
+        }
+
+
+class LatidoReplica(db.Model):
+    """
+    Marca de tiempo que la base principal actualiza periódicamente.
+    Leída desde la réplica permite calcular su retraso de replicación.
+    
+    Atributos:
+        id: Siempre 1 (fila única)
+        marca: Última marca de tiempo escrita en la base principal
+    """
+    __tablename__ = 'replica_latidos'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    marca = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<LatidoReplica {self.marca}>'
+
+
+class CupoCita(db.Model):
+    """
+    Franja horaria de citas de un trámite con su capacidad (ver app/citas.py).
+    
+    Reservar es un único UPDATE reservadas = reservadas + 1 condicionado a
+    reservadas < capacidad, por lo que dos reservas simultáneas no pueden
+    exceder la capacidad de la franja.
+    
+    Atributos:
+        tipo_tramite_id: ID del tipo de trámite
+        inicio: Fecha y hora de inicio de la franja
+        fecha: Día de la franja
+        capacidad: Citas que admite la franja
+        reservadas: Citas reservadas en la franja
+    """
+    __tablename__ = 'cupos_cita'
+    __table_args__ = (
+        db.Index('ix_cupos_cita_tramite_fecha', 'tipo_tramite_id', 'fecha'),
+    )
+    
+    tipo_tramite_id = db.Column(db.Integer, db.ForeignKey('tipos_tramite.id'), primary_key=True)
+    inicio = db.Column(db.DateTime, primary_key=True)
+    fecha = db.Column(db.Date, nullable=False)
+    capacidad = db.Column(db.Integer, nullable=False, default=0)
+    reservadas = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<CupoCita {self.tipo_tramite_id} {self.inicio}: {self.reservadas}/{self.capacidad}>'
+    
+    def to_dict(self):
+        """Convierte el objeto a diccionario"""
+        return {
+            'inicio': self.inicio.strftime('%Y-%m-%d %H:%M'),
+            'hora': self.inicio.strftime('%H:%M'),
+            'capacidad': self.capacidad,
+            'libres': max(0, self.capacidad - self.reservadas)
+        }
+
+
+class CapacidadCitasDia(db.Model):
+    """
+    Índice de capacidad diario: suma de capacidad y reservas de las franjas
+    de un trámite en un día. Permite saber si un día tiene cupos leyendo una
+    sola fila, sin recorrer sus franjas.
+    
+    Atributos:
+        tipo_tramite_id: ID del tipo de trámite
+        fecha: Día
+        capacidad: Capacidad total de las franjas del día
+        reservadas: Citas reservadas en el día
+    """
+    __tablename__ = 'capacidad_citas_dia'
+    
+    tipo_tramite_id = db.Column(db.Integer, db.ForeignKey('tipos_tramite.id'), primary_key=True)
+    fecha = db.Column(db.Date, primary_key=True)
+    capacidad = db.Column(db.Integer, nullable=False, default=0)
+    reservadas = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<CapacidadCitasDia {self.tipo_tramite_id} {self.fecha}: {self.reservadas}/{self.capacidad}>'
+
+
+class Cita(db.Model):
+    """
+    Cita reservada por un ciudadano para un trámite en una franja horaria.
+    Al llegar la hora de la franja se convierte en un turno pendiente.
+    
+    Atributos:
+        id: Identificador único de la cita
+        codigo: Código que el ciudadano presenta para consultar o cancelar
+        usuario_id: ID del usuario que reservó
+        tipo_tramite_id: ID del tipo de trámite
+        categoria_atencion: Categoría de atención del turno que se generará
+        inicio: Fecha y hora de la franja reservada
+        estado: reservada, activada, cancelada o vencida
+        turno_id: Turno generado al activarse (puede estar archivado)
+        fecha_creacion: Fecha de la reserva
+    """
+    __tablename__ = 'citas'
+    __table_args__ = (
+        db.Index('ix_citas_estado_inicio', 'estado', 'inicio'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    codigo = db.Column(db.String(12), unique=True, nullable=False, index=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False, index=True)
+    tipo_tramite_id = db.Column(db.Integer, db.ForeignKey('tipos_tramite.id'), nullable=False)
+    categoria_atencion = db.Column(db.String(20), nullable=False, default='ninguna')
+    inicio = db.Column(db.DateTime, nullable=False)
+    estado = db.Column(db.String(20), nullable=False, default='reservada')
+    # Sin llave foránea: el turno puede pasar a turnos_historico al archivarse
+    turno_id = db.Column(db.Integer, index=True)
+    fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    usuario = db.relationship('Usuario')
+    tipo_tramite = db.relationship('TipoTramite')
+    
+    def __repr__(self):
+        return f'<Cita {self.codigo} {self.inicio} - Estado: {self.estado}>'
+    
+    def to_dict(self):
+        """Convierte el objeto Cita a diccionario para JSON"""
+        return {
+            'id': self.id,
+            'codigo': self.codigo,
+            'usuario_id': self.usuario_id,
+            'tipo_tramite_id': self.tipo_tramite_id,
+            'tipo_tramite': self.tipo_tramite.nombre if self.tipo_tramite else None,
+            'categoria_atencion': self.categoria_atencion,
+            'inicio': self.inicio.strftime('%Y-%m-%d %H:%M'),
+            'estado': self.estado,
+            'turno_id': self.turno_id
+        }
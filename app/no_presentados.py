@@ -0,0 +1,96 @@
+"""
+Cierre de turnos no presentados
+
+Después del tercer llamado el turno ya no puede volver a llamarse, pero
+seguía en 'pendiente' ocupando las listas del dashboard, los contadores y las
+posiciones de la cola. Esta tarea periódica marca como 'no_presentado' los
+turnos que agotaron sus llamados y cuyo último llamado ocurrió hace más de
+NO_PRESENTADO_GRACIA_MINUTOS, con UPDATE por lotes, y avisa a los dashboards
+con un único evento 'turnos_no_presentados'.
+
+UPDATE ... RETURNING requiere SQLite 3.35 o posterior; con versiones
+anteriores (p. ej. en PythonAnywhere) los turnos marcados se leen con un
+SELECT después del UPDATE, en la misma transacción.
+"""
+
+import logging
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import select, update
+
+from app import socketio
+from app.models import db, Turno, Notificacion
+
+logger = logging.getLogger(__name__)
+
+# Llamados permitidos por turno (llamar_turno / turno_llamar)
+LLAMADOS_MAXIMOS = 3
+
+
+def marcar_no_presentados(gracia_minutos=None, tamano_lote=None):
+    """
+    Marca como 'no_presentado' los turnos pendientes con todos sus llamados
+    realizados y vencido el tiempo de gracia desde el último llamado.
+
+    Returns:
+        Lista de dicts (id, numero_turno, tipo_tramite_id) de los turnos marcados
+    """
+    if gracia_minutos is None:
+        gracia_minutos = current_app.config['NO_PRESENTADO_GRACIA_MINUTOS']
+    if tamano_lote is None:
+        tamano_lote = current_app.config['ARCHIVO_TAMANO_LOTE']
+
+    limite = datetime.utcnow() - timedelta(minutes=gracia_minutos)
+    candidatos = (Turno.estado == 'pendiente', Turno.llamados_realizados >= LLAMADOS_MAXIMOS)
+
+    # Sin ningún llamado desde el límite: la gracia corre aunque el último
+    # llamado haya sido antes de medianoche
+    llamado_reciente = (
+        select(Notificacion.id)
+        .where(Notificacion.turno_id == Turno.id, Notificacion.fecha_envio >= limite)
+        .exists()
+    )
+    con_returning = db.engine.dialect.update_returning
+
+    marcados = []
+    while True:
+        ids = db.session.execute(
+            select(Turno.id)
+            .where(*candidatos, Turno.fecha_solicitud < limite, ~llamado_reciente)
+            .limit(tamano_lote)
+        ).scalars().all()
+
+        if not ids:
+            break
+
+        # La condición de estado se repite por si un empleado lo atendió entretanto
+        marcar = (
+            update(Turno)
+            .where(Turno.id.in_(ids), Turno.estado == 'pendiente')
+            .values(estado='no_presentado')
+            .execution_options(synchronize_session=False)
+        )
+        columnas = (Turno.id, Turno.numero_turno, Turno.tipo_tramite_id)
+        if con_returning:
+            filas = db.session.execute(marcar.returning(*columnas)).all()
+        else:
+            db.session.execute(marcar)
+            filas = db.session.execute(
+                select(*columnas).where(Turno.id.in_(ids), Turno.estado == 'no_presentado')
+            ).all()
+        db.session.commit()
+
+        marcados.extend({'id': f.id, 'numero_turno': f.numero_turno, 'tipo_tramite_id': f.tipo_tramite_id} for f in filas)
+
+    if marcados:
+        logger.info('Marcados %s turnos como no presentados', len(marcados))
+        socketio.emit('turnos_no_presentados', {'turnos': marcados}, namespace='/')
+
+    return marcados
+
+
+def init_no_presentados(app):
+    """Programa la revisión periódica de turnos no presentados"""
+    from app.tareas import iniciar_tarea_periodica
+    iniciar_tarea_periodica(app, 'no_presentados', app.config['NO_PRESENTADO_INTERVALO_SEGUNDOS'], marcar_no_presentados)
@@ -0,0 +1,359 @@
+"""
+Perfilador de peticiones bajo demanda
+
+Un superadministrador activa desde /admin/perfilador la captura de una
+fracción de las peticiones, opcionalmente solo las de una ruta (por ejemplo
+/empleado/dashboard), hasta un número de capturas o un tiempo máximo. Cada
+petición capturada produce un archivo speedscope (https://www.speedscope.app)
+con dos perfiles:
+- Código: llamadas a funciones Python y built-in con sus tiempos (trazado con
+  sys.setprofile, limitado al greenlet/hilo de la petición).
+- SQL: línea de tiempo de las sentencias ejecutadas durante la petición.
+
+Mientras está deshabilitado no hay costo: el middleware WSGI y los ganchos
+SQL solo se instalan al activar la captura y se retiran al terminar.
+
+Notas:
+- El trazado hace la petición capturada varias veces más lenta; los tiempos
+  relativos entre funciones son los útiles.
+- Con eventlet el tiempo en que la petición espera E/S aparece dentro de la
+  función que esperaba (tiempo de reloj, no de CPU).
+- Se captura una petición a la vez; las demás siguen sin perfilar.
+- El estado es por proceso (cada worker de gunicorn tiene el suyo).
+"""
+
+import contextvars
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+try:
+    from greenlet import getcurrent
+except ImportError:
+    getcurrent = threading.current_thread
+
+# Rutas que nunca se perfilan
+RUTAS_EXCLUIDAS = ('/static', '/socket.io', '/admin/perfilador')
+LARGO_MAXIMO_SENTENCIA = 300
+FUNCIONES_RESUMEN = 20
+
+_captura_actual = contextvars.ContextVar('perfilador_captura', default=None)
+
+
+class Captura:
+    """Eventos de apertura/cierre de funciones y sentencias SQL de una petición"""
+
+    def __init__(self, max_eventos):
+        self.max_eventos = max_eventos
+        self.frames = []          # [(nombre, archivo, línea)]
+        self._indices = {}        # clave -> índice en frames
+        self.eventos = []         # (tipo 'O'/'C', frame, segundos)
+        self.pila = []
+        self.sql = []             # [inicio, fin, sentencia]
+        self.truncada = False
+        self.hilo = getcurrent()
+        self.inicio = time.perf_counter()
+
+    def _frame(self, clave, nombre, archivo, linea):
+        indice = self._indices.get(clave)
+        if indice is None:
+            indice = self._indices[clave] = len(self.frames)
+            self.frames.append((nombre, archivo, linea))
+        return indice
+
+    def trazar(self, frame, evento, arg):
+        # Se omiten otros greenlets y el propio perfilador (ganchos SQL, middleware)
+        if getcurrent() is not self.hilo or self.truncada or frame.f_code.co_filename == __file__:
+            return
+        ahora = time.perf_counter()
+        if evento == 'call':
+            codigo = frame.f_code
+            indice = self._indices.get(codigo)
+            if indice is None:
+                # co_qualname existe desde Python 3.11
+                indice = self._frame(codigo, getattr(codigo, 'co_qualname', codigo.co_name),
+                                     codigo.co_filename, codigo.co_firstlineno)
+        elif evento == 'c_call':
+            nombre = getattr(arg, '__qualname__', None) or getattr(arg, '__name__', repr(arg))
+            modulo = getattr(arg, '__module__', None) or ''
+            indice = self._frame(('c', modulo, nombre), f'{modulo}.{nombre}' if modulo else nombre, '<built-in>', 0)
+        else:
+            # return / c_return / c_exception: cierra solo lo que se abrió durante la captura
+            if self.pila:
+                self.eventos.append(('C', self.pila.pop(), ahora))
+            return
+        self.pila.append(indice)
+        self.eventos.append(('O', indice, ahora))
+        if len(self.eventos) >= self.max_eventos:
+            self.terminar(ahora)
+            self.truncada = True
+
+    def terminar(self, ahora=None):
+        ahora = ahora or time.perf_counter()
+        while self.pila:
+            self.eventos.append(('C', self.pila.pop(), ahora))
+        self.fin = ahora
+
+    def a_speedscope(self, nombre):
+        """Archivo speedscope con los perfiles de código y SQL (tiempos en ms desde el inicio)"""
+        frames = [{'name': n, 'file': a, 'line': l} for n, a, l in self.frames]
+        fin = (self.fin - self.inicio) * 1000
+        eventos = [{'type': tipo, 'frame': indice, 'at': round((t - self.inicio) * 1000, 4)}
+                   for tipo, indice, t in self.eventos]
+
+        eventos_sql = []
+        for inicio, termino, sentencia in self.sql:
+            indice = len(frames)
+            frames.append({'name': f'SQL: {sentencia[:120]}'})
+            eventos_sql.append({'type': 'O', 'frame': indice, 'at': round((inicio - self.inicio) * 1000, 4)})
+            eventos_sql.append({'type': 'C', 'frame': indice, 'at': round((termino - self.inicio) * 1000, 4)})
+
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': nombre,
+            'exporter': 'sistema-turnos',
+            'activeProfileIndex': 0,
+            'shared': {'frames': frames},
+            'profiles': [
+                {'type': 'evented', 'name': f'{nombre} (código)', 'unit': 'milliseconds',
+                 'startValue': 0, 'endValue': round(fin, 4), 'events': eventos},
+                {'type': 'evented', 'name': f'{nombre} (SQL)', 'unit': 'milliseconds',
+                 'startValue': 0, 'endValue': round(fin, 4), 'events': eventos_sql},
+            ]
+        }
+
+    def resumen_funciones(self, limite=FUNCIONES_RESUMEN):
+        """Funciones con más tiempo propio: [{funcion, archivo, propio_ms, total_ms, llamadas}]"""
+        propio, total, llamadas = {}, {}, {}
+        pila = []                 # [indice, apertura, tiempo en hijos]
+        abiertos = {}
+        for tipo, indice, t in self.eventos:
+            if tipo == 'O':
+                pila.append([indice, t, 0.0])
+                abiertos[indice] = abiertos.get(indice, 0) + 1
+                llamadas[indice] = llamadas.get(indice, 0) + 1
+                continue
+            indice, apertura, hijos = pila.pop()
+            duracion = t - apertura
+            propio[indice] = propio.get(indice, 0.0) + duracion - hijos
+            abiertos[indice] -= 1
+            if not abiertos[indice]:
+                # En recursión solo cuenta la llamada más externa
+                total[indice] = total.get(indice, 0.0) + duracion
+            if pila:
+                pila[-1][2] += duracion
+
+        return [{
+            'funcion': self.frames[i][0],
+            'archivo': f'{_ruta_corta(self.frames[i][1])}:{self.frames[i][2]}' if self.frames[i][2] else self.frames[i][1],
+            'propio_ms': round(propio[i] * 1000, 3),
+            'total_ms': round(total.get(i, 0.0) * 1000, 3),
+            'llamadas': llamadas[i]
+        } for i in sorted(propio, key=lambda i: -propio[i])[:limite]]
+
+
+def _ruta_corta(archivo):
+    """Ruta relativa al proyecto o al paquete instalado"""
+    for prefijo in sorted(sys.path, key=len, reverse=True):
+        if prefijo and archivo.startswith(prefijo + os.sep):
+            return archivo[len(prefijo) + 1:]
+    return archivo
+
+
+class Perfilador:
+    """Configuración de la captura activa e índice de perfiles guardados"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ocupado = threading.Lock()
+        self.app = None
+        self.activo = False
+        self.ruta = None
+        self.fraccion = 1.0
+        self.restantes = 0
+        self.expira = None
+        self.perfiles = deque(maxlen=50)
+
+    def estado(self):
+        return {
+            'activo': self.activo,
+            'ruta': self.ruta,
+            'fraccion': self.fraccion,
+            'restantes': self.restantes,
+            'expira': self.expira.strftime('%Y-%m-%d %H:%M:%S') if self.expira else None
+        }
+
+    def activar(self, app, ruta=None, fraccion=1.0, capturas=10, minutos=None):
+        """Instala el middleware y los ganchos SQL hasta completar `capturas` o pasar `minutos`"""
+        if not 0 < fraccion <= 1:
+            raise ValueError('La fracción debe estar entre 0 y 1')
+        if capturas < 1:
+            raise ValueError('Debe pedir al menos una captura')
+        minutos = minutos or app.config['PERFILADOR_MINUTOS_MAXIMOS']
+        with self._lock:
+            self.app = app
+            self.ruta = ruta or None
+            self.fraccion = fraccion
+            self.restantes = capturas
+            self.expira = datetime.utcnow() + timedelta(minutes=minutos)
+            if not self.activo:
+                app.wsgi_app = MiddlewarePerfilador(app.wsgi_app, self)
+                event.listen(Engine, 'before_cursor_execute', _antes_de_consulta)
+                event.listen(Engine, 'after_cursor_execute', _despues_de_consulta)
+                self.activo = True
+
+    def desactivar(self):
+        """Retira el middleware y los ganchos SQL"""
+        with self._lock:
+            if not self.activo:
+                return
+            self.activo = False
+            self.restantes = 0
+            if isinstance(self.app.wsgi_app, MiddlewarePerfilador):
+                self.app.wsgi_app = self.app.wsgi_app.siguiente
+            if event.contains(Engine, 'before_cursor_execute', _antes_de_consulta):
+                event.remove(Engine, 'before_cursor_execute', _antes_de_consulta)
+                event.remove(Engine, 'after_cursor_execute', _despues_de_consulta)
+
+    def elegir(self, ruta):
+        """True si la petición a `ruta` debe perfilarse (y reserva la captura)"""
+        if ruta.startswith(RUTAS_EXCLUIDAS):
+            return False
+        if self.ruta and not ruta.startswith(self.ruta):
+            return False
+        if self.fraccion < 1 and random.random() >= self.fraccion:
+            return False
+        if self.expira and datetime.utcnow() > self.expira:
+            self.desactivar()
+            return False
+        if not self._ocupado.acquire(blocking=False):
+            return False
+        with self._lock:
+            if self.restantes <= 0:
+                self._ocupado.release()
+                return False
+            self.restantes -= 1
+        return True
+
+    def liberar(self):
+        self._ocupado.release()
+        if self.restantes <= 0:
+            self.desactivar()
+
+    def perfil(self, identificador):
+        for perfil in self.perfiles:
+            if perfil['id'] == identificador:
+                return perfil
+        return None
+
+
+perfilador = Perfilador()
+
+
+# ===== CAPTURA =====
+
+class MiddlewarePerfilador:
+    """Envoltura WSGI que traza las peticiones elegidas"""
+
+    def __init__(self, siguiente, perfilador):
+        self.siguiente = siguiente
+        self.perfilador = perfilador
+
+    def __call__(self, environ, start_response):
+        ruta = environ.get('PATH_INFO', '')
+        if not self.perfilador.activo or not self.perfilador.elegir(ruta):
+            return self.siguiente(environ, start_response)
+
+        app = self.perfilador.app
+        codigo = []
+
+        def start_response_capturado(status, headers, exc_info=None):
+            codigo.append(status.split(' ', 1)[0])
+            return start_response(status, headers, exc_info)
+
+        # elegir() ya ocupó el perfilador: se libera pase lo que pase desde aquí
+        try:
+            captura = Captura(app.config['PERFILADOR_MAX_EVENTOS'])
+            token = _captura_actual.set(captura)
+            sys.setprofile(captura.trazar)
+            try:
+                respuesta = self.siguiente(environ, start_response_capturado)
+            finally:
+                sys.setprofile(None)
+                captura.terminar()
+                _captura_actual.reset(token)
+                try:
+                    datos = {
+                        'metodo': environ.get('REQUEST_METHOD'),
+                        'ruta': ruta,
+                        'endpoint': _endpoint(app, environ),
+                        'codigo': codigo[0] if codigo else None
+                    }
+                    from app.seguridad import ejecutar_fuera_del_bucle
+                    ejecutar_fuera_del_bucle(guardar_perfil, app.config['PERFILADOR_DIRECTORIO'], captura, datos)
+                except Exception as e:
+                    app.logger.error('Error al guardar el perfil de %s: %s', ruta, e)
+        finally:
+            self.perfilador.liberar()
+        return respuesta
+
+
+def _endpoint(app, environ):
+    try:
+        return app.url_map.bind_to_environ(environ).match()[0]
+    except Exception:
+        return None
+
+
+def _antes_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    captura = _captura_actual.get()
+    if captura is not None:
+        captura.sql.append([time.perf_counter(), None, statement])
+
+
+def _despues_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    captura = _captura_actual.get()
+    if captura is not None and captura.sql and captura.sql[-1][1] is None:
+        captura.sql[-1][1] = time.perf_counter()
+
+
+def guardar_perfil(directorio, captura, datos):
+    """Escribe el archivo speedscope y agrega el resumen al índice"""
+    for sentencia in captura.sql:
+        if sentencia[1] is None:
+            sentencia[1] = captura.fin
+    fecha = datetime.utcnow()
+    identificador = f'{fecha:%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}'
+    nombre = f'{datos["metodo"]} {datos["ruta"]}'
+    archivo = f'{identificador}_{re.sub(r"[^A-Za-z0-9]+", "_", datos["ruta"]).strip("_") or "raiz"}.speedscope.json'
+
+    os.makedirs(directorio, exist_ok=True)
+    with open(os.path.join(directorio, archivo), 'w', encoding='utf-8') as f:
+        json.dump(captura.a_speedscope(nombre), f, separators=(',', ':'))
+
+    perfilador.perfiles.appendleft(dict(
+        datos,
+        id=identificador,
+        fecha=fecha.strftime('%Y-%m-%d %H:%M:%S'),
+        archivo=archivo,
+        duracion_ms=round((captura.fin - captura.inicio) * 1000, 2),
+        eventos=len(captura.eventos),
+        truncada=captura.truncada,
+        consultas=len(captura.sql),
+        tiempo_sql_ms=round(sum(fin - inicio for inicio, fin, _ in captura.sql) * 1000, 2),
+        sql=[{'inicio_ms': round((inicio - captura.inicio) * 1000, 2),
+              'duracion_ms': round((fin - inicio) * 1000, 2),
+              'sentencia': sentencia[:LARGO_MAXIMO_SENTENCIA]}
+             for inicio, fin, sentencia in captura.sql],
+        funciones=captura.resumen_funciones()
+    ))
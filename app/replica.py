@@ -0,0 +1,173 @@
+"""
+Enrutamiento de consultas de reportes hacia una réplica de solo lectura
+
+Las rutas de reportes (estadísticas, dashboard de administración, listados)
+se marcan con el decorador @solo_lectura. Si hay una réplica configurada en
+REPLICA_DATABASE_URI y su retraso respecto a la base principal no supera
+REPLICA_MAX_RETRASO_SEGUNDOS, las consultas de esa petición se envían a la
+réplica. En cualquier otro caso (sin réplica, réplica atrasada o caída) se
+usa la base principal, de modo que las rutas siempre responden.
+
+El retraso se mide con la tabla replica_latidos: la base principal actualiza
+periódicamente una marca de tiempo que llega a la réplica por el mismo
+mecanismo de replicación que el resto de los datos. Para probar localmente
+con dos archivos SQLite ver sincronizar_replica.py.
+"""
+
+import logging
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import current_app, g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger(__name__)
+
+CLAVE_REPLICA = 'replica'
+
+
+class SesionEnrutada(Session):
+    """
+    Sesión de SQLAlchemy que envía las lecturas a la réplica cuando la
+    petición actual fue marcada con @solo_lectura.
+    Las escrituras (flush) siempre van a la base principal.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_app_context():
+            engine_replica = g.get('engine_replica')
+            if engine_replica is not None:
+                return engine_replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class EnrutadorReplica:
+    """
+    Mantiene el estado de salud de la réplica.
+
+    La verificación del retraso se cachea durante `intervalo_verificacion`
+    segundos para no agregar una consulta extra a cada petición.
+    """
+
+    def __init__(self, max_retraso, intervalo_verificacion):
+        self.max_retraso = timedelta(seconds=max_retraso)
+        self.intervalo_verificacion = intervalo_verificacion
+        self.ultimo_retraso = None
+        self._disponible = False
+        self._ultima_verificacion = None
+
+    @property
+    def engine(self):
+        from app.models import db
+        return db.engines[CLAVE_REPLICA]
+
+    def disponible(self):
+        """Indica si la réplica puede atender lecturas en este momento"""
+        ahora = time.monotonic()
+        if self._ultima_verificacion is None or ahora - self._ultima_verificacion >= self.intervalo_verificacion:
+            self._ultima_verificacion = ahora
+            self._disponible = self._verificar()
+        return self._disponible
+
+    def marcar_caida(self):
+        """Marca la réplica como no disponible hasta la próxima verificación"""
+        self._disponible = False
+        self._ultima_verificacion = time.monotonic()
+
+    def _verificar(self):
+        from app.models import LatidoReplica
+
+        try:
+            with self.engine.connect() as conexion:
+                marca = conexion.execute(
+                    LatidoReplica.__table__.select().where(LatidoReplica.id == 1)
+                ).first()
+        except SQLAlchemyError as e:
+            logger.warning('Réplica no disponible, usando la base principal: %s', e)
+            return False
+
+        if marca is None:
+            logger.warning('La réplica no tiene latidos registrados, usando la base principal')
+            return False
+
+        self.ultimo_retraso = datetime.utcnow() - marca.marca
+        if self.ultimo_retraso > self.max_retraso:
+            logger.warning('Réplica atrasada %s (máximo %s), usando la base principal',
+                           self.ultimo_retraso, self.max_retraso)
+            return False
+        return True
+
+
+def configurar_binds(app):
+    """
+    Registra la réplica como bind de Flask-SQLAlchemy.
+    Debe llamarse antes de db.init_app(app).
+    """
+    uri = app.config.get('REPLICA_DATABASE_URI')
+    if not uri:
+        return
+    if uri.startswith('postgres://'):
+        uri = uri.replace('postgres://', 'postgresql://', 1)
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    binds[CLAVE_REPLICA] = uri
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+
+def init_replica(app):
+    """
+    Inicializa el enrutador y programa los latidos en la base principal.
+    Debe llamarse después de db.init_app(app).
+    """
+    if not app.config.get('REPLICA_DATABASE_URI'):
+        return
+
+    app.extensions['replica'] = EnrutadorReplica(
+        max_retraso=app.config['REPLICA_MAX_RETRASO_SEGUNDOS'],
+        intervalo_verificacion=app.config['REPLICA_INTERVALO_VERIFICACION']
+    )
+
+    from app.tareas import iniciar_tarea_periodica
+    iniciar_tarea_periodica(app, 'latido_replica', app.config['REPLICA_INTERVALO_LATIDO'], registrar_latido)
+
+
+def registrar_latido():
+    """Actualiza la marca de tiempo de latido en la base principal"""
+    from app.models import db, LatidoReplica
+
+    latido = db.session.get(LatidoReplica, 1)
+    if latido is None:
+        latido = LatidoReplica(id=1)
+        db.session.add(latido)
+    latido.marca = datetime.utcnow()
+    db.session.commit()
+
+
+def solo_lectura(f):
+    """
+    Decorador para rutas de reportes que pueden leer desde la réplica.
+
+    Si la réplica falla durante la petición, se descarta lo leído y la ruta
+    se ejecuta de nuevo contra la base principal.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        enrutador = current_app.extensions.get('replica')
+        if enrutador is None or not enrutador.disponible():
+            return f(*args, **kwargs)
+
+        from app.models import db
+
+        g.engine_replica = enrutador.engine
+        try:
+            return f(*args, **kwargs)
+        except SQLAlchemyError as e:
+            logger.warning('Error leyendo de la réplica, reintentando en la base principal: %s', e)
+            enrutador.marcar_caida()
+            db.session.rollback()
+            g.engine_replica = None
+            return f(*args, **kwargs)
+        finally:
+            g.engine_replica = None
+    return decorated_function
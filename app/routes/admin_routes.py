@@ -5,13 +5,18 @@ Este módulo maneja todas las operaciones CRUD (Crear, Leer, Actualizar, Elimina
 para usuarios del sistema, empleados y tipos de trámites.
 """
 
-from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, abort
+from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, abort, current_app
 from flask_login import login_required, current_user, login_user, logout_user
-from app.models import db, UsuarioSistema, Empleado, TipoTramite, empleado_tramites, Turno, Notificacion
+from app.models import db, UsuarioSistema, Empleado, TipoTramite, empleado_tramites, Turno, TurnoHistorico, Notificacion
 from sqlalchemy import or_, and_
 from datetime import datetime
 from functools import wraps
 from app import socketio
+from app.replica import solo_lectura
+from app.cache_identidad import invalidar_usuario, invalidar_empleado, invalidar_todo
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Crear blueprint para rutas de administración
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
@@ -62,6 +67,7 @@ def crear_admin_sistema():
             usuario_existente.activo = True
             usuario_existente.set_password(admin_password)
             db.session.commit()
+            invalidar_usuario(usuario_existente.id)
             
             return f"""
             <h2>✅ Usuario Actualizado a Superadmin</h2>
@@ -231,6 +237,10 @@ def login():
         
         # Verificar credenciales
         if usuario and usuario.check_password(password) and usuario.activo:
+            # Guardar el hash actualizado si la contraseña se re-encriptó
+            if db.session.is_modified(usuario):
+                db.session.commit()
+            
             login_user(usuario)
             flash('Inicio de sesión exitoso', 'success')
             next_page = request.args.get('next')
@@ -264,6 +274,7 @@ def logout():
 @admin_bp.route('/dashboard')
 @admin_bp.route('/')
 @login_required
+@solo_lectura
 def dashboard():
     """Dashboard principal - muestra contenido según el rol del usuario"""
     
@@ -443,6 +454,7 @@ def usuario_editar(id):
                 usuario.set_password(password)
             
             db.session.commit()
+            invalidar_usuario(id)
             
             flash('Usuario actualizado exitosamente', 'success')
             return redirect(url_for('admin.usuarios_lista'))
@@ -510,6 +522,7 @@ def usuario_eliminar(id):
         usuario = UsuarioSistema.query.get_or_404(id)
         db.session.delete(usuario)
         db.session.commit()
+        invalidar_usuario(id)
         
         flash('Usuario eliminado exitosamente', 'success')
         return jsonify({'success': True})
@@ -654,6 +667,7 @@ def empleado_editar(id):
                 empleado.tramites_asignados = []
             
             db.session.commit()
+            invalidar_empleado(id)
             flash('Empleado actualizado exitosamente', 'success')
             return redirect(url_for('admin.empleados_lista'))
             
@@ -680,6 +694,7 @@ def empleado_eliminar(id):
         empleado = Empleado.query.get_or_404(id)
         db.session.delete(empleado)
         db.session.commit()
+        invalidar_empleado(id)
         
         flash('Empleado eliminado exitosamente', 'success')
         return jsonify({'success': True})
@@ -787,6 +802,7 @@ def tramite_editar(id):
             tramite.activo = activo
             
             db.session.commit()
+            invalidar_todo()
             flash('Trámite actualizado exitosamente', 'success')
             return redirect(url_for('admin.tramites_lista'))
             
@@ -806,8 +822,8 @@ def tramite_eliminar(id):
     try:
         tramite = TipoTramite.query.get_or_404(id)
         
-        # Verificar si tiene turnos asociados
-        if tramite.turnos.count() > 0:
+        # Verificar si tiene turnos asociados (operativos o archivados)
+        if tramite.turnos.count() > 0 or TurnoHistorico.query.filter_by(tipo_tramite_id=id).first():
             return jsonify({
                 'success': False, 
                 'message': 'No se puede eliminar el trámite porque tiene turnos asociados'
@@ -815,6 +831,7 @@ def tramite_eliminar(id):
         
         db.session.delete(tramite)
         db.session.commit()
+        invalidar_todo()
         
         flash('Trámite eliminado exitosamente', 'success')
         return jsonify({'success': True})
@@ -824,6 +841,95 @@ def tramite_eliminar(id):
         return jsonify({'success': False, 'message': str(e)}), 500
 
 
+# ===== IMPORTACIÓN DE CIUDADANOS =====
+
+@admin_bp.route('/importar-ciudadanos')
+@login_required
+@superadmin_required
+def importar_ciudadanos():
+    """Subida de padrones CSV de ciudadanos e importaciones recientes"""
+    from app.importacion_ciudadanos import COLUMNAS, PARTES_NOMBRE, importaciones
+    return render_template('admin/importar_ciudadanos.html', importaciones=importaciones.listar(),
+                           columnas=COLUMNAS, partes_nombre=PARTES_NOMBRE)
+
+
+@admin_bp.route('/importar-ciudadanos/nueva', methods=['POST'])
+@login_required
+@superadmin_required
+def importar_ciudadanos_nueva():
+    """Registra la subida de un archivo; sus partes se envían a /partes"""
+    from app.importacion_ciudadanos import importaciones
+    datos = request.get_json(silent=True) or {}
+    try:
+        importacion = importaciones.crear(
+            current_app.config['IMPORTACION_DIRECTORIO'],
+            datos.get('nombre'),
+            int(datos.get('tamano') or 0),
+            current_app.config['IMPORTACION_TAMANO_MAXIMO']
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    logger.info('Importación de ciudadanos %s iniciada por %s', importacion['id'], current_user.email)
+    return jsonify({'success': True, 'id': importacion['id'],
+                    'tamano_parte': current_app.config['IMPORTACION_TAMANO_PARTE']})
+
+
+@admin_bp.route('/importar-ciudadanos/<identificador>/partes', methods=['POST'])
+@login_required
+@superadmin_required
+def importar_ciudadanos_parte(identificador):
+    """Recibe una parte del archivo (cuerpo binario) que empieza en el byte ?inicio="""
+    from app.importacion_ciudadanos import importaciones
+    try:
+        importacion = importaciones.agregar_parte(
+            identificador, int(request.args.get('inicio', 0)), request.get_data(cache=False))
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify({'success': True, 'recibidos': importacion['recibidos']})
+
+
+@admin_bp.route('/importar-ciudadanos/<identificador>/procesar', methods=['POST'])
+@login_required
+@superadmin_required
+def importar_ciudadanos_procesar(identificador):
+    """Inicia la importación del archivo subido en segundo plano"""
+    from app.importacion_ciudadanos import importaciones
+    datos = request.get_json(silent=True) or {}
+    try:
+        importaciones.procesar(current_app._get_current_object(), identificador, bool(datos.get('solo_nuevos')))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify({'success': True})
+
+
+@admin_bp.route('/importar-ciudadanos/<identificador>')
+@login_required
+@superadmin_required
+def importar_ciudadanos_estado(identificador):
+    """Estado y contadores de una importación"""
+    from app.importacion_ciudadanos import importaciones
+    importacion = importaciones.obtener(identificador)
+    if importacion is None:
+        abort(404)
+    campos = ('id', 'nombre', 'tamano', 'recibidos', 'estado', 'mensaje', 'resultado')
+    return jsonify({'success': True, 'importacion': {campo: importacion[campo] for campo in campos}})
+
+
+@admin_bp.route('/importar-ciudadanos/<identificador>/rechazos')
+@login_required
+@superadmin_required
+def importar_ciudadanos_rechazos(identificador):
+    """Descarga el CSV de filas rechazadas"""
+    import os
+    from flask import send_file
+    from app.importacion_ciudadanos import importaciones
+    importacion = importaciones.obtener(identificador)
+    if importacion is None or not os.path.exists(importacion['rechazos']):
+        abort(404)
+    return send_file(importacion['rechazos'], as_attachment=True, mimetype='text/csv',
+                     download_name=f"rechazos_{os.path.splitext(importacion['nombre'])[0]}.csv")
+
+
 # ===== RUTAS PARA GESTIÓN DE TURNOS =====
 
 @admin_bp.route('/turnos/<int:id>/llamar', methods=['POST'])
@@ -856,7 +962,7 @@ def turno_llamar(id):
         db.session.commit()
         
         # Emitir notificación en tiempo real via SocketIO
-        print(f"[SOCKETIO] Emitiendo evento 'llamar_turno' (llamado #{numero_llamado}) para turno {turno.numero_turno}")
+        logger.debug('Emitiendo llamar_turno (llamado #%s) para turno %s', numero_llamado, turno.numero_turno)
         socketio.emit('llamar_turno', {
             'turno': turno.to_dict(),
             'notificacion': notificacion.to_dict()
@@ -930,3 +1036,127 @@ def turno_finalizar(id):
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 500
+
+
+# ===== MÉTRICAS =====
+
+@admin_bp.route('/metricas/cache-cedulas')
+@login_required
+@superadmin_required
+def metricas_cache_cedulas():
+    """Contadores y tasas de acierto de la caché de cédulas"""
+    from app.cache_cedulas import cache_cedulas
+    return jsonify(cache_cedulas.estadisticas())
+
+
+@admin_bp.route('/consultas-lentas')
+@login_required
+@superadmin_required
+def consultas_lentas():
+    """Sentencias SQL lentas ordenadas por tiempo total, con su plan de ejecución"""
+    from app.consultas_lentas import procesar_pendientes, registro
+    procesar_pendientes()
+    return render_template('admin/consultas_lentas.html', sentencias=registro.ranking(),
+                           umbral=current_app.config['CONSULTAS_LENTAS_UMBRAL_MS'])
+
+
+@admin_bp.route('/consultas-lentas/reiniciar', methods=['POST'])
+@login_required
+@superadmin_required
+def consultas_lentas_reiniciar():
+    """Vacía el ranking de consultas lentas (el log rotativo se conserva)"""
+    from app.consultas_lentas import registro
+    registro.reiniciar()
+    return jsonify({'success': True})
+
+
+@admin_bp.route('/perfilador')
+@login_required
+@superadmin_required
+def perfilador():
+    """Estado del perfilador de peticiones y perfiles capturados"""
+    from app.perfilador import perfilador as perfilador_peticiones
+    return render_template('admin/perfilador.html', estado=perfilador_peticiones.estado(),
+                           perfiles=list(perfilador_peticiones.perfiles))
+
+
+@admin_bp.route('/perfilador/activar', methods=['POST'])
+@login_required
+@superadmin_required
+def perfilador_activar():
+    """Activa la captura de una fracción de las peticiones (opcionalmente de una ruta)"""
+    from app.perfilador import perfilador as perfilador_peticiones
+    datos = request.get_json(silent=True) or {}
+    try:
+        perfilador_peticiones.activar(
+            current_app._get_current_object(),
+            ruta=(datos.get('ruta') or '').strip() or None,
+            fraccion=float(datos.get('fraccion') or 1),
+            capturas=int(datos.get('capturas') or 10),
+            minutos=int(datos.get('minutos') or 0) or None
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify({'success': True, 'estado': perfilador_peticiones.estado()})
+
+
+@admin_bp.route('/perfilador/desactivar', methods=['POST'])
+@login_required
+@superadmin_required
+def perfilador_desactivar():
+    """Detiene la captura y retira el middleware"""
+    from app.perfilador import perfilador as perfilador_peticiones
+    perfilador_peticiones.desactivar()
+    return jsonify({'success': True, 'estado': perfilador_peticiones.estado()})
+
+
+@admin_bp.route('/perfilador/<identificador>/descargar')
+@login_required
+@superadmin_required
+def perfilador_descargar(identificador):
+    """Descarga el archivo speedscope de una captura"""
+    from flask import send_from_directory
+    from app.perfilador import perfilador as perfilador_peticiones
+    perfil = perfilador_peticiones.perfil(identificador)
+    if perfil is None:
+        abort(404)
+    return send_from_directory(current_app.config['PERFILADOR_DIRECTORIO'], perfil['archivo'],
+                               as_attachment=True, mimetype='application/json')
+
+
+# ===== SIMULADOR =====
+
+@admin_bp.route('/simulador')
+@login_required
+@superadmin_required
+def simulador():
+    """Página del simulador de atención con el perfil de demanda actual"""
+    from app.simulador import POLITICAS, MODOS, cargar_perfil, ventanillas_actuales
+    perfil = cargar_perfil()
+    ventanillas = ventanillas_actuales()
+    resumen = perfil.resumen()
+    for tramite in resumen['tramites']:
+        tramite['ventanillas'] = ventanillas.get(tramite['id'], 1)
+    return render_template('admin/simulador.html', resumen=resumen, politicas=POLITICAS, modos=MODOS)
+
+
+@admin_bp.route('/simulador/ejecutar', methods=['POST'])
+@login_required
+@superadmin_required
+def simulador_ejecutar():
+    """Ejecuta una simulación con las ventanillas y la política indicadas"""
+    from app.simulador import cargar_perfil, recomendar_ventanillas, simular
+    datos = request.get_json(silent=True) or {}
+    try:
+        perfil = cargar_perfil(int(datos.get('historia') or 0) or None)
+        ventanillas = {int(t): int(c) for t, c in (datos.get('ventanillas') or {}).items()}
+        dias = int(datos.get('dias') or 0) or None
+        semilla = datos.get('semilla')
+        politica = datos.get('politica', 'prioridad')
+        resultado = simular(perfil, ventanillas, politica, datos.get('modo', 'remuestreo'), dias, semilla)
+        if datos.get('objetivo_p90'):
+            resultado['recomendadas'] = recomendar_ventanillas(
+                perfil, float(datos['objetivo_p90']), politica, dias, semilla)
+        return jsonify({'success': True, 'resultado': resultado})
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
@@ -9,9 +9,17 @@ from flask import Blueprint, render_template, request, jsonify, redirect, url_fo
 from flask_login import login_user, logout_user, login_required, current_user
 from app.models import db, Empleado, Usuario, Turno, TipoTramite, Notificacion
 from datetime import datetime, timedelta
-from sqlalchemy import func, and_
+from sqlalchemy import func
 from app import socketio
+from app.replica import solo_lectura
+from app.archivo import turnos_en_rango
+from app.cache_identidad import tramites_ids_actuales
+from app.mensajeria import mensajeria
+from app.enrutamiento import empleado_id_de, siguiente_turno as asignar_siguiente_turno
 from flask_socketio import emit
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 # Crear blueprint para las rutas de empleado
@@ -48,17 +56,13 @@ def login():
             if usuario_sistema.empleado and usuario_sistema.empleado.activo:
                 # Login con el objeto Empleado
                 empleado = usuario_sistema.empleado
-                print(f"[DEBUG LOGIN] UsuarioSistema ID: {usuario_sistema.id}")
-                print(f"[DEBUG LOGIN] Empleado ID: {empleado.id}")
-                print(f"[DEBUG LOGIN] Empleado get_id(): {empleado.get_id()}")
-                print(f"[DEBUG LOGIN] Empleado type: {type(empleado)}")
                 
-                login_user(empleado)
+                # Guardar el hash actualizado si la contraseña se re-encriptó
+                if db.session.is_modified(usuario_sistema):
+                    db.session.commit()
                 
-                print(f"[DEBUG LOGIN] Después de login_user")
-                print(f"[DEBUG LOGIN] current_user.id: {current_user.id}")
-                print(f"[DEBUG LOGIN] current_user.get_id(): {current_user.get_id()}")
-                print(f"[DEBUG LOGIN] current_user type: {type(current_user)}")
+                login_user(empleado)
+                logger.debug('Inicio de sesión: usuario_sistema=%s empleado=%s', usuario_sistema.id, empleado.id)
                 
                 if request.is_json:
                     return jsonify({
@@ -100,17 +104,8 @@ def dashboard():
     Muestra los turnos pendientes organizados por categoría.
     Solo muestra turnos de los trámites asignados al empleado actual.
     """
-    print(f"[DEBUG] ===== DASHBOARD EMPLEADO CARGADO =====")
-    print(f"[DEBUG] Current user: {current_user}")
-    print(f"[DEBUG] Current user type: {type(current_user)}")
-    print(f"[DEBUG] Current user nombre: {current_user.nombre if hasattr(current_user, 'nombre') else 'N/A'}")
-    print(f"[DEBUG] Tiene empleado attr: {hasattr(current_user, 'empleado')}")
-    print(f"[DEBUG] Tiene tramites_asignados attr: {hasattr(current_user, 'tramites_asignados')}")
-    
-    if hasattr(current_user, 'tramites_asignados'):
-        print(f"[DEBUG] Trámites asignados: {[t.nombre for t in current_user.tramites_asignados]}")
-    
-    print(f"[DEBUG] ========================================")
+    # IDs de trámites asignados desde la caché de identidad (sin consultas extra)
+    tramites_ids = tramites_ids_actuales()
     
     # Obtener turnos pendientes de hoy, ordenados por categoría (prioridad)
     hoy = datetime.utcnow().date()
@@ -130,14 +125,11 @@ def dashboard():
     )
     
     # Solo filtrar por trámites si tiene asignados y la lista no está vacía
-    if current_user.tramites_asignados and len(current_user.tramites_asignados) > 0:
-        tramites_ids = [t.id for t in current_user.tramites_asignados]
+    if tramites_ids:
         turnos_pendientes = query_base.filter(Turno.tipo_tramite_id.in_(tramites_ids)).all()
-        print(f"[DEBUG] Filtrando turnos por trámites: {tramites_ids}")
     else:
         # Si no tiene trámites asignados, mostrar todos los turnos
         turnos_pendientes = query_base.all()
-        print(f"[DEBUG] Sin trámites asignados, mostrando todos los turnos")
     
     # Ordenar turnos por prioridad de categoría
     turnos_pendientes.sort(key=lambda t: orden_categoria.get(t.categoria_atencion, 5))
@@ -159,18 +151,15 @@ def dashboard():
     stats_query_base = Turno.query.filter(func.date(Turno.fecha_solicitud) == hoy)
     
     # Solo filtrar por trámites si tiene asignados
-    if current_user.tramites_asignados and len(current_user.tramites_asignados) > 0:
-        tramites_ids = [t.id for t in current_user.tramites_asignados]
+    if tramites_ids:
         stats_query_base = stats_query_base.filter(Turno.tipo_tramite_id.in_(tramites_ids))
-        print(f"[DEBUG] Filtrando estadísticas por trámites: {tramites_ids}")
-    else:
-        print(f"[DEBUG] Sin trámites asignados, mostrando todas las estadísticas")
     
     total_hoy = stats_query_base.count()
     atendidos_hoy = stats_query_base.filter(Turno.estado == 'atendido').count()
     pendientes_hoy = stats_query_base.filter(Turno.estado == 'pendiente').count()
     
-    print(f"[DEBUG] Estadísticas - Total: {total_hoy}, Atendidos: {atendidos_hoy}, Pendientes: {pendientes_hoy}")
+    logger.debug('Dashboard de %s: trámites=%s total=%s atendidos=%s pendientes=%s',
+                 current_user.get_id(), tramites_ids or 'todos', total_hoy, atendidos_hoy, pendientes_hoy)
     
     # Calcular tiempo promedio de atención
     turnos_atendidos = stats_query_base.filter(
@@ -203,8 +192,7 @@ def dashboard():
 @login_required
 def test():
     """Página de prueba simple"""
-    print("[TEST] Página de prueba cargada")
-    print(f"[TEST] Usuario: {current_user.nombre}")
+    logger.debug('Página de prueba cargada por %s', current_user.get_id())
     return render_template('empleado/test.html')
 
 
@@ -221,25 +209,25 @@ def cambiar_estado_turno(turno_id):
         JSON con el resultado de la operación
     """
     data = request.get_json()
-    print(f"[DEBUG] Datos recibidos para cambiar estado: {data}")
-    print(f"[DEBUG] Turno ID: {turno_id}")
     
     nuevo_estado = data.get('estado')
     observaciones = data.get('observaciones', '')
     
     # Validar estado
-    estados_validos = ['pendiente', 'en_atencion', 'atendido', 'cancelado']
+    estados_validos = ['pendiente', 'en_atencion', 'atendido', 'cancelado', 'no_presentado']
     if nuevo_estado not in estados_validos:
-        print(f"[ERROR] Estado no válido: {nuevo_estado}")
         return jsonify({'error': 'Estado no válido'}), 400
     
     turno = Turno.query.get_or_404(turno_id)
-    print(f"[DEBUG] Turno encontrado: {turno.numero_turno}, estado actual: {turno.estado}")
+    logger.debug('Turno %s: %s -> %s', turno.numero_turno, turno.estado, nuevo_estado)
     
     try:
         # Actualizar estado
         turno.estado = nuevo_estado
-        print(f"[DEBUG] Estado cambiado a: {nuevo_estado}")
+        
+        # Registrar quién toma el turno (carga del empleado para el enrutamiento)
+        if nuevo_estado == 'en_atencion':
+            turno.empleado_id = empleado_id_de(current_user._get_current_object())
         
         # Si se marca como atendido, registrar fecha y empleado
         if nuevo_estado == 'atendido':
@@ -249,48 +237,39 @@ def cambiar_estado_turno(turno_id):
             from app.models import UsuarioSistema
             empleado_id = None
             
-            print(f"[DEBUG] Current user type: {type(current_user._get_current_object())}")
-            print(f"[DEBUG] Current user: {current_user}")
-            
             if isinstance(current_user._get_current_object(), UsuarioSistema):
                 # Si es UsuarioSistema, obtener el empleado vinculado
                 if current_user.empleado:
                     empleado_id = current_user.empleado.id
-                    print(f"[DEBUG] Es UsuarioSistema con empleado_id: {empleado_id}")
                 else:
-                    print(f"[ERROR] UsuarioSistema {current_user.email} no tiene empleado vinculado")
+                    logger.warning('UsuarioSistema %s no tiene empleado vinculado', current_user.email)
                     return jsonify({'error': 'Usuario no vinculado a un empleado'}), 500
             else:
                 # Si es Empleado directamente
                 empleado_id = current_user.id
-                print(f"[DEBUG] Es Empleado con ID: {empleado_id}")
             
             # Verificar que el empleado existe en la BD
             empleado_check = Empleado.query.get(empleado_id)
             if not empleado_check:
-                print(f"[ERROR] Empleado con ID {empleado_id} NO existe en la BD")
+                logger.error('Empleado con ID %s no existe en la BD', empleado_id)
                 return jsonify({'error': f'Error: Empleado con ID {empleado_id} no existe'}), 500
             
             turno.empleado_id = empleado_id
-            print(f"[DEBUG] Turno atendido por empleado ID: {empleado_id} ({empleado_check.nombre})")
         
         # Agregar observaciones si existen
         if observaciones:
             turno.observaciones = observaciones
-            print(f"[DEBUG] Observaciones agregadas: {observaciones}")
         
         db.session.commit()
-        print(f"[SUCCESS] Turno actualizado correctamente en BD")
         
         # Convertir turno a dict
         turno_dict = turno.to_dict()
-        print(f"[DEBUG] Turno convertido a dict: {turno_dict}")
         
         # Emitir evento de actualización de turno
-        print(f"[SOCKETIO] Emitiendo evento 'turno_actualizado' para turno {turno.numero_turno}")
         socketio.emit('turno_actualizado', {
             'turno': turno_dict
         })
+        logger.debug('Evento turno_actualizado emitido para turno %s', turno.numero_turno, extra={'datos': turno_dict})
         
         return jsonify({
             'success': True,
@@ -301,12 +280,41 @@ def cambiar_estado_turno(turno_id):
     except Exception as e:
         db.session.rollback()
         error_msg = f'Error al actualizar turno: {str(e)}'
-        print(f"[ERROR] {error_msg}")
-        import traceback
-        print(traceback.format_exc())
+        logger.exception(error_msg)
         return jsonify({'error': error_msg}), 500
 
 
+@empleado_bp.route('/siguiente-turno', methods=['POST'])
+@login_required
+def siguiente_turno():
+    """
+    Asigna al empleado actual el siguiente turno según el motor de
+    enrutamiento (prioridad de categoría, presión por trámite y antigüedad)
+    y lo pasa a 'en_atencion'.
+    
+    Returns:
+        JSON con el turno asignado, o 404 si no hay turnos pendientes
+    """
+    empleado_id = empleado_id_de(current_user._get_current_object())
+    if empleado_id is None:
+        return jsonify({'error': 'Usuario no vinculado a un empleado'}), 400
+    
+    turno = asignar_siguiente_turno(empleado_id, tramites_ids_actuales())
+    if turno is None:
+        return jsonify({'error': 'No hay turnos pendientes en sus trámites'}), 404
+    
+    turno_dict = turno.to_dict()
+    socketio.emit('turno_actualizado', {
+        'turno': turno_dict
+    })
+    
+    return jsonify({
+        'success': True,
+        'mensaje': f'Turno {turno.numero_turno} asignado',
+        'turno': turno_dict
+    })
+
+
 @empleado_bp.route('/turno/<int:turno_id>/llamar', methods=['POST'])
 @login_required
 def llamar_turno(turno_id):
@@ -340,10 +348,15 @@ def llamar_turno(turno_id):
         )
         
         db.session.add(notificacion)
+        db.session.flush()
+        
+        # Entregas por SMS, e-mail y WhatsApp (se envían en segundo plano)
+        entregas = mensajeria.preparar(turno, notificacion)
         db.session.commit()
+        mensajeria.encolar(entregas)
         
         # Emitir notificación en tiempo real
-        print(f"[SOCKETIO] Emitiendo evento 'llamar_turno' (llamado #{numero_llamado}) para turno {turno.numero_turno}")
+        logger.debug('Emitiendo llamar_turno (llamado #%s) para turno %s', numero_llamado, turno.numero_turno)
         socketio.emit('llamar_turno', {
             'turno': turno.to_dict(),
             'notificacion': notificacion.to_dict()
@@ -372,6 +385,7 @@ def estadisticas():
 
 @empleado_bp.route('/obtener-estadisticas', methods=['POST'])
 @login_required
+@solo_lectura
 def obtener_estadisticas():
     """
     Obtiene estadísticas de atención filtradas por fecha.
@@ -394,13 +408,8 @@ def obtener_estadisticas():
     if fecha_inicio > fecha_fin:
         return jsonify({'error': 'La fecha de inicio debe ser menor o igual a la fecha final'}), 400
     
-    # Consultar turnos en el rango de fechas
-    turnos = Turno.query.filter(
-        and_(
-            func.date(Turno.fecha_solicitud) >= fecha_inicio,
-            func.date(Turno.fecha_solicitud) <= fecha_fin
-        )
-    ).all()
+    # Consultar turnos en el rango de fechas (operativos y archivados)
+    turnos = turnos_en_rango(fecha_inicio, fecha_fin)
     
     # Calcular estadísticas
     total_turnos = len(turnos)
@@ -410,7 +419,8 @@ def obtener_estadisticas():
         'atendido': 0,
         'pendiente': 0,
         'cancelado': 0,
-        'en_atencion': 0
+        'en_atencion': 0,
+        'no_presentado': 0
     }
     
     # Turnos por categoría
@@ -462,6 +472,7 @@ def obtener_estadisticas():
 
 @empleado_bp.route('/turnos-lista')
 @login_required
+@solo_lectura
 def turnos_lista():
     """
     Obtiene la lista de todos los turnos con filtros opcionales.
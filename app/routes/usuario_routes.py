@@ -5,11 +5,22 @@ Este archivo contiene todas las rutas y lógica para las funcionalidades
 que los usuarios utilizan para solicitar turnos y ver su historial.
 """
 
-from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for
-from app.models import db, Usuario, TipoTramite, Turno, Notificacion
-from datetime import datetime
+from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for, abort, current_app
+from flask_login import login_required
+from app.models import db, Usuario, TipoTramite, Turno, Notificacion, Cita
+from app.archivo import obtener_turno, turnos_de_usuario
+from app.cache_cedulas import cache_cedulas
+from app.citas import CitaNoDisponible, cancelar_cita, dias_disponibles, franjas_disponibles, reservar_cita
+from app.enrutamiento import proponer_turnos
+from app.idempotencia import (ClaveInvalida, ClaveReutilizada, clave_de_peticion, huella_de,
+                              registrar_clave, turno_id_previo)
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
 from app import socketio
 from flask_socketio import emit
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 # Crear blueprint para las rutas de usuario
@@ -70,13 +81,13 @@ def consultar_cedula():
     if not cedula:
         return jsonify({'error': 'Debe proporcionar un número de cédula'}), 400
     
-    # Buscar usuario en la base de datos
-    usuario = Usuario.query.filter_by(cedula=cedula).first()
+    # Buscar usuario (caché de cédulas y, si hace falta, base de datos)
+    usuario = cache_cedulas.buscar(cedula)
     
     if usuario:
         return jsonify({
             'existe': True,
-            'usuario': usuario.to_dict()
+            'usuario': usuario
         })
     else:
         return jsonify({
@@ -94,19 +105,18 @@ def registrar_usuario():
         JSON con el resultado del registro
     """
     data = request.get_json()
-    print(f"[DEBUG] Datos recibidos para registro: {data}")
     
     # Validar datos requeridos
     cedula = data.get('cedula', '').strip()
     nombre = data.get('nombre', '').strip()
     
     if not cedula or not nombre:
-        print(f"[ERROR] Datos incompletos - Cédula: {cedula}, Nombre: {nombre}")
+        logger.info('Registro rechazado: datos incompletos')
         return jsonify({'error': 'Cédula y nombre son obligatorios'}), 400
     
-    # Verificar si el usuario ya existe
-    if Usuario.query.filter_by(cedula=cedula).first():
-        print(f"[ERROR] Usuario ya existe con cédula: {cedula}")
+    # Verificar si el usuario ya existe (sin consultar si la cédula es definitivamente nueva)
+    if cache_cedulas.puede_existir(cedula) and Usuario.query.filter_by(cedula=cedula).first():
+        logger.info('Registro rechazado: la cédula %s ya existe', cedula)
         return jsonify({'error': 'Ya existe un usuario con esta cédula'}), 400
     
     try:
@@ -119,17 +129,24 @@ def registrar_usuario():
             categoria=data.get('categoria', 'ninguna')
         )
         
-        print(f"[DEBUG] Agregando usuario a la sesión: {nuevo_usuario}")
         db.session.add(nuevo_usuario)
         db.session.commit()
-        print(f"[SUCCESS] Usuario registrado exitosamente: ID={nuevo_usuario.id}")
+        logger.debug('Usuario registrado: id=%s', nuevo_usuario.id)
         
         return jsonify({
             'success': True,
             'mensaje': 'Usuario registrado exitosamente',
-            'usuario': nuevo_usuario.to_dict()
+            'usuario': cache_cedulas.actualizar(nuevo_usuario)
         })
     
+    except IntegrityError:
+        # Registrada en paralelo (o el filtro de Bloom estaba desactualizado)
+        db.session.rollback()
+        existente = Usuario.query.filter_by(cedula=cedula).first()
+        if existente:
+            cache_cedulas.actualizar(existente)
+        return jsonify({'error': 'Ya existe un usuario con esta cédula'}), 400
+    
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Error al registrar usuario: {str(e)}'}), 500
@@ -150,14 +167,15 @@ def seleccionar_categoria():
     if not cedula or not categoria:
         return jsonify({'error': 'Datos incompletos'}), 400
     
-    usuario = Usuario.query.filter_by(cedula=cedula).first()
+    usuario = cache_cedulas.buscar(cedula)
     if not usuario:
         return jsonify({'error': 'Usuario no encontrado'}), 404
     
-    # Actualizar categoría si es diferente
-    if usuario.categoria != categoria:
-        usuario.categoria = categoria
+    # Actualizar categoría si es diferente (una sola sentencia UPDATE)
+    if usuario['categoria'] != categoria:
+        Usuario.query.filter_by(cedula=cedula).update({'categoria': categoria})
         db.session.commit()
+        cache_cedulas.descartar(cedula)
     
     return jsonify({
         'success': True,
@@ -166,10 +184,93 @@ def seleccionar_categoria():
     })
 
 
+def _respuesta_turno(turno, turno_dict=None):
+    """
+    Guarda el turno en la sesión del navegador y arma la respuesta JSON.
+    
+    Returns:
+        JSON de respuesta con los datos del turno asignado
+    """
+    # Guardar turno en sesión para seguimiento
+    session['turno_actual'] = turno.id
+    
+    return jsonify({
+        'success': True,
+        'mensaje': 'Turno asignado exitosamente',
+        'turno': turno_dict or turno.to_dict(),
+        'redirect': url_for('usuario.historial', turno_id=turno.id)
+    })
+
+
+def _notificar_nuevo_turno(turno):
+    """
+    Avisa a los empleados del nuevo turno y responde al kiosco.
+    
+    Returns:
+        JSON de respuesta con los datos del turno asignado
+    """
+    turno_dict = turno.to_dict()
+    
+    # Emitir evento de nuevo turno a los empleados
+    socketio.emit('nuevo_turno', {
+        'turno': turno_dict
+    }, namespace='/')
+    logger.debug('Evento nuevo_turno emitido para turno %s', turno.numero_turno, extra={'datos': turno_dict})
+    
+    # Proponer el turno al empleado libre más adecuado
+    proponer_turnos([turno_dict])
+    
+    return _respuesta_turno(turno, turno_dict)
+
+
+def _turno_ya_emitido(clave, huella):
+    """
+    Si la petición es un reintento con una clave de idempotencia conocida,
+    devuelve la respuesta con el turno original (sin volver a notificar).
+    
+    Returns:
+        Respuesta JSON, o None si hay que emitir un turno nuevo
+    """
+    if not clave:
+        return None
+    
+    turno_id = turno_id_previo(clave, huella)
+    if turno_id is None:
+        return None
+    
+    turno = obtener_turno(turno_id)
+    if turno is None:
+        return None
+    
+    respuesta = _respuesta_turno(turno)
+    respuesta.headers['Idempotent-Replayed'] = 'true'
+    return respuesta
+
+
+def _nuevo_turno(tipo_tramite, categoria, **usuario):
+    """
+    Crea (sin confirmar) un turno pendiente.
+    El usuario se indica con usuario=<Usuario> o usuario_id=<id>.
+    """
+    hoy = datetime.utcnow().date()
+    nuevo_turno = Turno(
+        numero_turno=Turno.generar_numero_turno(categoria, hoy),
+        fecha_numero=hoy,
+        **usuario,
+        tipo_tramite_id=tipo_tramite.id,
+        categoria_atencion=categoria,
+        estado='pendiente',
+        llamados_realizados=0
+    )
+    db.session.add(nuevo_turno)
+    return nuevo_turno
+
+
 @usuario_bp.route('/asignar-turno', methods=['POST'])
 def asignar_turno():
     """
     Asigna un turno al usuario según el trámite seleccionado y su categoría.
+    Admite el encabezado Idempotency-Key para reintentos seguros.
     
     Returns:
         JSON con los datos del turno asignado
@@ -184,7 +285,13 @@ def asignar_turno():
     if not all([cedula, tipo_tramite_id, categoria]):
         return jsonify({'error': 'Datos incompletos'}), 400
     
-    usuario = Usuario.query.filter_by(cedula=cedula).first()
+    try:
+        clave = clave_de_peticion()
+    except ClaveInvalida as e:
+        return jsonify({'error': str(e)}), 400
+    huella = huella_de(data)
+    
+    usuario = cache_cedulas.buscar(cedula)
     if not usuario:
         return jsonify({'error': 'Usuario no encontrado'}), 404
     
@@ -197,47 +304,26 @@ def asignar_turno():
         max_reintentos = 3
         for intento in range(max_reintentos):
             try:
-                # Generar número de turno
-                numero_turno = Turno.generar_numero_turno(categoria)
+                # Reintento del kiosco: devolver el turno original
+                respuesta = _turno_ya_emitido(clave, huella)
+                if respuesta:
+                    return respuesta
                 
-                # Crear nuevo turno
-                nuevo_turno = Turno(
-                    numero_turno=numero_turno,
-                    usuario_id=usuario.id,
-                    tipo_tramite_id=tipo_tramite.id,
-                    categoria_atencion=categoria,
-                    estado='pendiente',
-                    llamados_realizados=0
-                )
-                
-                db.session.add(nuevo_turno)
+                nuevo_turno = _nuevo_turno(tipo_tramite, categoria, usuario_id=usuario['id'])
+                if clave:
+                    registrar_clave(clave, huella, nuevo_turno)
                 db.session.commit()
                 
-                # Guardar turno en sesión para seguimiento
-                session['turno_actual'] = nuevo_turno.id
-                
-                # Emitir evento de nuevo turno a los empleados
-                print(f"[SOCKETIO] Emitiendo evento 'nuevo_turno' para turno {nuevo_turno.numero_turno}")
-                print(f"[SOCKETIO] Tipo de trámite ID: {nuevo_turno.tipo_tramite_id}")
-                print(f"[SOCKETIO] Datos del turno: {nuevo_turno.to_dict()}")
-                
-                socketio.emit('nuevo_turno', {
-                    'turno': nuevo_turno.to_dict()
-                }, namespace='/')
-                
-                print(f"[SOCKETIO] Evento emitido exitosamente")
-                
-                return jsonify({
-                    'success': True,
-                    'mensaje': 'Turno asignado exitosamente',
-                    'turno': nuevo_turno.to_dict(),
-                    'redirect': url_for('usuario.historial', turno_id=nuevo_turno.id)
-                })
+                return _notificar_nuevo_turno(nuevo_turno)
+            
+            except ClaveReutilizada as e:
+                db.session.rollback()
+                return jsonify({'error': str(e)}), 422
                 
-            except Exception as e:
+            except IntegrityError as e:
                 db.session.rollback()
-                # Si es error de clave duplicada y no es el último intento, reintentar
-                if 'UNIQUE constraint failed' in str(e) and intento < max_reintentos - 1:
+                # Número de turno o clave duplicados: reintentar si no es el último intento
+                if intento < max_reintentos - 1:
                     continue
                 else:
                     raise e
@@ -250,6 +336,217 @@ def asignar_turno():
         return jsonify({'error': f'Error al asignar turno: {str(e)}'}), 500
 
 
+@usuario_bp.route('/emitir-turno', methods=['POST'])
+def emitir_turno():
+    """
+    Emite un turno en una sola petición para los kioscos: registra al usuario
+    si no existe (o actualiza sus datos), fija su categoría y crea el turno,
+    todo en una única transacción.
+    
+    Espera JSON con cedula, tipo_tramite_id y categoria. Para usuarios nuevos
+    también nombre (telefono y email opcionales). Admite el encabezado
+    Idempotency-Key para que los reintentos devuelvan el turno original.
+    
+    Returns:
+        JSON con los datos del turno asignado (mismo formato que asignar-turno)
+    """
+    data = request.get_json() or {}
+    
+    cedula = str(data.get('cedula') or '').strip()
+    tipo_tramite_id = data.get('tipo_tramite_id')
+    categoria = data.get('categoria')
+    nombre = (data.get('nombre') or '').strip()
+    telefono = (data.get('telefono') or '').strip()
+    email = (data.get('email') or '').strip()
+    
+    # Validaciones
+    if not all([cedula, tipo_tramite_id, categoria]):
+        return jsonify({'error': 'Datos incompletos'}), 400
+    if categoria not in Turno.PREFIJOS:
+        return jsonify({'error': 'Categoría no válida'}), 400
+    
+    try:
+        clave = clave_de_peticion()
+    except ClaveInvalida as e:
+        return jsonify({'error': str(e)}), 400
+    huella = huella_de(data)
+    
+    tipo_tramite = TipoTramite.query.get(tipo_tramite_id)
+    if not tipo_tramite:
+        return jsonify({'error': 'Tipo de trámite no válido'}), 404
+    
+    max_reintentos = 3
+    for intento in range(max_reintentos):
+        try:
+            # Reintento del kiosco: devolver el turno original
+            respuesta = _turno_ya_emitido(clave, huella)
+            if respuesta:
+                return respuesta
+            
+            # En el primer intento se evita la consulta si la cédula es definitivamente nueva
+            usuario = None
+            if intento > 0 or cache_cedulas.puede_existir(cedula):
+                usuario = Usuario.query.filter_by(cedula=cedula).first()
+            
+            if not usuario:
+                if not nombre:
+                    return jsonify({
+                        'error': 'Usuario no encontrado. El nombre es obligatorio para registrarse.',
+                        'requiere_registro': True
+                    }), 400
+                usuario = Usuario(cedula=cedula, nombre=nombre, telefono=telefono, email=email)
+                db.session.add(usuario)
+            else:
+                # Actualizar solo los datos enviados
+                if nombre:
+                    usuario.nombre = nombre
+                if telefono:
+                    usuario.telefono = telefono
+                if email:
+                    usuario.email = email
+            
+            usuario.categoria = categoria
+            nuevo_turno = _nuevo_turno(tipo_tramite, categoria, usuario=usuario)
+            if clave:
+                registrar_clave(clave, huella, nuevo_turno)
+            db.session.commit()
+            cache_cedulas.actualizar(usuario)
+            
+            return _notificar_nuevo_turno(nuevo_turno)
+        
+        except ClaveReutilizada as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 422
+        
+        except IntegrityError:
+            # Número de turno, cédula o clave registrados en paralelo: repetir la transacción completa
+            db.session.rollback()
+            if intento == max_reintentos - 1:
+                return jsonify({'error': 'No se pudo generar un número de turno único. Intente nuevamente.'}), 500
+        
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': f'Error al emitir turno: {str(e)}'}), 500
+
+
+@usuario_bp.route('/asignar-turnos-lote', methods=['POST'])
+@login_required
+def asignar_turnos_lote():
+    """
+    Emite varios turnos en una sola transacción (grupos escolares, programas
+    de adulto mayor, listas pre-registradas).
+    
+    Espera JSON {"turnos": [{"cedula", "tipo_tramite_id", "categoria", "nombre"?}, ...]}.
+    Los usuarios que no existen se registran si la entrada incluye nombre.
+    Si alguna entrada es inválida no se emite ningún turno.
+    
+    Returns:
+        JSON con los turnos asignados, en el mismo orden de las entradas
+    """
+    data = request.get_json() or {}
+    entradas = data.get('turnos')
+    
+    if not isinstance(entradas, list) or not entradas:
+        return jsonify({'error': 'Se espera una lista "turnos" con al menos una entrada'}), 400
+    
+    maximo = current_app.config['LOTE_TURNOS_MAXIMO']
+    if len(entradas) > maximo:
+        return jsonify({'error': f'El lote no puede superar {maximo} turnos'}), 400
+    
+    # Normalizar cédulas e IDs de trámite
+    for entrada in entradas:
+        if isinstance(entrada, dict):
+            entrada['cedula'] = str(entrada.get('cedula') or '').strip()
+            try:
+                entrada['tipo_tramite_id'] = int(entrada.get('tipo_tramite_id'))
+            except (TypeError, ValueError):
+                entrada['tipo_tramite_id'] = None
+    
+    # Cargar trámites y usuarios del lote con una consulta cada uno
+    cedulas = {e['cedula'] for e in entradas if isinstance(e, dict)}
+    tramites_ids = {e['tipo_tramite_id'] for e in entradas if isinstance(e, dict)}
+    tramites = {t.id: t for t in TipoTramite.query.filter(TipoTramite.id.in_(tramites_ids), TipoTramite.activo == True).all()}
+    usuarios = {u.cedula: u for u in Usuario.query.filter(Usuario.cedula.in_(cedulas)).all()}
+    
+    # Validar todas las entradas antes de emitir
+    errores = []
+    for indice, entrada in enumerate(entradas):
+        if not isinstance(entrada, dict):
+            errores.append({'indice': indice, 'error': 'Entrada inválida'})
+            continue
+        cedula = entrada['cedula']
+        if not all([cedula, entrada['tipo_tramite_id'], entrada.get('categoria')]):
+            errores.append({'indice': indice, 'error': 'Datos incompletos'})
+        elif entrada['categoria'] not in Turno.PREFIJOS:
+            errores.append({'indice': indice, 'error': 'Categoría no válida'})
+        elif entrada['tipo_tramite_id'] not in tramites:
+            errores.append({'indice': indice, 'error': 'Tipo de trámite no válido'})
+        elif cedula not in usuarios:
+            nombre = (entrada.get('nombre') or '').strip()
+            if not nombre:
+                errores.append({'indice': indice, 'error': 'Usuario no encontrado'})
+                continue
+            usuarios[cedula] = Usuario(
+                cedula=cedula,
+                nombre=nombre,
+                telefono=(entrada.get('telefono') or '').strip(),
+                email=(entrada.get('email') or '').strip(),
+                categoria=entrada['categoria']
+            )
+            db.session.add(usuarios[cedula])
+    
+    if errores:
+        db.session.rollback()
+        return jsonify({'error': 'El lote contiene entradas inválidas', 'errores': errores}), 400
+    
+    try:
+        # Reservar los números de cada categoría en un solo paso
+        por_categoria = {}
+        for entrada in entradas:
+            por_categoria[entrada['categoria']] = por_categoria.get(entrada['categoria'], 0) + 1
+        hoy = datetime.utcnow().date()
+        numeros = {categoria: iter(Turno.reservar_numeros(categoria, cantidad, hoy))
+                   for categoria, cantidad in por_categoria.items()}
+        
+        nuevos_turnos = [
+            Turno(
+                numero_turno=next(numeros[entrada['categoria']]),
+                fecha_numero=hoy,
+                usuario=usuarios[entrada['cedula']],
+                tipo_tramite=tramites[entrada['tipo_tramite_id']],
+                categoria_atencion=entrada['categoria'],
+                estado='pendiente',
+                llamados_realizados=0
+            )
+            for entrada in entradas
+        ]
+        db.session.add_all(nuevos_turnos)
+        db.session.flush()
+        
+        # Serializar antes del commit para no recargar cada turno después
+        turnos_dict = [turno.to_dict() for turno in nuevos_turnos]
+        db.session.commit()
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Error al asignar turnos: {str(e)}'}), 500
+    
+    for usuario in usuarios.values():
+        if usuario.id is not None:
+            cache_cedulas.actualizar(usuario)
+    
+    # Un solo evento para todo el lote
+    socketio.emit('turnos_lote', {'turnos': turnos_dict}, namespace='/')
+    logger.debug('Evento turnos_lote emitido con %s turnos', len(turnos_dict))
+    proponer_turnos(turnos_dict)
+    
+    return jsonify({
+        'success': True,
+        'mensaje': f'{len(turnos_dict)} turnos asignados exitosamente',
+        'turnos': turnos_dict
+    })
+
+
 @usuario_bp.route('/historial')
 @usuario_bp.route('/historial/<int:turno_id>')
 def historial(turno_id=None):
@@ -258,13 +555,15 @@ def historial(turno_id=None):
     Si se proporciona turno_id, muestra ese turno específico.
     """
     if turno_id:
-        turno = Turno.query.get_or_404(turno_id)
-        # Obtener todos los turnos del usuario
-        turnos = Turno.query.filter_by(usuario_id=turno.usuario_id).order_by(Turno.fecha_solicitud.desc()).all()
+        turno = obtener_turno(turno_id)
+        if not turno:
+            abort(404)
+        # Obtener todos los turnos del usuario (incluye los archivados)
+        turnos = turnos_de_usuario(turno.usuario_id)
     elif 'turno_actual' in session:
-        turno = Turno.query.get(session['turno_actual'])
+        turno = obtener_turno(session['turno_actual'])
         if turno:
-            turnos = Turno.query.filter_by(usuario_id=turno.usuario_id).order_by(Turno.fecha_solicitud.desc()).all()
+            turnos = turnos_de_usuario(turno.usuario_id)
         else:
             turno = None
             turnos = []
@@ -306,6 +605,33 @@ def marcar_notificacion_leida(notificacion_id):
     return jsonify({'success': True})
 
 
+@usuario_bp.route('/marcar-leidas/<int:turno_id>', methods=['POST'])
+def marcar_leidas(turno_id):
+    """
+    Marca como leídas todas las notificaciones pendientes de un turno con una
+    sola sentencia UPDATE. Si se envía {"hasta_id": N}, solo las de id <= N
+    (las que el navegador ya mostró).
+    
+    Returns:
+        JSON con la cantidad de notificaciones marcadas
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        data = {}
+    
+    consulta = Notificacion.query.filter_by(turno_id=turno_id, leida=False)
+    hasta_id = data.get('hasta_id')
+    if hasta_id is not None:
+        if isinstance(hasta_id, bool) or not str(hasta_id).isdigit() or int(hasta_id) < 1:
+            return jsonify({'error': 'hasta_id debe ser un entero positivo'}), 400
+        consulta = consulta.filter(Notificacion.id <= int(hasta_id))
+    
+    marcadas = consulta.update({Notificacion.leida: True}, synchronize_session=False)
+    db.session.commit()
+    
+    return jsonify({'success': True, 'marcadas': marcadas})
+
+
 @usuario_bp.route('/estado-turno/<int:turno_id>')
 def estado_turno(turno_id):
     """
@@ -314,5 +640,147 @@ def estado_turno(turno_id):
     Returns:
         JSON con los datos actualizados del turno
     """
-    turno = Turno.query.get_or_404(turno_id)
+    turno = obtener_turno(turno_id)
+    if not turno:
+        abort(404)
     return jsonify(turno.to_dict())
+
+
+@usuario_bp.route('/citas')
+def citas():
+    """
+    Página para reservar, consultar y cancelar citas con franja horaria.
+    """
+    tipos_tramite = TipoTramite.query.filter_by(activo=True).all()
+    return render_template('usuario/citas.html', tipos_tramite=tipos_tramite)
+
+
+def _tramite_de_peticion():
+    tipo_tramite = TipoTramite.query.get(request.args.get('tipo_tramite_id', type=int) or 0)
+    if not tipo_tramite or not tipo_tramite.activo:
+        abort(404)
+    return tipo_tramite
+
+
+def _fecha_en_periodo(fecha):
+    """True si la fecha está entre hoy y el último día que se puede reservar"""
+    hoy = datetime.utcnow().date()
+    return hoy <= fecha <= hoy + timedelta(days=current_app.config['CITAS_DIAS_ANTICIPACION'])
+
+
+@usuario_bp.route('/citas/dias')
+def citas_dias():
+    """
+    Días con cupos para un trámite (?tipo_tramite_id=N&desde=AAAA-MM-DD&dias=N).
+    
+    Returns:
+        JSON con la lista de días y sus cupos libres
+    """
+    tipo_tramite = _tramite_de_peticion()
+    try:
+        desde = datetime.strptime(request.args['desde'], '%Y-%m-%d').date() if request.args.get('desde') else None
+    except ValueError:
+        return jsonify({'error': 'Fecha no válida'}), 400
+    if desde and not _fecha_en_periodo(desde):
+        return jsonify({'error': 'La fecha está fuera del período de reserva'}), 400
+    return jsonify({'dias': dias_disponibles(tipo_tramite, desde, request.args.get('dias', type=int))})
+
+
+@usuario_bp.route('/citas/franjas')
+def citas_franjas():
+    """
+    Franjas con cupos de un trámite en un día (?tipo_tramite_id=N&fecha=AAAA-MM-DD).
+    
+    Returns:
+        JSON con la lista de franjas y sus cupos libres
+    """
+    tipo_tramite = _tramite_de_peticion()
+    try:
+        fecha = datetime.strptime(request.args.get('fecha', ''), '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'error': 'Fecha no válida'}), 400
+    if not _fecha_en_periodo(fecha):
+        return jsonify({'error': 'La fecha está fuera del período de reserva'}), 400
+    return jsonify({'franjas': franjas_disponibles(tipo_tramite, fecha)})
+
+
+@usuario_bp.route('/citas/reservar', methods=['POST'])
+def citas_reservar():
+    """
+    Reserva una cita. Espera JSON con cedula, tipo_tramite_id e inicio
+    ("AAAA-MM-DD HH:MM"); categoria es opcional (por defecto la del usuario).
+    
+    Returns:
+        JSON con los datos de la cita reservada
+    """
+    data = request.get_json() or {}
+    cedula = str(data.get('cedula') or '').strip()
+    categoria = data.get('categoria')
+    
+    if not all([cedula, data.get('tipo_tramite_id'), data.get('inicio')]):
+        return jsonify({'error': 'Datos incompletos'}), 400
+    if categoria and categoria not in Turno.PREFIJOS:
+        return jsonify({'error': 'Categoría no válida'}), 400
+    
+    try:
+        inicio = datetime.strptime(data['inicio'], '%Y-%m-%d %H:%M')
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Fecha y hora no válidas'}), 400
+    
+    tipo_tramite = TipoTramite.query.get(data['tipo_tramite_id'])
+    if not tipo_tramite or not tipo_tramite.activo:
+        return jsonify({'error': 'Tipo de trámite no válido'}), 404
+    
+    usuario = Usuario.query.filter_by(cedula=cedula).first()
+    if not usuario:
+        return jsonify({'error': 'Usuario no encontrado', 'requiere_registro': True}), 404
+    
+    try:
+        cita = reservar_cita(usuario, tipo_tramite, inicio, categoria)
+        db.session.commit()
+    except CitaNoDisponible as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 409
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'No se pudo reservar la cita. Intente nuevamente.'}), 500
+    
+    return jsonify({'success': True, 'mensaje': 'Cita reservada exitosamente', 'cita': cita.to_dict()})
+
+
+@usuario_bp.route('/citas/<codigo>')
+def citas_consultar(codigo):
+    """
+    Consulta una cita por su código (?cedula=N para verificar al titular).
+    
+    Returns:
+        JSON con los datos de la cita
+    """
+    cita = Cita.query.filter_by(codigo=codigo.upper()).first()
+    if not cita or cita.usuario.cedula != request.args.get('cedula', '').strip():
+        abort(404)
+    return jsonify(cita.to_dict())
+
+
+@usuario_bp.route('/citas/<codigo>/cancelar', methods=['POST'])
+def citas_cancelar(codigo):
+    """
+    Cancela una cita reservada y libera su cupo. Espera JSON con la cédula
+    del titular.
+    
+    Returns:
+        JSON con los datos de la cita cancelada
+    """
+    data = request.get_json() or {}
+    cita = Cita.query.filter_by(codigo=codigo.upper()).first()
+    if not cita or cita.usuario.cedula != str(data.get('cedula') or '').strip():
+        abort(404)
+    
+    try:
+        cancelar_cita(cita)
+        db.session.commit()
+    except CitaNoDisponible as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 409
+    
+    return jsonify({'success': True, 'mensaje': 'Cita cancelada', 'cita': cita.to_dict()})
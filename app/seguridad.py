@@ -0,0 +1,90 @@
+"""
+Encriptación y verificación de contraseñas fuera del bucle de eventos
+
+En producción la aplicación corre en un único worker de eventlet. PBKDF2 es
+CPU intensivo y, ejecutado en línea, congela todas las conexiones de
+Socket.IO mientras calcula el hash. Aquí el cálculo se envía al pool de hilos
+nativos del servidor asíncrono (eventlet.tpool / hub de gevent) y el
+greenlet que atiende el login espera sin bloquear a los demás.
+
+El método y costo del hash se configuran con PASSWORD_HASH_METODO. Cuando un
+usuario inicia sesión con un hash generado con otros parámetros, la
+contraseña se vuelve a encriptar con los actuales.
+"""
+
+from functools import lru_cache
+
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Método por defecto si no hay aplicación activa (mismo que werkzeug)
+METODO_POR_DEFECTO = 'pbkdf2:sha256:600000'
+
+
+def metodo_configurado():
+    """Método de hash configurado (ej: pbkdf2:sha256:600000, scrypt)"""
+    if has_app_context():
+        return current_app.config.get('PASSWORD_HASH_METODO', METODO_POR_DEFECTO)
+    return METODO_POR_DEFECTO
+
+
+def ejecutar_fuera_del_bucle(funcion, *args):
+    """
+    Ejecuta una función CPU intensiva en un hilo nativo y espera su resultado
+    cediendo el control al bucle de eventos.
+    Con el modo 'threading' cada petición ya tiene su propio hilo y la función
+    se ejecuta directamente.
+    """
+    from app import socketio
+
+    modo = getattr(socketio, 'async_mode', None)
+    if modo == 'eventlet':
+        from eventlet import tpool
+        return tpool.execute(funcion, *args)
+    if modo == 'gevent':
+        import gevent
+        return gevent.get_hub().threadpool.apply(funcion, args)
+    return funcion(*args)
+
+
+def configurar_pool(app):
+    """Ajusta el tamaño del pool de hilos nativos de eventlet"""
+    if app.config.get('PASSWORD_POOL_HILOS'):
+        try:
+            from eventlet import tpool
+        except ImportError:
+            return
+        tpool.set_num_threads(app.config['PASSWORD_POOL_HILOS'])
+
+
+@lru_cache(maxsize=8)
+def _prefijo_metodo(metodo):
+    """Prefijo que genera werkzeug para un método (ej: 'pbkdf2:sha256' -> 'pbkdf2:sha256:600000')"""
+    return generate_password_hash('', method=metodo).split('$', 1)[0]
+
+
+def generar_hash(password):
+    """Encripta una contraseña con el método configurado"""
+    return ejecutar_fuera_del_bucle(generate_password_hash, password, metodo_configurado())
+
+
+def verificar_password(usuario, password):
+    """
+    Verifica la contraseña de un UsuarioSistema o Empleado.
+    Si es correcta y el hash usa parámetros distintos a los configurados, se
+    actualiza usuario.password_hash (el llamador debe hacer commit).
+
+    Returns:
+        True si la contraseña es correcta
+    """
+    if not usuario.password_hash:
+        return False
+
+    valida = ejecutar_fuera_del_bucle(check_password_hash, usuario.password_hash, password)
+
+    if valida:
+        metodo = metodo_configurado()
+        if usuario.password_hash.split('$', 1)[0] != _prefijo_metodo(metodo):
+            usuario.password_hash = generar_hash(password)
+
+    return valida
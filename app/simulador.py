@@ -0,0 +1,358 @@
+"""
+Simulador de atención para planificar ventanillas
+
+Reproduce o remuestrea la demanda histórica de turnos (operativos y
+archivados) y simula la atención con distintas políticas de cola y cantidades
+de ventanillas por trámite, para responder preguntas como "¿cuántas
+ventanillas necesita cada trámite para que el 90% espere menos de 20 minutos?".
+
+- Llegadas: en modo 'remuestreo' se generan jornadas nuevas a partir de la
+  tasa histórica por (hora, trámite, categoría); en modo 'historico' se
+  reproducen las jornadas reales del período.
+- Tiempos de servicio: diferencia entre atenciones consecutivas de un mismo
+  empleado en el día (fecha_atencion); si un trámite tiene pocas muestras se
+  usa una exponencial con media TipoTramite.tiempo_estimado.
+- Cada trámite se simula como una cola con sus propias ventanillas y la
+  cola se vacía al final de cada jornada.
+
+Las muestras de cada jornada se generan por lotes (conteos de Poisson por
+hora, random.choices con k=n) antes de simular, de modo que un mes completo
+se simula en pocos segundos sin dependencias adicionales.
+"""
+
+import heapq
+import math
+import random
+import statistics
+from collections import Counter, defaultdict, namedtuple
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func, select, union_all
+
+from app.models import db, Turno, TurnoHistorico, TipoTramite, Empleado, empleado_tramites
+from app.enrutamiento import PRIORIDAD_CATEGORIA
+
+POLITICAS = ['prioridad', 'fifo', 'envejecimiento']
+MODOS = ['remuestreo', 'historico']
+
+# Muestras de servicio necesarias para usar la distribución empírica de un trámite
+MUESTRAS_MINIMAS = 20
+# Diferencias mayores entre atenciones consecutivas se consideran pausas, no servicio
+SERVICIO_MAXIMO_MINUTOS = 120
+
+Llegada = namedtuple('Llegada', 'minuto tipo_tramite_id categoria_atencion')
+
+
+def percentil(valores, p):
+    """Percentil simple (p entre 0 y 100) de una lista ya ordenada"""
+    if not valores:
+        return None
+    indice = min(len(valores) - 1, int(round(p / 100 * (len(valores) - 1))))
+    return round(valores[indice], 1)
+
+
+def _poisson(rng, media):
+    """Muestra de Poisson (Knuth para medias chicas, aproximación normal para grandes)"""
+    if media <= 0:
+        return 0
+    if media > 30:
+        return max(0, int(round(rng.gauss(media, math.sqrt(media)))))
+    limite, k, p = math.exp(-media), 0, rng.random()
+    while p > limite:
+        k += 1
+        p *= rng.random()
+    return k
+
+
+# ===== PERFIL DE DEMANDA =====
+
+class PerfilDemanda:
+    """
+    Demanda y tiempos de servicio observados en un período.
+
+    Atributos:
+        jornadas: Lista de jornadas reales, cada una lista de Llegada ordenada
+        tasas: {hora: {(tipo_tramite_id, categoria): llegadas promedio por jornada}}
+        servicios: {tipo_tramite_id: minutos de servicio observados}
+        tiempos_estimados: {tipo_tramite_id: TipoTramite.tiempo_estimado}
+        nombres: {tipo_tramite_id: nombre del trámite}
+    """
+
+    def __init__(self, jornadas, servicios, tiempos_estimados, nombres):
+        self.jornadas = jornadas
+        self.servicios = servicios
+        self.tiempos_estimados = tiempos_estimados
+        self.nombres = nombres
+
+        conteos = defaultdict(Counter)
+        for jornada in jornadas:
+            for llegada in jornada:
+                conteos[int(llegada.minuto // 60)][(llegada.tipo_tramite_id, llegada.categoria_atencion)] += 1
+        dias = max(1, len(jornadas))
+        self.tasas = {hora: {clave: n / dias for clave, n in claves.items()} for hora, claves in conteos.items()}
+
+    @property
+    def tramites(self):
+        return sorted({t for claves in self.tasas.values() for t, _ in claves})
+
+    @property
+    def minutos_jornada(self):
+        """Minutos entre la primera y la última hora con llegadas"""
+        if not self.tasas:
+            return 0
+        return (max(self.tasas) - min(self.tasas) + 1) * 60
+
+    def resumen(self):
+        return {
+            'jornadas': len(self.jornadas),
+            'llegadas_por_jornada': round(sum(sum(c.values()) for c in self.tasas.values()), 1),
+            'tramites': [{
+                'id': t,
+                'nombre': self.nombres.get(t, f'Trámite {t}'),
+                'muestras_servicio': len(self.servicios.get(t, [])),
+                'servicio_promedio': round(statistics.mean(self.servicios[t]), 1)
+                if len(self.servicios.get(t, [])) >= MUESTRAS_MINIMAS else self.tiempos_estimados.get(t, 15)
+            } for t in self.tramites]
+        }
+
+
+def cargar_perfil(dias_historia=None, hasta=None):
+    """
+    Lee los turnos de los últimos `dias_historia` días (sin incluir `hasta`,
+    por defecto hoy) y construye el PerfilDemanda.
+    """
+    dias_historia = dias_historia or current_app.config['SIMULADOR_DIAS_HISTORIA']
+    hasta = datetime.combine(hasta or datetime.utcnow().date(), datetime.min.time())
+    desde = hasta - timedelta(days=dias_historia)
+
+    columnas = lambda modelo: select(
+        modelo.tipo_tramite_id, modelo.categoria_atencion, modelo.fecha_solicitud,
+        modelo.fecha_atencion, modelo.empleado_id
+    ).where(modelo.fecha_solicitud >= desde, modelo.fecha_solicitud < hasta)
+    filas = db.session.execute(union_all(columnas(Turno), columnas(TurnoHistorico))).all()
+
+    jornadas = defaultdict(list)
+    atenciones = defaultdict(list)
+    for fila in filas:
+        solicitud = fila.fecha_solicitud
+        minuto = solicitud.hour * 60 + solicitud.minute + solicitud.second / 60
+        jornadas[solicitud.date()].append(Llegada(minuto, fila.tipo_tramite_id, fila.categoria_atencion))
+        if fila.fecha_atencion and fila.empleado_id:
+            atenciones[(fila.empleado_id, fila.fecha_atencion.date())].append(
+                (fila.fecha_atencion, fila.tipo_tramite_id))
+
+    # Servicio = tiempo hasta la siguiente atención del mismo empleado en el día
+    servicios = defaultdict(list)
+    for lista in atenciones.values():
+        lista.sort()
+        for (inicio, tipo_tramite_id), (siguiente, _) in zip(lista, lista[1:]):
+            minutos = (siguiente - inicio).total_seconds() / 60
+            if 0 < minutos <= SERVICIO_MAXIMO_MINUTOS:
+                servicios[tipo_tramite_id].append(minutos)
+
+    tramites = db.session.execute(select(TipoTramite.id, TipoTramite.nombre, TipoTramite.tiempo_estimado)).all()
+    return PerfilDemanda(
+        [sorted(jornadas[dia]) for dia in sorted(jornadas)],
+        dict(servicios),
+        {t.id: t.tiempo_estimado or 15 for t in tramites},
+        {t.id: t.nombre for t in tramites}
+    )
+
+
+def ventanillas_actuales():
+    """Empleados activos asignados a cada trámite activo (mínimo 1)"""
+    asignados = dict(db.session.execute(
+        select(empleado_tramites.c.tipo_tramite_id, func.count())
+        .join(Empleado, Empleado.id == empleado_tramites.c.empleado_id)
+        .where(Empleado.activo == True)
+        .group_by(empleado_tramites.c.tipo_tramite_id)
+    ).all())
+    activos = db.session.execute(select(TipoTramite.id).where(TipoTramite.activo == True)).scalars()
+    return {t: max(1, asignados.get(t, 0)) for t in activos}
+
+
+# ===== MUESTREO =====
+
+def _generar_jornada(perfil, rng):
+    """Llegadas de una jornada remuestreada a partir de las tasas por hora"""
+    llegadas = []
+    for hora, claves in perfil.tasas.items():
+        cantidad = _poisson(rng, sum(claves.values()))
+        if not cantidad:
+            continue
+        elegidas = rng.choices(list(claves), weights=list(claves.values()), k=cantidad)
+        llegadas.extend(Llegada(hora * 60 + rng.random() * 60, t, c) for t, c in elegidas)
+    llegadas.sort()
+    return llegadas
+
+
+def _muestrear_servicios(perfil, rng, cantidades):
+    """Tiempos de servicio por trámite, un lote por trámite"""
+    muestras = {}
+    for tipo_tramite_id, cantidad in cantidades.items():
+        observados = perfil.servicios.get(tipo_tramite_id, [])
+        if len(observados) >= MUESTRAS_MINIMAS:
+            muestras[tipo_tramite_id] = rng.choices(observados, k=cantidad)
+        else:
+            tasa = 1 / perfil.tiempos_estimados.get(tipo_tramite_id, 15)
+            muestras[tipo_tramite_id] = [rng.expovariate(tasa) for _ in range(cantidad)]
+    return muestras
+
+
+# ===== SIMULACIÓN =====
+
+def _clave_orden(politica, envejecimiento):
+    """
+    Clave de la cola según la política. Con envejecimiento cada
+    `envejecimiento` minutos de espera equivalen a subir un nivel de
+    prioridad; como todos envejecen al mismo ritmo, el orden no cambia con
+    el tiempo y alcanza con una clave fija.
+    """
+    if politica == 'fifo':
+        return lambda llegada: (llegada.minuto,)
+    if politica == 'envejecimiento':
+        return lambda llegada: (PRIORIDAD_CATEGORIA.get(llegada.categoria_atencion, 5) * envejecimiento
+                                + llegada.minuto,)
+    return lambda llegada: (PRIORIDAD_CATEGORIA.get(llegada.categoria_atencion, 5), llegada.minuto)
+
+
+def _simular_cola(llegadas, servicios, ventanillas, clave):
+    """
+    Cola de un trámite con `ventanillas` servidores. Devuelve la lista de
+    (categoría, minutos de espera) y los minutos de servicio.
+    """
+    libres = [0.0] * ventanillas
+    cola = []
+    esperas = []
+    ocupado = 0.0
+    siguiente = 0
+
+    while siguiente < len(llegadas) or cola:
+        libre = heapq.heappop(libres)
+        while siguiente < len(llegadas) and llegadas[siguiente].minuto <= libre:
+            heapq.heappush(cola, (clave(llegadas[siguiente]), siguiente))
+            siguiente += 1
+        if not cola:
+            # Ventanilla ociosa hasta la próxima llegada
+            libre = llegadas[siguiente].minuto
+            heapq.heappush(cola, (clave(llegadas[siguiente]), siguiente))
+            siguiente += 1
+
+        _, indice = heapq.heappop(cola)
+        llegada = llegadas[indice]
+        servicio = servicios[indice]
+        esperas.append((llegada.categoria_atencion, libre - llegada.minuto))
+        ocupado += servicio
+        heapq.heappush(libres, libre + servicio)
+
+    return esperas, ocupado
+
+
+def simular(perfil, ventanillas, politica='prioridad', modo='remuestreo', dias=None, semilla=None,
+            envejecimiento=None, tramites=None):
+    """
+    Simula `dias` jornadas con la cantidad de ventanillas indicada por trámite.
+
+    Args:
+        perfil: PerfilDemanda (ver cargar_perfil)
+        ventanillas: {tipo_tramite_id: ventanillas}; los trámites ausentes usan 1
+        politica: 'prioridad', 'fifo' o 'envejecimiento'
+        modo: 'remuestreo' o 'historico' (reproduce las jornadas del perfil)
+        dias: Jornadas a simular en modo remuestreo (por defecto SIMULADOR_DIAS_SIMULADOS)
+        semilla: Semilla para resultados reproducibles
+        envejecimiento: Minutos de espera que valen un nivel de prioridad
+        tramites: Limitar la simulación a estos trámites (por defecto todos)
+
+    Returns:
+        Dict con percentiles de espera globales, por categoría y por trámite
+    """
+    if politica not in POLITICAS:
+        raise ValueError(f'Política no válida: {politica}')
+    if modo not in MODOS:
+        raise ValueError(f'Modo no válido: {modo}')
+    if not perfil.jornadas:
+        raise ValueError('No hay turnos en el período de historia para simular')
+
+    config = current_app.config
+    envejecimiento = envejecimiento or config['SIMULADOR_MINUTOS_ENVEJECIMIENTO']
+    rng = random.Random(semilla)
+    clave = _clave_orden(politica, envejecimiento)
+
+    if modo == 'historico':
+        jornadas = perfil.jornadas
+    else:
+        jornadas = [_generar_jornada(perfil, rng) for _ in range(dias or config['SIMULADOR_DIAS_SIMULADOS'])]
+
+    esperas_tramite = defaultdict(list)
+    esperas_categoria = defaultdict(list)
+    ocupado = Counter()
+
+    for jornada in jornadas:
+        por_tramite = defaultdict(list)
+        for llegada in jornada:
+            if tramites is None or llegada.tipo_tramite_id in tramites:
+                por_tramite[llegada.tipo_tramite_id].append(llegada)
+        servicios = _muestrear_servicios(perfil, rng, {t: len(l) for t, l in por_tramite.items()})
+
+        for tipo_tramite_id, llegadas in por_tramite.items():
+            esperas, minutos = _simular_cola(llegadas, servicios[tipo_tramite_id],
+                                             max(1, ventanillas.get(tipo_tramite_id, 1)), clave)
+            ocupado[tipo_tramite_id] += minutos
+            for categoria, espera in esperas:
+                esperas_tramite[tipo_tramite_id].append(espera)
+                esperas_categoria[categoria].append(espera)
+
+    return _resultado(perfil, ventanillas, politica, modo, len(jornadas),
+                      esperas_tramite, esperas_categoria, ocupado)
+
+
+def _resumir(esperas):
+    esperas.sort()
+    return {
+        'turnos': len(esperas),
+        'promedio': round(statistics.mean(esperas), 1) if esperas else None,
+        'p50': percentil(esperas, 50),
+        'p90': percentil(esperas, 90),
+        'p95': percentil(esperas, 95),
+        'maximo': round(esperas[-1], 1) if esperas else None
+    }
+
+
+def _resultado(perfil, ventanillas, politica, modo, jornadas, esperas_tramite, esperas_categoria, ocupado):
+    minutos_jornada = max(60, perfil.minutos_jornada)
+    todas = [e for lista in esperas_tramite.values() for e in lista]
+    return {
+        'politica': politica,
+        'modo': modo,
+        'jornadas': jornadas,
+        'espera': _resumir(todas),
+        'por_categoria': {c: _resumir(esperas_categoria[c]) for c in PRIORIDAD_CATEGORIA if esperas_categoria.get(c)},
+        'por_tramite': [{
+            'id': t,
+            'nombre': perfil.nombres.get(t, f'Trámite {t}'),
+            'ventanillas': max(1, ventanillas.get(t, 1)),
+            'utilizacion': round(ocupado[t] / (max(1, ventanillas.get(t, 1)) * minutos_jornada * jornadas), 3),
+            **_resumir(esperas_tramite[t])
+        } for t in sorted(esperas_tramite)]
+    }
+
+
+def recomendar_ventanillas(perfil, objetivo_p90, politica='prioridad', dias=None, semilla=None, maximo=20):
+    """
+    Menor cantidad de ventanillas por trámite para que el p90 de espera no
+    supere `objetivo_p90` minutos. Como cada trámite es una cola
+    independiente, se busca trámite por trámite.
+
+    Returns:
+        {tipo_tramite_id: ventanillas} (maximo si no se alcanza el objetivo)
+    """
+    recomendadas = {}
+    for tipo_tramite_id in perfil.tramites:
+        for cantidad in range(1, maximo + 1):
+            resultado = simular(perfil, {tipo_tramite_id: cantidad}, politica, dias=dias, semilla=semilla,
+                                tramites={tipo_tramite_id})
+            if resultado['espera']['p90'] is not None and resultado['espera']['p90'] <= objetivo_p90:
+                break
+        recomendadas[tipo_tramite_id] = cantidad
+    return recomendadas
@@ -0,0 +1,112 @@
+/**
+ * Bandeja de salida del kiosco
+ *
+ * Las solicitudes de turno llevan un encabezado Idempotency-Key. Si la red
+ * falla, la solicitud se guarda en localStorage con su clave y se reenvía
+ * cuando vuelve la conexión. El servidor reconoce la clave y devuelve el
+ * turno original, por lo que reenviar nunca crea un turno duplicado.
+ */
+
+const KioscoOutbox = (function () {
+    const CLAVE_ALMACEN = 'kiosco_outbox';
+    const INTERVALO_REINTENTO_MS = 15000;
+    let enviando = false;
+
+    /**
+     * Genera una clave de idempotencia (UUID v4)
+     * @returns {string} Clave nueva
+     */
+    function nuevaClave() {
+        if (window.crypto && crypto.randomUUID) {
+            return crypto.randomUUID();
+        }
+        return 'xxxxxxxx-xxxx-4xxx-yxxx-xxxxxxxxxxxx'.replace(/[xy]/g, function (c) {
+            const r = Math.random() * 16 | 0;
+            return (c === 'x' ? r : (r & 0x3 | 0x8)).toString(16);
+        });
+    }
+
+    function leer() {
+        try {
+            return JSON.parse(localStorage.getItem(CLAVE_ALMACEN)) || [];
+        } catch (e) {
+            return [];
+        }
+    }
+
+    function guardar(pendientes) {
+        localStorage.setItem(CLAVE_ALMACEN, JSON.stringify(pendientes));
+    }
+
+    /**
+     * Envía una solicitud de turno con su clave de idempotencia
+     * @returns {Promise<Response>} Respuesta del servidor (rechaza solo si falla la red)
+     */
+    function enviar(url, clave, datos) {
+        return fetch(url, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Idempotency-Key': clave
+            },
+            body: JSON.stringify(datos)
+        });
+    }
+
+    /**
+     * Guarda una solicitud para reenviarla cuando vuelva la conexión
+     */
+    function encolar(url, clave, datos) {
+        const pendientes = leer().filter(p => p.clave !== clave);
+        pendientes.push({ url: url, clave: clave, datos: datos, fecha: new Date().toISOString() });
+        guardar(pendientes);
+    }
+
+    /**
+     * Reenvía las solicitudes pendientes. Las que el servidor responde (con
+     * éxito o con un error definitivo) salen de la bandeja; las que vuelven a
+     * fallar por red se conservan.
+     */
+    async function reenviarPendientes() {
+        if (enviando || !navigator.onLine) {
+            return;
+        }
+        enviando = true;
+
+        try {
+            for (const pendiente of leer()) {
+                let response;
+                try {
+                    response = await enviar(pendiente.url, pendiente.clave, pendiente.datos);
+                } catch (error) {
+                    break; // Sigue sin conexión
+                }
+
+                if (response.status >= 500) {
+                    continue;
+                }
+
+                guardar(leer().filter(p => p.clave !== pendiente.clave));
+
+                const data = await response.json().catch(() => ({}));
+                if (data.success && data.turno) {
+                    alert(`Turno emitido: ${data.turno.numero_turno}`);
+                }
+            }
+        } finally {
+            enviando = false;
+        }
+    }
+
+    window.addEventListener('online', reenviarPendientes);
+    document.addEventListener('DOMContentLoaded', reenviarPendientes);
+    setInterval(reenviarPendientes, INTERVALO_REINTENTO_MS);
+
+    return {
+        nuevaClave: nuevaClave,
+        enviar: enviar,
+        encolar: encolar,
+        reenviarPendientes: reenviarPendientes,
+        pendientes: () => leer().length
+    };
+})();
@@ -185,7 +185,8 @@ function estadoATexto(estado) {
         'pendiente': 'Pendiente',
         'en_atencion': 'En Atención',
         'atendido': 'Atendido',
-        'cancelado': 'Cancelado'
+        'cancelado': 'Cancelado',
+        'no_presentado': 'No Presentado'
     };
 
     return estados[estado] || estado;
@@ -0,0 +1,40 @@
+/**
+ * Trazas de latencia de los eventos Socket.IO
+ *
+ * Sincroniza el reloj con el servidor al conectarse y confirma los eventos
+ * que traen '_traza' con la hora de recepción y la hora en que terminaron
+ * los manejadores de la página (ver app/trazas_socket.py).
+ */
+
+/**
+ * Instala las trazas en un socket
+ * @param {Socket} socket - Socket creado con io()
+ */
+function instalarTrazas(socket) {
+    // Hora del servidor menos hora local, en milisegundos
+    let desfase = 0;
+
+    socket.on('connect', function () {
+        const envio = Date.now();
+        socket.emit('sincronizar_reloj', {}, function (respuesta) {
+            const llegada = Date.now();
+            desfase = respuesta.servidor - (envio + llegada) / 2;
+        });
+    });
+
+    // onAny se ejecuta antes que los manejadores de cada evento
+    socket.onAny(function (evento, datos) {
+        const traza = datos && datos._traza;
+        if (!traza || Math.random() >= traza.p) {
+            return;
+        }
+        const recibido = Date.now() + desfase;
+        setTimeout(function () {
+            socket.emit('acuse_evento', {
+                id: traza.id,
+                recibido: recibido,
+                mostrado: Date.now() + desfase
+            });
+        }, 0);
+    });
+}
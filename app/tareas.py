@@ -0,0 +1,61 @@
+"""
+Tareas periódicas en segundo plano
+
+Este módulo ejecuta funciones de mantenimiento (latidos de réplica, archivado,
+limpiezas) cada cierto intervalo usando las tareas en segundo plano de
+Flask-SocketIO, de modo que funcionan igual con eventlet (producción) y con
+hilos (desarrollo).
+"""
+
+import logging
+import os
+
+from app import socketio
+from app.models import db
+
+logger = logging.getLogger(__name__)
+
+
+def tareas_habilitadas(app):
+    """
+    Indica si esta instancia debe ejecutar tareas programadas.
+
+    Con el recargador de Werkzeug (modo debug) el proceso padre también crea
+    la aplicación; solo el proceso hijo (WERKZEUG_RUN_MAIN=true) ejecuta tareas
+    para no duplicarlas.
+    """
+    if not app.config.get('TAREAS_PROGRAMADAS', False):
+        return False
+    if app.debug and os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+        return False
+    return True
+
+
+def iniciar_tarea_periodica(app, nombre, intervalo, funcion):
+    """
+    Ejecuta una función cada `intervalo` segundos dentro del contexto de la app.
+
+    Args:
+        app: Instancia de Flask
+        nombre: Nombre descriptivo de la tarea (para los logs)
+        intervalo: Segundos entre ejecuciones
+        funcion: Función sin argumentos a ejecutar
+
+    Returns:
+        La tarea en segundo plano creada, o None si las tareas están deshabilitadas
+    """
+    if not tareas_habilitadas(app):
+        return None
+
+    def _bucle():
+        while True:
+            socketio.sleep(intervalo)
+            with app.app_context():
+                try:
+                    funcion()
+                except Exception:
+                    db.session.rollback()
+                    logger.exception('Error en la tarea periódica %s', nombre)
+
+    logger.info('Tarea periódica %s iniciada (cada %ss)', nombre, intervalo)
+    return socketio.start_background_task(_bucle)
@@ -0,0 +1,56 @@
+"""
+Medición del tiempo de cada sentencia SQL
+
+Un único par de ganchos de SQLAlchemy (before/after_cursor_execute) mide cada
+sentencia y avisa la duración a los observadores registrados (métricas y
+consultas lentas), así se lee el reloj una sola vez por sentencia.
+
+El inicio se guarda en el contexto de ejecución de la sentencia y no en la
+conexión: si la sentencia falla, el contexto se descarta con ella y no quedan
+inicios pendientes. Las sentencias que fallan se avisan desde handle_error con
+el tiempo que alcanzaron a ejecutar.
+"""
+
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+ATRIBUTO_INICIO = '_tiempo_sql_inicio'
+
+# Funciones (conn, statement, parameters, segundos) llamadas después de cada sentencia
+observadores = []
+
+
+def _antes_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        setattr(context, ATRIBUTO_INICIO, time.perf_counter())
+
+
+def _avisar(conn, context, statement, parameters):
+    inicio = getattr(context, ATRIBUTO_INICIO, None) if context is not None else None
+    if inicio is None:
+        return
+    delattr(context, ATRIBUTO_INICIO)
+    duracion = time.perf_counter() - inicio
+    for observador in observadores:
+        observador(conn, statement, parameters, duracion)
+
+
+def _despues_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    _avisar(conn, context, statement, parameters)
+
+
+def _error_de_consulta(contexto_error):
+    _avisar(contexto_error.connection, contexto_error.execution_context,
+            contexto_error.statement, contexto_error.parameters)
+
+
+def observar_consultas(observador):
+    """Registra un observador y, la primera vez, los ganchos de SQLAlchemy"""
+    if observador not in observadores:
+        observadores.append(observador)
+    if not event.contains(Engine, 'before_cursor_execute', _antes_de_consulta):
+        event.listen(Engine, 'before_cursor_execute', _antes_de_consulta)
+        event.listen(Engine, 'after_cursor_execute', _despues_de_consulta)
+        event.listen(Engine, 'handle_error', _error_de_consulta)
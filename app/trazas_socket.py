@@ -0,0 +1,175 @@
+"""
+Trazas de latencia de los eventos Socket.IO
+
+Mide cuánto tarda un cambio de estado en llegar a la pantalla de quien lo
+escucha (por ejemplo, desde que el empleado pulsa "llamar" hasta que el
+teléfono del ciudadano muestra la alerta en historial.html):
+
+- Cada evento emitido lleva en su carga '_traza' con un id, la hora del
+  servidor al emitir, la hora del último commit de la petición o tarea que lo
+  emitió y la fracción de clientes que deben confirmarlo.
+- El cliente (static/js/trazas_socket.js) sincroniza su reloj con el
+  servidor al conectarse y, si le toca por muestreo, responde 'acuse_evento'
+  con la hora de recepción y la hora en que terminaron sus manejadores.
+- El servidor acota esas horas con su propio reloj (un acuse no puede
+  recibirse antes de emitir ni después de llegar) y acumula histogramas por
+  evento, sala y etapa:
+    emision:      commit -> emit
+    entrega:      emit -> recepción en el cliente
+    presentacion: recepción -> manejadores terminados
+    total:        commit (o emit si no hubo commit) -> manejadores terminados
+
+Los histogramas se exponen en /metrics (turnos_socket_latencia_segundos).
+"""
+
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from flask import g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import socketio
+from app.metricas import Histograma, LIMITES_LATENCIA, PREFIJO, _etiqueta
+
+ETAPAS = ('emision', 'entrega', 'presentacion', 'total')
+
+# Salas personales ('empleado_12') se agrupan en una sola etiqueta ('empleado')
+_SALA_PERSONAL = re.compile(r'_\d+$')
+
+
+def _ahora_ms():
+    return time.time() * 1000
+
+
+def _sala(destino):
+    if not destino:
+        return 'todos'
+    if isinstance(destino, (list, tuple, set)):
+        return ','.join(sorted({_sala(d) for d in destino}))
+    return _SALA_PERSONAL.sub('', str(destino))
+
+
+class RegistroTrazas:
+    """Eventos emitidos pendientes de acuse e histogramas de latencia"""
+
+    def __init__(self, pendientes_maximos=5000):
+        self._lock = threading.Lock()
+        self.pendientes_maximos = pendientes_maximos
+        self.fraccion_acuses = 1.0
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.pendientes = OrderedDict()   # id -> (evento, sala, emitido_ms, commit_ms)
+            self.histogramas = {}             # (evento, sala, etapa) -> Histograma
+            self.acuses = 0
+            self.acuses_descartados = 0
+
+    def _observar(self, evento, sala, etapa, milisegundos):
+        clave = (evento, sala, etapa)
+        histograma = self.histogramas.get(clave)
+        if histograma is None:
+            histograma = self.histogramas[clave] = Histograma(LIMITES_LATENCIA)
+        histograma.observar(max(0.0, milisegundos) / 1000)
+
+    def emitido(self, evento, sala, commit_ms):
+        """Registra un evento emitido y devuelve la traza que viaja en su carga"""
+        traza = {'id': uuid.uuid4().hex[:16], 'emitido': round(_ahora_ms(), 1), 'p': self.fraccion_acuses}
+        if commit_ms is not None:
+            traza['commit'] = round(commit_ms, 1)
+        with self._lock:
+            self.pendientes[traza['id']] = (evento, sala, traza['emitido'], commit_ms)
+            while len(self.pendientes) > self.pendientes_maximos:
+                self.pendientes.popitem(last=False)
+            if commit_ms is not None:
+                self._observar(evento, sala, 'emision', traza['emitido'] - commit_ms)
+        return traza
+
+    def acuse(self, identificador, recibido_ms, mostrado_ms):
+        """
+        Procesa el acuse de un cliente. Las horas vienen ya corregidas al reloj
+        del servidor; se acotan entre la emisión y la llegada del acuse.
+
+        Returns:
+            False si el evento no está pendiente o las horas no son válidas
+        """
+        llegada = _ahora_ms()
+        with self._lock:
+            pendiente = self.pendientes.get(identificador)
+            try:
+                recibido_ms = float(recibido_ms)
+                mostrado_ms = float(mostrado_ms if mostrado_ms is not None else recibido_ms)
+            except (TypeError, ValueError):
+                pendiente = None
+            if pendiente is None:
+                self.acuses_descartados += 1
+                return False
+
+            evento, sala, emitido, commit = pendiente
+            recibido_ms = min(max(recibido_ms, emitido), llegada)
+            mostrado_ms = min(max(mostrado_ms, recibido_ms), llegada)
+            self._observar(evento, sala, 'entrega', recibido_ms - emitido)
+            self._observar(evento, sala, 'presentacion', mostrado_ms - recibido_ms)
+            self._observar(evento, sala, 'total', mostrado_ms - (commit if commit is not None else emitido))
+            self.acuses += 1
+        return True
+
+    def exportar(self):
+        """Líneas en formato Prometheus"""
+        nombre = f'{PREFIJO}_socket_latencia_segundos'
+        with self._lock:
+            lineas = [f'# HELP {nombre} Latencia de los eventos Socket.IO por etapa (commit, emisión, entrega, presentación)',
+                      f'# TYPE {nombre} histogram']
+            for (evento, sala, etapa), histograma in sorted(self.histogramas.items()):
+                lineas.extend(histograma.lineas(
+                    nombre, f'evento="{_etiqueta(evento)}",sala="{_etiqueta(sala)}",etapa="{etapa}"'))
+            lineas += [f'# HELP {PREFIJO}_socket_acuses_total Acuses de recepción de eventos Socket.IO',
+                       f'# TYPE {PREFIJO}_socket_acuses_total counter',
+                       f'{PREFIJO}_socket_acuses_total{{resultado="aceptado"}} {self.acuses}',
+                       f'{PREFIJO}_socket_acuses_total{{resultado="descartado"}} {self.acuses_descartados}']
+        return lineas
+
+
+registro = RegistroTrazas()
+
+
+# ===== GANCHOS =====
+
+def _despues_de_commit(session):
+    if has_app_context():
+        g.traza_commit = _ahora_ms()
+
+
+def _trazar_emit(emit_original):
+    def emit(evento, *args, **kwargs):
+        if args and isinstance(args[0], dict):
+            commit = g.get('traza_commit') if has_app_context() else None
+            traza = registro.emitido(evento, _sala(kwargs.get('to') or kwargs.get('room')), commit)
+            args = (dict(args[0], _traza=traza),) + args[1:]
+        return emit_original(evento, *args, **kwargs)
+    emit.trazado = True
+    return emit
+
+
+def hora_servidor():
+    """Respuesta a 'sincronizar_reloj': hora del servidor en milisegundos"""
+    return {'servidor': _ahora_ms()}
+
+
+def init_trazas_socket(app):
+    """Marca los eventos emitidos con su traza y registra la hora de los commits"""
+    if not app.config['TRAZAS_SOCKET_HABILITADAS']:
+        return
+
+    registro.fraccion_acuses = app.config['TRAZAS_SOCKET_FRACCION_ACUSES']
+    registro.pendientes_maximos = app.config['TRAZAS_SOCKET_PENDIENTES_MAXIMOS']
+
+    if not event.contains(Session, 'after_commit', _despues_de_commit):
+        event.listen(Session, 'after_commit', _despues_de_commit)
+
+    if not getattr(socketio.emit, 'trazado', False):
+        socketio.emit = _trazar_emit(socketio.emit)
@@ -0,0 +1,31 @@
+"""
+Script para archivar turnos de días cerrados
+
+Mueve los turnos finalizados (y sus notificaciones) anteriores al período de
+retención a las tablas turnos_historico y notificaciones_historico.
+La aplicación ya lo hace periódicamente; este script permite ejecutarlo a demanda.
+
+Uso:
+    python archivar_turnos.py
+    python archivar_turnos.py --dias 30 --lote 5000
+"""
+
+import argparse
+
+from app import create_app
+from app.archivo import archivar_dias_cerrados
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Archiva turnos de días cerrados')
+    parser.add_argument('--dias', type=int, default=None,
+                        help='Días completos que se conservan en las tablas operativas')
+    parser.add_argument('--lote', type=int, default=None,
+                        help='Cantidad de turnos movidos por transacción')
+    args = parser.parse_args()
+
+    app = create_app()
+
+    with app.app_context():
+        total = archivar_dias_cerrados(dias_retencion=args.dias, tamano_lote=args.lote)
+        print(f"✓ {total} turnos archivados")
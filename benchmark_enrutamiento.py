@@ -0,0 +1,179 @@
+"""
+Benchmark del motor de enrutamiento de turnos
+
+Simula jornadas de atención (eventos discretos) con llegadas de Poisson por
+trámite y categoría, tiempos de servicio exponenciales alrededor del
+tiempo_estimado de cada trámite y ventanillas con distintos trámites
+asignados. Compara dos políticas:
+
+- Manual (actual): el empleado que queda libre tarda en revisar el dashboard
+  (retraso exponencial) y toma un turno cualquiera de la primera pestaña de
+  categoría con turnos de sus trámites.
+- Motor (app.enrutamiento): el empleado libre recibe de inmediato el turno
+  elegido por ordenar_candidatos y cada llegada se propone al empleado libre
+  elegido por elegir_empleado.
+
+Uso:
+    python benchmark_enrutamiento.py
+    python benchmark_enrutamiento.py --dias 20 --carga 0.9 --retraso-manual 2
+"""
+
+import argparse
+import heapq
+import random
+import statistics
+from collections import Counter, defaultdict
+
+from app.enrutamiento import Candidato, PRIORIDAD_CATEGORIA, calcular_presion, elegir_empleado, ordenar_candidatos
+
+# Trámites por defecto (id: minutos estimados) y ventanillas con sus trámites asignados
+TRAMITES = {1: 15, 2: 20, 3: 18, 4: 12, 5: 15}
+VENTANILLAS = {
+    1: {1}, 2: {1, 2}, 3: {2}, 4: {3, 4}, 5: {4, 5}, 6: {1, 3, 5}
+}
+# Proporción de llegadas por trámite y por categoría
+MEZCLA_TRAMITES = {1: 0.3, 2: 0.2, 3: 0.15, 4: 0.2, 5: 0.15}
+MEZCLA_CATEGORIAS = {'adulto_mayor': 0.12, 'discapacidad': 0.05, 'embarazada': 0.03, 'ninguna': 0.80}
+MINUTOS_JORNADA = 8 * 60
+
+
+def percentil(valores, p):
+    """Percentil simple (p entre 0 y 100)"""
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+def generar_llegadas(rng, carga):
+    """Llegadas de una jornada: lista de (minuto, tramite, categoria)"""
+    capacidad = len(VENTANILLAS) / (sum(TRAMITES[t] * p for t, p in MEZCLA_TRAMITES.items()))
+    tasa = carga * capacidad  # llegadas por minuto
+    llegadas = []
+    minuto = rng.expovariate(tasa)
+    tramites, pesos_t = zip(*MEZCLA_TRAMITES.items())
+    categorias, pesos_c = zip(*MEZCLA_CATEGORIAS.items())
+    while minuto < MINUTOS_JORNADA:
+        llegadas.append((minuto, rng.choices(tramites, pesos_t)[0], rng.choices(categorias, pesos_c)[0]))
+        minuto += rng.expovariate(tasa)
+    return llegadas
+
+
+def simular(llegadas, politica, semilla, retraso_manual):
+    """
+    Simula una jornada y devuelve (esperas por categoría, minutos ocupados por ventanilla).
+    Las llegadas se atienden hasta vaciar la cola aunque termine la jornada.
+    """
+    rng = random.Random(semilla)
+    en_linea = {e: frozenset(t) for e, t in VENTANILLAS.items()}
+    libres = set(VENTANILLAS)
+    atendidos = Counter()
+    ocupado = Counter()
+    pendientes = {}
+    esperas = defaultdict(list)
+    eventos = []
+    secuencia = 0
+
+    def programar(minuto, tipo, dato):
+        nonlocal secuencia
+        secuencia += 1
+        heapq.heappush(eventos, (minuto, secuencia, tipo, dato))
+
+    def atender(ahora, empleado, candidato):
+        del pendientes[candidato.id]
+        libres.discard(empleado)
+        esperas[candidato.categoria_atencion].append(ahora - candidato.fecha_solicitud)
+        servicio = rng.expovariate(1 / TRAMITES[candidato.tipo_tramite_id])
+        ocupado[empleado] += servicio
+        atendidos[empleado] += 1
+        programar(ahora + servicio, 'fin', empleado)
+
+    def tomar_turno(ahora, empleado):
+        """El empleado libre elige un turno según la política; False si no hay"""
+        propios = [c for c in pendientes.values() if c.tipo_tramite_id in en_linea[empleado]]
+        if not propios:
+            return False
+        if politica == 'motor':
+            presion = calcular_presion(Counter(c.tipo_tramite_id for c in pendientes.values()), en_linea)
+            atender(ahora, empleado, ordenar_candidatos(propios, presion)[0])
+        else:
+            mejor = min(PRIORIDAD_CATEGORIA[c.categoria_atencion] for c in propios)
+            pestana = [c for c in propios if PRIORIDAD_CATEGORIA[c.categoria_atencion] == mejor]
+            atender(ahora, empleado, rng.choice(pestana))
+        return True
+
+    for i, (minuto, tramite, categoria) in enumerate(llegadas):
+        programar(minuto, 'llegada', Candidato(i, tramite, categoria, minuto))
+
+    while eventos:
+        ahora, _, tipo, dato = heapq.heappop(eventos)
+
+        if tipo == 'llegada':
+            pendientes[dato.id] = dato
+            elegibles = [e for e, t in en_linea.items() if dato.tipo_tramite_id in t]
+            if politica == 'motor':
+                cargas = {e: 0 if e in libres else 1 for e in elegibles}
+                empleado = elegir_empleado(elegibles, cargas, atendidos)
+                if empleado is not None:
+                    atender(ahora, empleado, dato)
+            else:
+                # Los empleados libres notarán el turno al revisar el dashboard
+                for empleado in elegibles:
+                    if empleado in libres:
+                        programar(ahora + rng.expovariate(1 / retraso_manual), 'revisar', empleado)
+
+        elif tipo == 'fin':
+            libres.add(dato)
+            if politica == 'motor':
+                tomar_turno(ahora, dato)
+            else:
+                programar(ahora + rng.expovariate(1 / retraso_manual), 'revisar', dato)
+
+        elif tipo == 'revisar' and dato in libres:
+            tomar_turno(ahora, dato)
+
+    return esperas, ocupado
+
+
+def imprimir(nombre, esperas, ocupado, dias):
+    todas = [e for lista in esperas.values() for e in lista]
+    print(f"\n{nombre}")
+    print(f"  Turnos atendidos: {len(todas)}")
+    print(f"  Espera (min): promedio={statistics.mean(todas):.1f} p50={percentil(todas, 50):.1f} "
+          f"p90={percentil(todas, 90):.1f} máx={max(todas):.1f}")
+    for categoria in PRIORIDAD_CATEGORIA:
+        if esperas.get(categoria):
+            print(f"    {categoria:<13} promedio={statistics.mean(esperas[categoria]):.1f} min")
+    utilizacion = [ocupado[e] / (MINUTOS_JORNADA * dias) for e in VENTANILLAS]
+    print(f"  Utilización por ventanilla: {' '.join(f'{u:.0%}' for u in utilizacion)} "
+          f"(desviación {statistics.pstdev(utilizacion):.1%})")
+    return statistics.mean(todas)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compara la selección manual con el motor de enrutamiento')
+    parser.add_argument('--dias', type=int, default=10, help='Jornadas simuladas')
+    parser.add_argument('--carga', type=float, default=0.85, help='Utilización objetivo de las ventanillas (0-1)')
+    parser.add_argument('--retraso-manual', type=float, default=1.5,
+                        help='Minutos promedio que tarda un empleado en revisar el dashboard')
+    parser.add_argument('--semilla', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.semilla)
+    jornadas = [generar_llegadas(rng, args.carga) for _ in range(args.dias)]
+
+    print("=" * 60)
+    print(f"ENRUTAMIENTO: {args.dias} jornadas, carga {args.carga:.0%}, {len(VENTANILLAS)} ventanillas")
+    print("=" * 60)
+
+    resultados = {}
+    for politica, nombre in (('manual', 'Selección manual (actual)'), ('motor', 'Motor de enrutamiento')):
+        esperas, ocupado = defaultdict(list), Counter()
+        for dia, llegadas in enumerate(jornadas):
+            e, o = simular(llegadas, politica, args.semilla + dia, args.retraso_manual)
+            for categoria, lista in e.items():
+                esperas[categoria].extend(lista)
+            ocupado.update(o)
+        resultados[politica] = imprimir(nombre, esperas, ocupado, args.dias)
+
+    reduccion = 1 - resultados['motor'] / resultados['manual']
+    print(f"\n✓ Reducción de la espera promedio: {reduccion:.0%}")
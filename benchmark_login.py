@@ -0,0 +1,100 @@
+"""
+Benchmark de una ráfaga de inicios de sesión (cambio de turno a las 8:00)
+
+Simula N inicios de sesión simultáneos bajo eventlet, como en producción, y
+mide la latencia del bucle de eventos con un greenlet que se despierta cada
+pocos milisegundos. Esa latencia es la que sufre cualquier emisión o
+recepción de Socket.IO mientras se verifican las contraseñas.
+
+Compara la verificación en línea (werkzeug directo) con la verificación
+en el pool de hilos (app.seguridad).
+
+Uso:
+    python benchmark_login.py
+    python benchmark_login.py --logins 50 --metodo pbkdf2:sha256:600000
+"""
+
+import eventlet
+eventlet.monkey_patch()
+
+import argparse
+import os
+import statistics
+import time
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+os.environ['TAREAS_PROGRAMADAS'] = 'false'
+
+from app import create_app
+from app.seguridad import ejecutar_fuera_del_bucle
+
+PERIODO_TICK = 0.005  # 5 ms
+
+
+def medir_rafaga(verificar, hash_password, logins):
+    """
+    Ejecuta `logins` verificaciones concurrentes y devuelve
+    (duración total, lista de retrasos del bucle en ms).
+    """
+    retrasos = []
+    activo = [True]
+
+    def tick():
+        while activo[0]:
+            inicio = time.perf_counter()
+            eventlet.sleep(PERIODO_TICK)
+            retrasos.append((time.perf_counter() - inicio - PERIODO_TICK) * 1000)
+
+    monitor = eventlet.spawn(tick)
+    eventlet.sleep(PERIODO_TICK * 2)
+
+    inicio = time.perf_counter()
+    pool = eventlet.GreenPool(logins)
+    for _ in range(logins):
+        pool.spawn(verificar, hash_password, 'clave-correcta')
+    pool.waitall()
+    duracion = time.perf_counter() - inicio
+
+    activo[0] = False
+    monitor.wait()
+    return duracion, retrasos
+
+
+def percentil(valores, p):
+    """Percentil simple (p entre 0 y 100)"""
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+def imprimir(nombre, duracion, retrasos):
+    print(f"\n{nombre}")
+    print(f"  Duración total de la ráfaga: {duracion:.2f} s")
+    print(f"  Latencia del bucle (ms): p50={statistics.median(retrasos):.1f} "
+          f"p99={percentil(retrasos, 99):.1f} máx={max(retrasos):.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Ráfaga de inicios de sesión bajo eventlet')
+    parser.add_argument('--logins', type=int, default=50, help='Inicios de sesión simultáneos')
+    parser.add_argument('--metodo', default='pbkdf2:sha256:600000', help='Método de hash a evaluar')
+    args = parser.parse_args()
+
+    app = create_app('testing')
+    hash_password = generate_password_hash('clave-correcta', method=args.metodo)
+
+    print("=" * 60)
+    print(f"RÁFAGA DE {args.logins} LOGINS ({args.metodo})")
+    print("=" * 60)
+
+    with app.app_context():
+        duracion, retrasos = medir_rafaga(check_password_hash, hash_password, args.logins)
+        imprimir("Verificación en línea (bloquea el bucle)", duracion, retrasos)
+
+        duracion, retrasos = medir_rafaga(
+            lambda h, p: ejecutar_fuera_del_bucle(check_password_hash, h, p),
+            hash_password, args.logins
+        )
+        imprimir("Verificación en pool de hilos (app.seguridad)", duracion, retrasos)
@@ -0,0 +1,394 @@
+"""
+Benchmarks de los caminos críticos de modelos y rutas
+
+Mide, sobre una base de datos poblada con app.datos_sinteticos (semilla fija):
+
+- numero_turno:    Turno.generar_numero_turno con varios hilos reservando a la vez
+- to_dict:         serialización de turnos ya cargados
+- to_dict_consulta: consulta + serialización con las cargas perezosas de relaciones
+- dashboard:       GET /empleado/dashboard con --turnos-hoy turnos en el día
+- estadisticas:    POST /empleado/obtener-estadisticas sobre --turnos-historico turnos
+- load_user:       cargador de Flask-Login con la identidad en caché y sin ella
+- emision_socket:  socketio.emit de un turno a --clientes-socket clientes conectados
+
+Cada benchmark se repite --rondas veces (o hasta --tiempo-maximo segundos, con
+al menos --rondas-minimas rondas) y se reportan mínimo, mediana, media,
+desviación y operaciones por segundo. Con --guardar se almacena el resultado
+como línea base y con --comparar se detectan regresiones de la mediana frente
+a una línea base (código de salida 1 si alguna supera --tolerancia); los
+benchmarks con menos de --rondas-minimas rondas en cualquiera de las dos
+mediciones se informan pero no se comparan.
+benchmark_linea_base.json guarda la línea base medida con los valores por
+defecto; conviene regenerarla en la máquina donde se comparará.
+
+Por defecto se usa una base SQLite temporal; --base-datos permite apuntar a
+una base PostgreSQL local vacía (se crearán y poblarán las tablas).
+
+Uso:
+    python benchmark_rendimiento.py
+    python benchmark_rendimiento.py --solo dashboard,load_user --turnos-historico 100000
+    python benchmark_rendimiento.py --guardar benchmark_linea_base.json
+    python benchmark_rendimiento.py --comparar benchmark_linea_base.json --tolerancia 0.25
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+os.environ['TAREAS_PROGRAMADAS'] = 'false'
+os.environ.setdefault('LOG_NIVEL', 'WARNING')
+
+BENCHMARKS = ('numero_turno', 'to_dict', 'to_dict_consulta', 'dashboard', 'estadisticas', 'load_user', 'emision_socket')
+
+
+def medir(funcion, rondas, tiempo_maximo, preparar=None, calentamiento=1, rondas_minimas=1):
+    """
+    Ejecuta `funcion` hasta `rondas` veces (o hasta agotar `tiempo_maximo`
+    segundos, con al menos `rondas_minimas` rondas). `preparar` se ejecuta
+    antes de cada ronda sin contar en el tiempo.
+
+    Returns:
+        Diccionario con las estadísticas en segundos
+    """
+    for _ in range(calentamiento):
+        if preparar:
+            preparar()
+        funcion()
+
+    tiempos = []
+    limite = time.perf_counter() + tiempo_maximo
+    rondas_minimas = min(rondas_minimas, rondas)
+    while len(tiempos) < rondas and (len(tiempos) < rondas_minimas or time.perf_counter() < limite):
+        if preparar:
+            preparar()
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+
+    mediana = statistics.median(tiempos)
+    return {
+        'rondas': len(tiempos),
+        'min': min(tiempos),
+        'max': max(tiempos),
+        'media': statistics.mean(tiempos),
+        'mediana': mediana,
+        'desviacion': statistics.stdev(tiempos) if len(tiempos) > 1 else 0.0,
+        'ops': 1 / mediana if mediana else 0.0
+    }
+
+
+def formatear(segundos):
+    if segundos >= 1:
+        return f'{segundos:.2f} s'
+    if segundos >= 1e-3:
+        return f'{segundos * 1e3:.2f} ms'
+    return f'{segundos * 1e6:.1f} µs'
+
+
+# ===== PREPARACIÓN =====
+
+def crear_aplicacion(base_datos):
+    os.environ['SQLALCHEMY_DATABASE_URI'] = base_datos
+    from app import create_app
+    return create_app('testing')
+
+
+def poblar_base(app, args):
+    from app.datos_sinteticos import poblar
+    from app.models import db
+
+    with app.app_context():
+        inicio = time.perf_counter()
+        insertados = poblar(
+            usuarios=args.usuarios,
+            turnos=args.turnos_historico,
+            dias=max(2, args.dias),
+            turnos_hoy=args.turnos_hoy,
+            semilla=args.semilla
+        )
+        duracion = time.perf_counter() - inicio
+        db.session.remove()
+    print(f"✓ Base poblada en {duracion:.1f} s: "
+          + ', '.join(f'{cantidad} {tabla}' for tabla, cantidad in insertados.items()))
+    return insertados
+
+
+def cliente_empleado(app, empleado_id=1):
+    cliente = app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion['_user_id'] = f'emp_{empleado_id}'
+        sesion['_fresh'] = True
+    return cliente
+
+
+# ===== BENCHMARKS =====
+
+def bench_numero_turno(app, args):
+    """Reserva de números con `hilos` hilos, cada uno con su propia sesión y commit"""
+    from app.models import Turno, db
+    emitidos = []
+    errores = []
+
+    def trabajador():
+        with app.app_context():
+            for _ in range(args.reservas):
+                try:
+                    emitidos.append(Turno.generar_numero_turno('ninguna'))
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    errores.append(e)
+
+    def ronda():
+        hilos = [threading.Thread(target=trabajador) for _ in range(args.hilos)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+    resultado = medir(ronda, args.rondas, args.tiempo_maximo, rondas_minimas=args.rondas_minimas)
+    resultado['detalle'] = f'{args.hilos} hilos x {args.reservas} reservas'
+    if errores or len(set(emitidos)) != len(emitidos):
+        resultado['detalle'] += f' ({len(errores)} errores, {len(emitidos) - len(set(emitidos))} duplicados)'
+    return resultado
+
+
+def bench_to_dict(app, args):
+    from app.models import Turno, db
+    with app.app_context():
+        turnos = Turno.query.order_by(Turno.id.desc()).limit(args.serializar).all()
+        for turno in turnos:
+            turno.to_dict()   # carga las relaciones una sola vez
+        resultado = medir(lambda: [t.to_dict() for t in turnos], args.rondas, args.tiempo_maximo,
+                          rondas_minimas=args.rondas_minimas)
+        db.session.remove()
+    resultado['detalle'] = f'{len(turnos)} turnos'
+    return resultado
+
+
+def bench_to_dict_consulta(app, args):
+    from app.models import Turno, db
+    with app.app_context():
+        def ronda():
+            turnos = Turno.query.order_by(Turno.id.desc()).limit(args.serializar).all()
+            return [t.to_dict() for t in turnos]
+        resultado = medir(ronda, args.rondas, args.tiempo_maximo, preparar=db.session.expunge_all,
+                          rondas_minimas=args.rondas_minimas)
+        db.session.remove()
+    resultado['detalle'] = f'{args.serializar} turnos'
+    return resultado
+
+
+def bench_dashboard(app, args):
+    cliente = cliente_empleado(app)
+
+    def ronda():
+        respuesta = cliente.get('/empleado/dashboard')
+        assert respuesta.status_code == 200, respuesta.status_code
+
+    resultado = medir(ronda, args.rondas, args.tiempo_maximo, rondas_minimas=args.rondas_minimas)
+    resultado['detalle'] = f'{args.turnos_hoy} turnos hoy'
+    return resultado
+
+
+def bench_estadisticas(app, args):
+    cliente = cliente_empleado(app)
+    hoy = datetime.utcnow().date()
+    rango = {'fecha_inicio': (hoy - timedelta(days=max(2, args.dias))).isoformat(), 'fecha_fin': hoy.isoformat()}
+
+    def ronda():
+        respuesta = cliente.post('/empleado/obtener-estadisticas', json=rango)
+        assert respuesta.status_code == 200, respuesta.status_code
+
+    resultado = medir(ronda, args.rondas, args.tiempo_maximo, calentamiento=0, rondas_minimas=args.rondas_minimas)
+    resultado['detalle'] = f'{args.turnos_historico} turnos en {max(2, args.dias)} días'
+    return resultado
+
+
+def bench_load_user(app, args, en_cache):
+    from app import cache_identidad
+    llamadas = 1000
+
+    def ronda():
+        for _ in range(llamadas):
+            if not en_cache:
+                cache_identidad.invalidar_todo()
+            cache_identidad.cargar_identidad('emp_1')
+
+    with app.test_request_context():
+        resultado = medir(ronda, args.rondas, args.tiempo_maximo, rondas_minimas=args.rondas_minimas)
+    resultado['detalle'] = f'{llamadas} llamadas'
+    return resultado
+
+
+def bench_emision_socket(app, args):
+    """
+    Difusión a clientes conectados con el cliente de pruebas. Las difusiones
+    de python-socketio salen por _send_eio_packet (que el cliente de pruebas
+    no intercepta), así que cada entrega se codifica y se guarda aquí como lo
+    haría el socket del cliente.
+    """
+    from app import socketio
+    from app.models import Turno
+
+    clientes = [socketio.test_client(app) for _ in range(args.clientes_socket)]
+    entregas = []
+    socketio.server._send_eio_packet = lambda eio_sid, paquete: entregas.append(paquete.encode())
+    try:
+        with app.app_context():
+            carga = {'turno': Turno.query.order_by(Turno.id.desc()).first().to_dict()}
+            resultado = medir(lambda: socketio.emit('turno_actualizado', carga), args.rondas, args.tiempo_maximo,
+                              preparar=entregas.clear, rondas_minimas=args.rondas_minimas)
+    finally:
+        del socketio.server._send_eio_packet
+    for cliente in clientes:
+        cliente.disconnect()
+    resultado['detalle'] = f'{len(entregas)} de {args.clientes_socket} clientes'
+    return resultado
+
+
+def ejecutar(app, args, elegidos):
+    casos = {
+        'numero_turno': lambda: bench_numero_turno(app, args),
+        'to_dict': lambda: bench_to_dict(app, args),
+        'to_dict_consulta': lambda: bench_to_dict_consulta(app, args),
+        'dashboard': lambda: bench_dashboard(app, args),
+        'estadisticas': lambda: bench_estadisticas(app, args),
+        'load_user': lambda: {'load_user_cache': bench_load_user(app, args, True),
+                              'load_user_sin_cache': bench_load_user(app, args, False)},
+        'emision_socket': lambda: bench_emision_socket(app, args),
+    }
+    resultados = {}
+    for nombre in BENCHMARKS:
+        if nombre not in elegidos:
+            continue
+        print(f"⏱️  {nombre}...", flush=True)
+        resultado = casos[nombre]()
+        resultados.update(resultado if 'rondas' not in resultado else {nombre: resultado})
+    return resultados
+
+
+# ===== REPORTE Y LÍNEAS BASE =====
+
+def imprimir(resultados):
+    print("\n" + "=" * 100)
+    print(f"{'Benchmark':<22}{'Mín':>11}{'Mediana':>11}{'Media':>11}{'Desv.':>11}{'Ops/s':>10}{'Rondas':>8}  Detalle")
+    print("=" * 100)
+    for nombre, r in resultados.items():
+        print(f"{nombre:<22}{formatear(r['min']):>11}{formatear(r['mediana']):>11}{formatear(r['media']):>11}"
+              f"{formatear(r['desviacion']):>11}{r['ops']:>10.1f}{r['rondas']:>8}  {r['detalle']}")
+
+
+def comparar(resultados, parametros, archivo, tolerancia, rondas_minimas):
+    """
+    Compara las medianas con la línea base; devuelve el número de regresiones.
+    Un benchmark con menos de `rondas_minimas` rondas en alguna de las dos
+    mediciones no se compara: una sola ronda es puro ruido.
+    """
+    with open(archivo, encoding='utf-8') as f:
+        base = json.load(f)
+
+    diferentes = {k: (v, parametros.get(k)) for k, v in base['parametros'].items() if parametros.get(k) != v}
+    if diferentes:
+        print(f"\n⚠️  Parámetros distintos a la línea base: {diferentes}")
+
+    print(f"\nComparación con {archivo} ({base['fecha']}, tolerancia {tolerancia:.0%})")
+    regresiones = 0
+    for nombre, r in resultados.items():
+        anterior = base['resultados'].get(nombre)
+        if anterior is None:
+            print(f"  {nombre:<22} sin línea base")
+            continue
+        if min(r['rondas'], anterior['rondas']) < rondas_minimas:
+            print(f"  {nombre:<22} sin comparar: {anterior['rondas']} -> {r['rondas']} rondas "
+                  f"(mínimo {rondas_minimas})")
+            continue
+        razon = r['mediana'] / anterior['mediana'] if anterior['mediana'] else 1.0
+        if razon > 1 + tolerancia:
+            estado = '❌ REGRESIÓN'
+            regresiones += 1
+        elif razon < 1 - tolerancia:
+            estado = '✓ mejora'
+        else:
+            estado = '= sin cambios'
+        print(f"  {nombre:<22} {formatear(anterior['mediana']):>11} -> {formatear(r['mediana']):>11} "
+              f"({razon - 1:+.0%}) {estado}")
+    return regresiones
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks de modelos y rutas con líneas base')
+    parser.add_argument('--solo', default=','.join(BENCHMARKS), help=f'Benchmarks separados por comas: {", ".join(BENCHMARKS)}')
+    parser.add_argument('--rondas', type=int, default=20, help='Rondas máximas por benchmark')
+    parser.add_argument('--tiempo-maximo', type=float, default=10, help='Segundos máximos por benchmark')
+    parser.add_argument('--rondas-minimas', type=int, default=5,
+                        help='Rondas que se miden aunque se pase --tiempo-maximo y mínimo para comparar')
+    parser.add_argument('--usuarios', type=int, default=50000)
+    parser.add_argument('--turnos-hoy', type=int, default=10000, help='Turnos del día (dashboard)')
+    parser.add_argument('--turnos-historico', type=int, default=1000000, help='Turnos totales (estadísticas)')
+    parser.add_argument('--dias', type=int, default=90, help='Días cubiertos por los turnos')
+    parser.add_argument('--serializar', type=int, default=1000, help='Turnos por ronda de to_dict')
+    parser.add_argument('--hilos', type=int, default=8, help='Hilos compitiendo por numero_turno')
+    parser.add_argument('--reservas', type=int, default=25, help='Reservas por hilo y ronda')
+    parser.add_argument('--clientes-socket', type=int, default=200)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--base-datos', default=None, help='URL de una base vacía (por defecto SQLite temporal)')
+    parser.add_argument('--guardar', default=None, help='Guardar los resultados como línea base (JSON)')
+    parser.add_argument('--comparar', default=None, help='Línea base (JSON) contra la que comparar')
+    parser.add_argument('--tolerancia', type=float, default=0.2, help='Aumento de la mediana tolerado (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    elegidos = {b.strip() for b in args.solo.split(',') if b.strip()}
+    desconocidos = elegidos - set(BENCHMARKS)
+    if desconocidos:
+        parser.error(f'Benchmarks desconocidos: {", ".join(sorted(desconocidos))}')
+
+    temporal = None
+    if args.base_datos is None:
+        temporal = tempfile.mkdtemp(prefix='benchmark_')
+        args.base_datos = 'sqlite:///' + os.path.join(temporal, 'benchmark.db')
+
+    parametros = {k: v for k, v in vars(args).items()
+                  if k not in ('solo', 'guardar', 'comparar', 'tolerancia', 'base_datos')}
+    parametros['motor'] = args.base_datos.split(':', 1)[0]
+
+    print("=" * 60)
+    print(f"BENCHMARKS: {', '.join(b for b in BENCHMARKS if b in elegidos)}")
+    print(f"Base: {parametros['motor']} · {args.turnos_historico} turnos · {args.turnos_hoy} hoy · semilla {args.semilla}")
+    print("=" * 60)
+
+    try:
+        app = crear_aplicacion(args.base_datos)
+        poblar_base(app, args)
+        resultados = ejecutar(app, args, elegidos)
+    finally:
+        if temporal:
+            shutil.rmtree(temporal, ignore_errors=True)
+
+    imprimir(resultados)
+
+    if args.guardar:
+        with open(args.guardar, 'w', encoding='utf-8') as f:
+            json.dump({
+                'fecha': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+                'entorno': {'python': platform.python_version(), 'plataforma': platform.platform()},
+                'parametros': parametros,
+                'resultados': resultados
+            }, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Línea base guardada en {args.guardar}")
+
+    if args.comparar:
+        regresiones = comparar(resultados, parametros, args.comparar, args.tolerancia, args.rondas_minimas)
+        if regresiones:
+            print(f"\n❌ {regresiones} regresiones")
+            sys.exit(1)
+        print("\n✓ Sin regresiones")
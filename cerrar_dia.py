@@ -0,0 +1,50 @@
+"""
+Script para cerrar días de atención
+
+Resuelve los turnos que quedaron abiertos (cancelándolos o trasladándolos al
+día actual), calcula los resúmenes diarios, reinicia las secuencias de
+numeración, analiza las tablas operativas y escribe el reporte del día en
+instance/reportes/. La aplicación ya cierra periódicamente los días
+anteriores; este script permite ejecutarlo a demanda.
+
+Uso:
+    python cerrar_dia.py                       # todos los días sin cerrar
+    python cerrar_dia.py --fecha 2024-05-20 --politica trasladar
+    python cerrar_dia.py --vacuum
+"""
+
+import argparse
+from datetime import datetime
+
+from app import create_app
+from app.cierre_dia import POLITICAS, cerrar_dia, dias_sin_cerrar, mantenimiento_tablas
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Cierra días de atención')
+    parser.add_argument('--fecha', help='Día a cerrar (AAAA-MM-DD); por defecto todos los días sin cerrar')
+    parser.add_argument('--politica', choices=POLITICAS, default=None,
+                        help='Tratamiento de los turnos sobrantes (por defecto CIERRE_POLITICA)')
+    parser.add_argument('--vacuum', action='store_true', help='Compactar las tablas además de analizarlas')
+    args = parser.parse_args()
+
+    app = create_app()
+
+    with app.app_context():
+        if args.fecha:
+            dias = [datetime.strptime(args.fecha, '%Y-%m-%d').date()]
+        else:
+            dias = dias_sin_cerrar()
+
+        if not dias:
+            print("✓ No hay días pendientes de cierre")
+
+        for fecha in dias:
+            cierre = cerrar_dia(fecha, politica=args.politica, mantenimiento=False)
+            print(f"✓ {fecha}: {cierre.total_turnos} turnos | {cierre.cancelados} cancelados | "
+                  f"{cierre.no_presentados} no presentados | {cierre.trasladados} trasladados")
+            print(f"  📄 Reporte: {cierre.archivo_reporte}")
+
+        if dias:
+            mantenimiento_tablas(args.vacuum or app.config['CIERRE_VACUUM'])
+            print("✓ Tablas operativas analizadas" + (" y compactadas" if args.vacuum else ""))
@@ -8,6 +8,11 @@ import os
 from datetime import timedelta
 
 
+def _booleano(nombre, defecto):
+    """Variable de entorno booleana: 'true', 'on' o '1' (sin distinguir mayúsculas)"""
+    return os.environ.get(nombre, defecto).strip().lower() in ['true', 'on', '1']
+
+
 class Config:
     """Configuración base para todos los entornos"""
     
@@ -32,12 +37,159 @@ class Config:
     
     # Límites de la aplicación
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16 MB max file size
+    
+    # Contraseñas: método/costo del hash (se re-encripta al iniciar sesión si cambia)
+    # e hilos nativos usados para calcularlo sin bloquear eventlet
+    PASSWORD_HASH_METODO = os.environ.get('PASSWORD_HASH_METODO', 'pbkdf2:sha256:600000')
+    PASSWORD_POOL_HILOS = int(os.environ.get('PASSWORD_POOL_HILOS', 4))
+    
+    # Segundos que se conserva en caché la identidad del usuario autenticado
+    IDENTIDAD_CACHE_TTL = int(os.environ.get('IDENTIDAD_CACHE_TTL', 30))
+    
+    # Caché de cédulas de usuarios (LRU + filtro de Bloom)
+    CEDULAS_LRU_TAMANO = int(os.environ.get('CEDULAS_LRU_TAMANO', 5000))
+    CEDULAS_BLOOM_CAPACIDAD = int(os.environ.get('CEDULAS_BLOOM_CAPACIDAD', 100000))
+    CEDULAS_BLOOM_FALSOS_POSITIVOS = float(os.environ.get('CEDULAS_BLOOM_FALSOS_POSITIVOS', 0.01))
+    CEDULAS_REFRESCO_SEGUNDOS = int(os.environ.get('CEDULAS_REFRESCO_SEGUNDOS', 3600))
+    # Cada cuánto se agregan al filtro las cédulas registradas por otros procesos (importaciones, scripts)
+    CEDULAS_INCREMENTAL_SEGUNDOS = int(os.environ.get('CEDULAS_INCREMENTAL_SEGUNDOS', 5))
+    
+    # Claves Idempotency-Key de emisión de turnos
+    IDEMPOTENCIA_TTL_HORAS = int(os.environ.get('IDEMPOTENCIA_TTL_HORAS', 24))
+    IDEMPOTENCIA_PURGA_SEGUNDOS = int(os.environ.get('IDEMPOTENCIA_PURGA_SEGUNDOS', 3600))
+    
+    # Limpieza de notificaciones de turnos cerrados
+    NOTIFICACIONES_TTL_HORAS = int(os.environ.get('NOTIFICACIONES_TTL_HORAS', 2))
+    NOTIFICACIONES_ARCHIVAR = _booleano('NOTIFICACIONES_ARCHIVAR', 'true')
+    NOTIFICACIONES_INTERVALO_SEGUNDOS = int(os.environ.get('NOTIFICACIONES_INTERVALO_SEGUNDOS', 600))
+    
+    # Envío de notificaciones por SMS, e-mail y WhatsApp (ver app/mensajeria.py). Sin canales ni
+    # transporte por defecto: fuera de desarrollo y pruebas no se admiten los transportes archivo y memoria
+    MENSAJERIA_CANALES = [c.strip() for c in os.environ.get('MENSAJERIA_CANALES', '').split(',') if c.strip()]
+    MENSAJERIA_TRANSPORTE = os.environ.get('MENSAJERIA_TRANSPORTE')  # smtp, webhook (archivo, memoria: desarrollo)
+    MENSAJERIA_TRANSPORTE_SMS = os.environ.get('MENSAJERIA_TRANSPORTE_SMS')
+    MENSAJERIA_TRANSPORTE_EMAIL = os.environ.get('MENSAJERIA_TRANSPORTE_EMAIL')
+    MENSAJERIA_TRANSPORTE_WHATSAPP = os.environ.get('MENSAJERIA_TRANSPORTE_WHATSAPP')
+    # Envíos por segundo de cada canal (formato canal:tasa)
+    MENSAJERIA_LIMITES = {
+        canal.strip(): float(tasa)
+        for canal, tasa in (par.split(':') for par in os.environ.get('MENSAJERIA_LIMITES', 'sms:5,email:10,whatsapp:5').split(',') if ':' in par)
+    }
+    MENSAJERIA_WORKERS = int(os.environ.get('MENSAJERIA_WORKERS', 2))
+    MENSAJERIA_LOTE = int(os.environ.get('MENSAJERIA_LOTE', 20))
+    MENSAJERIA_REINTENTOS = int(os.environ.get('MENSAJERIA_REINTENTOS', 4))
+    MENSAJERIA_BACKOFF_SEGUNDOS = float(os.environ.get('MENSAJERIA_BACKOFF_SEGUNDOS', 2))
+    MENSAJERIA_ESPERA_SEGUNDOS = float(os.environ.get('MENSAJERIA_ESPERA_SEGUNDOS', 0.5))
+    MENSAJERIA_DIRECTORIO = os.environ.get('MENSAJERIA_DIRECTORIO') or \
+        os.path.join(os.path.abspath(os.path.dirname(__file__)), 'instance', 'mensajes')
+    MENSAJERIA_WEBHOOK_URL = os.environ.get('MENSAJERIA_WEBHOOK_URL')
+    MENSAJERIA_WEBHOOK_TOKEN = os.environ.get('MENSAJERIA_WEBHOOK_TOKEN')
+    MAIL_SERVER = os.environ.get('MAIL_SERVER', 'localhost')
+    MAIL_PORT = int(os.environ.get('MAIL_PORT', 587))
+    MAIL_USE_TLS = _booleano('MAIL_USE_TLS', 'true')
+    MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
+    MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
+    MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER')
+    
+    # Turnos no presentados (tres llamados sin respuesta)
+    NO_PRESENTADO_GRACIA_MINUTOS = int(os.environ.get('NO_PRESENTADO_GRACIA_MINUTOS', 10))
+    NO_PRESENTADO_INTERVALO_SEGUNDOS = int(os.environ.get('NO_PRESENTADO_INTERVALO_SEGUNDOS', 60))
+    
+    # Cierre del día (turnos sobrantes, resúmenes, mantenimiento de tablas)
+    CIERRE_POLITICA = os.environ.get('CIERRE_POLITICA', 'cancelar')  # cancelar o trasladar
+    CIERRE_VACUUM = _booleano('CIERRE_VACUUM', 'false')
+    CIERRE_INTERVALO_SEGUNDOS = int(os.environ.get('CIERRE_INTERVALO_SEGUNDOS', 900))
+    CIERRE_DIRECTORIO_REPORTES = os.environ.get('CIERRE_DIRECTORIO_REPORTES') or \
+        os.path.join(os.path.abspath(os.path.dirname(__file__)), 'instance', 'reportes')
+    
+    # Enrutamiento: proponer cada turno nuevo al empleado libre más adecuado
+    ENRUTAMIENTO_PROPONER = _booleano('ENRUTAMIENTO_PROPONER', 'true')
+    
+    # Simulador de atención (planificación de ventanillas)
+    SIMULADOR_DIAS_HISTORIA = int(os.environ.get('SIMULADOR_DIAS_HISTORIA', 60))
+    SIMULADOR_DIAS_SIMULADOS = int(os.environ.get('SIMULADOR_DIAS_SIMULADOS', 22))
+    SIMULADOR_MINUTOS_ENVEJECIMIENTO = int(os.environ.get('SIMULADOR_MINUTOS_ENVEJECIMIENTO', 20))
+    
+    # Citas con franja horaria (horas en el mismo reloj que fecha_solicitud)
+    CITAS_HORA_INICIO = int(os.environ.get('CITAS_HORA_INICIO', 8))
+    CITAS_HORA_FIN = int(os.environ.get('CITAS_HORA_FIN', 16))
+    CITAS_MINUTOS_FRANJA = int(os.environ.get('CITAS_MINUTOS_FRANJA', 30))
+    CITAS_PROPORCION = float(os.environ.get('CITAS_PROPORCION', 0.5))  # Parte de la capacidad reservable
+    CITAS_DIAS_SEMANA = os.environ.get('CITAS_DIAS_SEMANA', '0,1,2,3,4')  # 0 = lunes
+    CITAS_DIAS_ANTICIPACION = int(os.environ.get('CITAS_DIAS_ANTICIPACION', 30))
+    CITAS_INTERVALO_SEGUNDOS = int(os.environ.get('CITAS_INTERVALO_SEGUNDOS', 60))
+    
+    # Métricas en formato Prometheus (/metrics); con token se exige "Authorization: Bearer <token>",
+    # sin token solo las ve un superadmin con sesión (o la propia máquina en desarrollo)
+    METRICAS_HABILITADAS = _booleano('METRICAS_HABILITADAS', 'true')
+    METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN', '')
+    
+    # Trazas de latencia de eventos Socket.IO: fracción de clientes que confirman cada evento
+    # y eventos recordados a la espera de acuse
+    TRAZAS_SOCKET_HABILITADAS = _booleano('TRAZAS_SOCKET_HABILITADAS', 'true')
+    TRAZAS_SOCKET_FRACCION_ACUSES = float(os.environ.get('TRAZAS_SOCKET_FRACCION_ACUSES', 0.25))
+    TRAZAS_SOCKET_PENDIENTES_MAXIMOS = int(os.environ.get('TRAZAS_SOCKET_PENDIENTES_MAXIMOS', 5000))
+    
+    # Registro de consultas lentas (umbral 0 = deshabilitado)
+    CONSULTAS_LENTAS_UMBRAL_MS = float(os.environ.get('CONSULTAS_LENTAS_UMBRAL_MS', 200))
+    # Guardar los parámetros de la sentencia (datos personales): nunca los de usuarios, usuarios_sistema y empleados
+    CONSULTAS_LENTAS_PARAMETROS = _booleano('CONSULTAS_LENTAS_PARAMETROS', 'false')
+    CONSULTAS_LENTAS_EXPLAIN_ANALYZE = _booleano('CONSULTAS_LENTAS_EXPLAIN_ANALYZE', 'false')
+    CONSULTAS_LENTAS_ARCHIVO = os.environ.get('CONSULTAS_LENTAS_ARCHIVO') or \
+        os.path.join(os.path.abspath(os.path.dirname(__file__)), 'instance', 'logs', 'consultas_lentas.log')
+    CONSULTAS_LENTAS_ARCHIVO_MAX_BYTES = int(os.environ.get('CONSULTAS_LENTAS_ARCHIVO_MAX_BYTES', 5 * 1024 * 1024))
+    CONSULTAS_LENTAS_ARCHIVO_RESPALDOS = int(os.environ.get('CONSULTAS_LENTAS_ARCHIVO_RESPALDOS', 5))
+    CONSULTAS_LENTAS_INTERVALO_SEGUNDOS = int(os.environ.get('CONSULTAS_LENTAS_INTERVALO_SEGUNDOS', 30))
+    
+    # Perfilador de peticiones bajo demanda (/admin/perfilador): archivos speedscope, límite de
+    # eventos por captura y minutos máximos que permanece activo
+    PERFILADOR_DIRECTORIO = os.environ.get('PERFILADOR_DIRECTORIO') or \
+        os.path.join(os.path.abspath(os.path.dirname(__file__)), 'instance', 'perfiles')
+    PERFILADOR_MAX_EVENTOS = int(os.environ.get('PERFILADOR_MAX_EVENTOS', 1000000))
+    PERFILADOR_MINUTOS_MAXIMOS = int(os.environ.get('PERFILADOR_MINUTOS_MAXIMOS', 30))
+    
+    # Registro de eventos: nivel general, niveles por módulo ("app.routes=DEBUG,werkzeug=WARNING"),
+    # muestreo de módulos frecuentes ("app.routes.usuario_routes=10" conserva 1 de cada 10) y formato json|texto
+    LOG_NIVEL = os.environ.get('LOG_NIVEL', 'INFO')
+    LOG_NIVELES_MODULOS = os.environ.get('LOG_NIVELES_MODULOS', '')
+    LOG_MUESTREO = os.environ.get('LOG_MUESTREO', '')
+    LOG_FORMATO = os.environ.get('LOG_FORMATO', 'json')
+    LOG_COLA_MAXIMA = int(os.environ.get('LOG_COLA_MAXIMA', 10000))
+    
+    # Importación de ciudadanos desde /admin/importar-ciudadanos: directorio de archivos subidos,
+    # filas por lote, tamaño de cada parte de la subida (menor que MAX_CONTENT_LENGTH) y tamaño máximo del archivo
+    IMPORTACION_DIRECTORIO = os.environ.get('IMPORTACION_DIRECTORIO') or \
+        os.path.join(os.path.abspath(os.path.dirname(__file__)), 'instance', 'importaciones')
+    IMPORTACION_TAMANO_LOTE = int(os.environ.get('IMPORTACION_TAMANO_LOTE', 5000))
+    IMPORTACION_TAMANO_PARTE = int(os.environ.get('IMPORTACION_TAMANO_PARTE', 4 * 1024 * 1024))
+    IMPORTACION_TAMANO_MAXIMO = int(os.environ.get('IMPORTACION_TAMANO_MAXIMO', 512 * 1024 * 1024))
+    
+    # Emisión de turnos por lote
+    LOTE_TURNOS_MAXIMO = int(os.environ.get('LOTE_TURNOS_MAXIMO', 1000))
+    
+    # Tareas periódicas en segundo plano (latidos, archivado, limpiezas)
+    TAREAS_PROGRAMADAS = _booleano('TAREAS_PROGRAMADAS', 'true')
+    
+    # Réplica de solo lectura para reportes (opcional)
+    REPLICA_DATABASE_URI = os.environ.get('REPLICA_DATABASE_URI')
+    REPLICA_MAX_RETRASO_SEGUNDOS = int(os.environ.get('REPLICA_MAX_RETRASO_SEGUNDOS', 30))
+    REPLICA_INTERVALO_VERIFICACION = int(os.environ.get('REPLICA_INTERVALO_VERIFICACION', 5))
+    REPLICA_INTERVALO_LATIDO = int(os.environ.get('REPLICA_INTERVALO_LATIDO', 5))
+    
+    # Archivado de turnos de días cerrados a las tablas históricas
+    ARCHIVO_DIAS_RETENCION = int(os.environ.get('ARCHIVO_DIAS_RETENCION', 7))
+    ARCHIVO_TAMANO_LOTE = int(os.environ.get('ARCHIVO_TAMANO_LOTE', 1000))
+    ARCHIVO_INTERVALO_SEGUNDOS = int(os.environ.get('ARCHIVO_INTERVALO_SEGUNDOS', 3600))
 
 
 class DevelopmentConfig(Config):
     """Configuración para desarrollo"""
     DEBUG = True
     TESTING = False
+    LOG_NIVEL = os.environ.get('LOG_NIVEL', 'DEBUG')
+    LOG_FORMATO = os.environ.get('LOG_FORMATO', 'texto')
+    MENSAJERIA_CANALES = [c.strip() for c in os.environ.get('MENSAJERIA_CANALES', 'sms,email,whatsapp').split(',') if c.strip()]
+    MENSAJERIA_TRANSPORTE = os.environ.get('MENSAJERIA_TRANSPORTE', 'archivo')
     SESSION_COOKIE_SECURE = False  # Permitir HTTP en desarrollo
     REMEMBER_COOKIE_SECURE = False
 
@@ -75,6 +227,9 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'  # Base de datos en memoria
     WTF_CSRF_ENABLED = False
+    TAREAS_PROGRAMADAS = False
+    MENSAJERIA_CANALES = ['sms', 'email', 'whatsapp']
+    MENSAJERIA_TRANSPORTE = 'memoria'
 
 
 # Diccionario de configuraciones
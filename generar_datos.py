@@ -0,0 +1,91 @@
+"""
+Genera y carga datos sintéticos (usuarios, turnos y notificaciones)
+
+Pobla la base de datos configurada en el entorno con datos realistas y
+deterministas (ver app/datos_sinteticos.py) para benchmarks y pruebas de
+capacidad. Carga con COPY en PostgreSQL y executemany en SQLite, en lotes de
+--lote filas con un commit por lote.
+
+Las filas se agregan a las existentes: usar una base de pruebas, nunca la de
+producción.
+
+Uso:
+    python generar_datos.py --usuarios 200000 --turnos 2000000 --dias 180
+    python generar_datos.py --usuarios 0 --turnos 500000 --dias 30 --curva vencimiento --semilla 7
+"""
+
+import argparse
+import os
+import sys
+import time
+
+os.environ['TAREAS_PROGRAMADAS'] = 'false'
+
+from app import create_app
+from app.cierre_dia import mantenimiento_tablas
+from app.datos_sinteticos import CURVAS_LLEGADA, TAMANO_LOTE, poblar
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Genera y carga datos sintéticos en lotes')
+    parser.add_argument('--usuarios', type=int, default=100000, help='Usuarios nuevos (0: usar los existentes)')
+    parser.add_argument('--turnos', type=int, default=1000000, help='Turnos de los días completos (hoy recibe la parte transcurrida)')
+    parser.add_argument('--dias', type=int, default=90, help='Días que cubren los turnos (terminan hoy)')
+    parser.add_argument('--turnos-hoy', type=int, default=None, help='Turnos de la jornada en curso')
+    parser.add_argument('--curva', choices=sorted(CURVAS_LLEGADA), default='normal', help='Curva de llegadas por hora')
+    parser.add_argument('--ventanillas', type=int, default=0, help='Ventanillas por jornada (0: según la carga)')
+    parser.add_argument('--sin-notificaciones', action='store_true', help='No generar notificaciones de llamado')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help='Filas por lote')
+    parser.add_argument('--forzar', action='store_true', help='Permitir la carga con FLASK_ENV=production')
+    args = parser.parse_args()
+
+    if os.environ.get('FLASK_ENV') == 'production' and not args.forzar:
+        print("❌ FLASK_ENV=production: los datos sintéticos se agregan a la base configurada. Use --forzar si es una base de pruebas.")
+        sys.exit(1)
+
+    app = create_app()
+    inicio = time.perf_counter()
+
+    def progreso(insertados):
+        filas = sum(insertados.values())
+        segundos = time.perf_counter() - inicio
+        print(f"  {filas:>10,} filas  {filas / segundos * 60:>12,.0f} filas/min  "
+              + '  '.join(f'{tabla}={cantidad:,}' for tabla, cantidad in insertados.items()), flush=True)
+
+    print("=" * 60)
+    print("CARGA DE DATOS SINTÉTICOS")
+    print("=" * 60)
+    with app.app_context():
+        print(f"Base: {app.config['SQLALCHEMY_DATABASE_URI'].split('@')[-1]}")
+        print(f"Usuarios: {args.usuarios:,} · Turnos: {args.turnos:,} en {args.dias} días · "
+              f"Curva: {args.curva} · Semilla: {args.semilla}\n")
+        try:
+            insertados = poblar(
+                usuarios=args.usuarios,
+                turnos=args.turnos,
+                dias=args.dias,
+                curva=args.curva,
+                ventanillas=args.ventanillas,
+                turnos_hoy=args.turnos_hoy,
+                notificaciones=not args.sin_notificaciones,
+                semilla=args.semilla,
+                tamano_lote=args.lote,
+                progreso=progreso
+            )
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        duracion = time.perf_counter() - inicio
+
+        print("\n📊 Actualizando estadísticas del planificador...")
+        mantenimiento_tablas()
+
+    filas = sum(insertados.values())
+    print(f"\n✅ {filas:,} filas en {duracion:.1f} s ({filas / duracion * 60:,.0f} filas/min)")
+    for tabla, cantidad in insertados.items():
+        print(f"   {tabla}: {cantidad:,}")
+
+
+if __name__ == '__main__':
+    main()
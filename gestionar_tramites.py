@@ -3,6 +3,8 @@ Script para gestionar tipos de trámites
 
 Este script permite agregar, modificar, eliminar y listar los tipos de trámites
 de forma interactiva desde la línea de comandos.
+Para aplicar un catálogo completo de trámites y asignaciones de empleados en
+un solo paso use sincronizar_tramites.py.
 
 Uso:
     python gestionar_tramites.py
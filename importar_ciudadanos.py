@@ -0,0 +1,88 @@
+"""
+Importa un padrón CSV de ciudadanos a la tabla usuarios
+
+Valida cédula, nombre, teléfono, email y categoría de cada fila e inserta o
+actualiza en lotes con INSERT ... ON CONFLICT (ver app/importacion_ciudadanos.py).
+Las filas rechazadas se escriben en un CSV con la línea y el motivo.
+
+El servidor en ejecución reconoce las cédulas nuevas en pocos segundos
+(CEDULAS_INCREMENTAL_SEGUNDOS) y los datos modificados de las que tenga en
+caché cuando la reconstruye (CEDULAS_REFRESCO_SEGUNDOS); la subida desde
+/admin/importar-ciudadanos registra ambos de inmediato.
+
+Uso:
+    python importar_ciudadanos.py sisben.csv
+    python importar_ciudadanos.py adulto_mayor.csv --solo-nuevos --rechazos rechazos.csv
+    python importar_ciudadanos.py padron.csv --codificacion cp1252 --lote 10000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+os.environ['TAREAS_PROGRAMADAS'] = 'false'
+
+from app import create_app
+from app.importacion_ciudadanos import TAMANO_LOTE, detectar_codificacion, importar_ciudadanos
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Importa un padrón CSV de ciudadanos')
+    parser.add_argument('archivo', help='Archivo CSV con encabezado')
+    parser.add_argument('--rechazos', help='CSV de filas rechazadas (por defecto <archivo>_rechazos.csv)')
+    parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help='Filas por lote')
+    parser.add_argument('--codificacion', help='Codificación del archivo (por defecto se detecta: utf-8 o cp1252)')
+    parser.add_argument('--solo-nuevos', action='store_true', help='No modificar los ciudadanos ya registrados')
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.archivo):
+        print(f"❌ No existe el archivo {args.archivo}")
+        sys.exit(1)
+
+    codificacion = args.codificacion or detectar_codificacion(args.archivo)
+    ruta_rechazos = args.rechazos or f'{os.path.splitext(args.archivo)[0]}_rechazos.csv'
+
+    app = create_app()
+    inicio = time.perf_counter()
+
+    def progreso(resultado):
+        segundos = time.perf_counter() - inicio
+        print(f"  {resultado.filas:>10,} filas  {resultado.filas / segundos:>9,.0f} filas/s  "
+              f"nuevos={resultado.nuevos:,}  actualizados={resultado.actualizados:,}  "
+              f"rechazados={resultado.rechazados:,}", flush=True)
+
+    print("=" * 60)
+    print("IMPORTACIÓN DE CIUDADANOS")
+    print("=" * 60)
+    print(f"Archivo: {args.archivo} ({codificacion})")
+
+    with app.app_context():
+        print(f"Base: {app.config['SQLALCHEMY_DATABASE_URI'].split('@')[-1]}\n")
+        try:
+            with open(args.archivo, encoding=codificacion, errors='replace', newline='') as texto, \
+                    open(ruta_rechazos, 'w', encoding='utf-8-sig', newline='') as rechazos:
+                resultado = importar_ciudadanos(texto, rechazos, args.lote, args.solo_nuevos, progreso)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+
+    print(f"\n✅ {resultado.filas:,} filas en {resultado.duracion:.1f} s")
+    print(f"   Nuevos: {resultado.nuevos:,}")
+    if args.solo_nuevos:
+        print(f"   Omitidos (ya registrados): {resultado.omitidos:,}")
+    else:
+        print(f"   Actualizados: {resultado.actualizados:,}")
+    print(f"   Cédulas repetidas en el archivo: {resultado.duplicados:,}")
+    print(f"   Rechazados: {resultado.rechazados:,}")
+
+    if resultado.rechazados:
+        for linea, motivo in resultado.muestras[:10]:
+            print(f"     línea {linea}: {motivo}")
+        print(f"\n⚠️  Filas rechazadas en {ruta_rechazos}")
+    else:
+        os.remove(ruta_rechazos)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Script para migrar una base de datos existente al esquema actual
+
+Reconstruye con AUTOINCREMENT las tablas operativas de bases SQLite creadas
+antes de que lo declararan, conservando todas sus filas, y ajusta la
+secuencia de ids para que no repita ids ya archivados en las tablas
+históricas. Mientras la migración no se ejecute, el archivado y el barrido de
+notificaciones se niegan a correr. Las bases PostgreSQL no requieren cambios.
+
+Se recomienda respaldar el archivo de la base antes de ejecutarlo y detener
+la aplicación (la migración bloquea las escrituras mientras corre).
+
+Uso:
+    python migrar_db.py
+    python migrar_db.py --verificar
+"""
+
+import argparse
+import sys
+
+from app import create_app
+from app.migraciones import migrar_autoincremento, tablas_sin_autoincremento
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Migra una base de datos existente al esquema actual')
+    parser.add_argument('--verificar', action='store_true',
+                        help='Solo informa las tablas pendientes, sin modificar la base')
+    args = parser.parse_args()
+
+    app = create_app()
+
+    with app.app_context():
+        pendientes = tablas_sin_autoincremento()
+        if args.verificar:
+            if pendientes:
+                print(f"⚠️  Tablas pendientes de migrar: {', '.join(pendientes)}")
+                sys.exit(1)
+            print("✓ El esquema está al día")
+            sys.exit(0)
+
+        print("=" * 60)
+        print("MIGRACIÓN DEL ESQUEMA")
+        print("=" * 60)
+        reconstruidas = migrar_autoincremento()
+        for tabla in reconstruidas:
+            print(f"✓ Tabla {tabla} reconstruida con AUTOINCREMENT")
+        if not reconstruidas:
+            print("✓ No había tablas pendientes; secuencias verificadas")
@@ -0,0 +1,597 @@
+"""
+Prueba de carga: una jornada completa de la oficina contra una instancia en marcha
+
+Reproduce, comprimida en --duracion segundos, una jornada de --horas horas con
+actores guionizados que usan la aplicación como los navegadores:
+
+- Kioscos: siguen el flujo de formulario.html (carga del formulario,
+  consulta de cédula y emisión del turno con Idempotency-Key) para los
+  ciudadanos que llegan según la curva de llegadas. Si los kioscos no dan
+  abasto, los ciudadanos esperan en fila y esa espera se reporta.
+- Ciudadanos: con el turno emitido abren historial/<id>, mantienen abierto
+  el socket (transporte long-polling de Socket.IO) y consultan sus
+  notificaciones cada --sondeo segundos hasta que su turno se cierra.
+- Empleados: inician sesión, abren el dashboard con su socket y repiten el
+  ciclo siguiente turno -> llamar -> atender -> finalizar (o no presentado).
+
+Las llegadas son un proceso de Poisson cuya intensidad sigue la curva por
+hora elegida (--curva normal|vencimiento|constante o multiplicadores propios
+"1,2,3,..."). Con la misma --semilla se generan las mismas llegadas, cédulas,
+trámites, categorías y tiempos de atención.
+
+Reporta peticiones, errores, rendimiento y latencias p50/p95/p99 por
+endpoint, la latencia de entrega de los eventos Socket.IO a los clientes y la
+espera en fila de los kioscos. Con --salida guarda el reporte en JSON.
+
+Los empleados de carga se crean con --preparar en la base configurada en el
+entorno (la misma que usa la instancia: SQLite local o PostgreSQL local), con
+la contraseña dada en --clave. Son cuentas activas: con FLASK_ENV=production
+--preparar se niega a crearlas salvo con --forzar.
+
+Uso:
+    python prueba_carga.py --preparar --empleados 8 --clave <contraseña>
+    python run.py  # en otra terminal
+    python prueba_carga.py --clave <contraseña> --url http://127.0.0.1:5000 --turnos 800 --duracion 300
+    python prueba_carga.py --clave <contraseña> --curva vencimiento --turnos 3000 --empleados 12 --salida reporte.json
+"""
+
+import eventlet
+eventlet.monkey_patch()
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import Counter, defaultdict
+from http.cookiejar import CookieJar
+
+# Multiplicadores de llegadas por hora de la jornada
+CURVAS = {
+    'constante': [1, 1, 1, 1, 1, 1, 1, 1],
+    'normal': [0.6, 1.4, 1.6, 1.2, 0.8, 0.9, 0.9, 0.6],
+    'vencimiento': [1.2, 2.4, 2.6, 2.0, 1.6, 1.8, 2.2, 2.6],
+}
+
+CATEGORIAS = [('ninguna', 0.8), ('adulto_mayor', 0.1), ('discapacidad', 0.05), ('embarazada', 0.05)]
+
+DOMINIO_EMPLEADOS = 'carga.local'
+TIEMPO_ESPERA_HTTP = 30
+
+_IDS = re.compile(r'/\d+(?=/|$)')
+
+
+def percentil(valores, p):
+    """Percentil simple (p entre 0 y 100)"""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+# ===== ESTADÍSTICAS =====
+
+class Estadisticas:
+    """Resultados de todos los actores (un solo proceso con greenlets)"""
+
+    def __init__(self):
+        self.latencias = defaultdict(list)    # endpoint -> [ms]
+        self.codigos = defaultdict(Counter)   # endpoint -> {código: n}
+        self.errores = Counter()              # endpoint -> n
+        self.sockets = Counter()              # conectados, fallidos, eventos, ...
+        self.entregas = defaultdict(list)     # evento -> [ms emit -> recepción]
+        self.espera_kiosco = []               # segundos en fila antes del kiosco
+        self.turnos = Counter()               # emitidos, atendidos, no_presentados
+        self.inicio = None
+        self.fin = None
+
+    def peticion(self, endpoint, codigo, milisegundos, error):
+        self.latencias[endpoint].append(milisegundos)
+        self.codigos[endpoint][codigo] += 1
+        if error:
+            self.errores[endpoint] += 1
+
+    def reporte(self):
+        duracion = max(1e-9, (self.fin or time.time()) - self.inicio)
+        endpoints = {}
+        for endpoint, latencias in sorted(self.latencias.items()):
+            endpoints[endpoint] = {
+                'peticiones': len(latencias),
+                'errores': self.errores[endpoint],
+                'tasa_error': round(self.errores[endpoint] / len(latencias), 4),
+                'por_segundo': round(len(latencias) / duracion, 2),
+                'p50_ms': round(percentil(latencias, 50), 1),
+                'p95_ms': round(percentil(latencias, 95), 1),
+                'p99_ms': round(percentil(latencias, 99), 1),
+                'max_ms': round(max(latencias), 1),
+                'codigos': dict(self.codigos[endpoint])
+            }
+        total = sum(len(v) for v in self.latencias.values())
+        return {
+            'duracion_segundos': round(duracion, 1),
+            'peticiones': total,
+            'por_segundo': round(total / duracion, 2),
+            'errores': sum(self.errores.values()),
+            'endpoints': endpoints,
+            'turnos': dict(self.turnos),
+            'espera_kiosco_segundos': {
+                'p50': round(percentil(self.espera_kiosco, 50), 2),
+                'p99': round(percentil(self.espera_kiosco, 99), 2),
+                'max': round(max(self.espera_kiosco, default=0), 2)
+            },
+            'sockets': dict(self.sockets),
+            'entrega_eventos_ms': {
+                evento: {'eventos': len(v), 'p50': round(percentil(v, 50), 1),
+                         'p99': round(percentil(v, 99), 1), 'max': round(max(v), 1)}
+                for evento, v in sorted(self.entregas.items())
+            }
+        }
+
+
+# ===== CLIENTE HTTP =====
+
+class ClienteHTTP:
+    """Navegador mínimo: cookies propias y registro de cada petición"""
+
+    def __init__(self, base, estadisticas):
+        self.base = base.rstrip('/')
+        self.estadisticas = estadisticas
+        self.cookies = CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies))
+
+    def crudo(self, metodo, ruta, cuerpo=None, encabezados=None, tiempo=TIEMPO_ESPERA_HTTP):
+        """Petición sin registrar: (código, texto)"""
+        peticion = urllib.request.Request(self.base + ruta, data=cuerpo, method=metodo,
+                                          headers=encabezados or {})
+        try:
+            with self.opener.open(peticion, timeout=tiempo) as respuesta:
+                return respuesta.status, respuesta.read().decode('utf-8', 'replace')
+        except urllib.error.HTTPError as e:
+            return e.code, e.read().decode('utf-8', 'replace')
+
+    def pedir(self, metodo, ruta, datos=None, encabezados=None, esperados=()):
+        """
+        Petición registrada en las estadísticas. Los códigos en `esperados`
+        (ej: 404 de siguiente-turno sin turnos) no cuentan como error.
+
+        Returns:
+            (código, JSON o texto); código 0 si hubo un error de conexión
+        """
+        encabezados = dict(encabezados or {})
+        cuerpo = None
+        if datos is not None:
+            cuerpo = json.dumps(datos).encode('utf-8')
+            encabezados['Content-Type'] = 'application/json'
+        endpoint = f'{metodo} {_IDS.sub("/<id>", ruta.split("?", 1)[0])}'
+
+        inicio = time.perf_counter()
+        try:
+            codigo, texto = self.crudo(metodo, ruta, cuerpo, encabezados)
+        except Exception:
+            codigo, texto = 0, ''
+        self.estadisticas.peticion(endpoint, codigo, (time.perf_counter() - inicio) * 1000,
+                                   codigo == 0 or (codigo >= 400 and codigo not in esperados))
+        try:
+            return codigo, json.loads(texto)
+        except ValueError:
+            return codigo, texto
+
+
+# ===== CLIENTE SOCKET.IO (long-polling) =====
+
+class ClienteSocket:
+    """
+    Cliente Socket.IO mínimo sobre el transporte long-polling de Engine.IO 4,
+    con las cookies del ClienteHTTP (la sesión del empleado viaja igual que
+    en el navegador). Sincroniza el reloj como static/js/trazas_socket.js y
+    confirma los eventos trazados.
+    """
+
+    def __init__(self, http, estadisticas, manejador=None):
+        self.http = http
+        self.estadisticas = estadisticas
+        self.manejador = manejador
+        self.sid = None
+        self.activo = False
+        self.desfase = 0.0
+        self._acks = {}
+        self._siguiente_ack = 0
+        self._hilo = None
+
+    def _ruta(self):
+        ruta = f'/socket.io/?EIO=4&transport=polling&t={uuid.uuid4().hex[:8]}'
+        return ruta + (f'&sid={self.sid}' if self.sid else '')
+
+    def _enviar(self, paquete):
+        self.http.crudo('POST', self._ruta(), paquete.encode('utf-8'), {'Content-Type': 'text/plain;charset=UTF-8'})
+
+    def conectar(self):
+        try:
+            codigo, texto = self.http.crudo('GET', self._ruta())
+            if codigo != 200 or not texto.startswith('0'):
+                raise ConnectionError(f'handshake {codigo}')
+            apertura = json.loads(texto.split('\x1e')[0][1:])
+            self.sid = apertura['sid']
+            self._espera = apertura.get('pingInterval', 25000) / 1000 + apertura.get('pingTimeout', 20000) / 1000
+            self._enviar('40')
+        except Exception:
+            self.estadisticas.sockets['fallidos'] += 1
+            return False
+
+        self.activo = True
+        self.estadisticas.sockets['conectados'] += 1
+        self._hilo = eventlet.spawn(self._escuchar)
+        envio = time.time() * 1000
+        self.emitir('sincronizar_reloj', {}, lambda r: self._sincronizar(envio, r))
+        return True
+
+    def _sincronizar(self, envio, respuesta):
+        llegada = time.time() * 1000
+        self.desfase = respuesta.get('servidor', llegada) - (envio + llegada) / 2
+
+    def emitir(self, evento, datos, ack=None):
+        identificador = ''
+        if ack is not None:
+            identificador = str(self._siguiente_ack)
+            self._acks[identificador] = ack
+            self._siguiente_ack += 1
+        try:
+            self._enviar(f'42{identificador}' + json.dumps([evento, datos]))
+        except Exception:
+            self.estadisticas.sockets['errores_envio'] += 1
+
+    def _escuchar(self):
+        while self.activo:
+            try:
+                codigo, texto = self.http.crudo('GET', self._ruta(), tiempo=self._espera)
+            except Exception:
+                codigo, texto = 0, ''
+            if not self.activo:
+                return
+            if codigo != 200:
+                self.estadisticas.sockets['desconexiones'] += 1
+                self.activo = False
+                return
+            for paquete in texto.split('\x1e'):
+                self._procesar(paquete)
+
+    def _procesar(self, paquete):
+        if paquete == '2':
+            self._enviar('3')
+        elif paquete == '1':
+            self.activo = False
+        elif paquete.startswith('42'):
+            evento, datos = json.loads(paquete[2:])[:2]
+            self._evento(evento, datos)
+        elif paquete.startswith('43'):
+            cuerpo = paquete[2:]
+            identificador = cuerpo[:len(cuerpo) - len(cuerpo.lstrip('0123456789'))]
+            ack = self._acks.pop(identificador, None)
+            if ack is not None:
+                ack(*json.loads(cuerpo[len(identificador):]))
+        elif paquete.startswith('44'):
+            self.estadisticas.sockets['rechazados'] += 1
+
+    def _evento(self, evento, datos):
+        recibido = time.time() * 1000 + self.desfase
+        self.estadisticas.sockets['eventos'] += 1
+        traza = datos.get('_traza') if isinstance(datos, dict) else None
+        if traza:
+            self.estadisticas.entregas[evento].append(max(0.0, recibido - traza['emitido']))
+        if self.manejador is not None:
+            self.manejador(evento, datos)
+        if traza and random.random() < traza.get('p', 0):
+            self.emitir('acuse_evento', {'id': traza['id'], 'recibido': recibido,
+                                         'mostrado': time.time() * 1000 + self.desfase})
+
+    def cerrar(self):
+        if self.activo:
+            self.activo = False
+            try:
+                self._enviar('1')
+            except Exception:
+                pass
+
+
+# ===== LLEGADAS =====
+
+def generar_llegadas(rng, turnos, curva, duracion):
+    """
+    Instantes de llegada (segundos reales desde el inicio) de un proceso de
+    Poisson con intensidad proporcional a la curva, para unos `turnos` esperados.
+    """
+    tramo = duracion / len(curva)
+    total = sum(curva)
+    llegadas = []
+    for i, peso in enumerate(curva):
+        tasa = turnos * peso / total / tramo
+        if tasa <= 0:
+            continue
+        instante = i * tramo + rng.expovariate(tasa)
+        while instante < (i + 1) * tramo:
+            llegadas.append(instante)
+            instante += rng.expovariate(tasa)
+    return llegadas
+
+
+def leer_curva(texto):
+    if texto in CURVAS:
+        return CURVAS[texto]
+    curva = [float(x) for x in texto.split(',') if x.strip()]
+    if not curva or min(curva) < 0 or not sum(curva):
+        raise argparse.ArgumentTypeError('La curva debe ser normal, vencimiento, constante o multiplicadores "1,2,3"')
+    return curva
+
+
+# ===== ACTORES =====
+
+class Jornada:
+    """Estado compartido de una prueba: parámetros, llegadas y actores en curso"""
+
+    def __init__(self, args, estadisticas):
+        self.args = args
+        self.estadisticas = estadisticas
+        self.rng = random.Random(args.semilla)
+        self.escala = args.duracion / (args.horas * 3600)  # segundos reales por segundo simulado
+        self.fila = eventlet.queue.Queue()
+        self.terminar = eventlet.event.Event()
+        self.ciudadanos = eventlet.GreenPool(args.ciudadanos_max)
+        self.tramites = []
+        self.cedulas = []
+
+    def activa(self):
+        return not self.terminar.ready()
+
+    def ciudadano_nuevo(self):
+        """Datos de un ciudadano (recurrente o nuevo) generados con la semilla"""
+        if self.cedulas and self.rng.random() < self.args.recurrentes:
+            cedula = self.rng.choice(self.cedulas)
+        else:
+            cedula = str(self.args.cedula_base + len(self.cedulas))
+            self.cedulas.append(cedula)
+        categorias, pesos = zip(*CATEGORIAS)
+        return {
+            'cedula': cedula,
+            'nombre': f'Ciudadano {cedula}',
+            'telefono': '',
+            'email': '',
+            'tipo_tramite_id': self.rng.choice(self.tramites),
+            'categoria': self.rng.choices(categorias, pesos)[0]
+        }
+
+
+def kiosco(jornada, numero):
+    """Atiende la fila con el flujo de formulario.html"""
+    http = ClienteHTTP(jornada.args.url, jornada.estadisticas)
+    while True:
+        llegada, datos = jornada.fila.get()
+        if datos is None:
+            return
+        jornada.estadisticas.espera_kiosco.append(time.time() - llegada)
+
+        http.pedir('GET', '/usuario/formulario')
+        codigo, respuesta = http.pedir('POST', '/usuario/consultar-cedula', {'cedula': datos['cedula']})
+        if codigo != 200:
+            continue
+        codigo, respuesta = http.pedir('POST', '/usuario/emitir-turno', datos,
+                                       {'Idempotency-Key': str(uuid.uuid4())})
+        if codigo != 200 or not isinstance(respuesta, dict) or not respuesta.get('success'):
+            jornada.estadisticas.turnos['rechazados'] += 1
+            continue
+        jornada.estadisticas.turnos['emitidos'] += 1
+
+        turno_id = respuesta['turno']['id']
+        http.pedir('GET', f'/usuario/historial/{turno_id}')
+        if jornada.ciudadanos.free():
+            jornada.ciudadanos.spawn_n(ciudadano, jornada, turno_id)
+        else:
+            jornada.estadisticas.sockets['ciudadanos_sin_socket'] += 1
+
+
+def ciudadano(jornada, turno_id):
+    """Mantiene abierto historial/<id> hasta que el turno se cierra"""
+    http = ClienteHTTP(jornada.args.url, jornada.estadisticas)
+    cerrado = eventlet.event.Event()
+
+    def manejador(evento, datos):
+        turnos = datos.get('turnos') or [datos.get('turno') or {}]
+        for turno in turnos:
+            if turno.get('id') == turno_id and turno.get('estado') in ('atendido', 'no_presentado', 'cancelado'):
+                if not cerrado.ready():
+                    cerrado.send(True)
+
+    http.pedir('GET', f'/usuario/historial/{turno_id}')
+    socket = ClienteSocket(http, jornada.estadisticas, manejador)
+    socket.conectar()
+    try:
+        while jornada.activa() and not cerrado.ready():
+            eventlet.with_timeout(jornada.args.sondeo, cerrado.wait, timeout_value=None)
+            if cerrado.ready() or not jornada.activa():
+                break
+            codigo, datos = http.pedir('GET', f'/usuario/verificar-notificaciones/{turno_id}')
+            if codigo == 200 and datos.get('notificaciones'):
+                hasta = max(n['id'] for n in datos['notificaciones'])
+                http.pedir('POST', f'/usuario/marcar-leidas/{turno_id}', {'hasta_id': hasta})
+    finally:
+        socket.cerrar()
+
+
+def empleado(jornada, numero):
+    """Ciclo del dashboard: siguiente turno, llamar, atender y finalizar"""
+    args = jornada.args
+    rng = random.Random(args.semilla * 1000 + numero)
+    http = ClienteHTTP(args.url, jornada.estadisticas)
+    hay_turnos = eventlet.event.Event()
+
+    def manejador(evento, datos):
+        if evento in ('nuevo_turno', 'turnos_lote', 'turno_propuesto') and not hay_turnos.ready():
+            hay_turnos.send(True)
+
+    http.pedir('GET', '/empleado/login')
+    codigo, _ = http.pedir('POST', '/empleado/login',
+                           {'usuario': f'carga{numero}@{DOMINIO_EMPLEADOS}', 'password': args.clave})
+    if codigo != 200:
+        print(f"❌ El empleado carga{numero} no pudo iniciar sesión (¿se ejecutó --preparar?)")
+        return
+    http.pedir('GET', '/empleado/dashboard')
+    socket = ClienteSocket(http, jornada.estadisticas, manejador)
+    socket.conectar()
+
+    try:
+        while jornada.activa():
+            codigo, datos = http.pedir('POST', '/empleado/siguiente-turno', {}, esperados=(404,))
+            if codigo != 200:
+                hay_turnos = eventlet.event.Event()
+                eventlet.with_timeout(5, hay_turnos.wait, timeout_value=None)
+                continue
+
+            turno_id = datos['turno']['id']
+            no_se_presenta = rng.random() < args.no_presentados
+            for _ in range(3 if no_se_presenta else 1):
+                http.pedir('POST', f'/empleado/turno/{turno_id}/llamar', {})
+                eventlet.sleep(rng.uniform(30, 90) * jornada.escala)   # el ciudadano se acerca
+
+            if no_se_presenta:
+                estado = 'no_presentado'
+            else:
+                estado = 'atendido'
+                eventlet.sleep(rng.expovariate(1 / (args.atencion_min * 60)) * jornada.escala)
+            http.pedir('POST', f'/empleado/turno/{turno_id}/cambiar-estado', {'estado': estado})
+            jornada.estadisticas.turnos['atendidos' if estado == 'atendido' else 'no_presentados'] += 1
+            http.pedir('GET', '/empleado/dashboard')
+    finally:
+        socket.cerrar()
+
+
+# ===== PREPARACIÓN =====
+
+def preparar_empleados(cantidad, clave):
+    """Crea (si no existen) los empleados de carga con todos los trámites asignados"""
+    from app import create_app
+    from app.models import db, Empleado, TipoTramite, UsuarioSistema
+
+    app = create_app()
+    with app.app_context():
+        tramites = TipoTramite.query.filter_by(activo=True).all()
+        creados = 0
+        for i in range(cantidad):
+            email = f'carga{i}@{DOMINIO_EMPLEADOS}'
+            if UsuarioSistema.query.filter_by(email=email).first():
+                continue
+            empleado = Empleado(nombre=f'Empleado de carga {i}', cargo='Prueba de carga', activo=True)
+            empleado.tramites_asignados = tramites
+            db.session.add(empleado)
+            db.session.flush()
+            usuario = UsuarioSistema(nombre=empleado.nombre, email=email, empleado_id=empleado.id)
+            usuario.set_password(clave)
+            db.session.add(usuario)
+            creados += 1
+        db.session.commit()
+    print(f"✅ {creados} empleados de carga creados ({cantidad} en total)")
+
+
+# ===== REPORTE =====
+
+def imprimir(reporte):
+    print("\n" + "=" * 96)
+    print(f"RESULTADOS ({reporte['duracion_segundos']} s, {reporte['peticiones']} peticiones, "
+          f"{reporte['por_segundo']} req/s, {reporte['errores']} errores)")
+    print("=" * 96)
+    print(f"{'Endpoint':<48}{'Pet.':>7}{'Err.':>6}{'req/s':>8}{'p50':>8}{'p95':>8}{'p99':>8}")
+    for endpoint, datos in reporte['endpoints'].items():
+        print(f"{endpoint[:47]:<48}{datos['peticiones']:>7}{datos['errores']:>6}{datos['por_segundo']:>8}"
+              f"{datos['p50_ms']:>8}{datos['p95_ms']:>8}{datos['p99_ms']:>8}")
+
+    print(f"\n🎫 Turnos: {reporte['turnos']}")
+    espera = reporte['espera_kiosco_segundos']
+    print(f"🧍 Fila de kioscos (s): p50={espera['p50']} p99={espera['p99']} máx={espera['max']}")
+    print(f"🔌 Sockets: {reporte['sockets']}")
+    for evento, datos in reporte['entrega_eventos_ms'].items():
+        print(f"   {evento:<24} entrega (ms): p50={datos['p50']} p99={datos['p99']} máx={datos['max']} "
+              f"({datos['eventos']} eventos)")
+
+
+def ejecutar(args):
+    estadisticas = Estadisticas()
+    jornada = Jornada(args, estadisticas)
+
+    http = ClienteHTTP(args.url, estadisticas)
+    codigo, formulario = http.crudo('GET', '/usuario/formulario')
+    jornada.tramites = [int(t) for t in re.findall(r'<option value="(\d+)" data-tiempo', formulario)]
+    if codigo != 200 or not jornada.tramites:
+        print(f"❌ No se pudo leer los trámites de {args.url}/usuario/formulario (código {codigo})")
+        return None
+
+    llegadas = generar_llegadas(jornada.rng, args.turnos, args.curva, args.duracion)
+    print(f"🚀 {len(llegadas)} llegadas en {args.duracion} s ({args.horas} h simuladas), "
+          f"{args.kioscos} kioscos, {args.empleados} empleados, trámites {jornada.tramites}")
+
+    estadisticas.inicio = time.time()
+    actores = [eventlet.spawn(kiosco, jornada, i) for i in range(args.kioscos)]
+    actores += [eventlet.spawn(empleado, jornada, i) for i in range(args.empleados)]
+
+    for instante in llegadas:
+        espera = estadisticas.inicio + instante - time.time()
+        if espera > 0:
+            eventlet.sleep(espera)
+        jornada.fila.put((time.time(), jornada.ciudadano_nuevo()))
+
+    # Fin de la jornada: se termina la fila y se da un margen a los turnos en curso
+    eventlet.sleep(max(0, estadisticas.inicio + args.duracion - time.time()))
+    for _ in range(args.kioscos):
+        jornada.fila.put((time.time(), None))
+    eventlet.sleep(args.gracia)
+    jornada.terminar.send(True)
+    estadisticas.fin = time.time()
+    for actor in actores:
+        eventlet.with_timeout(TIEMPO_ESPERA_HTTP, actor.wait, timeout_value=None)
+    jornada.ciudadanos.waitall()
+    return estadisticas.reporte()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Prueba de carga de una jornada completa')
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='Instancia a probar')
+    parser.add_argument('--turnos', type=int, default=500, help='Turnos esperados en la jornada')
+    parser.add_argument('--duracion', type=float, default=300, help='Segundos reales que dura la jornada')
+    parser.add_argument('--horas', type=float, default=8, help='Horas simuladas de la jornada')
+    parser.add_argument('--curva', type=leer_curva, default='normal',
+                        help='normal, vencimiento, constante o multiplicadores por tramo "1,2,3"')
+    parser.add_argument('--kioscos', type=int, default=4)
+    parser.add_argument('--empleados', type=int, default=6)
+    parser.add_argument('--atencion-min', type=float, default=12, help='Atención promedio (minutos simulados)')
+    parser.add_argument('--no-presentados', type=float, default=0.05, help='Fracción de turnos que no se presentan')
+    parser.add_argument('--recurrentes', type=float, default=0.3, help='Fracción de cédulas ya registradas')
+    parser.add_argument('--cedula-base', type=int, default=900000000, help='Primera cédula generada')
+    parser.add_argument('--sondeo', type=float, default=10, help='Segundos entre consultas de notificaciones')
+    parser.add_argument('--ciudadanos-max', type=int, default=500, help='Ciudadanos con socket abierto a la vez')
+    parser.add_argument('--gracia', type=float, default=10, help='Segundos de margen al final de la jornada')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--clave', required=True, help='Contraseña de los empleados de carga')
+    parser.add_argument('--preparar', action='store_true',
+                        help='Crear los empleados de carga en la base configurada y salir')
+    parser.add_argument('--forzar', action='store_true', help='Permitir --preparar con FLASK_ENV=production')
+    parser.add_argument('--salida', default=None, help='Archivo JSON para el reporte')
+    args = parser.parse_args()
+
+    if args.preparar and os.environ.get('FLASK_ENV') == 'production' and not args.forzar:
+        print("❌ FLASK_ENV=production: --preparar crea cuentas de empleado activas en la base configurada. "
+              "Use --forzar si es una base de pruebas.")
+        sys.exit(1)
+
+    if args.preparar:
+        preparar_empleados(args.empleados, args.clave)
+    else:
+        reporte = ejecutar(args)
+        if reporte:
+            imprimir(reporte)
+            if args.salida:
+                with open(args.salida, 'w', encoding='utf-8') as f:
+                    json.dump(reporte, f, ensure_ascii=False, indent=2)
+                print(f"\n💾 Reporte guardado en {args.salida}")
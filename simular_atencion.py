@@ -0,0 +1,93 @@
+"""
+Script para simular la atención con distintas ventanillas y políticas
+
+Construye el perfil de demanda de los últimos días (turnos operativos y
+archivados) y simula un mes de atención para comparar cantidades de
+ventanillas por trámite y políticas de cola. Con --objetivo-p90 busca la menor
+cantidad de ventanillas por trámite que cumple el objetivo de espera.
+
+Uso:
+    python simular_atencion.py
+    python simular_atencion.py --ventanillas 1:3,2:2 --politica envejecimiento
+    python simular_atencion.py --modo historico --historia 30
+    python simular_atencion.py --objetivo-p90 20
+"""
+
+import argparse
+import time
+
+from app import create_app
+from app.simulador import (MODOS, POLITICAS, cargar_perfil, recomendar_ventanillas, simular,
+                           ventanillas_actuales)
+
+
+def leer_ventanillas(texto):
+    """'1:3,2:2' -> {1: 3, 2: 2}"""
+    ventanillas = {}
+    for par in texto.split(','):
+        tramite, cantidad = par.split(':')
+        ventanillas[int(tramite)] = int(cantidad)
+    return ventanillas
+
+
+def imprimir(resultado, segundos):
+    espera = resultado['espera']
+    print(f"\n{resultado['politica']} ({resultado['modo']}, {resultado['jornadas']} jornadas, {segundos:.2f} s)")
+    print(f"  Turnos atendidos: {espera['turnos']}")
+    print(f"  Espera (min): promedio={espera['promedio']} p50={espera['p50']} p90={espera['p90']} "
+          f"p95={espera['p95']} máx={espera['maximo']}")
+    for categoria, datos in resultado['por_categoria'].items():
+        print(f"    {categoria:<13} promedio={datos['promedio']} p90={datos['p90']}")
+    for fila in resultado['por_tramite']:
+        print(f"  • {fila['nombre']:<30} ventanillas={fila['ventanillas']} utilización={fila['utilizacion']:.0%} "
+              f"p90={fila['p90']} min")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Simula la atención para planificar ventanillas')
+    parser.add_argument('--historia', type=int, default=None,
+                        help='Días de historia para el perfil (por defecto SIMULADOR_DIAS_HISTORIA)')
+    parser.add_argument('--dias', type=int, default=None,
+                        help='Jornadas a simular (por defecto SIMULADOR_DIAS_SIMULADOS)')
+    parser.add_argument('--ventanillas', default=None,
+                        help='Ventanillas por trámite "id:cantidad,..." (por defecto las asignaciones actuales)')
+    parser.add_argument('--politica', choices=POLITICAS + ['todas'], default='todas')
+    parser.add_argument('--modo', choices=MODOS, default='remuestreo')
+    parser.add_argument('--objetivo-p90', type=float, default=None,
+                        help='Recomendar ventanillas para que el p90 de espera no supere estos minutos')
+    parser.add_argument('--semilla', type=int, default=42)
+    args = parser.parse_args()
+
+    app = create_app()
+
+    with app.app_context():
+        perfil = cargar_perfil(args.historia)
+        resumen = perfil.resumen()
+        if not perfil.jornadas:
+            print("❌ No hay turnos en el período de historia")
+            raise SystemExit(1)
+
+        print("=" * 60)
+        print(f"SIMULADOR: {resumen['jornadas']} jornadas de historia, "
+              f"{resumen['llegadas_por_jornada']} llegadas por jornada")
+        print("=" * 60)
+        for tramite in resumen['tramites']:
+            print(f"  • {tramite['nombre']:<30} servicio={tramite['servicio_promedio']} min "
+                  f"({tramite['muestras_servicio']} muestras)")
+
+        ventanillas = ventanillas_actuales()
+        if args.ventanillas:
+            ventanillas.update(leer_ventanillas(args.ventanillas))
+
+        politicas = POLITICAS if args.politica == 'todas' else [args.politica]
+        for politica in politicas:
+            inicio = time.perf_counter()
+            resultado = simular(perfil, ventanillas, politica, args.modo, args.dias, args.semilla)
+            imprimir(resultado, time.perf_counter() - inicio)
+
+        if args.objetivo_p90:
+            politica = politicas[0]
+            recomendadas = recomendar_ventanillas(perfil, args.objetivo_p90, politica, args.dias, args.semilla)
+            print(f"\n✓ Ventanillas recomendadas para p90 ≤ {args.objetivo_p90:g} min ({politica}):")
+            for tramite, cantidad in recomendadas.items():
+                print(f"  • {perfil.nombres.get(tramite, tramite)}: {cantidad} (actual {ventanillas.get(tramite, 1)})")
@@ -0,0 +1,60 @@
+"""
+Script para simular una réplica de lectura con dos archivos SQLite
+
+SQLite no tiene replicación propia. Para probar localmente el enrutamiento de
+reportes a la réplica, este script registra un latido en la base principal y
+copia la base completa al archivo de réplica (API de backup de sqlite3), una
+vez o cada cierto intervalo. Con PostgreSQL se usa la replicación en streaming
+del propio servidor y este script no es necesario.
+
+Uso:
+    set SQLALCHEMY_DATABASE_URI=sqlite:////ruta/principal.db
+    set REPLICA_DATABASE_URI=sqlite:////ruta/replica.db
+    python sincronizar_replica.py                 # Copia una sola vez
+    python sincronizar_replica.py --intervalo 5   # Copia cada 5 segundos
+"""
+
+import argparse
+import sqlite3
+import time
+
+from app import create_app, db
+from app.replica import CLAVE_REPLICA, registrar_latido
+
+
+def ruta_sqlite(engine):
+    """Obtiene la ruta del archivo de una base SQLite"""
+    if engine.dialect.name != 'sqlite' or not engine.url.database:
+        raise SystemExit('❌ Este script solo sincroniza bases SQLite en archivo')
+    return engine.url.database
+
+
+def sincronizar(origen, destino):
+    """Registra un latido y copia la base principal sobre la réplica"""
+    registrar_latido()
+
+    with sqlite3.connect(origen) as conexion_origen, sqlite3.connect(destino) as conexion_destino:
+        conexion_origen.backup(conexion_destino)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Copia la base SQLite principal a la réplica')
+    parser.add_argument('--intervalo', type=float, default=0,
+                        help='Segundos entre copias (0 = copiar una sola vez)')
+    args = parser.parse_args()
+
+    app = create_app()
+
+    with app.app_context():
+        if CLAVE_REPLICA not in db.engines:
+            raise SystemExit('❌ Defina REPLICA_DATABASE_URI para usar este script')
+
+        origen = ruta_sqlite(db.engine)
+        destino = ruta_sqlite(db.engines[CLAVE_REPLICA])
+
+        while True:
+            sincronizar(origen, destino)
+            print(f"✓ Réplica sincronizada: {origen} → {destino}")
+            if not args.intervalo:
+                break
+            time.sleep(args.intervalo)
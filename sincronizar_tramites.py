@@ -0,0 +1,96 @@
+"""
+Sincroniza el catálogo de trámites y las asignaciones de empleados desde un archivo
+
+Aplica un catálogo JSON o YAML (formato en app/catalogo_tramites.py) como un
+único cambio: calcula las diferencias con la base, las muestra y las aplica
+en una sola transacción. Con --simular solo muestra el plan.
+
+Para cambios puntuales sigue disponible gestionar_tramites.py. El servidor en
+ejecución ve las nuevas asignaciones al expirar su caché de identidades
+(IDENTIDAD_CACHE_TTL); los empleados conectados las reciben al reconectarse.
+
+Uso:
+    python sincronizar_tramites.py --exportar catalogo.json
+    python sincronizar_tramites.py catalogo.json --simular
+    python sincronizar_tramites.py catalogo.yaml --desactivar-ausentes
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+os.environ['TAREAS_PROGRAMADAS'] = 'false'
+
+from app import create_app
+from app.catalogo_tramites import aplicar_cambios, calcular_cambios, exportar_catalogo, leer_catalogo
+
+ETIQUETAS = {
+    'tramites_creados': 'Trámites creados',
+    'tramites_modificados': 'Trámites modificados',
+    'tramites_desactivados': 'Trámites desactivados',
+    'asignaciones_agregadas': 'Asignaciones agregadas',
+    'asignaciones_quitadas': 'Asignaciones quitadas',
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sincroniza trámites y asignaciones desde un catálogo JSON/YAML')
+    parser.add_argument('catalogo', nargs='?', help='Archivo del catálogo (.json, .yaml o .yml)')
+    parser.add_argument('--simular', action='store_true', help='Mostrar los cambios sin aplicarlos')
+    parser.add_argument('--desactivar-ausentes', action='store_true',
+                        help='Desactivar los trámites que no están en el catálogo')
+    parser.add_argument('--exportar', metavar='ARCHIVO', help='Escribir el catálogo actual en un archivo JSON y salir')
+    args = parser.parse_args()
+
+    if not args.catalogo and not args.exportar:
+        parser.error('indique un catálogo o --exportar ARCHIVO')
+
+    app = create_app()
+
+    with app.app_context():
+        if args.exportar:
+            catalogo = exportar_catalogo()
+            with open(args.exportar, 'w', encoding='utf-8') as archivo:
+                json.dump(catalogo, archivo, ensure_ascii=False, indent=2)
+            print(f"✅ {len(catalogo['tramites'])} trámites y {len(catalogo['asignaciones'])} empleados "
+                  f"exportados a {args.exportar}")
+            return
+
+        inicio = time.perf_counter()
+        try:
+            plan = calcular_cambios(leer_catalogo(args.catalogo), args.desactivar_ausentes)
+        except (OSError, ValueError) as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+
+        print("=" * 60)
+        print("SINCRONIZACIÓN DE TRÁMITES" + (" (SIMULACIÓN)" if args.simular else ""))
+        print("=" * 60)
+
+        if plan.vacio:
+            print("\n✅ La base ya coincide con el catálogo: no hay cambios")
+            return
+
+        print()
+        for linea in plan.lineas():
+            print(f"  {linea}")
+        print()
+        for clave, cantidad in plan.resumen().items():
+            print(f"   {ETIQUETAS[clave]}: {cantidad}")
+
+        if args.simular:
+            print("\n⚠️  Simulación: no se aplicó ningún cambio")
+            return
+
+        try:
+            aplicar_cambios(plan)
+        except Exception as e:
+            print(f"\n❌ Error al aplicar los cambios (no se modificó nada): {e}")
+            sys.exit(1)
+        print(f"\n✅ Cambios aplicados en una transacción ({time.perf_counter() - inicio:.2f} s)")
+
+
+if __name__ == '__main__':
+    main()
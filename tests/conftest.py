@@ -0,0 +1,55 @@
+"""
+Fixtures comunes: una aplicación 'testing' con base SQLite en memoria por prueba
+"""
+
+import os
+
+os.environ.setdefault('SECRET_KEY', 'pruebas')
+os.environ['TAREAS_PROGRAMADAS'] = 'false'
+os.environ.pop('SQLALCHEMY_DATABASE_URI', None)
+
+import pytest
+
+from app import create_app, db
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def usuario(app):
+    from app.models import Usuario
+    usuario = Usuario(cedula='1000000001', nombre='Ciudadano de Prueba', categoria='ninguna')
+    db.session.add(usuario)
+    db.session.commit()
+    return usuario
+
+
+@pytest.fixture
+def crear_turno(usuario):
+    """Crea y confirma un turno con los valores dados (trámite 1, categoría ninguna por defecto)"""
+    from app.models import Turno
+
+    def crear(numero_turno, **valores):
+        valores.setdefault('usuario_id', usuario.id)
+        valores.setdefault('tipo_tramite_id', 1)
+        valores.setdefault('categoria_atencion', 'ninguna')
+        valores.setdefault('estado', 'pendiente')
+        valores.setdefault('llamados_realizados', 0)
+        if 'fecha_solicitud' in valores:
+            valores.setdefault('fecha_numero', valores['fecha_solicitud'].date())
+        turno = Turno(numero_turno=numero_turno, **valores)
+        db.session.add(turno)
+        db.session.commit()
+        return turno
+    return crear
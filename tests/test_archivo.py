@@ -0,0 +1,90 @@
+"""
+Archivado de días cerrados y secuencias de numeración de turnos (user-027)
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.archivo import archivar_dias_cerrados, barrer_notificaciones, obtener_turno
+from app.models import db, Notificacion, NotificacionHistorico, SecuenciaTurno, Turno, TurnoHistorico
+
+
+def hace_dias(dias):
+    return datetime.utcnow() - timedelta(days=dias)
+
+
+def test_archiva_turnos_finalizados_anteriores_al_corte(app, crear_turno):
+    viejo = crear_turno('N001', estado='atendido', fecha_solicitud=hace_dias(10))
+    db.session.add(Notificacion(turno_id=viejo.id, mensaje='Llamado', fecha_envio=hace_dias(10)))
+    abierto = crear_turno('N002', estado='pendiente', fecha_solicitud=hace_dias(10))
+    reciente = crear_turno('N003', estado='atendido', fecha_solicitud=hace_dias(1))
+    db.session.commit()
+    viejo_id = viejo.id
+
+    assert archivar_dias_cerrados(dias_retencion=7, tamano_lote=1) == 1
+
+    assert db.session.get(Turno, viejo_id) is None
+    assert db.session.get(TurnoHistorico, viejo_id).numero_turno == 'N001'
+    assert NotificacionHistorico.query.filter_by(turno_id=viejo_id).count() == 1
+    assert Notificacion.query.filter_by(turno_id=viejo_id).count() == 0
+    assert {t.id for t in Turno.query} == {abierto.id, reciente.id}
+    assert obtener_turno(viejo_id).numero_turno == 'N001'
+
+
+def test_ids_de_turnos_archivados_no_se_reutilizan(app, crear_turno):
+    ultimo = crear_turno('N001', estado='atendido', fecha_solicitud=hace_dias(10))
+    ultimo_id = ultimo.id
+    archivar_dias_cerrados(dias_retencion=7)
+
+    nuevo = crear_turno('N002')
+    assert nuevo.id > ultimo_id
+    assert obtener_turno(ultimo_id).numero_turno == 'N001'
+
+
+def test_barrido_repetido_sobre_tabla_vaciada_no_choca_en_el_historico(app, crear_turno):
+    turno = crear_turno('N001', estado='atendido', fecha_solicitud=hace_dias(3))
+    db.session.add(Notificacion(turno_id=turno.id, mensaje='Llamado 1', fecha_envio=hace_dias(3)))
+    db.session.commit()
+    assert barrer_notificaciones(ttl_horas=24, archivar=True) == 1
+    assert Notificacion.query.count() == 0
+
+    # La tabla operativa quedó vacía: la siguiente notificación no puede reutilizar el id
+    db.session.add(Notificacion(turno_id=turno.id, mensaje='Llamado 2', fecha_envio=hace_dias(2)))
+    db.session.commit()
+    assert barrer_notificaciones(ttl_horas=24, archivar=True) == 1
+
+    assert sorted(n.mensaje for n in NotificacionHistorico.query) == ['Llamado 1', 'Llamado 2']
+
+
+def test_secuencia_empieza_de_nuevo_cada_dia(app, crear_turno):
+    for numero in range(1, 6):
+        crear_turno(f'N{numero:03d}', estado='atendido', fecha_solicitud=hace_dias(1))
+
+    # Los números de ayer siguen en la tabla operativa pero no ocupan los de hoy
+    assert Turno.reservar_numeros('ninguna', 2) == ['N001', 'N002']
+    assert Turno.reservar_numeros('adulto_mayor', 1) == ['A001']
+    crear_turno('N001')
+    assert Turno.query.filter_by(numero_turno='N001').count() == 2
+
+
+def test_secuencia_continua_desde_el_mayor_numero_del_dia(app, crear_turno):
+    for numero in range(1, 4):
+        crear_turno(f'N{numero:03d}')
+
+    assert Turno.reservar_numeros('ninguna', 1) == ['N004']
+
+
+def test_numero_repetido_en_el_mismo_dia_se_rechaza(app, crear_turno):
+    crear_turno('N001')
+    with pytest.raises(IntegrityError):
+        crear_turno('N001')
+    db.session.rollback()
+
+
+def test_secuencia_omite_numeros_ocupados(app, crear_turno):
+    assert SecuenciaTurno.reservar('N', 1) == ['N001']
+    crear_turno('N002')  # insertado por fuera de la secuencia
+
+    assert SecuenciaTurno.reservar('N', 2) == ['N003', 'N004']
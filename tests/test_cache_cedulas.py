@@ -0,0 +1,47 @@
+"""
+Caché de cédulas: precalentamiento cooperativo y cédulas de otros procesos (user-031)
+"""
+
+from app import cache_cedulas as modulo
+from app.cache_cedulas import CacheCedulas, cache_cedulas
+from app.models import db, Usuario
+
+
+def registrar_por_fuera(*cedulas):
+    """Inserta usuarios sin pasar por la caché, como lo haría otro proceso"""
+    for cedula in cedulas:
+        db.session.add(Usuario(cedula=cedula, nombre=f'Ciudadano {cedula}', categoria='ninguna'))
+    db.session.commit()
+
+
+def test_sin_tareas_programadas_no_se_precalienta(app):
+    assert cache_cedulas._bloom is None
+    registrar_por_fuera('3000000001')
+    assert cache_cedulas.buscar('3000000001')['cedula'] == '3000000001'
+
+
+def test_precalentar_cede_el_bucle_de_eventos(app, monkeypatch):
+    cesiones = []
+    monkeypatch.setattr(modulo, 'PAUSA_CADA', 2)
+    monkeypatch.setattr(modulo.socketio, 'sleep', cesiones.append)
+    registrar_por_fuera(*(f'30000000{n:02d}' for n in range(1, 6)))
+
+    cache = CacheCedulas(capacidad_minima_bloom=100)
+    cache.precalentar()
+
+    assert cesiones == [0, 0]
+    assert cache.puede_existir('3000000005')
+
+
+def test_cedulas_de_otro_proceso_se_incorporan_sin_reconstruir(app):
+    registrar_por_fuera('3000000001')
+    cache = CacheCedulas(tamano_lru=1, capacidad_minima_bloom=100)
+    cache.precalentar()
+
+    registrar_por_fuera('3000000002', '3000000003')
+    assert not cache.puede_existir('3000000002')
+
+    assert cache.incorporar_nuevas() == 2
+    assert cache.buscar('3000000002')['cedula'] == '3000000002'
+    assert cache.buscar('3000000003')['nombre'] == 'Ciudadano 3000000003'
+    assert cache.incorporar_nuevas() == 0
@@ -0,0 +1,97 @@
+"""
+Sincronización declarativa del catálogo de trámites (user-050)
+"""
+
+import json
+
+import pytest
+
+from app.catalogo_tramites import aplicar_cambios, calcular_cambios, exportar_catalogo, leer_catalogo
+from app.models import db, Empleado, TipoTramite
+
+
+@pytest.fixture
+def admin(app):
+    return Empleado.query.filter_by(usuario='admin').one()
+
+
+def tramite(nombre):
+    return TipoTramite.query.filter_by(nombre=nombre).one()
+
+
+def test_el_catalogo_exportado_no_produce_cambios(app, admin):
+    catalogo = exportar_catalogo()
+
+    assert {t['nombre'] for t in catalogo['tramites']} >= {'Predial', 'Sisben'}
+    assert catalogo['asignaciones'] == {'admin': []}
+    assert calcular_cambios(catalogo, desactivar_ausentes=True).vacio
+
+
+def test_crea_modifica_desactiva_y_asigna(app, admin):
+    catalogo = {
+        'tramites': [
+            {'nombre': 'predial', 'tiempo_estimado': 20},
+            {'id': 4, 'nombre': 'Sisbén IV'},
+            {'nombre': 'Certificados', 'descripcion': 'Certificados de residencia'},
+        ],
+        'asignaciones': {'admin': ['Sisbén IV', 'Certificados']},
+    }
+    plan = calcular_cambios(catalogo, desactivar_ausentes=True)
+
+    assert plan.resumen() == {'tramites_creados': 1, 'tramites_modificados': 2, 'tramites_desactivados': 3,
+                              'asignaciones_agregadas': 2, 'asignaciones_quitadas': 0}
+    aplicar_cambios(plan)
+
+    # El nombre se compara sin distinguir mayúsculas; la del catálogo queda registrada
+    assert (db.session.get(TipoTramite, 1).nombre, db.session.get(TipoTramite, 1).tiempo_estimado) == ('predial', 20)
+    assert db.session.get(TipoTramite, 4).nombre == 'Sisbén IV'
+    assert tramite('Certificados').activo
+    assert not tramite('Tránsito').activo
+    db.session.refresh(admin)
+    assert sorted(t.nombre for t in admin.tramites_asignados) == ['Certificados', 'Sisbén IV']
+    assert calcular_cambios(catalogo, desactivar_ausentes=True).vacio
+
+    plan = calcular_cambios({'asignaciones': {str(admin.id): ['Certificados']}})
+    assert [(e.id, t.nombre) for e, t in plan.quitar] == [(admin.id, 'Sisbén IV')]
+
+
+def test_intercambiar_nombres_es_valido(app):
+    plan = calcular_cambios({'tramites': [{'id': 1, 'nombre': 'Sisben'}, {'id': 4, 'nombre': 'Predial'}]})
+    aplicar_cambios(plan)
+
+    assert (db.session.get(TipoTramite, 1).nombre, db.session.get(TipoTramite, 4).nombre) == ('Sisben', 'Predial')
+
+
+@pytest.mark.parametrize('catalogo, mensaje', [
+    ({'tramites': [{'id': 3, 'nombre': 'PREDIAL'}]}, 'quedaría repetido'),
+    ({'tramites': [{'id': 1, 'nombre': 'Nuevo'}, {'nombre': 'nuevo'}]}, 'repetido en el catálogo'),
+    ({'tramites': [{'nombre': 'Predial'}, {'nombre': 'predial '}]}, 'repetido en el catálogo'),
+    ({'tramites': [{'id': 999, 'nombre': 'X'}]}, 'no existe el ID'),
+    ({'tramites': [{'nombre': 'X', 'tiempo_estimado': 0}]}, 'tiempo_estimado'),
+    ({'tramites': [{'nombre': 'X', 'color': 'rojo'}]}, 'campos desconocidos'),
+    ({'asignaciones': {'nadie': []}}, 'no existe el empleado'),
+    ({'asignaciones': {'admin': ['Inexistente']}}, 'no existe el trámite'),
+])
+def test_catalogos_invalidos(app, admin, catalogo, mensaje):
+    with pytest.raises(ValueError, match=mensaje):
+        calcular_cambios(catalogo)
+
+
+def test_nombres_repetidos_en_la_base_sin_tocar(app, admin):
+    db.session.add(TipoTramite(nombre='Predial', descripcion='Duplicado', tiempo_estimado=10))
+    db.session.commit()
+
+    assert calcular_cambios({'tramites': [{'id': 4, 'nombre': 'Sisben'}]}).vacio
+    with pytest.raises(ValueError, match='hay 2 trámites llamados'):
+        calcular_cambios({'asignaciones': {'admin': ['Predial']}})
+
+
+def test_leer_catalogo_json_y_yaml(tmp_path):
+    pytest.importorskip('yaml')
+    (tmp_path / 'catalogo.json').write_text(json.dumps({'tramites': [{'nombre': 'Predial'}]}), encoding='utf-8')
+    (tmp_path / 'catalogo.yaml').write_text('tramites:\n  - nombre: Predial\n', encoding='utf-8')
+    (tmp_path / 'lista.json').write_text('[]', encoding='utf-8')
+
+    assert leer_catalogo(str(tmp_path / 'catalogo.json')) == leer_catalogo(str(tmp_path / 'catalogo.yaml'))
+    with pytest.raises(ValueError):
+        leer_catalogo(str(tmp_path / 'lista.json'))
@@ -0,0 +1,97 @@
+"""
+Cierre del día de atención (user-037)
+"""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.cierre_dia import HistogramaEspera, cerrar_dia, dias_sin_cerrar
+from app.models import db, EstadisticaDiaria, SecuenciaTurno, Turno
+from app.no_presentados import LLAMADOS_MAXIMOS
+
+
+@pytest.fixture
+def ayer(app, tmp_path):
+    app.config['CIERRE_DIRECTORIO_REPORTES'] = str(tmp_path)
+    return datetime.utcnow().date() - timedelta(days=1)
+
+
+@pytest.fixture
+def jornada(ayer, crear_turno):
+    """Turnos de ayer: dos atendidos, uno sin presentarse tras tres llamados y dos abiertos"""
+    inicio = datetime.combine(ayer, datetime.min.time()) + timedelta(hours=9)
+    crear_turno('N001', estado='atendido', fecha_solicitud=inicio, fecha_atencion=inicio + timedelta(minutes=4))
+    crear_turno('N002', estado='atendido', fecha_solicitud=inicio, fecha_atencion=inicio + timedelta(minutes=25))
+    crear_turno('N003', llamados_realizados=LLAMADOS_MAXIMOS, fecha_solicitud=inicio)
+    crear_turno('N004', fecha_solicitud=inicio, llamados_realizados=1)
+    crear_turno('N005', estado='en_atencion', fecha_solicitud=inicio)
+    db.session.add(SecuenciaTurno(prefijo='N', fecha=ayer, ultimo=5))
+    db.session.commit()
+
+
+def test_histograma_combinable_y_percentiles():
+    primero, segundo = HistogramaEspera(), HistogramaEspera()
+    for minutos in (1, 2, 3, 4):
+        primero.agregar(minutos)
+    for minutos in (12, 14, 300):
+        segundo.agregar(minutos)
+
+    total = HistogramaEspera.desde_json(primero.a_json()).combinar(segundo)
+    assert total.total == 7
+    assert total.percentil(50) <= 5
+    assert 10 < total.percentil(80) <= 15
+    assert total.percentil(100) == 240.0
+    assert HistogramaEspera().percentil(50) is None
+
+
+def test_cierre_cancelando_los_sobrantes(app, ayer, jornada):
+    cierre = cerrar_dia(ayer, politica='cancelar', mantenimiento=False)
+
+    estados = {t.numero_turno: t.estado for t in Turno.query}
+    assert estados == {'N001': 'atendido', 'N002': 'atendido', 'N003': 'no_presentado',
+                       'N004': 'cancelado', 'N005': 'cancelado'}
+    assert (cierre.total_turnos, cierre.cancelados, cierre.no_presentados, cierre.trasladados) == (5, 2, 1, 0)
+    assert db.session.get(SecuenciaTurno, ('N', ayer)) is None
+
+    resumen = EstadisticaDiaria.query.filter_by(fecha=ayer).one()
+    assert (resumen.total, resumen.atendidos, resumen.cancelados, resumen.no_presentados) == (5, 2, 2, 1)
+    assert resumen.espera_promedio == 14.5
+
+    with open(cierre.archivo_reporte, encoding='utf-8') as archivo:
+        reporte = json.load(archivo)
+    assert reporte['sobrantes'] == {'cancelados': 2, 'no_presentados': 1, 'trasladados': 0}
+    assert reporte['espera_minutos']['atendidos'] == 2
+    assert dias_sin_cerrar() == []
+
+
+def test_cierre_trasladando_los_sobrantes_al_dia_actual(app, ayer, jornada):
+    cierre = cerrar_dia(ayer, politica='trasladar', mantenimiento=False)
+
+    assert cierre.trasladados == 2
+    hoy = datetime.utcnow().date()
+    trasladados = Turno.query.filter(Turno.fecha_numero == hoy).order_by(Turno.id).all()
+    # Reciben números del día actual, que empieza su propia numeración
+    assert [t.numero_turno for t in trasladados] == ['N001', 'N002']
+    assert [t.observaciones for t in trasladados] == [f'Trasladado desde {ayer} (antes N004)',
+                                                      f'Trasladado desde {ayer} (antes N005)']
+    assert {t.estado for t in trasladados} == {'pendiente'}
+    assert {t.fecha_solicitud.date() for t in trasladados} == {hoy}
+    assert {t.llamados_realizados for t in trasladados} == {0}
+    assert Turno.reservar_numeros('ninguna', 1) == ['N003']
+
+
+def test_cierre_repetido_recalcula_sin_duplicar(app, ayer, jornada):
+    cerrar_dia(ayer, politica='cancelar', mantenimiento=False)
+    cerrar_dia(ayer, politica='cancelar', mantenimiento=True)
+
+    assert EstadisticaDiaria.query.filter_by(fecha=ayer).count() == 1
+
+
+def test_solo_se_cierran_dias_anteriores(app, ayer, jornada):
+    assert dias_sin_cerrar() == [ayer]
+    with pytest.raises(ValueError):
+        cerrar_dia(datetime.utcnow().date())
+    with pytest.raises(ValueError):
+        cerrar_dia(ayer, politica='borrar')
@@ -0,0 +1,127 @@
+"""
+Citas con franja horaria: capacidad, reservas, activación y período de reserva (user-040)
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.archivo import archivar_dias_cerrados, obtener_turno
+from app.citas import (CitaNoDisponible, activar_citas, cancelar_cita, dias_disponibles, es_dia_habil,
+                       franjas_del_dia, reservar_cita)
+from app.models import db, CapacidadCitasDia, Cita, CupoCita, TipoTramite, Turno, Usuario
+
+
+@pytest.fixture
+def tramite(app):
+    return db.session.get(TipoTramite, 1)
+
+
+@pytest.fixture
+def franja(app):
+    """Primera franja del próximo día hábil"""
+    fecha = datetime.utcnow().date() + timedelta(days=1)
+    while not es_dia_habil(fecha):
+        fecha += timedelta(days=1)
+    return franjas_del_dia(fecha)[0]
+
+
+def nuevo_usuario(cedula):
+    usuario = Usuario(cedula=cedula, nombre=f'Ciudadano {cedula}', categoria='ninguna')
+    db.session.add(usuario)
+    db.session.commit()
+    return usuario
+
+
+def reservadas(tramite, inicio):
+    cupo = CupoCita.query.filter_by(tipo_tramite_id=tramite.id, inicio=inicio).one()
+    dia = CapacidadCitasDia.query.filter_by(tipo_tramite_id=tramite.id, fecha=inicio.date()).one()
+    return cupo.capacidad, cupo.reservadas, dia.reservadas
+
+
+def test_la_franja_no_admite_mas_citas_que_su_capacidad(app, tramite, franja, usuario):
+    cita = reservar_cita(usuario, tramite, franja)
+    db.session.commit()
+    capacidad, en_franja, en_dia = reservadas(tramite, franja)
+    assert (en_franja, en_dia) == (1, 1)
+
+    for numero in range(capacidad - 1):
+        reservar_cita(nuevo_usuario(f'30000000{numero:02d}'), tramite, franja)
+        db.session.commit()
+    sin_cupo = nuevo_usuario('3999999999')
+    with pytest.raises(CitaNoDisponible):
+        reservar_cita(sin_cupo, tramite, franja)
+    db.session.rollback()
+    assert reservadas(tramite, franja)[1:] == (capacidad, capacidad)
+
+    cancelar_cita(cita)
+    db.session.commit()
+    assert reservadas(tramite, franja)[1:] == (capacidad - 1, capacidad - 1)
+    reservar_cita(Usuario.query.filter_by(cedula='3999999999').one(), tramite, franja)
+
+
+def test_una_cita_por_tramite_y_dia(app, tramite, franja, usuario):
+    reservar_cita(usuario, tramite, franja)
+    db.session.commit()
+    with pytest.raises(CitaNoDisponible):
+        reservar_cita(usuario, tramite, franja + timedelta(minutes=app.config['CITAS_MINUTOS_FRANJA']))
+
+
+def test_franjas_fuera_del_periodo_o_del_horario(app, tramite, franja, usuario):
+    with pytest.raises(CitaNoDisponible):
+        reservar_cita(usuario, tramite, datetime.utcnow() - timedelta(minutes=1))
+    with pytest.raises(CitaNoDisponible):
+        reservar_cita(usuario, tramite, franja + timedelta(days=app.config['CITAS_DIAS_ANTICIPACION'] + 7))
+    with pytest.raises(CitaNoDisponible):
+        reservar_cita(usuario, tramite, franja + timedelta(minutes=7))
+
+
+def test_dias_disponibles_no_pasan_del_periodo_de_reserva(app, tramite):
+    hoy = datetime.utcnow().date()
+    limite = hoy + timedelta(days=app.config['CITAS_DIAS_ANTICIPACION'])
+
+    dias = dias_disponibles(tramite, limite - timedelta(days=2), dias=30)
+
+    assert all(limite - timedelta(days=2) <= datetime.fromisoformat(d['fecha']).date() <= limite for d in dias)
+    assert db.session.query(db.func.max(CapacidadCitasDia.fecha)).scalar() <= limite
+
+
+def test_rutas_rechazan_fechas_fuera_del_periodo(app, client):
+    hoy = datetime.utcnow().date()
+    fuera = hoy + timedelta(days=app.config['CITAS_DIAS_ANTICIPACION'] + 1)
+
+    for ruta in (f'/usuario/citas/dias?tipo_tramite_id=1&desde={hoy - timedelta(days=1)}',
+                 f'/usuario/citas/dias?tipo_tramite_id=1&desde={fuera}',
+                 f'/usuario/citas/franjas?tipo_tramite_id=1&fecha={fuera}',
+                 '/usuario/citas/franjas?tipo_tramite_id=1&fecha=9999-12-31'):
+        assert client.get(ruta).status_code == 400, ruta
+    assert CupoCita.query.count() == 0
+
+    assert client.get(f'/usuario/citas/dias?tipo_tramite_id=1&desde={hoy}').status_code == 200
+
+
+def test_activacion_convierte_citas_en_turnos(app, tramite, franja, usuario):
+    cita = reservar_cita(usuario, tramite, franja)
+    db.session.commit()
+
+    turnos = activar_citas(ahora=franja + timedelta(minutes=5))
+
+    assert len(turnos) == 1
+    assert cita.estado == 'activada'
+    turno = db.session.get(Turno, cita.turno_id)
+    assert (turno.estado, turno.fecha_solicitud, turno.usuario_id) == ('pendiente', franja, usuario.id)
+    assert activar_citas(ahora=franja + timedelta(minutes=6)) == []
+
+
+def test_la_cita_no_impide_archivar_su_turno(app, crear_turno, usuario):
+    assert not Cita.__table__.c.turno_id.foreign_keys
+
+    solicitud = datetime.utcnow() - timedelta(days=30)
+    turno = crear_turno('N001', estado='atendido', fecha_solicitud=solicitud)
+    db.session.add(Cita(codigo='ABCD1234', usuario_id=usuario.id, tipo_tramite_id=1, inicio=solicitud,
+                        estado='activada', turno_id=turno.id))
+    db.session.commit()
+
+    assert archivar_dias_cerrados(dias_retencion=7) == 1
+    cita = Cita.query.filter_by(codigo='ABCD1234').one()
+    assert obtener_turno(cita.turno_id).numero_turno == 'N001'
@@ -0,0 +1,41 @@
+"""
+Registro de consultas lentas: parámetros solo bajo demanda y nunca los de tablas sensibles (user-042)
+"""
+
+import pytest
+
+from app.consultas_lentas import PARAMETROS_OCULTOS, RegistroConsultasLentas
+
+
+@pytest.fixture
+def registro(app):
+    return RegistroConsultasLentas()
+
+
+def test_parametros_no_se_guardan_por_defecto(app, registro):
+    assert app.config['CONSULTAS_LENTAS_PARAMETROS'] is False
+
+    registro.registrar('SELECT * FROM turnos WHERE id = ?', (7,), 1.0)
+
+    assert registro.pendientes[0]['parametros'] is None
+
+
+@pytest.mark.parametrize('sentencia', [
+    'INSERT INTO usuarios (cedula, nombre) VALUES (?, ?)',
+    'UPDATE usuarios_sistema SET password_hash=? WHERE usuarios_sistema.id = ?',
+    'SELECT empleados.id FROM "empleados" WHERE empleados.usuario = ?',
+])
+def test_parametros_de_tablas_sensibles_se_ocultan(registro, sentencia):
+    registro.incluir_parametros = True
+
+    registro.registrar(sentencia, [('1000000001', 'secreto'), ('1000000002', 'otro')], 1.0)
+
+    assert registro.pendientes[0]['parametros'] == PARAMETROS_OCULTOS
+
+
+def test_parametros_de_otras_tablas_se_guardan_si_se_habilita(registro):
+    registro.incluir_parametros = True
+
+    registro.registrar('SELECT * FROM turnos WHERE usuario_id = ?', (7,), 1.0)
+
+    assert registro.pendientes[0]['parametros'] == '(7,)'
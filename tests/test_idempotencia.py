@@ -0,0 +1,63 @@
+"""
+Emisión idempotente de turnos desde los kioscos (user-032)
+"""
+
+from datetime import datetime, timedelta
+
+from app.idempotencia import purgar_claves_vencidas
+from app.models import db, ClaveIdempotencia, Turno
+
+DATOS = {'cedula': '2000000001', 'nombre': 'Ciudadana Kiosco', 'tipo_tramite_id': 1, 'categoria': 'ninguna'}
+
+
+def emitir(client, datos=DATOS, clave='clave-1'):
+    return client.post('/usuario/emitir-turno', json=datos, headers={'Idempotency-Key': clave} if clave else {})
+
+
+def test_reintento_con_la_misma_clave_devuelve_el_turno_original(app, client):
+    primera = emitir(client)
+    reintento = emitir(client)
+
+    assert primera.status_code == 200
+    assert reintento.status_code == 200
+    assert reintento.headers.get('Idempotent-Replayed') == 'true'
+    assert reintento.get_json()['turno']['id'] == primera.get_json()['turno']['id']
+    assert Turno.query.count() == 1
+
+
+def test_claves_distintas_emiten_turnos_distintos(app, client):
+    primera = emitir(client, clave='clave-1').get_json()['turno']
+    segunda = emitir(client, clave='clave-2').get_json()['turno']
+
+    assert primera['numero_turno'] != segunda['numero_turno']
+    assert Turno.query.count() == 2
+
+
+def test_clave_reutilizada_con_otros_datos(app, client):
+    emitir(client)
+    respuesta = emitir(client, dict(DATOS, tipo_tramite_id=2))
+
+    assert respuesta.status_code == 422
+    assert Turno.query.count() == 1
+
+
+def test_clave_demasiado_larga(app, client):
+    assert emitir(client, clave='x' * 65).status_code == 400
+    assert Turno.query.count() == 0
+
+
+def test_clave_vencida_emite_un_turno_nuevo_y_se_purga(app, client):
+    emitir(client)
+    registro = db.session.get(ClaveIdempotencia, 'clave-1')
+    registro.fecha_creacion = datetime.utcnow() - timedelta(hours=app.config['IDEMPOTENCIA_TTL_HORAS'] + 1)
+    db.session.commit()
+
+    respuesta = emitir(client)
+    assert respuesta.headers.get('Idempotent-Replayed') is None
+    assert Turno.query.count() == 2
+
+    registro = db.session.get(ClaveIdempotencia, 'clave-1')
+    registro.fecha_creacion = datetime.utcnow() - timedelta(hours=app.config['IDEMPOTENCIA_TTL_HORAS'] + 1)
+    db.session.commit()
+    assert purgar_claves_vencidas() == 1
+    assert ClaveIdempotencia.query.count() == 0
@@ -0,0 +1,114 @@
+"""
+Importación de padrones CSV de ciudadanos (user-049)
+"""
+
+import csv
+import io
+import os
+
+import pytest
+
+from app.cache_cedulas import cache_cedulas
+from app.importacion_ciudadanos import Encabezado, Importaciones, importar_ciudadanos, normalizar_categoria
+from app.models import db, Usuario
+
+PADRON = """Número de Documento;Primer Nombre;Primer Apellido;Celular;Correo;Programa
+1.000.000.001;Ana;Pérez;;;Adulto Mayor
+2000000002;Luis;Gómez;300 123 4567;LUIS@EJEMPLO.CO;
+2000000003;Marta;Ríos;;;gestante
+12AB;Sin;Cédula;;;
+2000000004;Pedro;Díaz;123;;
+2000000005;Rosa;Vega;;;astronauta
+2000000002;Luis Alberto;Gómez;;;PcD
+"""
+
+
+@pytest.fixture
+def registrado(usuario):
+    usuario.telefono = '3001112222'
+    usuario.email = 'ana@ejemplo.co'
+    db.session.commit()
+    return usuario
+
+
+def importar(texto, **opciones):
+    rechazos = io.StringIO()
+    resultado = importar_ciudadanos(io.StringIO(texto), rechazos, **opciones)
+    return resultado, list(csv.reader(io.StringIO(rechazos.getvalue())))
+
+
+def test_inserta_actualiza_y_rechaza(app, registrado):
+    resultado, rechazos = importar(PADRON, tamano_lote=2)
+
+    assert (resultado.filas, resultado.nuevos, resultado.actualizados) == (7, 2, 2)
+    assert (resultado.duplicados, resultado.rechazados) == (0, 3)
+
+    ana = db.session.get(Usuario, registrado.id)
+    db.session.refresh(ana)
+    # Teléfono y email vacíos en el archivo no borran los registrados
+    assert (ana.nombre, ana.telefono, ana.email, ana.categoria) == \
+        ('Ana Pérez', '3001112222', 'ana@ejemplo.co', 'adulto_mayor')
+
+    luis = Usuario.query.filter_by(cedula='2000000002').one()
+    # La última fila de la cédula gana; el teléfono de la primera se conserva
+    assert (luis.nombre, luis.telefono, luis.email, luis.categoria) == \
+        ('Luis Alberto Gómez', '3001234567', 'luis@ejemplo.co', 'discapacidad')
+    assert Usuario.query.filter_by(cedula='2000000003').one().categoria == 'embarazada'
+
+    assert rechazos[0][:2] == ['linea', 'motivo']
+    assert [(fila[0], fila[1].split(':')[0]) for fila in rechazos[1:]] == [
+        ('5', 'Cédula inválida'), ('6', 'Teléfono inválido'), ('7', 'Categoría desconocida')]
+    assert cache_cedulas.puede_existir('2000000003')
+
+
+def test_cedula_repetida_en_el_mismo_lote(app):
+    resultado, _ = importar('cedula,nombre\n3000000001,Primero\n3000000001,Segundo\n')
+
+    assert (resultado.nuevos, resultado.duplicados) == (1, 1)
+    assert Usuario.query.filter_by(cedula='3000000001').one().nombre == 'Segundo'
+
+
+def test_solo_nuevos_no_modifica_los_registrados(app, registrado):
+    resultado, _ = importar(f'cedula,nombre,telefono\n{registrado.cedula},Otro Nombre,3009998888\n'
+                            '3000000001,Nuevo Ciudadano,\n', solo_nuevos=True)
+
+    assert (resultado.nuevos, resultado.omitidos, resultado.actualizados) == (1, 1, 0)
+    db.session.refresh(registrado)
+    assert (registrado.nombre, registrado.telefono) == ('Ciudadano de Prueba', '3001112222')
+
+
+def test_sin_categoria_en_el_archivo_conserva_la_registrada(app, registrado):
+    registrado.categoria = 'discapacidad'
+    db.session.commit()
+
+    importar(f'cedula,nombres\n{registrado.cedula},Nombre Nuevo\n')
+
+    db.session.refresh(registrado)
+    assert (registrado.nombre, registrado.categoria) == ('Nombre Nuevo', 'discapacidad')
+
+
+def test_encabezados_y_categorias():
+    assert Encabezado(['Identificación', 'Nombre Completo']).indices == {'cedula': 0}
+    with pytest.raises(ValueError):
+        Encabezado(['nombre', 'telefono'])
+    with pytest.raises(ValueError):
+        Encabezado(['cedula', 'telefono'])
+    assert normalizar_categoria('Adulto Mayor') == 'adulto_mayor'
+    assert normalizar_categoria('Persona con Discapacidad') == 'discapacidad'
+    assert normalizar_categoria('') == 'ninguna'
+    assert normalizar_categoria('otro') is None
+
+
+def test_no_descarta_la_importacion_en_proceso(tmp_path):
+    importaciones = Importaciones(maximo=2)
+    en_proceso = importaciones.crear(str(tmp_path), 'padron.csv', 10, 100)
+    en_proceso['estado'] = 'procesando'
+    importaciones.en_proceso = en_proceso['id']
+    with open(en_proceso['archivo'], 'w') as archivo:
+        archivo.write('cedula,nombre\n')
+
+    for nombre in ('a.csv', 'b.csv', 'c.csv'):
+        importaciones.crear(str(tmp_path), nombre, 10, 100)
+
+    assert [i['nombre'] for i in importaciones.listar()] == ['c.csv', 'padron.csv']
+    assert os.path.exists(en_proceso['archivo'])
@@ -0,0 +1,121 @@
+"""
+Envío de notificaciones por canales externos con el transporte 'memoria' (user-035)
+"""
+
+import pytest
+
+from app import mensajeria as modulo
+from app.mensajeria import Mensajeria, TransporteMemoria
+from app.models import db, EntregaNotificacion, Notificacion
+
+
+class TransporteFallido(TransporteMemoria):
+    """Rechaza todos los mensajes"""
+
+    def enviar_lote(self, mensajes):
+        return [(False, 'Pasarela caída')] * len(mensajes)
+
+
+class TransporteIncompleto(TransporteMemoria):
+    """Devuelve un resultado menos que los mensajes recibidos"""
+
+    def enviar_lote(self, mensajes):
+        return super().enviar_lote(mensajes)[:-1]
+
+
+@pytest.fixture
+def despacho(app, usuario):
+    """Mensajería solo por SMS, sin límite efectivo ni espera entre reintentos"""
+    app.config['MENSAJERIA_CANALES'] = ['sms']
+    app.config['MENSAJERIA_LIMITES'] = {'sms': 1000}
+    app.config['MENSAJERIA_REINTENTOS'] = 3
+    usuario.telefono = '3001234567'
+    db.session.commit()
+    TransporteMemoria.enviados.clear()
+    despacho = Mensajeria()
+    despacho.configurar(app)
+    return despacho
+
+
+@pytest.fixture
+def llamar(despacho, crear_turno):
+    """Registra y encola `cantidad` llamados de turnos distintos"""
+    def llamar(cantidad=1):
+        mensajes = []
+        for numero in range(1, cantidad + 1):
+            turno = crear_turno(f'N{numero:03d}')
+            notificacion = Notificacion(turno_id=turno.id, mensaje=f'Llamado {turno.numero_turno}')
+            db.session.add(notificacion)
+            db.session.flush()
+            mensajes.extend(despacho.preparar(turno, notificacion))
+        db.session.commit()
+        despacho.encolar(mensajes)
+        return mensajes
+    return llamar
+
+
+def entregas():
+    db.session.expire_all()
+    return {e.mensaje: e for e in EntregaNotificacion.query}
+
+
+def test_envio_exitoso_registra_el_acuse(despacho, llamar):
+    llamar(2)
+
+    assert despacho.procesar_pendientes() == 2
+
+    assert {m['mensaje'] for m in TransporteMemoria.enviados} == {'Llamado N001', 'Llamado N002'}
+    for entrega in entregas().values():
+        assert (entrega.estado, entrega.intentos) == ('enviado', 1)
+        assert entrega.referencia_proveedor == f'memoria-{entrega.id}'
+        assert entrega.fecha_envio is not None
+
+
+def test_reintento_con_espera_exponencial(app, despacho, llamar, monkeypatch):
+    esperas = []
+    monkeypatch.setattr(modulo.socketio, 'sleep', esperas.append)
+    monkeypatch.setattr(modulo.socketio, 'start_background_task', lambda funcion: funcion())
+    despacho.workers = ['worker']  # con workers el reintento espera antes de volver a la cola
+    despacho.transportes['sms'] = TransporteFallido('sms', app.config)
+    llamar()
+
+    despacho.procesar()
+    despacho.procesar()
+
+    backoff = app.config['MENSAJERIA_BACKOFF_SEGUNDOS']
+    assert esperas == [backoff, backoff * 2]
+    entrega = entregas()['Llamado N001']
+    assert (entrega.estado, entrega.intentos, entrega.ultimo_error) == ('pendiente', 2, 'Pasarela caída')
+
+    despacho.transportes['sms'] = TransporteMemoria('sms', app.config)
+    despacho.procesar()
+    assert (entregas()['Llamado N001'].estado, entregas()['Llamado N001'].intentos) == ('enviado', 3)
+
+
+def test_fallo_definitivo_al_agotar_los_reintentos(app, despacho, llamar):
+    despacho.transportes['sms'] = TransporteFallido('sms', app.config)
+    llamar()
+
+    assert despacho.procesar_pendientes() == 3
+
+    entrega = entregas()['Llamado N001']
+    assert (entrega.estado, entrega.intentos, entrega.ultimo_error) == ('fallido', 3, 'Pasarela caída')
+    assert despacho.estadisticas() == {'sms': 0}
+
+
+def test_resultados_faltantes_cuentan_como_fallos(app, despacho, llamar):
+    despacho.transportes['sms'] = TransporteIncompleto('sms', app.config)
+    llamar(2)
+
+    despacho.procesar()
+
+    resultado = entregas()
+    assert (resultado['Llamado N001'].estado, resultado['Llamado N001'].intentos) == ('enviado', 1)
+    assert (resultado['Llamado N002'].estado, resultado['Llamado N002'].intentos) == ('pendiente', 1)
+    assert resultado['Llamado N002'].ultimo_error == 'El transporte no devolvió resultado'
+    assert despacho.estadisticas() == {'sms': 1}
+
+    # Sin workers el reintento vuelve a la cola de inmediato y se entrega solo
+    despacho.transportes['sms'] = TransporteMemoria('sms', app.config)
+    despacho.procesar_pendientes()
+    assert entregas()['Llamado N002'].estado == 'enviado'
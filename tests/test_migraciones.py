@@ -0,0 +1,124 @@
+"""
+Migraciones de bases existentes: AUTOINCREMENT en SQLite (user-027, user-034)
+y columnas e índices nuevos agregados al iniciar (user-037)
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import inspect, text
+
+from app.archivo import archivar_dias_cerrados, barrer_notificaciones
+from app.migraciones import actualizar_esquema, migrar_autoincremento, tablas_sin_autoincremento
+from app.models import db, Notificacion, NotificacionHistorico, Turno, TurnoHistorico
+
+
+def quitar_autoincremento(tabla):
+    """Deja la tabla con la definición que tenían las bases creadas antes de AUTOINCREMENT"""
+    sql = db.session.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :nombre"), {'nombre': tabla}
+    ).scalar()
+    db.session.execute(text(f'DROP TABLE {tabla}'))
+    db.session.execute(text(sql.replace('AUTOINCREMENT', '')))
+    db.session.commit()
+
+
+def test_migracion_reconstruye_la_tabla_y_conserva_las_filas(app, usuario, crear_turno):
+    quitar_autoincremento('turnos')
+    assert tablas_sin_autoincremento() == ['turnos']
+
+    viejo = crear_turno('N001', estado='atendido', fecha_solicitud=datetime.utcnow() - timedelta(days=10))
+    viejo_id = viejo.id
+    abierto_id = crear_turno('N002').id
+    db.session.remove()
+
+    # Sin migrar, el archivado se niega a correr
+    assert archivar_dias_cerrados(dias_retencion=7) == 0
+    db.session.remove()
+
+    assert migrar_autoincremento() == ['turnos']
+    assert tablas_sin_autoincremento() == []
+    assert db.session.get(Turno, abierto_id).numero_turno == 'N002'
+    assert {i.name for i in Turno.__table__.indexes} <= set(db.session.execute(
+        text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'turnos'")
+    ).scalars())
+
+    assert archivar_dias_cerrados(dias_retencion=7) == 1
+    db.session.delete(db.session.get(Turno, abierto_id))
+    db.session.commit()
+
+    # La tabla operativa quedó vacía y aun así el id no se reutiliza
+    db.session.add(usuario)
+    nuevo = crear_turno('N003')
+    assert nuevo.id > abierto_id > viejo_id
+
+
+def test_migracion_salta_la_secuencia_por_encima_del_historico(app, usuario):
+    usuario_id = usuario.id
+    quitar_autoincremento('turnos')
+    db.session.add(TurnoHistorico(id=50, numero_turno='N050', usuario_id=usuario_id, tipo_tramite_id=1,
+                                  categoria_atencion='ninguna', estado='atendido',
+                                  fecha_solicitud=datetime.utcnow() - timedelta(days=30)))
+    db.session.commit()
+    db.session.remove()
+
+    migrar_autoincremento()
+
+    turno = Turno(numero_turno='N001', usuario_id=usuario_id, tipo_tramite_id=1, categoria_atencion='ninguna')
+    db.session.add(turno)
+    db.session.commit()
+    assert turno.id == 51
+
+
+def test_archivado_se_detiene_si_el_id_ya_esta_en_el_historico(app, crear_turno):
+    turno = crear_turno('N001', estado='atendido', fecha_solicitud=datetime.utcnow() - timedelta(days=10))
+    db.session.add(TurnoHistorico(id=turno.id, numero_turno='N900', usuario_id=turno.usuario_id, tipo_tramite_id=1,
+                                  categoria_atencion='ninguna', estado='atendido',
+                                  fecha_solicitud=turno.fecha_solicitud))
+    db.session.commit()
+
+    assert archivar_dias_cerrados(dias_retencion=7) == 0
+    assert db.session.get(Turno, turno.id) is not None
+    assert db.session.get(TurnoHistorico, turno.id).numero_turno == 'N900'
+
+
+def test_migracion_de_notificaciones_habilita_el_barrido(app, crear_turno):
+    quitar_autoincremento('notificaciones')
+    turno = crear_turno('N001', estado='atendido', fecha_solicitud=datetime.utcnow() - timedelta(days=3))
+    db.session.add(NotificacionHistorico(id=40, turno_id=turno.id, mensaje='Archivada',
+                                         fecha_envio=datetime.utcnow() - timedelta(days=3)))
+    db.session.add(Notificacion(turno_id=turno.id, mensaje='Llamado', fecha_envio=datetime.utcnow() - timedelta(days=3)))
+    db.session.commit()
+    db.session.remove()
+
+    assert tablas_sin_autoincremento() == ['notificaciones']
+    assert barrer_notificaciones(ttl_horas=24, archivar=True) == 0
+    db.session.remove()
+
+    assert migrar_autoincremento() == ['notificaciones']
+    assert barrer_notificaciones(ttl_horas=24, archivar=True) == 1
+    nueva = Notificacion(turno_id=1, mensaje='Otra')
+    db.session.add(nueva)
+    db.session.commit()
+    assert nueva.id == 41
+
+
+def test_actualizar_esquema_agrega_fecha_numero_y_quita_la_unicidad_global(app, usuario, crear_turno):
+    ayer = datetime.utcnow() - timedelta(days=1)
+    turno_id = crear_turno('N001', fecha_solicitud=ayer).id
+    # Definición anterior: número único en toda la tabla y sin fecha_numero
+    for sql in ('DROP INDEX ux_turnos_numero_fecha', 'DROP INDEX ix_turnos_numero_turno',
+                'CREATE UNIQUE INDEX ix_turnos_numero_turno ON turnos (numero_turno)',
+                'ALTER TABLE turnos DROP COLUMN fecha_numero'):
+        db.session.execute(text(sql))
+    db.session.commit()
+    db.session.remove()
+
+    actualizar_esquema()
+
+    indices = {i['name']: i['unique'] for i in inspect(db.engine).get_indexes('turnos')}
+    assert not indices['ix_turnos_numero_turno']
+    assert indices['ux_turnos_numero_fecha']
+    assert db.session.get(Turno, turno_id).fecha_numero == ayer.date()
+    db.session.add(usuario)
+    crear_turno('N001')
+    assert Turno.query.filter_by(numero_turno='N001').count() == 2
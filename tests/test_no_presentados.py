@@ -0,0 +1,79 @@
+"""
+Cierre automático de turnos no presentados (user-036)
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import db, Notificacion, Turno
+from app.no_presentados import LLAMADOS_MAXIMOS, marcar_no_presentados
+
+
+def hace_minutos(minutos):
+    return datetime.utcnow() - timedelta(minutes=minutos)
+
+
+def llamar(turno, minutos):
+    db.session.add(Notificacion(turno_id=turno.id, mensaje='Llamado', fecha_envio=hace_minutos(minutos)))
+    db.session.commit()
+
+
+@pytest.fixture(params=[True, False], ids=['returning', 'sin_returning'])
+def returning(request, app, monkeypatch):
+    """Ejecuta la prueba con UPDATE ... RETURNING y con el SELECT posterior (SQLite < 3.35)"""
+    monkeypatch.setattr(db.engine.dialect, 'update_returning', request.param)
+    return request.param
+
+
+def test_marca_los_turnos_que_agotaron_sus_llamados(app, crear_turno, returning):
+    solicitud = hace_minutos(60)
+    vencido = crear_turno('N001', llamados_realizados=LLAMADOS_MAXIMOS, fecha_solicitud=solicitud)
+    llamar(vencido, 20)
+    llamar(vencido, 10)
+    en_gracia = crear_turno('N002', llamados_realizados=LLAMADOS_MAXIMOS, fecha_solicitud=solicitud)
+    llamar(en_gracia, 1)
+    con_llamados = crear_turno('N003', llamados_realizados=LLAMADOS_MAXIMOS - 1, fecha_solicitud=solicitud)
+    llamar(con_llamados, 10)
+    en_atencion = crear_turno('N004', estado='en_atencion', llamados_realizados=LLAMADOS_MAXIMOS,
+                              fecha_solicitud=solicitud)
+
+    marcados = marcar_no_presentados(gracia_minutos=5)
+
+    assert marcados == [{'id': vencido.id, 'numero_turno': 'N001', 'tipo_tramite_id': 1}]
+    estados = {t.numero_turno: t.estado for t in Turno.query}
+    assert estados == {'N001': 'no_presentado', 'N002': 'pendiente', 'N003': 'pendiente', 'N004': 'en_atencion'}
+
+
+def test_la_gracia_de_un_llamado_antes_de_medianoche_se_respeta(app, crear_turno, returning, monkeypatch):
+    medianoche = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+
+    class Reloj(datetime):
+        @classmethod
+        def utcnow(cls):
+            return medianoche + timedelta(minutes=1)
+
+    monkeypatch.setattr('app.no_presentados.datetime', Reloj)
+    solicitud = medianoche - timedelta(hours=1)
+    en_gracia = crear_turno('N001', llamados_realizados=LLAMADOS_MAXIMOS, fecha_solicitud=solicitud)
+    db.session.add(Notificacion(turno_id=en_gracia.id, mensaje='Llamado', fecha_envio=medianoche - timedelta(minutes=2)))
+    vencido = crear_turno('N002', llamados_realizados=LLAMADOS_MAXIMOS, fecha_solicitud=solicitud)
+    db.session.add(Notificacion(turno_id=vencido.id, mensaje='Llamado', fecha_envio=medianoche - timedelta(minutes=10)))
+    db.session.commit()
+
+    assert [t['id'] for t in marcar_no_presentados(gracia_minutos=5)] == [vencido.id]
+
+
+def test_sin_llamados_usa_la_fecha_de_solicitud(app, crear_turno, returning):
+    antiguo = crear_turno('N001', llamados_realizados=LLAMADOS_MAXIMOS, fecha_solicitud=hace_minutos(60))
+    crear_turno('N002', llamados_realizados=LLAMADOS_MAXIMOS, fecha_solicitud=hace_minutos(1))
+
+    assert [t['id'] for t in marcar_no_presentados(gracia_minutos=5)] == [antiguo.id]
+
+
+def test_procesa_por_lotes(app, crear_turno, returning):
+    for numero in range(1, 6):
+        crear_turno(f'N{numero:03d}', llamados_realizados=LLAMADOS_MAXIMOS, fecha_solicitud=hace_minutos(60))
+
+    assert len(marcar_no_presentados(gracia_minutos=5, tamano_lote=2)) == 5
+    assert Turno.query.filter_by(estado='pendiente').count() == 0